@@ -1,13 +1,22 @@
 #!/usr/bin/env bash
 export LTA_AUTH_ALGORITHM=${LTA_AUTH_ALGORITHM:="HS512"}
+export LTA_AUTH_CACHE_SIZE=${LTA_AUTH_CACHE_SIZE:="1024"}
 export LTA_AUTH_ISSUER=${LTA_AUTH_ISSUER:="http://localhost:8888"}
 export LTA_AUTH_SECRET=${LTA_AUTH_SECRET:="$(<local-secret)"}
+export LTA_BULK_CREATE_CHUNK_BYTES=${LTA_BULK_CREATE_CHUNK_BYTES:="4194304"}
 export LTA_MAX_CLAIM_AGE_HOURS=${LTA_MAX_CLAIM_AGE_HOURS:="12"}
 export LTA_MONGODB_AUTH_USER=${LTA_MONGODB_AUTH_USER:=''}
 export LTA_MONGODB_AUTH_PASS=${LTA_MONGODB_AUTH_PASS:=''}
 export LTA_MONGODB_DATABASE_NAME=${LTA_MONGODB_DATABASE_NAME:='lta'}
 export LTA_MONGODB_HOST=${LTA_MONGODB_HOST:='localhost'}
 export LTA_MONGODB_PORT=${LTA_MONGODB_PORT:='27017'}
+export LTA_POP_DEST_WEIGHTS=${LTA_POP_DEST_WEIGHTS:="{}"}
+export LTA_POP_POLICY=${LTA_POP_POLICY:="fifo"}
+export LTA_POP_WAIT_POLL_SECONDS=${LTA_POP_WAIT_POLL_SECONDS:="30"}
+export LTA_RECOUNT_BUNDLES=${LTA_RECOUNT_BUNDLES:="False"}
 export LTA_REST_HOST=${LTA_REST_HOST:="127.0.0.1"}
 export LTA_REST_PORT=${LTA_REST_PORT:="8080"}
+export LTA_REST_TRACE=${LTA_REST_TRACE:="False"}
+export LTA_REST_WORKERS=${LTA_REST_WORKERS:="1"}
+export LTA_STATUS_CACHE_SECONDS=${LTA_STATUS_CACHE_SECONDS:="15"}
 python -m lta.rest_server
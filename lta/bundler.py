@@ -62,33 +62,31 @@ class Bundler(Component):
     async def _do_work(self) -> None:
         """Perform a work cycle for this component."""
         self.logger.info("Starting work on Bundles.")
-        work_claimed = True
-        while work_claimed:
-            work_claimed = await self._do_work_claim()
-            work_claimed &= not self.run_once_and_die
+        await self._do_work_claims()
         self.logger.info("Ending work on Bundles.")
 
     async def _do_work_claim(self) -> bool:
         """Claim a bundle and perform work on it."""
         # 1. Ask the LTA DB for the next Bundle to be built
         # configure a RestClient to talk to the LTA DB
-        lta_rc = RestClient(self.lta_rest_url,
-                            token=self.lta_rest_token,
-                            timeout=self.work_timeout_seconds,
-                            retries=self.work_retries)
+        lta_rc = self.rest_client(self.lta_rest_url,
+                                  token=self.lta_rest_token,
+                                  timeout=self.work_timeout_seconds,
+                                  retries=self.work_retries)
         self.logger.info("Asking the LTA DB for a Bundle to build.")
         pop_body = {
             "claimant": f"{self.name}-{self.instance_uuid}"
         }
-        response = await lta_rc.request('POST', f'/Bundles/actions/pop?source={self.source_site}&status=specified', pop_body)
+        response = await lta_rc.request('POST', f'/Bundles/actions/pop?source={self.source_site}&status=specified&wait={self.pop_wait(self.work_timeout_seconds)}', pop_body)
         self.logger.info(f"LTA DB responded with: {response}")
         bundle = response["bundle"]
         if not bundle:
             self.logger.info("LTA DB did not provide a Bundle to build. Going on vacation.")
             return False
-        # process the Bundle that we were given
+        # process the Bundle that we were given; it isn't built yet, so budget the bytes of its files
         try:
-            await self._do_work_bundle(lta_rc, bundle)
+            async with self.work_budget.reserve(sum(file.get("file_size", 0) for file in bundle.get("files", []))):
+                await self._do_work_bundle(lta_rc, bundle)
         except Exception as e:
             await self._quarantine_bundle(lta_rc, bundle, f"{e}")
             raise e
@@ -113,11 +111,53 @@ class Bundler(Component):
             "files": bundle["files"],
         }
         metadata_file_path = os.path.join(self.workbox_path, f"{bundle_id}.metadata.json")
+        # 2. Create a ZIP bundle by writing the manifest and constituent files to it
+        bundle_file_path = os.path.join(self.workbox_path, f"{bundle_id}.zip")
+        await self.run_io(self._write_bundle_zip, bundle, metadata_dict, metadata_file_path, bundle_file_path)
+        # 3. Compute the size of the bundle
+        bundle_size = os.path.getsize(bundle_file_path)
+        self.logger.info(f"Archive bundle has size {bundle_size} bytes")
+        # 4. Compute the LTA checksums for the bundle
+        self.logger.info(f"Computing LTA checksums for bundle: '{bundle_file_path}'")
+        checksum = await self.run_cpu(lta_checksums, bundle_file_path)
+        self.logger.info(f"Bundle '{bundle_file_path}' has adler32 checksum '{checksum['adler32']}'")
+        self.logger.info(f"Bundle '{bundle_file_path}' has SHA512 checksum '{checksum['sha512']}'")
+        # 5. Determine the final destination path of the bundle
+        final_bundle_path = bundle_file_path
+        if self.outbox_path != self.workbox_path:
+            final_bundle_path = os.path.join(self.outbox_path, f"{bundle_id}.zip")
+        self.logger.info(f"Finished archive bundle will be located at: '{final_bundle_path}'")
+        # 6. Collect the information to update the bundle record; the file
+        #    manifest is unchanged, so we don't send it back to the LTA DB
+        patch_body = {
+            "status": "created",
+            "reason": "",
+            "update_timestamp": now(),
+            "bundle_path": final_bundle_path,
+            "size": bundle_size,
+            "checksum": checksum,
+            "verified": False,
+            "claimed": False,
+        }
+        # 7. Move the bundle from the work box to the outbox
+        if final_bundle_path != bundle_file_path:
+            self.logger.info(f"Moving bundle from '{bundle_file_path}' to '{final_bundle_path}'")
+            await self.run_io(shutil.move, bundle_file_path, final_bundle_path)
+        self.logger.info(f"Finished archive bundle now located at: '{final_bundle_path}'")
+        # 8. Update the Bundle record in the LTA DB
+        self.logger.info(f"PATCH /Bundles/{bundle_id} - '{patch_body}'")
+        await lta_rc.request('PATCH', f'/Bundles/{bundle_id}?return=minimal', patch_body)
+
+    def _write_bundle_zip(self,
+                          bundle: BundleType,
+                          metadata_dict: Dict[str, Any],
+                          metadata_file_path: str,
+                          bundle_file_path: str) -> None:
+        """Write the manifest and files of a bundle to a ZIP archive; this blocks, so run it in the thread pool."""
+        num_files = len(bundle["files"])
         with open(metadata_file_path, mode="w") as metadata_file:
             self.logger.info(f"Writing bundle metadata to '{metadata_file_path}'")
             metadata_file.write(json.dumps(metadata_dict))
-        # 2. Create a ZIP bundle by writing constituent files to it
-        bundle_file_path = os.path.join(self.workbox_path, f"{bundle_id}.zip")
         self.logger.info(f"Creating bundle as ZIP archive: '{bundle_file_path}'")
         with ZipFile(bundle_file_path, mode="x", compression=ZIP_STORED, allowZip64=True) as bundle_zip:
             self.logger.info(f"Adding bundle metadata '{metadata_file_path}' to bundle '{bundle_file_path}'")
@@ -129,40 +169,9 @@ class Bundler(Component):
                 self.logger.info(f"Writing file {file_count}/{num_files}: '{bundle_me_path}' to bundle '{bundle_file_path}'")
                 bundle_zip.write(bundle_me_path, os.path.basename(bundle_me_path))
                 file_count = file_count + 1
-        # 3. Clean up generated JSON metadata file
         self.logger.info(f"Deleting bundle metadata file: '{metadata_file_path}'")
         os.remove(metadata_file_path)
         self.logger.info(f"Bundle metadata '{metadata_file_path}' was deleted.")
-        # 4. Compute the size of the bundle
-        bundle_size = os.path.getsize(bundle_file_path)
-        self.logger.info(f"Archive bundle has size {bundle_size} bytes")
-        # 5. Compute the LTA checksums for the bundle
-        self.logger.info(f"Computing LTA checksums for bundle: '{bundle_file_path}'")
-        checksum = lta_checksums(bundle_file_path)
-        self.logger.info(f"Bundle '{bundle_file_path}' has adler32 checksum '{checksum['adler32']}'")
-        self.logger.info(f"Bundle '{bundle_file_path}' has SHA512 checksum '{checksum['sha512']}'")
-        # 6. Determine the final destination path of the bundle
-        final_bundle_path = bundle_file_path
-        if self.outbox_path != self.workbox_path:
-            final_bundle_path = os.path.join(self.outbox_path, f"{bundle_id}.zip")
-        self.logger.info(f"Finished archive bundle will be located at: '{final_bundle_path}'")
-        # 7. Update the bundle record we have with all the information we collected
-        bundle["status"] = "created"
-        bundle["reason"] = ""
-        bundle["update_timestamp"] = now()
-        bundle["bundle_path"] = final_bundle_path
-        bundle["size"] = bundle_size
-        bundle["checksum"] = checksum
-        bundle["verified"] = False
-        bundle["claimed"] = False
-        # 8. Move the bundle from the work box to the outbox
-        if final_bundle_path != bundle_file_path:
-            self.logger.info(f"Moving bundle from '{bundle_file_path}' to '{final_bundle_path}'")
-            shutil.move(bundle_file_path, final_bundle_path)
-        self.logger.info(f"Finished archive bundle now located at: '{final_bundle_path}'")
-        # 9. Update the Bundle record in the LTA DB
-        self.logger.info(f"PATCH /Bundles/{bundle_id} - '{bundle}'")
-        await lta_rc.request('PATCH', f'/Bundles/{bundle_id}', bundle)
 
     async def _quarantine_bundle(self,
                                  lta_rc: RestClient,
@@ -177,7 +186,7 @@ class Bundler(Component):
             "work_priority_timestamp": right_now,
         }
         try:
-            await lta_rc.request('PATCH', f'/Bundles/{bundle["uuid"]}', patch_body)
+            await lta_rc.request('PATCH', f'/Bundles/{bundle["uuid"]}?return=minimal', patch_body)
         except Exception as e:
             self.logger.error(f'Unable to quarantine Bundle {bundle["uuid"]}: {e}.')
 
@@ -2,12 +2,22 @@
 """Module to implement an abstract base Component for the Long Term Archive."""
 
 import asyncio
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import asynccontextmanager
 from datetime import datetime
+from functools import partial
 from logging import Logger
 import os
 from pathlib import Path
+import random
+import signal
+from subprocess import CompletedProcess, PIPE, TimeoutExpired
 import sys
-from typing import Any, Dict, Optional
+import threading
+import time
+import traceback
+from typing import Any, AsyncIterator, Callable, cast, Deque, Dict, List, Optional, Tuple, TypeVar
 from uuid import uuid4
 
 from rest_tools.client import RestClient  # type: ignore
@@ -21,13 +31,20 @@ COMMON_CONFIG: Dict[str, Optional[str]] = {
     "HEARTBEAT_PATCH_RETRIES": "3",
     "HEARTBEAT_PATCH_TIMEOUT_SECONDS": "30",
     "HEARTBEAT_SLEEP_DURATION_SECONDS": "60",
+    "LOOP_STALL_LOG_SECONDS": "0",  # 0 means never log the stack of a stall
     "LTA_REST_TOKEN": None,
     "LTA_REST_URL": None,
     "RUN_ONCE_AND_DIE": "False",
     "SOURCE_SITE": None,
+    "WORK_BYTES_IN_FLIGHT": "0",  # 0 means no limit
+    "WORK_CONCURRENCY": "1",
     "WORK_SLEEP_DURATION_SECONDS": "60",
+    "WORK_SLEEP_MIN_DURATION_SECONDS": "5",
 }
 
+LOOP_LAG_SAMPLE_SECONDS = 0.5
+LOOP_LAG_SAMPLES = 1200  # ten minutes of samples
+
 def now() -> str:
     """Return string timestamp for current time, to the second."""
     return datetime.utcnow().isoformat(timespec='seconds')
@@ -36,6 +53,145 @@ def unique_id() -> str:
     """Return a unique ID for a module instance."""
     return str(uuid4())
 
+T = TypeVar("T")
+
+async def run_command(args: List[str], timeout: Optional[float] = None) -> "CompletedProcess[bytes]":
+    """
+    Run a command like subprocess.run(args, stdout=PIPE, stderr=PIPE, timeout=timeout), without blocking the event loop.
+
+    If the command times out, or we are cancelled while waiting for it, the
+    command is killed and reaped before the TimeoutExpired or CancelledError
+    is raised, so it never outlives the work that started it.
+    """
+    process = await asyncio.create_subprocess_exec(*args, stdout=PIPE, stderr=PIPE)
+    try:
+        stdout, stderr = await asyncio.wait_for(process.communicate(), timeout)
+    except BaseException as e:
+        if process.returncode is None:
+            try:
+                process.kill()
+            except ProcessLookupError:
+                pass  # it exited on its own in the meantime
+            await process.wait()
+        if isinstance(e, asyncio.TimeoutError):
+            raise TimeoutExpired(args, cast(float, timeout)) from e
+        raise
+    returncode = await process.wait()
+    return CompletedProcess(args, returncode, stdout, stderr)
+
+class ByteBudget:
+    """ByteBudget limits the number of bytes being worked on at the same time."""
+
+    def __init__(self, budget: int) -> None:
+        """Create a ByteBudget; a budget of 0 means no limit."""
+        self.budget = budget
+        self.in_flight = 0
+        self._condition: Optional[asyncio.Condition] = None
+
+    @asynccontextmanager
+    async def reserve(self, size: int) -> AsyncIterator[None]:
+        """Wait until size bytes fit in the budget and hold them until done."""
+        if self.budget <= 0:
+            yield
+            return
+        # created here, so that it belongs to the loop that is running us
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        condition = self._condition
+        async with condition:
+            # something bigger than the whole budget may run by itself
+            await condition.wait_for(lambda: (self.in_flight == 0) or (self.in_flight + size <= self.budget))
+            self.in_flight += size
+        try:
+            yield
+        finally:
+            async with condition:
+                self.in_flight -= size
+                condition.notify_all()
+
+def percentile(ordered: List[float], fraction: float) -> float:
+    """Find the value at the provided fraction of the sorted values."""
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+class LoopMonitor:
+    """LoopMonitor measures how late the event loop is to run its callbacks."""
+
+    def __init__(self, logger: Logger, stall_log_seconds: float) -> None:
+        """Create a LoopMonitor; a stall_log_seconds of 0 means never log stacks."""
+        self.logger = logger
+        self.stall_log_seconds = stall_log_seconds
+        self.lags: Deque[float] = deque(maxlen=LOOP_LAG_SAMPLES)
+        self.max_lag = 0.0
+        self.last_tick = time.monotonic()
+        self._loop_thread_id = 0
+        self._stopped = threading.Event()
+        self._task: "Optional[asyncio.Future[None]]" = None
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Start sampling the running event loop, and watching it for stalls if configured."""
+        if self._task is not None:
+            return
+        self._task = asyncio.ensure_future(self._sample())
+        if self.stall_log_seconds > 0:
+            self._loop_thread_id = threading.get_ident()
+            self._thread = threading.Thread(target=self._watch, name="loop-stall-watchdog", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        """Stop sampling the event loop, and wait for the stall watchdog to finish."""
+        self._stopped.set()
+        if self._task is not None:
+            self._task.cancel()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def status(self) -> Dict[str, float]:
+        """Summarize the event loop lag; the maximum is since the last reset()."""
+        ordered = sorted(self.lags)
+        return {
+            "loop_lag_p50_seconds": percentile(ordered, 0.50),
+            "loop_lag_p99_seconds": percentile(ordered, 0.99),
+            "loop_lag_max_seconds": self.max_lag,
+        }
+
+    def reset(self) -> None:
+        """Start a new window for the maximum, so that one old stall doesn't pin it forever."""
+        self.max_lag = 0.0
+
+    def snapshot_and_reset(self) -> Dict[str, float]:
+        """Summarize the event loop lag for a status heartbeat, and start a new window."""
+        ret = self.status()
+        self.reset()
+        return ret
+
+    async def _sample(self) -> None:
+        """Measure how much later than scheduled each of our sleeps wakes up."""
+        loop = asyncio.get_event_loop()
+        while True:
+            expected = loop.time() + LOOP_LAG_SAMPLE_SECONDS
+            await asyncio.sleep(LOOP_LAG_SAMPLE_SECONDS)
+            lag = max(0.0, loop.time() - expected)
+            self.last_tick = time.monotonic()
+            self.lags.append(lag)
+            self.max_lag = max(self.max_lag, lag)
+
+    def _watch(self) -> None:
+        """Log the stack of the event loop thread whenever it stalls; runs in its own thread."""
+        reported_tick = 0.0
+        while not self._stopped.wait(self.stall_log_seconds / 2):
+            last_tick = self.last_tick
+            stalled = time.monotonic() - last_tick - LOOP_LAG_SAMPLE_SECONDS
+            if (stalled < self.stall_log_seconds) or (last_tick == reported_tick):
+                continue
+            reported_tick = last_tick
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = "".join(traceback.format_stack(frame)) if frame else "(unavailable)"
+            self.logger.warning(f"Event loop has been blocked for {stalled:.1f} seconds in:\n{stack}")
+
 class Component:
     """
     Component is a Long Term Archive component.
@@ -69,11 +225,28 @@ class Component:
         self.heartbeat_patch_retries = int(config["HEARTBEAT_PATCH_RETRIES"])
         self.heartbeat_patch_timeout_seconds = float(config["HEARTBEAT_PATCH_TIMEOUT_SECONDS"])
         self.heartbeat_sleep_duration_seconds = float(config["HEARTBEAT_SLEEP_DURATION_SECONDS"])
+        self.loop_monitor = LoopMonitor(logger, float(config["LOOP_STALL_LOG_SECONDS"]))
         self.lta_rest_token = config["LTA_REST_TOKEN"]
         self.lta_rest_url = config["LTA_REST_URL"]
         self.run_once_and_die = boolify(config["RUN_ONCE_AND_DIE"])
         self.source_site = config["SOURCE_SITE"]
+        self.work_budget = ByteBudget(int(config["WORK_BYTES_IN_FLIGHT"]))
+        self.work_concurrency = max(1, int(config["WORK_CONCURRENCY"]))
         self.work_sleep_duration_seconds = float(config["WORK_SLEEP_DURATION_SECONDS"])
+        self.work_sleep_min_duration_seconds = min(float(config["WORK_SLEEP_MIN_DURATION_SECONDS"]),
+                                                   self.work_sleep_duration_seconds)
+        # adaptive sleep between work cycles; see next_sleep_duration()
+        self.last_pop_wait = 0
+        self.last_work_claimed = False
+        self.last_work_seconds = 0.0
+        self.work_backoff_seconds = self.work_sleep_min_duration_seconds
+        self._wake_event: Optional[asyncio.Event] = None
+        # long-lived RestClients, so that connections are kept alive between requests
+        self._rest_clients: Dict[Tuple[str, str, float, int], RestClient] = {}
+        # executors for blocking work; one extra thread for the status heartbeat
+        self.io_executor = ThreadPoolExecutor(max_workers=self.work_concurrency + 1)
+        # most components never run_cpu, so the process pool is created on first use
+        self.cpu_executor: Optional[ProcessPoolExecutor] = None
         # record some default state
         timestamp = datetime.utcnow().isoformat()
         self.last_work_begin_timestamp = timestamp
@@ -88,6 +261,9 @@ class Component:
         self.logger.info(f"Starting {self.type} work cycle")
         # start the work cycle stopwatch
         self.last_work_begin_timestamp = datetime.utcnow().isoformat()
+        self.last_pop_wait = 0
+        self.last_work_claimed = False
+        start = time.monotonic()
         # perform the work
         try:
             await self._do_work()
@@ -96,6 +272,7 @@ class Component:
             self.logger.error(f"Error occurred during the {self.type} work cycle")
             self.logger.error(f"Error was: '{e}'", exc_info=True)
         # stop the work cycle stopwatch
+        self.last_work_seconds = time.monotonic() - start
         self.last_work_end_timestamp = datetime.utcnow().isoformat()
         self.logger.info(f"Ending {self.type} work cycle")
         # if we are configured to run once and die, then die
@@ -118,6 +295,90 @@ class Component:
             if not config[name]:
                 raise ValueError(f"Missing expected configuration parameter: '{name}'")
 
+    def rest_client(self, url: str, token: str, timeout: float, retries: int) -> RestClient:
+        """Get the shared RestClient for a REST service, creating it on first use."""
+        key = (url, token, timeout, retries)
+        if key not in self._rest_clients:
+            self._rest_clients[key] = RestClient(url,
+                                                 token=token,
+                                                 timeout=timeout,
+                                                 retries=retries)
+        return self._rest_clients[key]
+
+    async def run_io(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Run a blocking I/O call in the thread pool, so the event loop keeps running."""
+        return await asyncio.get_event_loop().run_in_executor(self.io_executor, partial(func, *args, **kwargs))
+
+    async def run_cpu(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Run a CPU-bound call in the process pool, so the event loop keeps running."""
+        if self.cpu_executor is None:
+            self.cpu_executor = ProcessPoolExecutor(max_workers=self.work_concurrency)
+        return await asyncio.get_event_loop().run_in_executor(self.cpu_executor, partial(func, *args, **kwargs))
+
+    async def _do_work_claims(self) -> None:
+        """Call _do_work_claim until it runs out of work, WORK_CONCURRENCY claims at a time."""
+        async def worker() -> None:
+            work_claimed = True
+            while work_claimed:
+                work_claimed = await self._do_work_claim()
+                self.last_work_claimed |= work_claimed
+                work_claimed &= not self.run_once_and_die
+        # let every worker finish before we report a problem in any of them
+        results: List[Any] = await asyncio.gather(*[worker() for i in range(self.work_concurrency)],
+                                                  return_exceptions=True)
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+
+    def next_sleep_duration(self) -> float:
+        """Determine how long to sleep before the next work cycle."""
+        # while work is flowing, poll again soon
+        if self.last_work_claimed:
+            self.work_backoff_seconds = self.work_sleep_min_duration_seconds
+            return self.work_sleep_min_duration_seconds
+        # if the LTA DB held our pops for as long as we asked, we already waited for work
+        if self.last_pop_wait and (self.last_work_seconds >= self.last_pop_wait):
+            self.work_backoff_seconds = self.work_sleep_min_duration_seconds
+            return 0
+        # otherwise back off, with jitter so that idle components don't poll in lockstep
+        self.work_backoff_seconds = min(self.work_backoff_seconds * 2, self.work_sleep_duration_seconds)
+        return random.uniform(max(self.work_backoff_seconds / 2, self.work_sleep_min_duration_seconds),
+                              self.work_backoff_seconds)
+
+    async def sleep_until_woken(self, seconds: float) -> None:
+        """Sleep for the provided number of seconds, or until wake() is called."""
+        # created here, so that it belongs to the loop that is running us
+        if self._wake_event is None:
+            self._wake_event = asyncio.Event()
+        try:
+            await asyncio.wait_for(self._wake_event.wait(), timeout=seconds)
+            self.logger.info("Woken up to look for work")
+        except asyncio.TimeoutError:
+            pass
+        self._wake_event.clear()
+
+    def wake(self) -> None:
+        """Cut short the sleep between work cycles; e.g.: on SIGUSR1."""
+        # treat the wake-up like work arriving, even if we are mid-cycle
+        self.last_work_claimed = True
+        if self._wake_event is not None:
+            self._wake_event.set()
+
+    def pop_wait(self, timeout: float) -> int:
+        """
+        Determine how many seconds a pop may wait on the LTA DB for work.
+
+        The wait stands in for the sleep between work cycles, so it is never
+        longer than WORK_SLEEP_DURATION_SECONDS, and it stays well inside the
+        timeout of the RestClient making the pop. The wait is remembered, so
+        that an idle cycle whose pops waited doesn't sleep on top of it.
+        """
+        if self.run_once_and_die:
+            return 0
+        wait = int(min(self.work_sleep_duration_seconds, timeout / 2))
+        self.last_pop_wait = max(self.last_pop_wait, wait)
+        return wait
+
     def _do_status(self) -> Dict[str, Any]:
         """Override this to provide status updates."""
         raise NotImplementedError()
@@ -130,6 +391,10 @@ class Component:
         """Override this to provide work cycle behavior."""
         raise NotImplementedError()
 
+    async def _do_work_claim(self) -> bool:
+        """Override this to claim and perform one unit of work; return False when there is none."""
+        raise NotImplementedError()
+
 
 def check_drain_semaphore(component: Component) -> bool:
     """Check if a drain semaphore exists in the current working directory."""
@@ -146,7 +411,7 @@ async def patch_status_heartbeat(component: Component) -> bool:
     status_route = f"/status/{component.type}"
     status_url = urljoin(component.lta_rest_url, status_route)
     # determine the body to PATCH with
-    status_body = {
+    status_body: Dict[str, Dict[str, Any]] = {
         component.name: {
             "timestamp": datetime.utcnow().isoformat(),
             "last_work_begin_timestamp": component.last_work_begin_timestamp,
@@ -154,15 +419,17 @@ async def patch_status_heartbeat(component: Component) -> bool:
         }
     }
     # ask the base class to annotate the status body
-    status_update = component._do_status()
+    # (in the thread pool, as some components shell out to report status)
+    status_update = await component.run_io(component._do_status)
     status_body[component.name].update(status_update)
+    status_body[component.name].update(component.loop_monitor.snapshot_and_reset())
     # attempt to PATCH the status resource
     component.logger.info(f"PATCH {status_url} - {status_body}")
     try:
-        rc = RestClient(component.lta_rest_url,
-                        token=component.lta_rest_token,
-                        timeout=component.heartbeat_patch_timeout_seconds,
-                        retries=component.heartbeat_patch_retries)
+        rc = component.rest_client(component.lta_rest_url,
+                                   token=component.lta_rest_token,
+                                   timeout=component.heartbeat_patch_timeout_seconds,
+                                   retries=component.heartbeat_patch_retries)
         # Use the RestClient to PATCH our heartbeat to the LTA DB
         await rc.request("PATCH", status_route, status_body)
     except Exception as e:
@@ -174,23 +441,56 @@ async def patch_status_heartbeat(component: Component) -> bool:
     return True
 
 
+async def renew_claims(component: Component) -> bool:
+    """POST /Bundles/actions/renew to extend the leases on our claims."""
+    claimant = f"{component.name}-{component.instance_uuid}"
+    renew_body = {
+        "claimant": claimant,
+    }
+    try:
+        rc = component.rest_client(component.lta_rest_url,
+                                   token=component.lta_rest_token,
+                                   timeout=component.heartbeat_patch_timeout_seconds,
+                                   retries=component.heartbeat_patch_retries)
+        # Use the RestClient to renew our claims in the LTA DB
+        response = await rc.request("POST", "/Bundles/actions/renew", renew_body)
+    except Exception as e:
+        component.logger.error(f"Error trying to renew Bundle claims for {claimant}")
+        component.logger.error(f"Error was: '{e}'", exc_info=True)
+        return False
+    if response["count"]:
+        component.logger.info(f"Renewed {response['count']} Bundle claims for {claimant}")
+    return True
+
+
 async def status_loop(component: Component) -> None:
     """Run status heartbeat updates as an infinite loop."""
     component.logger.info("Starting status loop")
+    # measure event loop lag, so that the heartbeat can report it
+    component.loop_monitor.start()
     while not check_drain_semaphore(component):
         # PATCH /status/{component}
         await patch_status_heartbeat(component)
+        # keep the leases on our claimed Bundles alive
+        await renew_claims(component)
         # sleep until we PATCH the next heartbeat
         await asyncio.sleep(component.heartbeat_sleep_duration_seconds)
+    component.loop_monitor.stop()
     component.logger.info("Ending status heartbeats; drain semaphore detected.")
 
 
 async def work_loop(component: Component) -> None:
     """Run component work cycles as an infinite loop."""
     component.logger.info("Starting work loop")
+    # let operators and other local processes wake us with SIGUSR1
+    loop = asyncio.get_event_loop()
+    try:
+        loop.add_signal_handler(signal.SIGUSR1, component.wake)
+    except (NotImplementedError, RuntimeError, ValueError):
+        component.logger.info("Unable to wake on SIGUSR1; work cycles will only start on schedule")
     while not check_drain_semaphore(component):
         # Do the work of the component
         await component.run()
         # sleep until we need to work again
-        await asyncio.sleep(component.work_sleep_duration_seconds)
+        await component.sleep_until_woken(component.next_sleep_duration())
     component.logger.info("Component drained; shutting down.")
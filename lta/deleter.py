@@ -63,25 +63,22 @@ class Deleter(Component):
     async def _do_work(self) -> None:
         """Perform a work cycle for this component."""
         self.logger.info("Starting work on Bundles.")
-        work_claimed = True
-        while work_claimed:
-            work_claimed = await self._do_work_claim()
-            work_claimed &= not self.run_once_and_die
+        await self._do_work_claims()
         self.logger.info("Ending work on Bundles.")
 
     async def _do_work_claim(self) -> bool:
         """Claim a bundle and perform work on it."""
         # 1. Ask the LTA DB for the next Bundle to be deleted
         # configure a RestClient to talk to the LTA DB
-        lta_rc = RestClient(self.lta_rest_url,
-                            token=self.lta_rest_token,
-                            timeout=self.work_timeout_seconds,
-                            retries=self.work_retries)
+        lta_rc = self.rest_client(self.lta_rest_url,
+                                  token=self.lta_rest_token,
+                                  timeout=self.work_timeout_seconds,
+                                  retries=self.work_retries)
         self.logger.info("Asking the LTA DB for a Bundle to delete.")
         pop_body = {
             "claimant": f"{self.name}-{self.instance_uuid}"
         }
-        response = await lta_rc.request('POST', f'/Bundles/actions/pop?dest={self.dest_site}&status={self.input_status}', pop_body)
+        response = await lta_rc.request('POST', f'/Bundles/actions/pop?dest={self.dest_site}&status={self.input_status}&contents=false&wait={self.pop_wait(self.work_timeout_seconds)}', pop_body)
         self.logger.info(f"LTA DB responded with: {response}")
         bundle = response["bundle"]
         if not bundle:
@@ -104,7 +101,7 @@ class Deleter(Component):
         bundle_path = os.path.join(self.disk_base_path, bundle_name)
         # delete the file from the disk
         self.logger.info(f"Removing file {bundle_path} from the disk.")
-        os.remove(bundle_path)
+        await self.run_io(os.remove, bundle_path)
         # update the Bundle in the LTA DB
         self.logger.info(f"File {bundle_path} was deleted from the disk.")
         patch_body = {
@@ -114,7 +111,7 @@ class Deleter(Component):
             "claimed": False,
         }
         self.logger.info(f"PATCH /Bundles/{bundle_id} - '{patch_body}'")
-        await lta_rc.request('PATCH', f'/Bundles/{bundle_id}', patch_body)
+        await lta_rc.request('PATCH', f'/Bundles/{bundle_id}?return=minimal', patch_body)
         return True
 
     async def _quarantine_bundle(self,
@@ -130,7 +127,7 @@ class Deleter(Component):
             "work_priority_timestamp": right_now,
         }
         try:
-            await lta_rc.request('PATCH', f'/Bundles/{bundle["uuid"]}', patch_body)
+            await lta_rc.request('PATCH', f'/Bundles/{bundle["uuid"]}?return=minimal', patch_body)
         except Exception as e:
             self.logger.error(f'Unable to quarantine Bundle {bundle["uuid"]}: {e}.')
 
@@ -66,25 +66,22 @@ class DesyMoveVerifier(Component):
     async def _do_work(self) -> None:
         """Perform a work cycle for this component."""
         self.logger.info("Starting work on Bundles.")
-        work_claimed = True
-        while work_claimed:
-            work_claimed = await self._do_work_claim()
-            work_claimed &= not self.run_once_and_die
+        await self._do_work_claims()
         self.logger.info("Ending work on Bundles.")
 
     async def _do_work_claim(self) -> bool:
         """Claim a bundle and perform work on it."""
         # 1. Ask the LTA DB for the next Bundle to be verified
         # configure a RestClient to talk to the LTA DB
-        lta_rc = RestClient(self.lta_rest_url,
-                            token=self.lta_rest_token,
-                            timeout=self.work_timeout_seconds,
-                            retries=self.work_retries)
+        lta_rc = self.rest_client(self.lta_rest_url,
+                                  token=self.lta_rest_token,
+                                  timeout=self.work_timeout_seconds,
+                                  retries=self.work_retries)
         self.logger.info("Asking the LTA DB for a Bundle to verify.")
         pop_body = {
             "claimant": f"{self.name}-{self.instance_uuid}"
         }
-        response = await lta_rc.request('POST', f'/Bundles/actions/pop?dest={self.dest_site}&status=transferring', pop_body)
+        response = await lta_rc.request('POST', f'/Bundles/actions/pop?dest={self.dest_site}&status=transferring&contents=false&wait={self.pop_wait(self.work_timeout_seconds)}', pop_body)
         self.logger.info(f"LTA DB responded with: {response}")
         bundle = response["bundle"]
         if not bundle:
@@ -92,7 +89,8 @@ class DesyMoveVerifier(Component):
             return False
         # process the Bundle that we were given
         try:
-            await self._verify_bundle(lta_rc, bundle)
+            async with self.work_budget.reserve(bundle.get("size", 0)):
+                await self._verify_bundle(lta_rc, bundle)
         except Exception as e:
             await self._quarantine_bundle(lta_rc, bundle, f"{e}")
             raise e
@@ -112,7 +110,7 @@ class DesyMoveVerifier(Component):
             "work_priority_timestamp": right_now,
         }
         try:
-            await lta_rc.request('PATCH', f'/Bundles/{bundle["uuid"]}', patch_body)
+            await lta_rc.request('PATCH', f'/Bundles/{bundle["uuid"]}?return=minimal', patch_body)
         except Exception as e:
             self.logger.error(f'Unable to quarantine Bundle {bundle["uuid"]}: {e}.')
 
@@ -147,7 +145,7 @@ class DesyMoveVerifier(Component):
             "claimed": False,
         }
         self.logger.info(f"PATCH /Bundles/{bundle_id} - '{patch_body}'")
-        await lta_rc.request('PATCH', f'/Bundles/{bundle_id}', patch_body)
+        await lta_rc.request('PATCH', f'/Bundles/{bundle_id}?return=minimal', patch_body)
         return True
 
     async def _unclaim_bundle(self, lta_rc: RestClient, bundle: BundleType) -> bool:
@@ -161,7 +159,7 @@ class DesyMoveVerifier(Component):
             "work_priority_timestamp": right_now,
         }
         self.logger.info(f"PATCH /Bundles/{bundle_id} - '{patch_body}'")
-        await lta_rc.request('PATCH', f'/Bundles/{bundle_id}', patch_body)
+        await lta_rc.request('PATCH', f'/Bundles/{bundle_id}?return=minimal', patch_body)
         return True
 
 
@@ -5,14 +5,13 @@ import asyncio
 from logging import Logger
 import logging
 import os
-from subprocess import PIPE, run
 import sys
 from typing import Any, Dict, Optional
 
 from rest_tools.client import RestClient  # type: ignore
 from rest_tools.server import from_environment  # type: ignore
 
-from .component import COMMON_CONFIG, Component, now, status_loop, work_loop
+from .component import COMMON_CONFIG, Component, now, run_command, status_loop, work_loop
 from .crypto import sha512sum
 from .log_format import StructuredFormatter
 from .lta_types import BundleType
@@ -81,10 +80,7 @@ class DesyVerifier(Component):
     async def _do_work(self) -> None:
         """Perform a work cycle for this component."""
         self.logger.info("Starting work on Bundles.")
-        work_claimed = True
-        while work_claimed:
-            work_claimed = await self._do_work_claim()
-            work_claimed &= not self.run_once_and_die
+        await self._do_work_claims()
         self.logger.info("Ending work on Bundles.")
 
     async def _do_work_claim(self) -> bool:
@@ -92,14 +88,14 @@ class DesyVerifier(Component):
         # 1. Ask the LTA DB for the next Bundle to be verified
         self.logger.info("Asking the LTA DB for a Bundle to verify at DESY.")
         # configure a RestClient to talk to the LTA DB
-        lta_rc = RestClient(self.lta_rest_url,
-                            token=self.lta_rest_token,
-                            timeout=self.work_timeout_seconds,
-                            retries=self.work_retries)
+        lta_rc = self.rest_client(self.lta_rest_url,
+                                  token=self.lta_rest_token,
+                                  timeout=self.work_timeout_seconds,
+                                  retries=self.work_retries)
         pop_body = {
             "claimant": f"{self.name}-{self.instance_uuid}"
         }
-        response = await lta_rc.request('POST', '/Bundles/actions/pop?dest=DESY&status=verifying', pop_body)
+        response = await lta_rc.request('POST', f'/Bundles/actions/pop?dest=DESY&status=verifying&wait={self.pop_wait(self.work_timeout_seconds)}', pop_body)
         self.logger.info(f"LTA DB responded with: {response}")
         bundle = response["bundle"]
         if not bundle:
@@ -107,10 +103,11 @@ class DesyVerifier(Component):
             return False
         # process the Bundle that we were given
         try:
-            if await self._verify_bundle_at_desy(lta_rc, bundle):
-                await self._add_bundle_to_file_catalog(bundle)
-                await self._update_bundle_in_lta_db(lta_rc, bundle)
-            return True
+            async with self.work_budget.reserve(bundle.get("size", 0)):
+                if await self._verify_bundle_at_desy(lta_rc, bundle):
+                    await self._add_bundle_to_file_catalog(bundle)
+                    await self._update_bundle_in_lta_db(lta_rc, bundle)
+                return True
         except Exception as e:
             bundle_id = bundle["uuid"]
             right_now = now()
@@ -120,16 +117,16 @@ class DesyVerifier(Component):
                 "work_priority_timestamp": right_now,
             }
             self.logger.info(f"PATCH /Bundles/{bundle_id} - '{patch_body}'")
-            await lta_rc.request('PATCH', f'/Bundles/{bundle_id}', patch_body)
+            await lta_rc.request('PATCH', f'/Bundles/{bundle_id}?return=minimal', patch_body)
         return False
 
     async def _add_bundle_to_file_catalog(self, bundle: BundleType) -> bool:
         """Add a FileCatalog entry for the bundle, then update existing records."""
         # configure a RestClient to talk to the File Catalog
-        fc_rc = RestClient(self.file_catalog_rest_url,
-                           token=self.file_catalog_rest_token,
-                           timeout=self.work_timeout_seconds,
-                           retries=self.work_retries)
+        fc_rc = self.rest_client(self.file_catalog_rest_url,
+                                 token=self.file_catalog_rest_token,
+                                 timeout=self.work_timeout_seconds,
+                                 retries=self.work_retries)
         # determine the path where the bundle is stored on hpss
         basename = os.path.basename(bundle["bundle_path"])
         stupid_python_path = os.path.sep.join([self.tape_base_path, basename])
@@ -192,7 +189,7 @@ class DesyVerifier(Component):
             "claimed": False,
         }
         self.logger.info(f"PATCH /Bundles/{bundle_id} - '{patch_body}'")
-        await lta_rc.request('PATCH', f'/Bundles/{bundle_id}', patch_body)
+        await lta_rc.request('PATCH', f'/Bundles/{bundle_id}?return=minimal', patch_body)
         # the morning sun has vanquished the horrible night
         return True
 
@@ -215,7 +212,7 @@ class DesyVerifier(Component):
         #     SOURCE-URL
         #     DESTINATION-URL
         args = ["globus-url-copy", "-fast", "-gridftp2", "-src-cred", self.desy_cred_path, src_url, workbox_bundle_path]
-        completed_process = run(args, stdout=PIPE, stderr=PIPE)
+        completed_process = await run_command(args)
         # if our command failed
         if completed_process.returncode != 0:
             self.logger.error("Command to copy file from DESY via GridFTP failed")
@@ -230,7 +227,7 @@ class DesyVerifier(Component):
             raise Exception(f"Bundle file {workbox_bundle_path} does not exist after copying from DESY. Bad thing happen.")
         # run a checksum on the bundle we copied to the workbox
         self.logger.info(f"Computing SHA512 checksum for bundle: '{workbox_bundle_path}'")
-        checksum_sha512 = sha512sum(workbox_bundle_path)
+        checksum_sha512 = await self.run_cpu(sha512sum, workbox_bundle_path)
         self.logger.info(f"Bundle '{workbox_bundle_path}' has SHA512 checksum '{checksum_sha512}'")
         # now we'll compare the bundle's checksum
         if bundle["checksum"]["sha512"] != checksum_sha512:
@@ -241,7 +238,7 @@ class DesyVerifier(Component):
         self.logger.info("Bundle checksum at DESY matches the checksum at the time of bundle creation.")
         # delete the file from the disk
         self.logger.info(f"Removing file {workbox_bundle_path} from the disk.")
-        os.remove(workbox_bundle_path)
+        await self.run_io(os.remove, workbox_bundle_path)
         # having passed the gauntlet, we indicate the checksums match
         return True
 
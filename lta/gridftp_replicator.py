@@ -74,26 +74,23 @@ class GridFTPReplicator(Component):
     async def _do_work(self) -> None:
         """Perform a work cycle for this component."""
         self.logger.info("Starting work on Bundles.")
-        work_claimed = True
-        while work_claimed:
-            work_claimed = await self._do_work_claim()
-            work_claimed &= not self.run_once_and_die
+        await self._do_work_claims()
         self.logger.info("Ending work on Bundles.")
 
     async def _do_work_claim(self) -> bool:
         """Claim a bundle and perform work on it."""
         # 1. Ask the LTA DB for the next Bundle to be transferred
         # configure a RestClient to talk to the LTA DB
-        lta_rc = RestClient(self.lta_rest_url,
-                            token=self.lta_rest_token,
-                            timeout=self.work_timeout_seconds,
-                            retries=self.work_retries)
+        lta_rc = self.rest_client(self.lta_rest_url,
+                                  token=self.lta_rest_token,
+                                  timeout=self.work_timeout_seconds,
+                                  retries=self.work_retries)
         self.logger.info("Asking the LTA DB for a Bundle to transfer.")
         source = self.source_site
         pop_body = {
             "claimant": f"{self.name}-{self.instance_uuid}"
         }
-        response = await lta_rc.request('POST', f'/Bundles/actions/pop?source={source}&status=staged', pop_body)
+        response = await lta_rc.request('POST', f'/Bundles/actions/pop?source={source}&status=staged&contents=false&wait={self.pop_wait(self.work_timeout_seconds)}', pop_body)
         self.logger.info(f"LTA DB responded with: {response}")
         bundle = response["bundle"]
         if not bundle:
@@ -101,7 +98,8 @@ class GridFTPReplicator(Component):
             return False
         # process the Bundle that we were given
         try:
-            await self._replicate_bundle_to_destination_site(lta_rc, bundle)
+            async with self.work_budget.reserve(bundle.get("size", 0)):
+                await self._replicate_bundle_to_destination_site(lta_rc, bundle)
         except Exception as e:
             await self._quarantine_bundle(lta_rc, bundle, f"{e}")
             return False
@@ -121,7 +119,7 @@ class GridFTPReplicator(Component):
             "work_priority_timestamp": right_now,
         }
         try:
-            await lta_rc.request('PATCH', f'/Bundles/{bundle["uuid"]}', patch_body)
+            await lta_rc.request('PATCH', f'/Bundles/{bundle["uuid"]}?return=minimal', patch_body)
         except Exception as e:
             self.logger.error(f'Unable to quarantine Bundle {bundle["uuid"]}: {e}.')
 
@@ -133,7 +131,7 @@ class GridFTPReplicator(Component):
         # make sure our proxy credentials are all in order
         self.logger.info('Updating proxy credentials')
         sgp = SiteGlobusProxy()
-        sgp.update_proxy()
+        await self.run_io(sgp.update_proxy)
         # tell GridFTP to 'put' our file to the destination
         if self.use_full_bundle_path:
             dest_url = f"{self.gridftp_dest_url}{bundle_path}"
@@ -141,9 +139,10 @@ class GridFTPReplicator(Component):
             basename = os.path.basename(bundle_path)
             dest_url = f"{self.gridftp_dest_url}/{basename}"
         self.logger.info(f'Sending {bundle_path} to {dest_url}')
-        GridFTP.put(dest_url,
-                    filename=bundle_path,
-                    request_timeout=self.gridftp_timeout)
+        await self.run_io(GridFTP.put,
+                          dest_url,
+                          filename=bundle_path,
+                          request_timeout=self.gridftp_timeout)
         # update the Bundle in the LTA DB
         patch_body = {
             "status": "transferring",
@@ -153,7 +152,7 @@ class GridFTPReplicator(Component):
             "transfer_reference": "globus-url-copy",
         }
         self.logger.info(f"PATCH /Bundles/{bundle_id} - '{patch_body}'")
-        await lta_rc.request('PATCH', f'/Bundles/{bundle_id}', patch_body)
+        await lta_rc.request('PATCH', f'/Bundles/{bundle_id}?return=minimal', patch_body)
 
 def runner() -> None:
     """Configure a GridFTPReplicator component from the environment and set it running."""
@@ -87,25 +87,22 @@ class Locator(Component):
     async def _do_work(self) -> None:
         """Perform a work cycle for this component."""
         self.logger.info("Starting work on TransferRequests.")
-        work_claimed = True
-        while work_claimed:
-            work_claimed = await self._do_work_claim()
-            work_claimed &= not self.run_once_and_die
+        await self._do_work_claims()
         self.logger.info("Ending work on TransferRequests.")
 
     async def _do_work_claim(self) -> bool:
         """Claim a transfer request and perform work on it."""
         # 1. Ask the LTA DB for the next TransferRequest to be picked
         # configure a RestClient to talk to the LTA DB
-        lta_rc = RestClient(self.lta_rest_url,
-                            token=self.lta_rest_token,
-                            timeout=self.work_timeout_seconds,
-                            retries=self.work_retries)
+        lta_rc = self.rest_client(self.lta_rest_url,
+                                  token=self.lta_rest_token,
+                                  timeout=self.work_timeout_seconds,
+                                  retries=self.work_retries)
         self.logger.info("Asking the LTA DB for a TransferRequest to work on.")
         pop_body = {
             "claimant": f"{self.name}-{self.instance_uuid}"
         }
-        response = await lta_rc.request('POST', f'/TransferRequests/actions/pop?dest={self.dest_site}&source={self.source_site}', pop_body)
+        response = await lta_rc.request('POST', f'/TransferRequests/actions/pop?dest={self.dest_site}&source={self.source_site}&wait={self.pop_wait(self.work_timeout_seconds)}', pop_body)
         self.logger.info(f"LTA DB responded with: {response}")
         tr = response["transfer_request"]
         if not tr:
@@ -125,10 +122,10 @@ class Locator(Component):
                                         tr: TransferRequestType) -> None:
         self.logger.info(f"Processing TransferRequest: {tr}")
         # configure a RestClient to talk to the File Catalog
-        fc_rc = RestClient(self.file_catalog_rest_url,
-                           token=self.file_catalog_rest_token,
-                           timeout=self.work_timeout_seconds,
-                           retries=self.work_retries)
+        fc_rc = self.rest_client(self.file_catalog_rest_url,
+                                 token=self.file_catalog_rest_token,
+                                 timeout=self.work_timeout_seconds,
+                                 retries=self.work_retries)
         # figure out which files need to come back
         source = tr["source"]
         dest = tr["dest"]
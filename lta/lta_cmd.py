@@ -118,17 +118,17 @@ def _enumerate_path(path: str) -> List[str]:
     return disk_files
 
 async def _get_bundles_status(rc: RestClient, bundle_uuids: List[str]) -> List[Dict[str, Any]]:
+    if not bundle_uuids:
+        return []
+    KEYS = ['claim_timestamp', 'claimant', 'claimed', 'create_timestamp', 'path', 'request', 'status', 'type', 'update_timestamp', 'uuid']
+    bulk_get_body = {
+        "bundles": bundle_uuids,
+        "fields": KEYS + ["file_count"],
+    }
+    response = await rc.request('POST', '/Bundles/actions/bulk_get', bulk_get_body)
     bundles = []
-    for uuid in bundle_uuids:
-        response = await rc.request('GET', f"/Bundles/{uuid}")
-        KEYS = ['claim_timestamp', 'claimant', 'claimed', 'create_timestamp', 'path', 'request', 'status', 'type', 'update_timestamp', 'uuid']
-        bundle = {}
-        for k in KEYS:
-            if k in response:
-                bundle[k] = response[k]
-        bundle["file_count"] = 0
-        if 'files' in response:
-            bundle["file_count"] = len(response["files"])
+    for bundle in response["bundles"]:
+        bundle["file_count"] = bundle.get("file_count", 0)
         bundles.append(bundle)
     return bundles
 
@@ -212,10 +212,37 @@ def _get_status_bar(status_list: List[str],
     return sb
 
 
+async def _archive(rc: RestClient, collection: str, days: int, verbose: bool) -> int:
+    """Move old finished documents of a collection into its archive, one batch at a time."""
+    archived = 0
+    while True:
+        response = await rc.request("POST", f"/{collection}/actions/archive", {"days": days})
+        if verbose:
+            for uuid in response["uuids"]:
+                print(f"archived {collection} {uuid}")
+        archived += int(response["count"])
+        if not response["count"]:
+            return archived
+
 # -----------------------------------------------------------------------------
 
+async def bundle_archive(args: Namespace) -> ExitCode:
+    """Move old finished Bundle objects into the archive."""
+    archived = await _archive(args.di["lta_rc"], "Bundles", args.days, args.verbose)
+    print(f"archived {archived} Bundles")
+    return EXIT_OK
+
+
 async def bundle_ls(args: Namespace) -> ExitCode:
     """List all of the Bundle objects in the LTA DB."""
+    # --json always prints the uuid list; --status only changes the text output
+    if args.show_status and not args.json:
+        response = await args.di["lta_rc"].request("GET", "/Bundles?fields=status")
+        results = response["results"]
+        print(f"total {len(results)}")
+        for result in results:
+            print(f"Bundle {result['uuid']} {result.get('status')}")
+        return EXIT_OK
     response = await args.di["lta_rc"].request("GET", "/Bundles")
     if args.json:
         print_dict_as_pretty_json(response)
@@ -223,11 +250,7 @@ async def bundle_ls(args: Namespace) -> ExitCode:
         results = response["results"]
         print(f"total {len(results)}")
         for uuid in results:
-            if args.show_status:
-                bundle = await args.di["lta_rc"].request("GET", f"/Bundles/{uuid}?contents=0")
-                print(f"Bundle {uuid} {bundle['status']}")
-            else:
-                print(f"Bundle {uuid}")
+            print(f"Bundle {uuid}")
     return EXIT_OK
 
 
@@ -236,12 +259,12 @@ async def bundle_overdue(args: Namespace) -> ExitCode:
     # calculate our cutoff time for bundles not making progress
     cutoff_time = datetime.utcnow() - timedelta(days=args.days)
     # query the LTA DB to get a list of bundles to check
-    response = await args.di["lta_rc"].request("GET", "/Bundles")
+    fields = "claim_timestamp,claimant,claimed,create_timestamp,dest,path,reason,request,source,status,type,update_timestamp,work_priority_timestamp"
+    response = await args.di["lta_rc"].request("GET", f"/Bundles?fields={fields}")
     results = response["results"]
-    # for each bundle, query the LTA DB and check it
+    # check each bundle
     problem_bundles = []
-    for uuid in results:
-        bundle = await args.di["lta_rc"].request("GET", f"/Bundles/{uuid}?contents=0")
+    for bundle in results:
         if bundle["status"] == "quarantined":
             problem_bundles.append(bundle)
         elif as_datetime(bundle["update_timestamp"]) < cutoff_time:
@@ -261,13 +284,13 @@ async def bundle_overdue(args: Namespace) -> ExitCode:
 
 async def bundle_priority_reset(args: Namespace) -> ExitCode:
     """List all of the Bundle objects in the LTA DB."""
-    response = await args.di["lta_rc"].request("GET", "/Bundles")
+    response = await args.di["lta_rc"].request("GET", "/Bundles?fields=create_timestamp")
     results = response["results"]
-    for uuid in results:
-        response2 = await args.di["lta_rc"].request("GET", f"/Bundles/{uuid}?contents=0")
+    for bundle in results:
+        uuid = bundle["uuid"]
         patch_body = {
             "update_timestamp": now(),
-            "work_priority_timestamp": response2["create_timestamp"],
+            "work_priority_timestamp": bundle["create_timestamp"],
         }
         await args.di["lta_rc"].request("PATCH", f"/Bundles/{uuid}", patch_body)
     return EXIT_OK
@@ -326,6 +349,16 @@ async def bundle_update_status(args: Namespace) -> ExitCode:
         patch_body["claimed"] = False
     if not args.keep_priority:
         patch_body["work_priority_timestamp"] = right_now
+    if args.old_status:
+        # only move the bundle if nobody else has moved it first
+        del patch_body["status"]
+        transition_body = {
+            "from_status": args.old_status,
+            "to_status": args.new_status,
+            "update": patch_body,
+        }
+        await args.di["lta_rc"].request("POST", f"/Bundles/{args.uuid}/actions/transition", transition_body)
+        return EXIT_OK
     await args.di["lta_rc"].request("PATCH", f"/Bundles/{args.uuid}", patch_body)
     return EXIT_OK
 
@@ -527,6 +560,13 @@ async def display_config(args: Namespace) -> ExitCode:
     return EXIT_OK
 
 
+async def request_archive(args: Namespace) -> ExitCode:
+    """Move old completed TransferRequest objects into the archive."""
+    archived = await _archive(args.di["lta_rc"], "TransferRequests", args.days, args.verbose)
+    print(f"archived {archived} TransferRequests")
+    return EXIT_OK
+
+
 async def request_estimate(args: Namespace) -> ExitCode:
     """Estimate the count and size of a new TransferRequest."""
     files_and_size = _get_files_and_size(args.path)
@@ -577,7 +617,7 @@ async def request_new(args: Namespace) -> ExitCode:
             # raise an Exception to prevent the command from creating a too small request
             raise Exception(f"TransferRequest for {path}\n{size:,} bytes ({hurry.filesize.size(size)}) in {len(disk_files):,} files.\nMinimum required size: {MINIMUM_REQUEST_SIZE:,} bytes.")
     # check to see if we've already got an open TransferRequest on that path
-    response = await args.di["lta_rc"].request("GET", "/TransferRequests")
+    response = await args.di["lta_rc"].request("GET", "/TransferRequests?fields=path,status")
     results = response["results"]
     for request in results:
         old_path = os.path.normpath(request['path'])
@@ -608,7 +648,7 @@ async def request_new(args: Namespace) -> ExitCode:
 async def request_priority_reset(args: Namespace) -> ExitCode:
     """Reset the work priority timestamp for every TransferRequest."""
     # find every transfer request and set work_priority_timestamp to create_timestamp
-    response = await args.di["lta_rc"].request("GET", "/TransferRequests")
+    response = await args.di["lta_rc"].request("GET", "/TransferRequests?fields=create_timestamp")
     results = response["results"]
     for request in results:
         uuid = request["uuid"]
@@ -631,19 +671,25 @@ async def request_rm(args: Namespace) -> ExitCode:
     if args.verbose:
         print(f"removed TransferRequest {args.uuid}")
     res3 = await args.di["lta_rc"].request("GET", f"/Bundles?request={args.uuid}")
-    bundles = await _get_bundles_status(args.di["lta_rc"], res3["results"])
-    for bundle in bundles:
-        await args.di["lta_rc"].request("DELETE", f"/Bundles/{bundle['uuid']}")
-        if args.verbose:
-            print(f"removed Bundle {bundle['uuid']}")
+    if not res3["results"]:
+        return EXIT_OK
+    res4 = await args.di["lta_rc"].request("POST", "/Bundles/actions/bulk_delete", {"bundles": res3["results"]})
+    if args.verbose:
+        for uuid in res4["bundles"]:
+            print(f"removed Bundle {uuid}")
     return EXIT_OK
 
 
 async def request_status(args: Namespace) -> ExitCode:
     """Query the status of a TransferRequest in the LTA DB."""
     response = await args.di["lta_rc"].request("GET", f"/TransferRequests/{args.uuid}")
-    res2 = await args.di["lta_rc"].request("GET", f"/Bundles?request={args.uuid}")
-    response["bundles"] = await _get_bundles_status(args.di["lta_rc"], res2["results"])
+    # only list the bundles individually if we need to show them
+    if args.json or args.contents:
+        res2 = await args.di["lta_rc"].request("GET", f"/Bundles?request={args.uuid}")
+        response["bundles"] = await _get_bundles_status(args.di["lta_rc"], res2["results"])
+    else:
+        res2 = await args.di["lta_rc"].request("GET", f"/Bundles/actions/summary?request={args.uuid}&group_by=status")
+        response["summary"] = res2["results"]
     if args.json:
         print_dict_as_pretty_json(response)
     else:
@@ -658,9 +704,9 @@ async def request_status(args: Namespace) -> ExitCode:
             print(f"        Claimant: {response['claimant']} ({display_time(response['claim_timestamp'])})")
         print(f"    Source: {response['source']} -> Dest: {response['dest']}")
         print(f"    Path: {response['path']}")
-        print(f"    Bundles: {len(response['bundles'])}")
         # display the contents of the transfer request, if requested
         if args.contents:
+            print(f"    Bundles: {len(response['bundles'])}")
             print("    Contents:")
             for bundle in response["bundles"]:
                 print(f"        Bundle {bundle['uuid']}")
@@ -669,6 +715,11 @@ async def request_status(args: Namespace) -> ExitCode:
                 if bundle['claimed']:
                     print(f"                Claimant: {bundle['claimant']} ({display_time(bundle['claim_timestamp'])})")
                 print(f"            Files: {bundle['file_count']}")
+        # otherwise display how many bundles are in each status
+        else:
+            print(f"    Bundles: {sum([group['count'] for group in response['summary']])}")
+            for group in response["summary"]:
+                print(f"        {group.get('status')}: {group['count']} ({hurry.filesize.size(group['size'])}) since {display_time(group['oldest_update_timestamp'])}")
     return EXIT_OK
 
 
@@ -747,6 +798,17 @@ async def main() -> None:
     parser_bundle = subparser.add_parser('bundle', help='interact with bundles')
     bundle_subparser = parser_bundle.add_subparsers(help='bundle command help')
 
+    # define a subparser for the 'bundle archive' subcommand
+    parser_bundle_archive = bundle_subparser.add_parser('archive', help='archive old finished bundles')
+    parser_bundle_archive.add_argument("--days",
+                                       help="minimum age in days of bundles to archive",
+                                       type=int,
+                                       default=30)
+    parser_bundle_archive.add_argument("--verbose",
+                                       help="display each archived bundle",
+                                       action="store_true")
+    parser_bundle_archive.set_defaults(func=bundle_archive)
+
     # define a subparser for the 'bundle ls' subcommand
     parser_bundle_ls = bundle_subparser.add_parser('ls', help='list bundles')
     parser_bundle_ls.add_argument("--json",
@@ -799,6 +861,10 @@ async def main() -> None:
                                              dest="new_status",
                                              help="new status of the bundle",
                                              required=True)
+    parser_bundle_update_status.add_argument("--old-status",
+                                             dest="old_status",
+                                             help="only update if the bundle still has this status",
+                                             default=None)
     parser_bundle_update_status.add_argument("--keep-claim",
                                              dest="keep_claim",
                                              help="don't unclaim the bundle",
@@ -859,6 +925,17 @@ async def main() -> None:
     parser_request = subparser.add_parser('request', help='interact with transfer requests')
     request_subparser = parser_request.add_subparsers(help='request command help')
 
+    # define a subparser for the 'request archive' subcommand
+    parser_request_archive = request_subparser.add_parser('archive', help='archive old completed transfer requests')
+    parser_request_archive.add_argument("--days",
+                                        help="minimum age in days of transfer requests to archive",
+                                        type=int,
+                                        default=30)
+    parser_request_archive.add_argument("--verbose",
+                                        help="display each archived transfer request",
+                                        action="store_true")
+    parser_request_archive.set_defaults(func=request_archive)
+
     # define a subparser for the 'request estimate' subcommand
     parser_request_estimate = request_subparser.add_parser('estimate', help='estimate new transfer request')
     parser_request_estimate.add_argument("--path",
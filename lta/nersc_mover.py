@@ -5,14 +5,13 @@ import asyncio
 from logging import Logger
 import logging
 import os
-from subprocess import PIPE, run
 import sys
 from typing import Any, Dict, List, Optional
 
 from rest_tools.client import RestClient  # type: ignore
 from rest_tools.server import from_environment  # type: ignore
 
-from .component import COMMON_CONFIG, Component, now, status_loop, work_loop
+from .component import COMMON_CONFIG, Component, now, run_command, status_loop, work_loop
 from .log_format import StructuredFormatter
 from .lta_types import BundleType
 
@@ -72,10 +71,7 @@ class NerscMover(Component):
     async def _do_work(self) -> None:
         """Perform a work cycle for this component."""
         self.logger.info("Starting work on Bundles.")
-        work_claimed = True
-        while work_claimed:
-            work_claimed = await self._do_work_claim()
-            work_claimed &= not self.run_once_and_die
+        await self._do_work_claims()
         self.logger.info("Ending work on Bundles.")
 
     async def _do_work_claim(self) -> bool:
@@ -83,7 +79,7 @@ class NerscMover(Component):
         # 0. Do some pre-flight checks to ensure that we can do work
         # if the HPSS system is not available
         args = ["/usr/common/mss/bin/hpss_avail", "archive"]
-        completed_process = run(args, stdout=PIPE, stderr=PIPE)
+        completed_process = await run_command(args)
         if completed_process.returncode != 0:
             # prevent this instance from claiming any work
             self.logger.error(f"Unable to do work; HPSS system not available (returncode: {completed_process.returncode})")
@@ -91,14 +87,14 @@ class NerscMover(Component):
         # 1. Ask the LTA DB for the next Bundle to be taped
         self.logger.info("Asking the LTA DB for a Bundle to tape at NERSC with HPSS.")
         # configure a RestClient to talk to the LTA DB
-        lta_rc = RestClient(self.lta_rest_url,
-                            token=self.lta_rest_token,
-                            timeout=self.work_timeout_seconds,
-                            retries=self.work_retries)
+        lta_rc = self.rest_client(self.lta_rest_url,
+                                  token=self.lta_rest_token,
+                                  timeout=self.work_timeout_seconds,
+                                  retries=self.work_retries)
         pop_body = {
             "claimant": f"{self.name}-{self.instance_uuid}"
         }
-        response = await lta_rc.request('POST', '/Bundles/actions/pop?dest=NERSC&status=taping', pop_body)
+        response = await lta_rc.request('POST', f'/Bundles/actions/pop?dest=NERSC&status=taping&contents=false&wait={self.pop_wait(self.work_timeout_seconds)}', pop_body)
         self.logger.info(f"LTA DB responded with: {response}")
         bundle = response["bundle"]
         if not bundle:
@@ -106,8 +102,9 @@ class NerscMover(Component):
             return False
         # process the Bundle that we were given
         try:
-            await self._write_bundle_to_hpss(lta_rc, bundle)
-            return True
+            async with self.work_budget.reserve(bundle.get("size", 0)):
+                await self._write_bundle_to_hpss(lta_rc, bundle)
+                return True
         except Exception as e:
             bundle_id = bundle["uuid"]
             right_now = now()
@@ -117,7 +114,7 @@ class NerscMover(Component):
                 "work_priority_timestamp": right_now,
             }
             self.logger.info(f"PATCH /Bundles/{bundle_id} - '{patch_body}'")
-            await lta_rc.request('PATCH', f'/Bundles/{bundle_id}', patch_body)
+            await lta_rc.request('PATCH', f'/Bundles/{bundle_id}?return=minimal', patch_body)
         return False
 
     async def _write_bundle_to_hpss(self, lta_rc: RestClient, bundle: BundleType) -> bool:
@@ -155,11 +152,11 @@ class NerscMover(Component):
             "claimed": False,
         }
         self.logger.info(f"PATCH /Bundles/{bundle_id} - '{patch_body}'")
-        await lta_rc.request('PATCH', f'/Bundles/{bundle_id}', patch_body)
+        await lta_rc.request('PATCH', f'/Bundles/{bundle_id}?return=minimal', patch_body)
         return True
 
     async def _execute_hsi_command(self, lta_rc: RestClient, bundle: BundleType, args: List[str]) -> bool:
-        completed_process = run(args, stdout=PIPE, stderr=PIPE)
+        completed_process = await run_command(args)
         # if our command failed
         if completed_process.returncode != 0:
             self.logger.info(f"Command to tape bundle to HPSS failed: {completed_process.args}")
@@ -174,7 +171,7 @@ class NerscMover(Component):
                 "work_priority_timestamp": right_now,
             }
             self.logger.info(f"PATCH /Bundles/{bundle_id} - '{patch_body}'")
-            await lta_rc.request('PATCH', f'/Bundles/{bundle_id}', patch_body)
+            await lta_rc.request('PATCH', f'/Bundles/{bundle_id}?return=minimal', patch_body)
             return False
         # otherwise, we succeeded
         return True
@@ -5,14 +5,13 @@ import asyncio
 from logging import Logger
 import logging
 import os
-from subprocess import PIPE, run
 import sys
 from typing import Any, Dict, Optional
 
 from rest_tools.client import RestClient  # type: ignore
 from rest_tools.server import from_environment  # type: ignore
 
-from .component import COMMON_CONFIG, Component, now, status_loop, work_loop
+from .component import COMMON_CONFIG, Component, now, run_command, status_loop, work_loop
 from .log_format import StructuredFormatter
 from .lta_types import BundleType
 
@@ -80,10 +79,7 @@ class NerscVerifier(Component):
     async def _do_work(self) -> None:
         """Perform a work cycle for this component."""
         self.logger.info("Starting work on Bundles.")
-        work_claimed = True
-        while work_claimed:
-            work_claimed = await self._do_work_claim()
-            work_claimed &= not self.run_once_and_die
+        await self._do_work_claims()
         self.logger.info("Ending work on Bundles.")
 
     async def _do_work_claim(self) -> bool:
@@ -91,7 +87,7 @@ class NerscVerifier(Component):
         # 0. Do some pre-flight checks to ensure that we can do work
         # if the HPSS system is not available
         args = ["/usr/common/mss/bin/hpss_avail", "archive"]
-        completed_process = run(args, stdout=PIPE, stderr=PIPE)
+        completed_process = await run_command(args)
         if completed_process.returncode != 0:
             # prevent this instance from claiming any work
             self.logger.error(f"Unable to do work; HPSS system not available (returncode: {completed_process.returncode})")
@@ -99,14 +95,14 @@ class NerscVerifier(Component):
         # 1. Ask the LTA DB for the next Bundle to be verified
         self.logger.info("Asking the LTA DB for a Bundle to verify at NERSC with HPSS.")
         # configure a RestClient to talk to the LTA DB
-        lta_rc = RestClient(self.lta_rest_url,
-                            token=self.lta_rest_token,
-                            timeout=self.work_timeout_seconds,
-                            retries=self.work_retries)
+        lta_rc = self.rest_client(self.lta_rest_url,
+                                  token=self.lta_rest_token,
+                                  timeout=self.work_timeout_seconds,
+                                  retries=self.work_retries)
         pop_body = {
             "claimant": f"{self.name}-{self.instance_uuid}"
         }
-        response = await lta_rc.request('POST', '/Bundles/actions/pop?dest=NERSC&status=verifying', pop_body)
+        response = await lta_rc.request('POST', f'/Bundles/actions/pop?dest=NERSC&status=verifying&wait={self.pop_wait(self.work_timeout_seconds)}', pop_body)
         self.logger.info(f"LTA DB responded with: {response}")
         bundle = response["bundle"]
         if not bundle:
@@ -114,10 +110,11 @@ class NerscVerifier(Component):
             return False
         # process the Bundle that we were given
         try:
-            if await self._verify_bundle_in_hpss(lta_rc, bundle):
-                await self._add_bundle_to_file_catalog(bundle)
-                await self._update_bundle_in_lta_db(lta_rc, bundle)
-            return True
+            async with self.work_budget.reserve(bundle.get("size", 0)):
+                if await self._verify_bundle_in_hpss(lta_rc, bundle):
+                    await self._add_bundle_to_file_catalog(bundle)
+                    await self._update_bundle_in_lta_db(lta_rc, bundle)
+                return True
         except Exception as e:
             bundle_id = bundle["uuid"]
             right_now = now()
@@ -127,16 +124,16 @@ class NerscVerifier(Component):
                 "work_priority_timestamp": right_now,
             }
             self.logger.info(f"PATCH /Bundles/{bundle_id} - '{patch_body}'")
-            await lta_rc.request('PATCH', f'/Bundles/{bundle_id}', patch_body)
+            await lta_rc.request('PATCH', f'/Bundles/{bundle_id}?return=minimal', patch_body)
         return False
 
     async def _add_bundle_to_file_catalog(self, bundle: BundleType) -> bool:
         """Add a FileCatalog entry for the bundle, then update existing records."""
         # configure a RestClient to talk to the File Catalog
-        fc_rc = RestClient(self.file_catalog_rest_url,
-                           token=self.file_catalog_rest_token,
-                           timeout=self.work_timeout_seconds,
-                           retries=self.work_retries)
+        fc_rc = self.rest_client(self.file_catalog_rest_url,
+                                 token=self.file_catalog_rest_token,
+                                 timeout=self.work_timeout_seconds,
+                                 retries=self.work_retries)
         # determine the path where the bundle is stored on hpss
         data_warehouse_path = bundle["path"]
         basename = os.path.basename(bundle["bundle_path"])
@@ -201,7 +198,7 @@ class NerscVerifier(Component):
             "claimed": False,
         }
         self.logger.info(f"PATCH /Bundles/{bundle_id} - '{patch_body}'")
-        await lta_rc.request('PATCH', f'/Bundles/{bundle_id}', patch_body)
+        await lta_rc.request('PATCH', f'/Bundles/{bundle_id}?return=minimal', patch_body)
         # the morning sun has vanquished the horrible night
         return True
 
@@ -221,7 +218,7 @@ class NerscVerifier(Component):
         #                      disabling verbose response messages, and disabling interactive file transfer messages
         #     hashlist      -> List checksum hash for HPSS file(s)
         args = ["/usr/common/mss/bin/hsi", "-P", "hashlist", hpss_path]
-        completed_process = run(args, stdout=PIPE, stderr=PIPE)
+        completed_process = await run_command(args)
         # if our command failed
         if completed_process.returncode != 0:
             self.logger.error("Command to list checksum in HPSS failed")
@@ -237,7 +234,7 @@ class NerscVerifier(Component):
                 "work_priority_timestamp": right_now,
             }
             self.logger.info(f"PATCH /Bundles/{bundle_id} - '{patch_body}'")
-            await lta_rc.request('PATCH', f'/Bundles/{bundle_id}', patch_body)
+            await lta_rc.request('PATCH', f'/Bundles/{bundle_id}?return=minimal', patch_body)
             return False
         # otherwise, we succeeded; output is on stderr
         # 1693e9d0273e3a2995b917c0e72e6bd2f40ea677f3613b6d57eaa14bd3a285c73e8db8b6e556b886c3929afe324bcc718711f2faddfeb43c3e030d9afe697873 sha512 /home/projects/icecube/data/exp/IceCube/2018/unbiased/PFDST/1230/50145c5c-01e1-4727-a9a1-324e5af09a29.zip [hsi]
@@ -258,7 +255,7 @@ class NerscVerifier(Component):
                 "work_priority_timestamp": right_now,
             }
             self.logger.info(f"PATCH /Bundles/{bundle_id} - '{patch_body}'")
-            await lta_rc.request('PATCH', f'/Bundles/{bundle_id}', patch_body)
+            await lta_rc.request('PATCH', f'/Bundles/{bundle_id}?return=minimal', patch_body)
             return False
         # run an hsi command to calculate the checksum of the archive as stored
         #     -P            -> ("popen" flag) - specifies that HSI is being run via popen (as a child process).
@@ -269,7 +266,7 @@ class NerscVerifier(Component):
         #     hashverify    -> Verify checksum hash for existing HPSS file(s)
         #     -A            -> enable auto-scheduling of retrievals
         args = ["/usr/common/mss/bin/hsi", "-P", "hashverify", "-A", hpss_path]
-        completed_process = run(args, stdout=PIPE, stderr=PIPE)
+        completed_process = await run_command(args)
         # if our command failed
         if completed_process.returncode != 0:
             self.logger.error("Command to verify bundle in HPSS failed")
@@ -285,7 +282,7 @@ class NerscVerifier(Component):
                 "work_priority_timestamp": right_now,
             }
             self.logger.info(f"PATCH /Bundles/{bundle_id} - '{patch_body}'")
-            await lta_rc.request('PATCH', f'/Bundles/{bundle_id}', patch_body)
+            await lta_rc.request('PATCH', f'/Bundles/{bundle_id}?return=minimal', patch_body)
             return False
         # otherwise, we succeeded; output is on stderr
         # /home/projects/icecube/data/exp/IceCube/2018/unbiased/PFDST/1230/50145c5c-01e1-4727-a9a1-324e5af09a29.zip: (sha512) OK
@@ -310,7 +307,7 @@ class NerscVerifier(Component):
                 "work_priority_timestamp": right_now,
             }
             self.logger.info(f"PATCH /Bundles/{bundle_id} - '{patch_body}'")
-            await lta_rc.request('PATCH', f'/Bundles/{bundle_id}', patch_body)
+            await lta_rc.request('PATCH', f'/Bundles/{bundle_id}?return=minimal', patch_body)
             return False
         # having passed the gauntlet, we indicate the checksums match
         return True
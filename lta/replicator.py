@@ -65,26 +65,23 @@ class Replicator(Component):
     async def _do_work(self) -> None:
         """Perform a work cycle for this component."""
         self.logger.info("Starting work on Bundles.")
-        work_claimed = True
-        while work_claimed:
-            work_claimed = await self._do_work_claim()
-            work_claimed &= not self.run_once_and_die
+        await self._do_work_claims()
         self.logger.info("Ending work on Bundles.")
 
     async def _do_work_claim(self) -> bool:
         """Claim a bundle and perform work on it."""
         # 1. Ask the LTA DB for the next Bundle to be transferred
         # configure a RestClient to talk to the LTA DB
-        lta_rc = RestClient(self.lta_rest_url,
-                            token=self.lta_rest_token,
-                            timeout=self.work_timeout_seconds,
-                            retries=self.work_retries)
+        lta_rc = self.rest_client(self.lta_rest_url,
+                                  token=self.lta_rest_token,
+                                  timeout=self.work_timeout_seconds,
+                                  retries=self.work_retries)
         self.logger.info("Asking the LTA DB for a Bundle to transfer.")
         source = self.source_site
         pop_body = {
             "claimant": f"{self.name}-{self.instance_uuid}"
         }
-        response = await lta_rc.request('POST', f'/Bundles/actions/pop?source={source}&status=staged', pop_body)
+        response = await lta_rc.request('POST', f'/Bundles/actions/pop?source={source}&status=staged&contents=false&wait={self.pop_wait(self.work_timeout_seconds)}', pop_body)
         self.logger.info(f"LTA DB responded with: {response}")
         bundle = response["bundle"]
         if not bundle:
@@ -92,7 +89,8 @@ class Replicator(Component):
             return False
         # process the Bundle that we were given
         try:
-            await self._replicate_bundle_to_destination_site(lta_rc, bundle)
+            async with self.work_budget.reserve(bundle.get("size", 0)):
+                await self._replicate_bundle_to_destination_site(lta_rc, bundle)
         except Exception as e:
             await self._quarantine_bundle(lta_rc, bundle, f"{e}")
             return False
@@ -112,7 +110,7 @@ class Replicator(Component):
             "work_priority_timestamp": right_now,
         }
         try:
-            await lta_rc.request('PATCH', f'/Bundles/{bundle["uuid"]}', patch_body)
+            await lta_rc.request('PATCH', f'/Bundles/{bundle["uuid"]}?return=minimal', patch_body)
         except Exception as e:
             self.logger.error(f'Unable to quarantine Bundle {bundle["uuid"]}: {e}.')
 
@@ -132,7 +130,7 @@ class Replicator(Component):
             "transfer_reference": xfer_ref,
         }
         self.logger.info(f"PATCH /Bundles/{bundle_id} - '{patch_body}'")
-        await lta_rc.request('PATCH', f'/Bundles/{bundle_id}', patch_body)
+        await lta_rc.request('PATCH', f'/Bundles/{bundle_id}?return=minimal', patch_body)
 
 def runner() -> None:
     """Configure a Replicator component from the environment and set it running."""
@@ -5,45 +5,149 @@ Run with `python -m lta.rest_server`.
 """
 
 import asyncio
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict
+from contextlib import contextmanager
 from datetime import datetime, timedelta
 from functools import wraps
+from glob import glob
+from hashlib import sha256
+import json
 import logging
-from typing import Any, Callable, Dict
+from operator import itemgetter
+import os
+import socket
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, cast, Dict, Iterable, Iterator, List, Optional, Set, Tuple
 from urllib.parse import quote_plus
 from uuid import uuid1
 
-from motor.motor_tornado import MotorClient, MotorDatabase  # type: ignore
+from motor.motor_tornado import MotorClient, MotorCollection, MotorDatabase  # type: ignore
 import pymongo  # type: ignore
 from pymongo import MongoClient
+from pymongo.errors import BulkWriteError  # type: ignore
 from rest_tools.client import json_decode  # type: ignore
 from rest_tools.server import authenticated, catch_error, from_environment, RestHandler, RestHandlerSetup, RestServer  # type: ignore
+import tornado.httpserver
+import tornado.netutil
+import tornado.process
 import tornado.web
 
 
 EXPECTED_CONFIG = {
     'LTA_AUTH_ALGORITHM': 'RS256',
+    'LTA_AUTH_CACHE_SIZE': '1024',
     'LTA_AUTH_ISSUER': 'lta',
     'LTA_AUTH_SECRET': 'secret',
+    'LTA_BULK_CREATE_CHUNK_BYTES': '4194304',  # capped at MONGODB_MAX_BATCH_BYTES
     'LTA_MAX_BODY_SIZE': '16777216',  # 16 MB is the limit of MongoDB documents
-    'LTA_MAX_CLAIM_AGE_HOURS': '12',
+    'LTA_MAX_CLAIM_AGE_HOURS': '12',  # lower once every component renews its claims; see doc/admin.md
     'LTA_MONGODB_AUTH_USER': '',  # None means required to specify
     'LTA_MONGODB_AUTH_PASS': '',  # empty means no authentication required
     'LTA_MONGODB_DATABASE_NAME': 'lta',
     'LTA_MONGODB_HOST': 'localhost',
     'LTA_MONGODB_PORT': '27017',
+    'LTA_POP_DEST_WEIGHTS': '{}',  # JSON object of dest: weight for fair-share pop
+    'LTA_POP_POLICY': 'fifo',  # fifo or fair
+    'LTA_POP_WAIT_POLL_SECONDS': '30',  # re-poll for work that other processes write, or claims that expire
+    'LTA_RECOUNT_BUNDLES': 'False',  # recount bundle_counts at startup, even if they were counted before
     'LTA_REST_HOST': 'localhost',
     'LTA_REST_PORT': '8080',
+    'LTA_REST_TRACE': 'False',
+    'LTA_REST_WORKERS': '1',
+    'LTA_STATUS_CACHE_SECONDS': '15',
 }
 
 # -----------------------------------------------------------------------------
 
 AFTER = pymongo.ReturnDocument.AFTER
 ALL_DOCUMENTS: Dict[str, str] = {}
+ARCHIVE_AGE_DAYS = 30
+ARCHIVE_BATCH_SIZE = 1000
+ARCHIVE_STATUSES = {
+    "Bundles": ["finished"],  # not detached; the deleter still has work to do
+    "TransferRequests": ["completed"],
+}
+BEFORE = pymongo.ReturnDocument.BEFORE
+BUNDLE_COUNT_FIELDS = {"request", "size", "status"}
+BUNDLE_COUNT_PROJECTION = {"_id": False, "request": True, "size": True, "status": True}
+DUPLICATE_KEY_ERROR = 11000
 FIRST_IN_FIRST_OUT = [("work_priority_timestamp", pymongo.ASCENDING)]
+KEYSET_ORDER = [("work_priority_timestamp", pymongo.ASCENDING), ("uuid", pymongo.ASCENDING)]
+MANIFEST_CHUNK_SIZE = 1000
+MANIFEST_ORDER = [("bundle", pymongo.ASCENDING), ("version", pymongo.ASCENDING), ("index", pymongo.ASCENDING)]
+MONGODB_MAX_BATCH_BYTES = 48 * 1024 * 1024
 MOST_RECENT_FIRST = [("timestamp", pymongo.DESCENDING)]
+NDJSON_BATCH_SIZE = 1000
+NDJSON_CONTENT_TYPE = "application/x-ndjson"
+OBSOLETE_INDEXES = {
+    "BundleFiles": [
+        "bundle_files_bundle_index",  # superseded by bundle_files_version_index
+    ],
+    "Bundles": [
+        "bundles_claimant_index",  # superseded by bundles_claims_index
+        "bundles_fair_dest_index",  # superseded by bundles_fair_dest_claimed_index
+        "bundles_fair_source_index",  # superseded by bundles_fair_source_claimed_index
+        "bundles_pop_dest_index",  # superseded by bundles_pop_dest_claimed_index
+        "bundles_pop_source_index",  # superseded by bundles_pop_source_claimed_index
+        "bundles_status_index",  # prefix of bundles_pop_{source,dest}_claimed_index
+        "bundles_work_priority_timestamp_index",  # prefix of bundles_keyset_index
+    ],
+    "Status": [
+        "status_component_index",  # prefix of status_component_timestamp_index
+    ],
+    "TransferRequests": [
+        "transfer_requests_work_priority_timestamp_index",  # prefix of transfer_requests_keyset_index
+    ],
+}
+POP_FAIR_SHARE_SECONDS = 5
+POP_POLICIES = {"fair", "fifo"}
+POP_WAIT_MAX_SECONDS = 60
 REMOVE_ID = {"_id": False}
+ROW_BUCKETS = [4**i for i in range(0, 11)]  # 1 to 1M rows
+SIZE_BUCKETS = [2**i for i in range(6, 27, 2)]  # 64 B to 64 MB
+STREAM_BUCKETS = [0.01, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0]
+SUMMARY_GROUP_BY_FIELDS = {"claimant", "claimed", "dest", "request", "source", "status", "verified"}
+TOKEN_CACHE_MAX_SECONDS = 300  # how long a revoked token or rotated key can go unnoticed
+TRACE_LOGGER = logging.getLogger("lta.rest_server.trace")
 TRUE_SET = {'1', 't', 'true', 'y', 'yes'}
 
+METRICS: Dict[str, Any] = {}
+try:
+    from prometheus_client import CollectorRegistry, CONTENT_TYPE_LATEST, generate_latest, Histogram, multiprocess, REGISTRY  # type: ignore
+except ImportError:
+    pass
+else:
+    METRICS = {
+        "mongo_seconds": Histogram("lta_rest_mongo_seconds",
+                                   "Latency of MongoDB operations",
+                                   ["collection", "operation"]),
+        "request_bytes": Histogram("lta_rest_request_bytes",
+                                   "Size of REST request bodies",
+                                   ["route", "method"],
+                                   buckets=SIZE_BUCKETS),
+        "request_seconds": Histogram("lta_rest_request_seconds",
+                                     "Latency of REST requests",
+                                     ["route", "method", "status"]),
+        "response_bytes": Histogram("lta_rest_response_bytes",
+                                    "Size of REST response bodies",
+                                    ["route", "method"],
+                                    buckets=SIZE_BUCKETS),
+        "stream_rows": Histogram("lta_rest_stream_rows",
+                                 "Documents written to NDJSON response streams",
+                                 ["collection"],
+                                 buckets=ROW_BUCKETS),
+        "stream_seconds": Histogram("lta_rest_stream_seconds",
+                                    "Duration of NDJSON response streams",
+                                    ["collection"],
+                                    buckets=STREAM_BUCKETS),
+    }
+
+def metrics_multiprocess_dir() -> Optional[str]:
+    """Find the directory where prometheus_client shares metrics between processes, if any."""
+    # prometheus_client reads this when it is imported, so it has to be set before we start
+    return os.environ.get("PROMETHEUS_MULTIPROC_DIR") or os.environ.get("prometheus_multiproc_dir")
+
 def boolify(value: str) -> bool:
     """Convert a string into a True or False value."""
     return isinstance(value, str) and value.lower() in TRUE_SET
@@ -56,6 +160,28 @@ def unique_id() -> str:
     """Return a unique ID for an LTA database entity."""
     return uuid1().hex
 
+def observe(metric: str, value: float, *labels: str) -> None:
+    """Record a value in one of the METRICS histograms, if Prometheus is available."""
+    if metric in METRICS:
+        METRICS[metric].labels(*labels).observe(value)
+
+def trace(render: Callable[[], str]) -> None:
+    """Log a trace message; render is only called if tracing is enabled."""
+    if TRACE_LOGGER.isEnabledFor(logging.DEBUG):
+        TRACE_LOGGER.debug(render())
+
+@contextmanager
+def mongo_op(collection: str, operation: str, render: Callable[[], str]) -> Iterator[None]:
+    """Time a MongoDB operation; its arguments are only rendered if tracing is enabled."""
+    trace(lambda: f"MONGO-START: db.{collection}.{operation}({render()})")
+    start = time.monotonic()
+    try:
+        yield
+    finally:
+        elapsed = time.monotonic() - start
+        observe("mongo_seconds", elapsed, collection, operation)
+        trace(lambda: f"MONGO-END:   db.{collection}.{operation} in {elapsed:.6f}s")
+
 # -----------------------------------------------------------------------------
 
 def lta_auth(**_auth: Any) -> Callable[..., Any]:
@@ -104,10 +230,528 @@ def lta_auth(**_auth: Any) -> Callable[..., Any]:
 
 # -----------------------------------------------------------------------------
 
+def parse_limit(value: Optional[str]) -> int:
+    """Validate a limit argument; 0 means no limit was provided."""
+    if value is None:
+        return 0
+    try:
+        limit = int(value)
+    except ValueError:
+        raise tornado.web.HTTPError(400, reason="limit field is not an integer")
+    if limit < 1:
+        raise tornado.web.HTTPError(400, reason="limit field must be positive")
+    return limit
+
+def parse_wait(value: Optional[str]) -> float:
+    """Parse the wait query argument of a pop route; 0 means do not wait."""
+    if value is None:
+        return 0
+    try:
+        wait = float(value)
+    except ValueError:
+        raise tornado.web.HTTPError(400, reason="wait field is not a number")
+    if wait < 0:
+        raise tornado.web.HTTPError(400, reason="wait field must not be negative")
+    return min(wait, POP_WAIT_MAX_SECONDS)
+
+def work_statuses(update: Dict[str, Any]) -> Set[str]:
+    """Determine the statuses in which an update can make documents poppable."""
+    # a component that drops its claim without moving the document on is
+    # putting it back to be checked later, so that doesn't wake anybody up;
+    # waiting pops find it when they next poll
+    if isinstance(update.get("status"), str):
+        return {update["status"]}
+    return set()
+
+async def claim_many(collection: MotorCollection,
+                     find_query: Dict[str, Any],
+                     update_doc: Dict[str, Any],
+                     limit: int,
+                     projection: Optional[Dict[str, bool]] = None) -> List[Dict[str, Any]]:
+    """
+    Claim up to limit documents matching find_query, as a best-effort batch.
+
+    The batch is not atomic. Candidates are chosen in FIRST_IN_FIRST_OUT
+    order and claimed with an update_many that re-checks find_query, so a
+    document claimed by a concurrent pop is skipped rather than claimed
+    twice. Any candidates lost that way are replaced by looking again,
+    until limit documents are claimed or no candidates remain. Only the
+    documents that this call actually claimed are returned; they are found
+    by a claim_token unique to this call, as a claimant may pop more than
+    once within the same second, and the claim_token is removed again once
+    they have been read back. The projection must exclude fields, not
+    include them.
+    """
+    name = collection.name
+    claim_token = uuid1().hex
+    claim_update = dict(update_doc)
+    claim_update["$set"] = dict(update_doc["$set"], claim_token=claim_token)
+    if projection is None:
+        projection = REMOVE_ID
+    won_projection = dict(projection, claim_token=False)
+    uuid_only = {"_id": False, "uuid": True}
+    ret: List[Dict[str, Any]] = []
+    while len(ret) < limit:
+        # find the candidates at the front of the queue
+        wanted = limit - len(ret)
+        with mongo_op(name, "find", lambda: f"filter={find_query}, projection={uuid_only}, sort={FIRST_IN_FIRST_OUT}, limit={wanted}"):
+            uuids = [row["uuid"] async for row in collection.find(filter=find_query,
+                                                                  projection=uuid_only,
+                                                                  sort=FIRST_IN_FIRST_OUT,
+                                                                  limit=wanted)]
+        if not uuids:
+            break
+        # claim the candidates that are still unclaimed
+        claim_query = dict(find_query)
+        claim_query["uuid"] = {"$in": uuids}
+        with mongo_op(name, "update_many", lambda: f"filter={claim_query}, update={claim_update}"):
+            result = await collection.update_many(filter=claim_query, update=claim_update)
+        if result.modified_count:
+            # read back the documents that we won, then take our token off of them
+            won_query = {
+                "uuid": {"$in": uuids},
+                "claim_token": claim_token,
+            }
+            with mongo_op(name, "find", lambda: f"filter={won_query}, projection={won_projection}, sort={FIRST_IN_FIRST_OUT}"):
+                ret.extend([row async for row in collection.find(filter=won_query,
+                                                                 projection=won_projection,
+                                                                 sort=FIRST_IN_FIRST_OUT)])
+            unset_doc = {"$unset": {"claim_token": True}}
+            with mongo_op(name, "update_many", lambda: f"filter={won_query}, update={unset_doc}"):
+                await collection.update_many(filter=won_query, update=unset_doc)
+        # if we won every candidate there was, the queue has run dry
+        if (result.modified_count == len(uuids)) and (len(uuids) < wanted):
+            break
+    return ret
+
+async def fair_share_weights(db: MotorDatabase, fair_share: "FairShare", find_query: Dict[str, Any]) -> Dict[Optional[str], float]:
+    """Find the TransferRequests with Bundles matching find_query, and the weight of each."""
+    with mongo_op("Bundles", "distinct", lambda: f"key=request, filter={find_query}"):
+        requests = await db.Bundles.distinct("request", find_query)
+    weights: Dict[Optional[str], float] = {request: 1.0 for request in requests}
+    query = {"uuid": {"$in": [request for request in requests if request]}}
+    projection = {"_id": False, "dest": True, "uuid": True, "weight": True}
+    with mongo_op("TransferRequests", "find", lambda: f"filter=<{len(requests)} uuids>, projection={projection}"):
+        async for row in db.TransferRequests.find(filter=query, projection=projection):
+            weights[row["uuid"]] = fair_share.weight(row)
+    return weights
+
+async def claim_fair(db: MotorDatabase,
+                     fair_share: "FairShare",
+                     key: str,
+                     find_query: Dict[str, Any],
+                     update_doc: Dict[str, Any],
+                     limit: int,
+                     projection: Dict[str, bool]) -> Any:
+    """
+    Claim a Bundle, or up to limit Bundles, sharing the queue between TransferRequests.
+
+    Returns a Bundle or None without a limit, and a list of Bundles with one.
+    """
+    refreshed = False
+    if fair_share.expired(key):
+        fair_share.refresh(key, await fair_share_weights(db, fair_share, find_query))
+        refreshed = True
+    results: List[Dict[str, Any]] = []
+    while True:
+        # work out which TransferRequests to serve this time around
+        if limit:
+            allocation = fair_share.allocate(key, limit - len(results))
+        else:
+            found, request = fair_share.pick(key)
+            allocation = {request: 1} if found else {}
+        if not allocation:
+            # if the queue ran dry, look again before telling the caller there is no work
+            if refreshed or results:
+                break
+            fair_share.refresh(key, await fair_share_weights(db, fair_share, find_query))
+            refreshed = True
+            continue
+        for request, count in allocation.items():
+            request_query = {"$and": [find_query, {"request": request}]}
+            if limit:
+                rows = await claim_many(db.Bundles, request_query, update_doc, count, projection)
+            else:
+                with mongo_op("Bundles", "find_one_and_update", lambda: f"filter={request_query}, update={update_doc}, projection={projection}, sort={FIRST_IN_FIRST_OUT}, return_document={AFTER}"):
+                    row = await db.Bundles.find_one_and_update(filter=request_query,
+                                                               update=update_doc,
+                                                               projection=projection,
+                                                               sort=FIRST_IN_FIRST_OUT,
+                                                               return_document=AFTER)
+                rows = [row] if row else []
+            fair_share.charge(key, request, len(rows))
+            if len(rows) < count:
+                fair_share.drop(key, request)
+            results.extend(rows)
+        if (not limit and results) or (len(results) >= limit > 0):
+            break
+    if limit:
+        return results
+    return results[0] if results else None
+
+async def find_counted(collection: MotorCollection, query: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """Find the Bundles matching query, by uuid, with the fields that bundle_counts tracks."""
+    name = collection.name
+    projection = dict(BUNDLE_COUNT_PROJECTION, uuid=True)
+    with mongo_op(name, "find", lambda: f"filter=<query>, projection={projection}"):
+        ret = {row.pop("uuid"): row async for row in collection.find(filter=query, projection=projection)}
+    return ret
+
+def parse_fields(value: Optional[str]) -> Optional[Dict[str, bool]]:
+    """Convert a fields argument into a MongoDB projection; None means all fields."""
+    if value is None:
+        return None
+    projection = {field: True for field in value.split(",") if field}
+    projection["_id"] = False
+    projection["uuid"] = True
+    return projection
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    """Convert a page cursor into a query clause for the documents after it."""
+    try:
+        work_priority_timestamp, uuid = json.loads(urlsafe_b64decode(cursor.encode()))
+    except Exception:
+        raise tornado.web.HTTPError(400, reason="cursor field is not valid")
+    if work_priority_timestamp is None:
+        # a missing or null timestamp sorts first, and $gt null matches nothing
+        later = {"work_priority_timestamp": {"$ne": None}}
+    else:
+        later = {"work_priority_timestamp": {"$gt": work_priority_timestamp}}
+    return {
+        "$or": [
+            later,
+            {"work_priority_timestamp": work_priority_timestamp, "uuid": {"$gt": uuid}},
+        ]
+    }
+
+def encode_cursor(row: Dict[str, Any]) -> str:
+    """Create an opaque page cursor pointing after the provided document."""
+    key = [row.get("work_priority_timestamp"), row["uuid"]]
+    return urlsafe_b64encode(json.dumps(key).encode()).decode()
+
+async def find_page(collection: MotorCollection,
+                    query: Dict[str, Any],
+                    projection: Dict[str, bool],
+                    limit: int,
+                    cursor: Optional[str]) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Find the documents matching query, optionally one page at a time.
+
+    If a limit or cursor is provided, documents are returned in keyset
+    order of (work_priority_timestamp, uuid), starting after the cursor,
+    along with a cursor for the next page. The next page cursor is None
+    when there are no more documents to read.
+    """
+    name = collection.name
+    if not (limit or cursor):
+        with mongo_op(name, "find", lambda: f"filter={query}, projection={projection}"):
+            ret = [row async for row in collection.find(filter=query, projection=projection)]
+        return (ret, None)
+    if cursor:
+        query = {"$and": [query, decode_cursor(cursor)]}
+    # the cursor needs the sort keys, even if the caller did not ask for them
+    page_projection = dict(projection)
+    inclusive = any([value for key, value in projection.items() if key != "_id"])
+    strip_key = inclusive and ("work_priority_timestamp" not in projection)
+    if strip_key:
+        page_projection["work_priority_timestamp"] = True
+    with mongo_op(name, "find", lambda: f"filter={query}, projection={page_projection}, sort={KEYSET_ORDER}, limit={limit}"):
+        ret = [row async for row in collection.find(filter=query,
+                                                    projection=page_projection,
+                                                    sort=KEYSET_ORDER,
+                                                    limit=limit)]
+    next_cursor = None
+    if limit and len(ret) == limit:
+        next_cursor = encode_cursor(ret[-1])
+    if strip_key:
+        for row in ret:
+            row.pop("work_priority_timestamp", None)
+    return (ret, next_cursor)
+
+async def find_stream(collection: MotorCollection,
+                      query: Dict[str, Any],
+                      projection: Dict[str, bool],
+                      limit: int,
+                      cursor: Optional[str]) -> AsyncIterator[Dict[str, Any]]:
+    """Stream the documents matching query, fetching them in batches."""
+    name = collection.name
+    if cursor:
+        query = {"$and": [query, decode_cursor(cursor)]}
+    find_args: Dict[str, Any] = {"filter": query, "projection": projection}
+    if limit or cursor:
+        find_args.update(sort=KEYSET_ORDER, limit=limit)
+    find_args["batch_size"] = NDJSON_BATCH_SIZE
+    rows = collection.find(**find_args)
+    # find() is lazy; the query only runs when the first batch is fetched
+    with mongo_op(name, "find", lambda: ", ".join(f"{key}={value}" for key, value in find_args.items())):
+        try:
+            row = await rows.next()
+        except StopAsyncIteration:
+            return
+    yield row
+    async for row in rows:
+        yield row
+
+def manifest_chunks(bundle_uuid: str, version: str, files: List[Any]) -> List[Dict[str, Any]]:
+    """Split a version of the file manifest of a Bundle into BundleFiles documents."""
+    return [
+        {
+            "bundle": bundle_uuid,
+            "version": version,
+            "index": index,
+            "files": files[start:start+MANIFEST_CHUNK_SIZE],
+        } for index, start in enumerate(range(0, len(files), MANIFEST_CHUNK_SIZE))
+    ]
+
+async def attach_files(db: MotorDatabase, bundles: List[Dict[str, Any]]) -> None:
+    """Add the file manifests from BundleFiles back into the provided Bundles."""
+    # only Bundles whose manifest was stored separately need to be filled in
+    missing = {bundle["uuid"]: bundle for bundle in bundles if ("file_count" in bundle) and ("files" not in bundle)}
+    if not missing:
+        return
+    for bundle in missing.values():
+        bundle["files"] = []
+    # the manifests of archived Bundles were archived along with them
+    for collection_name in ["BundleFiles", "BundleFilesArchive"]:
+        wanted = [uuid for uuid, bundle in missing.items() if bundle["file_count"] and not bundle["files"]]
+        if not wanted:
+            break
+        query = {"bundle": {"$in": wanted}}
+        with mongo_op(collection_name, "find", lambda: f"filter=<{len(wanted)} uuids>, projection={REMOVE_ID}, sort={MANIFEST_ORDER}"):
+            async for row in db[collection_name].find(filter=query, projection=REMOVE_ID, sort=MANIFEST_ORDER):
+                bundle = missing[row["bundle"]]
+                # skip the chunks of a manifest that has been replaced, but not yet removed
+                if row.get("version") == bundle.get("files_version"):
+                    bundle["files"].extend(row["files"])
+
+async def insert_files(db: MotorDatabase, chunks: List[Dict[str, Any]]) -> None:
+    """Write file manifest chunks from manifest_chunks into BundleFiles."""
+    if chunks:
+        with mongo_op("BundleFiles", "insert_many", lambda: f"documents=<{len(chunks)} chunks>, ordered=False"):
+            await db.BundleFiles.insert_many(documents=chunks, ordered=False)
+
+async def remove_files(db: MotorDatabase, bundle_uuid: str, keep: Optional[str] = None) -> None:
+    """Remove the file manifests of a Bundle from BundleFiles, except for the version to keep."""
+    query: Dict[str, Any] = {"bundle": bundle_uuid}
+    if keep:
+        query["version"] = {"$ne": keep}
+    with mongo_op("BundleFiles", "delete_many", lambda: f"filter={query}"):
+        await db.BundleFiles.delete_many(filter=query)
+
+async def insert_archived(db: MotorDatabase, archive_name: str, docs: List[Dict[str, Any]]) -> None:
+    """Insert documents into an archive collection, skipping any that are already there."""
+    try:
+        with mongo_op(archive_name, "insert_many", lambda: f"documents=<{len(docs)} documents>, ordered=False"):
+            await db[archive_name].insert_many(documents=docs, ordered=False)
+    except BulkWriteError as e:
+        # a document archived by an earlier, interrupted attempt is already there
+        if any(error["code"] != DUPLICATE_KEY_ERROR for error in e.details["writeErrors"]):
+            raise
+
+async def archive_files(db: MotorDatabase, uuids: List[str]) -> None:
+    """Copy the file manifests of the provided Bundles into BundleFilesArchive."""
+    query = {"bundle": {"$in": uuids}}
+    chunks: List[Dict[str, Any]] = []
+    with mongo_op("BundleFiles", "find", lambda: f"filter=<{len(uuids)} uuids>, projection={REMOVE_ID}"):
+        async for row in db.BundleFiles.find(filter=query, projection=REMOVE_ID):
+            chunks.append(row)
+            # manifests can be large, so don't hold all of them at once
+            if len(chunks) >= MANIFEST_CHUNK_SIZE:
+                await insert_archived(db, "BundleFilesArchive", chunks)
+                chunks = []
+    if chunks:
+        await insert_archived(db, "BundleFilesArchive", chunks)
+
+async def archive_documents(db: MotorDatabase, name: str, cutoff: str, limit: int) -> List[str]:
+    """Move terminal documents last updated before cutoff into the archive of a collection."""
+    archive_name = f"{name}Archive"
+    query = {
+        "status": {"$in": ARCHIVE_STATUSES[name]},
+        "update_timestamp": {"$lt": cutoff},
+    }
+    with mongo_op(name, "find", lambda: f"filter={query}, projection={REMOVE_ID}, limit={limit}"):
+        docs = [row async for row in db[name].find(filter=query, projection=REMOVE_ID, limit=limit)]
+    if not docs:
+        return []
+    uuids = [doc["uuid"] for doc in docs]
+    await insert_archived(db, archive_name, docs)
+    # the manifests of Bundles go into the archive before the Bundles leave
+    if name == "Bundles":
+        await archive_files(db, uuids)
+    # only remove the documents that are still finished with
+    query2 = {"$and": [{"uuid": {"$in": uuids}}, query]}
+    with mongo_op(name, "delete_many", lambda: f"filter=<{len(uuids)} uuids>"):
+        await db[name].delete_many(filter=query2)
+    if name == "Bundles":
+        # a Bundle that changed in the meantime stays, and so does its manifest
+        with mongo_op(name, "distinct", lambda: f"key=uuid, filter=<{len(uuids)} uuids>"):
+            remaining = set(await db[name].distinct("uuid", {"uuid": {"$in": uuids}}))
+        archived = [uuid for uuid in uuids if uuid not in remaining]
+        query3 = {"bundle": {"$in": archived}}
+        with mongo_op("BundleFiles", "delete_many", lambda: f"filter=<{len(archived)} uuids>"):
+            await db.BundleFiles.delete_many(filter=query3)
+    return uuids
+
+async def find_one_archived(db: MotorDatabase, name: str, query: Dict[str, Any], projection: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Find a document in a collection, falling back to the archive of that collection."""
+    for collection_name in [name, f"{name}Archive"]:
+        with mongo_op(collection_name, "find_one", lambda: f"filter={query}, projection={projection}"):
+            ret = await db[collection_name].find_one(filter=query, projection=projection)
+        if ret:
+            return cast(Dict[str, Any], ret)
+    return None
+
+def bundle_counts_pipeline(query: Dict[str, Any], archived: bool = False) -> List[Dict[str, Any]]:
+    """Create an aggregation that totals the Bundles of TransferRequests by status."""
+    pipeline: List[Dict[str, Any]] = [{"$match": query}]
+    if archived:
+        # in the archive, skip any Bundle whose move out of Bundles was interrupted
+        pipeline.extend([
+            {"$lookup": {"from": "Bundles", "localField": "uuid", "foreignField": "uuid", "as": "live"}},
+            {"$match": {"live": {"$size": 0}}},
+        ])
+    return pipeline + [
+        {"$group": {
+            "_id": {"request": "$request", "status": "$status"},
+            "count": {"$sum": 1},
+            "size": {"$sum": "$size"},
+        }},
+    ]
+
+def bundle_counts_add(counts: Dict[str, Dict[str, Any]], row: Dict[str, Any]) -> None:
+    """Add a row from bundle_counts_pipeline to the counters of its TransferRequest."""
+    request = row["_id"].get("request")
+    status = row["_id"].get("status")
+    if isinstance(request, str) and isinstance(status, str):
+        total = counts.setdefault(request, {}).setdefault(status, {"count": 0, "size": 0})
+        total["count"] += row["count"]
+        total["size"] += row["size"]
+
+def bundle_counts_nonzero(bundle_counts: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Drop the statuses that $inc has emptied out of bundle_counts, as bundle_counts_pipeline would."""
+    return {status: total for status, total in bundle_counts.items() if total.get("count")}
+
+def bundle_counts_incs(before: List[Dict[str, Any]], after: List[Dict[str, Any]]) -> Dict[str, Dict[str, int]]:
+    """Determine how the bundle_counts of each TransferRequest change when Bundles change from before to after."""
+    incs: Dict[str, Dict[str, int]] = {}
+    for sign, bundles in [(-1, before), (1, after)]:
+        for bundle in bundles:
+            request = bundle.get("request")
+            status = bundle.get("status")
+            if not (isinstance(request, str) and isinstance(status, str)):
+                continue
+            size = bundle.get("size")
+            if not isinstance(size, int):
+                size = 0
+            inc = incs.setdefault(request, {})
+            for key, value in [(f"bundle_counts.{status}.count", 1), (f"bundle_counts.{status}.size", size)]:
+                inc[key] = inc.get(key, 0) + (sign * value)
+    return {request: inc for request, inc in incs.items() if any(inc.values())}
+
+async def update_bundle_counts(db: MotorDatabase, before: List[Dict[str, Any]], after: List[Dict[str, Any]]) -> None:
+    """Apply a change in the status or size of some Bundles to the bundle_counts of their TransferRequests."""
+    for request, inc in bundle_counts_incs(before, after).items():
+        query = {"uuid": request}
+        update_doc = {"$inc": inc}
+        with mongo_op("TransferRequests", "update_one", lambda: f"filter={query}, update={update_doc}"):
+            await db.TransferRequests.update_one(filter=query, update=update_doc)
+
+async def update_counted(db: MotorDatabase,
+                         bundles: Dict[str, Dict[str, Any]],
+                         changed: Dict[str, Any],
+                         update: Dict[str, Any]) -> None:
+    """
+    Update Bundles read with find_counted, and move their bundle_counts with $inc.
+
+    The Bundles of each TransferRequest and status are updated together, but
+    only while each still has the request and status it was read with. A
+    Bundle that somebody else changed in the meantime is updated on its own,
+    the way that PATCH does it; changed is the query that Bundles needing
+    update match. The counters of each TransferRequest then move with one
+    $inc. MongoDB does not write the Bundles and the counters atomically, so
+    an interrupted update can leave the counters off; ensure_bundle_counts
+    repairs them when LTA_RECOUNT_BUNDLES is set, and TransferRequestFinisher
+    checks a summary of the Bundles before it trusts them to complete a
+    TransferRequest.
+    """
+    token = uuid1().hex
+    update_doc = {"$set": dict(update, bulk_token=token)}
+    counted = {key: update[key] for key in BUNDLE_COUNT_FIELDS if key in update}
+    groups: Dict[Tuple[Any, Any], List[str]] = {}
+    for uuid, bundle in bundles.items():
+        groups.setdefault((bundle.get("request"), bundle.get("status")), []).append(uuid)
+    before: List[Dict[str, Any]] = []
+    stragglers: List[str] = []
+    for (request, status), uuids in groups.items():
+        # null also matches a missing field, as it was read
+        query = {"uuid": {"$in": uuids}, "request": request, "status": status}
+        with mongo_op("Bundles", "update_many", lambda: f"filter=<{len(uuids)} Bundles of {request} in {status}>, update={update_doc}"):
+            ret = await db.Bundles.update_many(filter=query, update=update_doc)
+        if ret.matched_count < len(uuids):
+            # the token tells us which of the Bundles were still as we read them
+            won_query = {"uuid": {"$in": uuids}, "bulk_token": token}
+            with mongo_op("Bundles", "distinct", lambda: f"key=uuid, filter=<{len(uuids)} uuids with bulk_token>"):
+                won = set(await db.Bundles.distinct("uuid", filter=won_query))
+            stragglers.extend([uuid for uuid in uuids if uuid not in won])
+            uuids = [uuid for uuid in uuids if uuid in won]
+        before.extend([bundles[uuid] for uuid in uuids])
+    # the token has done its job, so take it back out of the Bundles
+    token_query = {"bulk_token": token}
+    unset_doc = {"$unset": {"bulk_token": True}}
+    with mongo_op("Bundles", "update_many", lambda: f"filter={token_query}, update={unset_doc}"):
+        await db.Bundles.update_many(filter=token_query, update=unset_doc)
+    await update_bundle_counts(db, before, [dict(bundle, **counted) for bundle in before])
+    for uuid in stragglers:
+        query = dict(changed, uuid=uuid)
+        with mongo_op("Bundles", "find_one_and_update", lambda: f"filter={query}, update={update}, projection={BUNDLE_COUNT_PROJECTION}, return_document={BEFORE}"):
+            straggler = await db.Bundles.find_one_and_update(filter=query,
+                                                             update={"$set": update},
+                                                             projection=BUNDLE_COUNT_PROJECTION,
+                                                             return_document=BEFORE)
+        if straggler:
+            await update_bundle_counts(db, [straggler], [dict(straggler, **counted)])
+
+async def delete_counted(db: MotorDatabase, bundles: Dict[str, Dict[str, Any]]) -> None:
+    """
+    Delete Bundles read with find_counted, and take them out of their bundle_counts.
+
+    Like update_counted, the Bundles of each TransferRequest and status are
+    deleted together while they still have the request and status they were
+    read with, and a Bundle that somebody else changed in the meantime is
+    deleted on its own, the way that DELETE does it.
+    """
+    groups: Dict[Tuple[Any, Any], List[str]] = {}
+    for uuid, bundle in bundles.items():
+        groups.setdefault((bundle.get("request"), bundle.get("status")), []).append(uuid)
+    before: List[Dict[str, Any]] = []
+    stragglers: List[str] = []
+    for (request, status), uuids in groups.items():
+        # null also matches a missing field, as it was read
+        query = {"uuid": {"$in": uuids}, "request": request, "status": status}
+        with mongo_op("Bundles", "delete_many", lambda: f"filter=<{len(uuids)} Bundles of {request} in {status}>"):
+            ret = await db.Bundles.delete_many(filter=query)
+        if ret.deleted_count < len(uuids):
+            # whatever is left was changed after we read it
+            left_query = {"uuid": {"$in": uuids}}
+            with mongo_op("Bundles", "distinct", lambda: f"key=uuid, filter=<{len(uuids)} uuids>"):
+                left = set(await db.Bundles.distinct("uuid", filter=left_query))
+            stragglers.extend([uuid for uuid in uuids if uuid in left])
+            uuids = [uuid for uuid in uuids if uuid not in left]
+        before.extend([bundles[uuid] for uuid in uuids])
+    await update_bundle_counts(db, before, [])
+    for uuid in stragglers:
+        query = {"uuid": uuid}
+        with mongo_op("Bundles", "find_one_and_delete", lambda: f"filter={query}, projection={BUNDLE_COUNT_PROJECTION}"):
+            straggler = await db.Bundles.find_one_and_delete(filter=query, projection=BUNDLE_COUNT_PROJECTION)
+        if straggler:
+            await update_bundle_counts(db, [straggler], [])
+
+# -----------------------------------------------------------------------------
+
 class CheckClaims:
     """CheckClaims determines if claims are old/expired."""
 
-    def __init__(self, claim_age: int = 12):
+    def __init__(self, claim_age: float = 12):
         """Intialize a CheckClaims object."""
         self.claim_age = claim_age
 
@@ -116,19 +760,313 @@ class CheckClaims:
         cutoff_time = datetime.utcnow() - timedelta(hours=self.claim_age)
         return cutoff_time.isoformat()
 
+    def claimable(self) -> Dict[str, Any]:
+        """Create a query clause matching unclaimed or expired claims."""
+        # both branches test claimed, so each can walk the claimed field of the pop indexes
+        return {
+            "$or": [
+                {"claimed": False},
+                {"claimed": True, "claim_timestamp": {"$lt": self.old_age()}},
+            ]
+        }
+
+class TokenCache:
+    """TokenCache remembers the claims of recently validated tokens."""
+
+    def __init__(self, auth: Any, size: int = 1024, max_age: float = TOKEN_CACHE_MAX_SECONDS):
+        """Initialize a TokenCache object around a rest_tools Auth object."""
+        self.auth = auth
+        self.max_age = max_age
+        self.size = size
+        self.entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+
+    def __getattr__(self, name: str) -> Any:
+        """Pass anything we don't cache through to the Auth object."""
+        return getattr(self.auth, name)
+
+    def validate(self, token: str, *args: Any, **kwargs: Any) -> Dict[str, Any]:
+        """Validate a token, reusing the result of an earlier validation until it or its cache entry expires."""
+        if (self.size < 1) or args or kwargs:
+            return cast(Dict[str, Any], self.auth.validate(token, *args, **kwargs))
+        key = sha256(token.encode("utf-8")).hexdigest()
+        entry = self.entries.get(key)
+        if entry:
+            if entry[0] > time.time():
+                self.entries.move_to_end(key)
+                return dict(entry[1])
+            # the token has expired; let the Auth object say so
+            del self.entries[key]
+        data = self.auth.validate(token)
+        # a token that never expires is validated every time
+        if "exp" in data:
+            self.entries[key] = (min(float(data["exp"]), time.time() + self.max_age), data)
+            if len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+        return dict(data)
+
+class StatusCache:
+    """
+    StatusCache keeps short-lived rollups of the Status collection.
+
+    Each server process has its own cache; with several LTA_REST_WORKERS,
+    a heartbeat only invalidates the cache of the worker that received it,
+    and the others catch up when their entries expire.
+    """
+
+    def __init__(self, ttl: float = 15):
+        """Initialize a StatusCache object."""
+        self.ttl = ttl
+        self.entries: Dict[str, Tuple[float, Any]] = {}
+
+    def get(self, key: str) -> Any:
+        """Get a cached rollup, or None if it is missing or stale."""
+        entry = self.entries.get(key)
+        if entry and (entry[0] > time.monotonic()):
+            return entry[1]
+        return None
+
+    def put(self, key: str, value: Any) -> None:
+        """Cache a rollup for the next ttl seconds."""
+        self.entries[key] = (time.monotonic() + self.ttl, value)
+
+    def invalidate(self) -> None:
+        """Forget all of the cached rollups."""
+        self.entries.clear()
+
+class WorkNotifier:
+    """
+    WorkNotifier wakes up pop requests that are waiting for work.
+
+    Each server process has its own notifier; with several LTA_REST_WORKERS,
+    a write only wakes the pops waiting in the worker that received it, and
+    the pops in other workers find the work when they next poll.
+    """
+
+    def __init__(self, poll_seconds: float = 30) -> None:
+        """Initialize a WorkNotifier object."""
+        self.events: Dict[Tuple[str, str], asyncio.Event] = {}
+        self.poll_seconds = poll_seconds
+
+    def listen(self, name: str, status: str) -> asyncio.Event:
+        """Get the Event that the next notify(name, [status]) will set."""
+        key = (name, status)
+        if key not in self.events:
+            self.events[key] = asyncio.Event()
+        return self.events[key]
+
+    def notify(self, name: str, statuses: Iterable[str]) -> None:
+        """Wake up everyone waiting for work in the provided statuses of the named collection."""
+        for status in set(statuses):
+            event = self.events.pop((name, status), None)
+            if event:
+                event.set()
+
+    async def poll(self, name: str, status: str, wait: float, attempt: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Call attempt until it finds work or wait seconds have passed.
+
+        Between attempts, we sleep until the status of the named collection
+        is notified, but never longer than poll_seconds; writes made by other
+        server processes and claims that expire are not notified.
+        """
+        loop = asyncio.get_event_loop()
+        deadline = loop.time() + wait
+        while True:
+            # listen before the attempt, so we can't miss a notify during it
+            event = self.listen(name, status)
+            found = await attempt()
+            remaining = deadline - loop.time()
+            if found or (remaining <= 0):
+                return found
+            try:
+                await asyncio.wait_for(event.wait(), timeout=min(remaining, self.poll_seconds))
+            except asyncio.TimeoutError:
+                # nothing was notified; the caller will ask again soon enough
+                if loop.time() >= deadline:
+                    return found
+
+class FairShare:
+    """
+    FairShare decides which TransferRequest a fair-share pop serves next.
+
+    Each pop queue (status plus source or dest) keeps a stride schedule of
+    the TransferRequests that have claimable Bundles in it. Every claimed
+    Bundle advances the pass of its TransferRequest by 1/weight, and the
+    TransferRequest with the lowest pass is served next, so a large
+    TransferRequest can no longer starve the ones queued behind it. The
+    set of TransferRequests in each queue is re-read from MongoDB every
+    POP_FAIR_SHARE_SECONDS, or sooner when it runs dry. With several
+    LTA_REST_WORKERS, each worker keeps its own schedule, so the shares
+    are only fair within each worker.
+    """
+
+    def __init__(self, policy: str = "fifo", dest_weights: Optional[Dict[str, float]] = None, ttl: float = POP_FAIR_SHARE_SECONDS):
+        """Initialize a FairShare object."""
+        if policy not in POP_POLICIES:
+            raise ValueError(f"pop policy must be one of {sorted(POP_POLICIES)}, not {policy}")
+        self.policy = policy
+        self.dest_weights = dest_weights if dest_weights else {}
+        self.ttl = ttl
+        self.expires: Dict[str, float] = {}
+        self.passes: Dict[str, Dict[Optional[str], float]] = {}
+        self.weights: Dict[str, Dict[Optional[str], float]] = {}
+
+    def weight(self, request: Dict[str, Any]) -> float:
+        """Determine the weight of a TransferRequest from its own weight and the weight of its dest."""
+        weight = request.get("weight", 1)
+        if isinstance(weight, bool) or not isinstance(weight, (int, float)) or (weight <= 0):
+            weight = 1
+        return float(weight) * float(self.dest_weights.get(request.get("dest", ""), 1))
+
+    def expired(self, key: str) -> bool:
+        """Determine if the TransferRequests of a queue need to be re-read."""
+        return time.monotonic() >= self.expires.get(key, 0.0)
+
+    def refresh(self, key: str, weights: Dict[Optional[str], float]) -> None:
+        """Replace the TransferRequests of a queue, keeping the progress of those still in it."""
+        old_passes = self.passes.get(key, {})
+        start = min(old_passes.values()) if old_passes else 0.0
+        self.passes[key] = {request: old_passes.get(request, start) for request in weights}
+        self.weights[key] = weights
+        self.expires[key] = time.monotonic() + self.ttl
+
+    def pick(self, key: str) -> Tuple[bool, Optional[str]]:
+        """Pick the TransferRequest that a queue should serve next; False if there are none."""
+        passes = self.passes.get(key, {})
+        if not passes:
+            return (False, None)
+        request = min(passes, key=lambda request: (passes[request], str(request)))
+        return (True, request)
+
+    def allocate(self, key: str, limit: int) -> Dict[Optional[str], int]:
+        """Split a batch of limit Bundles between the TransferRequests of a queue."""
+        passes = dict(self.passes.get(key, {}))
+        allocation: Dict[Optional[str], int] = {}
+        for i in range(limit if passes else 0):
+            request = min(passes, key=lambda request: (passes[request], str(request)))
+            allocation[request] = allocation.get(request, 0) + 1
+            passes[request] += 1 / self.weights[key][request]
+        return allocation
+
+    def charge(self, key: str, request: Optional[str], count: int = 1) -> None:
+        """Advance the pass of a TransferRequest that was served count Bundles."""
+        if request in self.passes.get(key, {}):
+            self.passes[key][request] += count / self.weights[key][request]
+
+    def drop(self, key: str, request: Optional[str]) -> None:
+        """Forget a TransferRequest that has no more claimable Bundles in a queue."""
+        self.passes.get(key, {}).pop(request, None)
+
+class SharedSocketServer(RestServer):
+    """SharedSocketServer is a RestServer that serves sockets bound before forking workers."""
+
+    def __init__(self, sockets: List[socket.socket], max_body_size: int, **kwargs: Any) -> None:
+        """Create a SharedSocketServer to serve the provided sockets."""
+        super().__init__(max_body_size=max_body_size, **kwargs)
+        self.max_body_size = max_body_size
+        self.sockets = sockets
+
+    def startup(self, address: str = 'localhost', port: int = 8080) -> None:
+        """Start serving the shared sockets; they were bound to address and port before forking."""
+        app = tornado.web.Application(self.routes, **self.app_args)
+        self.http_server = tornado.httpserver.HTTPServer(app, xheaders=True, max_body_size=self.max_body_size)
+        self.http_server.add_sockets(self.sockets)
+
 # -----------------------------------------------------------------------------
 
 class BaseLTAHandler(RestHandler):
     """BaseLTAHandler is a RestHandler for all LTA routes."""
 
-    def initialize(self, check_claims: CheckClaims, db: MotorDatabase, *args: Any, **kwargs: Any) -> None:
+    def initialize(self,
+                   bulk_create_chunk_bytes: int,
+                   check_claims: CheckClaims,
+                   db: MotorDatabase,
+                   fair_share: FairShare,
+                   status_cache: StatusCache,
+                   work_notifier: WorkNotifier,
+                   *args: Any,
+                   **kwargs: Any) -> None:
         """Initialize a BaseLTAHandler object."""
         super(BaseLTAHandler, self).initialize(*args, **kwargs)
+        self.bulk_create_chunk_bytes = bulk_create_chunk_bytes
         self.check_claims = check_claims
         self.db = db
+        self.fair_share = fair_share
+        self.status_cache = status_cache
+        self.work_notifier = work_notifier
+        self.streamed_bytes = 0
+
+    def on_finish(self) -> None:
+        """Record the latency and payload sizes of the request."""
+        super(BaseLTAHandler, self).on_finish()
+        route = type(self).__name__
+        method = str(self.request.method)
+        # a streamed response has no Content-Length, so we counted it ourselves
+        response_bytes = int(self._headers.get("Content-Length", self.streamed_bytes))
+        observe("request_seconds", self.request.request_time(), route, method, str(self.get_status()))
+        observe("request_bytes", len(self.request.body), route, method)
+        observe("response_bytes", response_bytes, route, method)
+
+    def accepts_ndjson(self) -> bool:
+        """Determine if the client asked for a streaming NDJSON response."""
+        return NDJSON_CONTENT_TYPE in self.request.headers.get("Accept", "")
+
+    def minimal_return(self) -> bool:
+        """Determine if the client asked for a minimal response (return=minimal)."""
+        return bool(self.get_query_argument("return", default=None) == "minimal")
+
+    async def write_ndjson(self, name: str, rows: AsyncIterator[Dict[str, Any]], transform: Callable[[Dict[str, Any]], Any]) -> None:
+        """Stream rows to the client as NDJSON, one batch at a time."""
+        self.set_header("Content-Type", NDJSON_CONTENT_TYPE)
+        count = 0
+        start = time.monotonic()
+        try:
+            async for row in rows:
+                line = json.dumps(transform(row)) + "\n"
+                self.write(line)
+                self.streamed_bytes += len(line)
+                count = count + 1
+                if (count % NDJSON_BATCH_SIZE) == 0:
+                    await self.flush()
+        finally:
+            elapsed = time.monotonic() - start
+            observe("stream_seconds", elapsed, name)
+            observe("stream_rows", count, name)
+            trace(lambda: f"STREAM-END:  db.{name} streamed {count} rows in {elapsed:.6f}s")
 
 # -----------------------------------------------------------------------------
 
+class ArchiveActionsHandler(BaseLTAHandler):
+    """ArchiveActionsHandler moves old terminal documents of a collection into its archive."""
+
+    collection = ""
+
+    @lta_auth(roles=['admin', 'system'])
+    async def post(self) -> None:
+        """Handle POST /{collection}/actions/archive."""
+        req = json_decode(self.request.body) if self.request.body else {}
+        days = req.get("days", ARCHIVE_AGE_DAYS)
+        if isinstance(days, bool) or not isinstance(days, (int, float)):
+            raise tornado.web.HTTPError(400, reason="days field is not a number")
+        if days < 0:
+            raise tornado.web.HTTPError(400, reason="days field must not be negative")
+        limit = req.get("limit", ARCHIVE_BATCH_SIZE)
+        if isinstance(limit, bool) or not isinstance(limit, int):
+            raise tornado.web.HTTPError(400, reason="limit field is not an integer")
+        if limit < 1:
+            raise tornado.web.HTTPError(400, reason="limit field must be positive")
+
+        cutoff = (datetime.utcnow() - timedelta(days=days)).isoformat()
+        uuids = await archive_documents(self.db, self.collection, cutoff, limit)
+        for uuid in uuids:
+            logging.info(f"archived {self.collection} {uuid}")
+        self.write({'uuids': uuids, 'count': len(uuids)})
+
+class BundlesActionsArchiveHandler(ArchiveActionsHandler):
+    """Handler for /Bundles/actions/archive."""
+
+    collection = "Bundles"
+
 class BundlesActionsBulkCreateHandler(BaseLTAHandler):
     """Handler for /Bundles/actions/bulk_create."""
 
@@ -143,6 +1081,7 @@ class BundlesActionsBulkCreateHandler(BaseLTAHandler):
         if not req['bundles']:
             raise tornado.web.HTTPError(400, reason="bundles field is empty")
 
+        manifests = []
         for xfer_bundle in req["bundles"]:
             right_now = now()  # https://www.youtube.com/watch?v=BQkFEG_iZUA
             xfer_bundle["uuid"] = unique_id()
@@ -150,17 +1089,42 @@ class BundlesActionsBulkCreateHandler(BaseLTAHandler):
             xfer_bundle["update_timestamp"] = right_now
             xfer_bundle["work_priority_timestamp"] = right_now
             xfer_bundle["claimed"] = False
-
-        logging.debug(f"MONGO-START: db.Bundles.insert_many(documents={req['bundles']})")
-        ret = await self.db.Bundles.insert_many(documents=req["bundles"])
-        logging.debug("MONGO-END:   db.Bundles.insert_many(documents)")
-        create_count = len(ret.inserted_ids)
+            # the file manifest lives in BundleFiles, not in the Bundle
+            if isinstance(xfer_bundle.get("files"), list):
+                files = xfer_bundle.pop("files")
+                xfer_bundle["file_count"] = len(files)
+                xfer_bundle["files_version"] = unique_id()
+                manifests.extend(manifest_chunks(xfer_bundle["uuid"], xfer_bundle["files_version"], files))
+
+        # write the manifests first, so that no Bundle is ever without its manifest
+        await insert_files(self.db, manifests)
+
+        # split large bodies into chunks, and insert them one after another
+        num_chunks = -(-len(self.request.body) // self.bulk_create_chunk_bytes)
+        chunk_size = -(-len(req["bundles"]) // num_chunks)
+        chunks = [req["bundles"][i:i+chunk_size] for i in range(0, len(req["bundles"]), chunk_size)]
+        created: List[Dict[str, Any]] = []
+        try:
+            for chunk in chunks:
+                try:
+                    with mongo_op("Bundles", "insert_many", lambda: f"documents=<{len(chunk)} Bundles>, ordered=False"):
+                        await self.db.Bundles.insert_many(documents=chunk, ordered=False)
+                except BulkWriteError as e:
+                    failed = {error["index"] for error in e.details["writeErrors"]}
+                    created.extend([bundle for index, bundle in enumerate(chunk) if index not in failed])
+                    raise
+                created.extend(chunk)
+        finally:
+            # count the Bundles that made it in, even if the rest of them didn't
+            await update_bundle_counts(self.db, [], created)
+        create_count = len(created)
 
         uuids = []
         for x in req["bundles"]:
             uuid = x["uuid"]
             uuids.append(uuid)
             logging.info(f"created Bundle {uuid}")
+        self.work_notifier.notify("Bundles", [x["status"] for x in req["bundles"] if isinstance(x.get("status"), str)])
 
         self.set_status(201)
         self.write({'bundles': uuids, 'count': create_count})
@@ -179,15 +1143,70 @@ class BundlesActionsBulkDeleteHandler(BaseLTAHandler):
         if not req['bundles']:
             raise tornado.web.HTTPError(400, reason="bundles field is empty")
 
-        results = []
-        for uuid in req["bundles"]:
-            query = {"uuid": uuid}
-            logging.debug(f"MONGO-START: db.Bundles.delete_one(filter={query})")
-            ret = await self.db.Bundles.delete_one(filter=query)
-            logging.debug("MONGO-END:   db.Bundles.delete_one(filter)")
-            if ret.deleted_count > 0:
-                logging.info(f"deleted Bundle {uuid}")
-                results.append(uuid)
+        # determine which of the Bundles exist, then delete them all at once
+        query = {"uuid": {"$in": req["bundles"]}}
+        found = await find_counted(self.db.Bundles, query)
+        results = [uuid for uuid in dict.fromkeys(req["bundles"]) if uuid in found]
+        if results:
+            await delete_counted(self.db, found)
+            with mongo_op("BundleFiles", "delete_many", lambda: f"filter=<{len(results)} uuids>"):
+                await self.db.BundleFiles.delete_many(filter={"bundle": {"$in": results}})
+        for uuid in results:
+            logging.info(f"deleted Bundle {uuid}")
+
+        self.write({'bundles': results, 'count': len(results)})
+
+class BundlesActionsBulkGetHandler(BaseLTAHandler):
+    """Handler for /Bundles/actions/bulk_get."""
+
+    @lta_auth(roles=['admin', 'system', 'user'])
+    async def post(self) -> None:
+        """Handle POST /Bundles/actions/bulk_get."""
+        req = json_decode(self.request.body)
+        if 'bundles' not in req:
+            raise tornado.web.HTTPError(400, reason="missing bundles field")
+        if not isinstance(req['bundles'], list):
+            raise tornado.web.HTTPError(400, reason="bundles field is not a list")
+        if not req['bundles']:
+            raise tornado.web.HTTPError(400, reason="bundles field is empty")
+        fields = req.get('fields', None)
+        if fields is not None:
+            if not isinstance(fields, list):
+                raise tornado.web.HTTPError(400, reason="fields field is not a list")
+            if not all(isinstance(field, str) and field for field in fields):
+                raise tornado.web.HTTPError(400, reason="fields field must contain field names")
+
+        # without a list of fields, return the Bundles without their manifests
+        projection: Dict[str, Any] = {"_id": False, "files": False}
+        if fields is not None:
+            projection = {field: True for field in fields}
+            projection["_id"] = False
+            projection["uuid"] = True
+            # Bundles created before BundleFiles keep their manifest inline
+            if ("file_count" in fields) or ("files" in fields):
+                projection["file_count"] = {"$ifNull": ["$file_count", {"$size": {"$ifNull": ["$files", []]}}]}
+            if "files" in fields:
+                projection["files_version"] = True
+        found: Dict[str, Dict[str, Any]] = {}
+        for collection_name in ["Bundles", "BundlesArchive"]:
+            missing = [uuid for uuid in req["bundles"] if uuid not in found]
+            if not missing:
+                break
+            pipeline = [
+                {"$match": {"uuid": {"$in": missing}}},
+                {"$project": projection},
+            ]
+            with mongo_op(collection_name, "aggregate", lambda: f"pipeline=[<{len(missing)} uuids>, {projection}]"):
+                async for row in self.db[collection_name].aggregate(pipeline):
+                    found[row["uuid"]] = row
+        results = [found[uuid] for uuid in dict.fromkeys(req["bundles"]) if uuid in found]
+        if (fields is not None) and ("files" in fields):
+            await attach_files(self.db, results)
+            for bundle in results:
+                if "file_count" not in fields:
+                    bundle.pop("file_count", None)
+                if "files_version" not in fields:
+                    bundle.pop("files_version", None)
 
         self.write({'bundles': results, 'count': len(results)})
 
@@ -208,17 +1227,29 @@ class BundlesActionsBulkUpdateHandler(BaseLTAHandler):
             raise tornado.web.HTTPError(400, reason="bundles field is not a list")
         if not req['bundles']:
             raise tornado.web.HTTPError(400, reason="bundles field is empty")
-
-        results = []
-        for uuid in req["bundles"]:
-            query = {"uuid": uuid}
+        for field in ["files", "files_version"]:
+            if field in req['update']:
+                raise tornado.web.HTTPError(400, reason=f"cannot bulk update {field} field")
+
+        # determine which of the Bundles the update would modify, then update them all at once
+        query: Dict[str, Any] = {"uuid": {"$in": req["bundles"]}}
+        if req["update"]:
+            query["$or"] = [{key: {"$ne": value}} for key, value in req["update"].items()]
+            # {"$ne": None} also skips a missing field, which $set would still create
+            query["$or"].extend([{key: {"$exists": False}} for key, value in req["update"].items() if value is None])
+        found = await find_counted(self.db.Bundles, query)
+        results = [uuid for uuid in dict.fromkeys(req["bundles"]) if uuid in found]
+        if results and (BUNDLE_COUNT_FIELDS & set(req["update"])):
+            # keep the bundle_counts of the TransferRequests in step with the Bundles
+            await update_counted(self.db, found, {"$or": query["$or"]}, req["update"])
+        elif results:
             update_doc = {"$set": req["update"]}
-            logging.debug(f"MONGO-START: db.Bundles.update_one(filter={query}, update={update_doc})")
-            ret = await self.db.Bundles.update_one(filter=query, update=update_doc)
-            logging.debug("MONGO-END:   db.Bundles.update_one(filter, update)")
-            if ret.modified_count > 0:
-                logging.info(f"updated Bundle {uuid}")
-                results.append(uuid)
+            with mongo_op("Bundles", "update_many", lambda: f"filter=<{len(results)} uuids>, update={update_doc}"):
+                await self.db.Bundles.update_many(filter={"uuid": {"$in": results}}, update=update_doc)
+        for uuid in results:
+            logging.info(f"updated Bundle {uuid}")
+        if results:
+            self.work_notifier.notify("Bundles", work_statuses(req["update"]))
 
         self.write({'bundles': results, 'count': len(results)})
 
@@ -232,6 +1263,12 @@ class BundlesHandler(BaseLTAHandler):
         request = self.get_query_argument("request", default=None)
         status = self.get_query_argument("status", default=None)
         verified = self.get_query_argument("verified", default=None)
+        fields = parse_fields(self.get_query_argument("fields", default=None))
+        limit = parse_limit(self.get_query_argument("limit", default=None))
+        cursor = self.get_query_argument("cursor", default=None)
+        # file manifests live in BundleFiles; listing them here would be empty or enormous
+        if fields and ("files" in fields):
+            raise tornado.web.HTTPError(400, reason="files field is not available here; use /Bundles/{uuid}/files")
 
         query: Dict[str, Any] = {
             "uuid": {"$exists": True},
@@ -249,17 +1286,27 @@ class BundlesHandler(BaseLTAHandler):
             "_id": False,
             "uuid": True,
         }
+        if fields:
+            projection = fields
 
-        results = []
-        logging.debug(f"MONGO-START: db.Bundles.find(filter={query}, projection={projection})")
-        async for row in self.db.Bundles.find(filter=query,
-                                              projection=projection):
-            results.append(row["uuid"])
-        logging.debug("MONGO-END*:   db.Bundles.find(filter, projection)")
+        # if the caller wants a stream, send the results as we read them
+        if self.accepts_ndjson():
+            stream = find_stream(self.db.Bundles, query, projection, limit, cursor)
+            await self.write_ndjson("Bundles", stream, (lambda row: row) if fields else itemgetter("uuid"))
+            return
+
+        rows, next_cursor = await find_page(self.db.Bundles, query, projection, limit, cursor)
 
-        ret = {
+        # without fields, the caller gets a list of uuids
+        results: List[Any] = rows
+        if not fields:
+            results = [row["uuid"] for row in rows]
+
+        ret: Dict[str, Any] = {
             'results': results,
         }
+        if limit or cursor:
+            ret['cursor'] = next_cursor
         self.write(ret)
 
 class BundlesActionsPopHandler(BaseLTAHandler):
@@ -271,45 +1318,157 @@ class BundlesActionsPopHandler(BaseLTAHandler):
         dest = self.get_argument('dest', default=None)
         source = self.get_argument('source', default=None)
         status = self.get_argument('status')
+        limit = parse_limit(self.get_argument('limit', default=None))
+        contents = boolify(self.get_argument('contents', default="True"))
         if (not dest) and (not source):
             raise tornado.web.HTTPError(400, reason="missing source and dest fields")
         pop_body = json_decode(self.request.body)
         if 'claimant' not in pop_body:
             raise tornado.web.HTTPError(400, reason="missing claimant field")
         claimant = pop_body["claimant"]
+        projection = {
+            "_id": False,
+        }
+        if not contents:
+            projection["files"] = False
+        wait = parse_wait(self.get_argument('wait', default=None))
+        policy = self.get_argument('policy', default=self.fair_share.policy)
+        if policy not in POP_POLICIES:
+            raise tornado.web.HTTPError(400, reason=f"policy field must be one of {sorted(POP_POLICIES)}")
         # find and claim a bundle for the specified source
         sdb = self.db.Bundles
-        find_query = {
-            "status": status,
-            "claimed": False,
-        }
-        if dest:
-            find_query["dest"] = dest
-        if source:
-            find_query["source"] = source
-        right_now = now()  # https://www.youtube.com/watch?v=WaSy8yy-mr8
-        update_doc = {
-            "$set": {
-                "update_timestamp": right_now,
-                "claimed": True,
-                "claimant": claimant,
-                "claim_timestamp": right_now,
+
+        async def claim() -> Any:
+            find_query: Dict[str, Any] = {
+                "status": status,
             }
-        }
-        logging.debug(f"MONGO-START: db.Bundles.find_one_and_update(filter={find_query}, update={update_doc}, projection={REMOVE_ID}, sort={FIRST_IN_FIRST_OUT}, return_document={AFTER})")
-        bundle = await sdb.find_one_and_update(filter=find_query,
-                                               update=update_doc,
-                                               projection=REMOVE_ID,
-                                               sort=FIRST_IN_FIRST_OUT,
-                                               return_document=AFTER)
-        logging.debug("MONGO-END:   db.Bundles.find_one_and_update(filter, update, projection, sort, return_document)")
+            find_query.update(self.check_claims.claimable())
+            if dest:
+                find_query["dest"] = dest
+            if source:
+                find_query["source"] = source
+            right_now = now()  # https://www.youtube.com/watch?v=WaSy8yy-mr8
+            update_doc = {
+                "$set": {
+                    "update_timestamp": right_now,
+                    "claimed": True,
+                    "claimant": claimant,
+                    "claim_timestamp": right_now,
+                }
+            }
+            # share the queue between TransferRequests, if asked to
+            if policy == "fair":
+                key = f"{status}/{source}/{dest}"
+                return await claim_fair(self.db, self.fair_share, key, find_query, update_doc, limit, projection)
+            # if the caller asked for a batch of bundles, claim them together
+            if limit:
+                return await claim_many(sdb, find_query, update_doc, limit, projection)
+            with mongo_op("Bundles", "find_one_and_update", lambda: f"filter={find_query}, update={update_doc}, projection={projection}, sort={FIRST_IN_FIRST_OUT}, return_document={AFTER}"):
+                bundle = await sdb.find_one_and_update(filter=find_query,
+                                                       update=update_doc,
+                                                       projection=projection,
+                                                       sort=FIRST_IN_FIRST_OUT,
+                                                       return_document=AFTER)
+            return bundle
+
+        # if the caller is willing to wait, hold the request until we find work
+        found = await self.work_notifier.poll("Bundles", status, wait, claim)
+        if limit:
+            bundles = found
+            if contents:
+                await attach_files(self.db, bundles)
+            logging.info(f"{len(bundles)} Bundles with source {source}, dest {dest}, and status {status} claimed by {claimant}")
+            self.write({'bundles': bundles})
+            return
         # return what we found to the caller
+        bundle = found
         if not bundle:
             logging.info(f"Unclaimed Bundle with source {source} and status {status} does not exist.")
         else:
             logging.info(f"Bundle {bundle['uuid']} claimed by {claimant}")
+            if contents:
+                await attach_files(self.db, [bundle])
         self.write({'bundle': bundle})
 
+class BundlesActionsRenewHandler(BaseLTAHandler):
+    """BundlesActionsRenewHandler handles /Bundles/actions/renew."""
+
+    @lta_auth(roles=['admin', 'system'])
+    async def post(self) -> None:
+        """Handle POST /Bundles/actions/renew."""
+        req = json_decode(self.request.body)
+        if 'claimant' not in req:
+            raise tornado.web.HTTPError(400, reason="missing claimant field")
+        if not isinstance(req['claimant'], str):
+            raise tornado.web.HTTPError(400, reason="claimant field is not a string")
+        if not req['claimant']:
+            raise tornado.web.HTTPError(400, reason="claimant field is empty")
+        if 'bundles' in req and not isinstance(req['bundles'], list):
+            raise tornado.web.HTTPError(400, reason="bundles field is not a list")
+        claimant = req["claimant"]
+        # extend the lease on every live claim held by the claimant
+        query: Dict[str, Any] = {
+            "claimed": True,
+            "claimant": claimant,
+            "status": {"$ne": "quarantined"},
+        }
+        if 'bundles' in req:
+            query["uuid"] = {"$in": req["bundles"]}
+        update_doc = {
+            "$set": {
+                "claim_timestamp": now(),
+            }
+        }
+        with mongo_op("Bundles", "update_many", lambda: f"filter={query}, update={update_doc}"):
+            ret = await self.db.Bundles.update_many(filter=query, update=update_doc)
+        logging.info(f"renewed {ret.matched_count} Bundle claims for {claimant}")
+        self.write({'count': ret.matched_count})
+
+class BundlesActionsSummaryHandler(BaseLTAHandler):
+    """BundlesActionsSummaryHandler handles /Bundles/actions/summary."""
+
+    @lta_auth(roles=['admin', 'system', 'user'])
+    async def get(self) -> None:
+        """Handle GET /Bundles/actions/summary."""
+        group_by = self.get_query_argument("group_by", default="status").split(",")
+        for field in group_by:
+            if field not in SUMMARY_GROUP_BY_FIELDS:
+                raise tornado.web.HTTPError(400, reason=f"cannot group_by field {field}")
+        dest = self.get_query_argument("dest", default=None)
+        request = self.get_query_argument("request", default=None)
+        source = self.get_query_argument("source", default=None)
+        status = self.get_query_argument("status", default=None)
+
+        query: Dict[str, Any] = {}
+        if dest:
+            query["dest"] = dest
+        if request:
+            query["request"] = request
+        if source:
+            query["source"] = source
+        if status:
+            query["status"] = status
+
+        # count up the Bundles in each group, all in one aggregation
+        pipeline = [
+            {"$match": query},
+            {"$group": {
+                "_id": {field: f"${field}" for field in group_by},
+                "count": {"$sum": 1},
+                "size": {"$sum": "$size"},
+                "oldest_update_timestamp": {"$min": "$update_timestamp"},
+            }},
+            {"$sort": {"_id": 1}},
+        ]
+        results = []
+        with mongo_op("Bundles", "aggregate", lambda: f"pipeline={pipeline}"):
+            async for row in self.db.Bundles.aggregate(pipeline):
+                group = row.pop("_id")
+                group.update(row)
+                results.append(group)
+
+        self.write({'results': results})
+
 class BundlesSingleHandler(BaseLTAHandler):
     """BundlesSingleHandler handles object level routes for Bundles."""
 
@@ -323,11 +1482,11 @@ class BundlesSingleHandler(BaseLTAHandler):
         contents = boolify(self.get_query_argument("contents", default="True"))
         if not contents:
             projection["files"] = False
-        logging.debug(f"MONGO-START: db.Bundles.find_one(filter={query}, projection={projection})")
-        ret = await self.db.Bundles.find_one(filter=query, projection=projection)
-        logging.debug("MONGO-END:   db.Bundles.find_one(filter, projection)")
+        ret = await find_one_archived(self.db, "Bundles", query, projection)
         if not ret:
             raise tornado.web.HTTPError(404, reason="not found")
+        if contents:
+            await attach_files(self.db, [ret])
         self.write(ret)
 
     @lta_auth(roles=['admin', 'system', 'user'])
@@ -336,29 +1495,203 @@ class BundlesSingleHandler(BaseLTAHandler):
         req = json_decode(self.request.body)
         if 'uuid' in req and req['uuid'] != bundle_id:
             raise tornado.web.HTTPError(400, reason="bad request")
-        query = {"uuid": bundle_id}
-        update_doc = {"$set": req}
-        logging.debug(f"MONGO-START: db.Bundles.find_one_and_update(filter={query}, update={update_doc}, projection={REMOVE_ID}, return_document={AFTER})")
-        ret = await self.db.Bundles.find_one_and_update(filter=query,
-                                                        update=update_doc,
-                                                        projection=REMOVE_ID,
-                                                        return_document=AFTER)
-        logging.debug("MONGO-END:   db.Bundles.find_one_and_update(filter, update, projection, return_document)")
-        if not ret:
-            raise tornado.web.HTTPError(404, reason="not found")
-        logging.info(f"patched Bundle {bundle_id} with {req}")
+        if 'files_version' in req:
+            raise tornado.web.HTTPError(400, reason="cannot patch files_version field")
+        # the file manifest lives in BundleFiles, not in the Bundle
+        files = req.pop("files", None)
+        if files is not None:
+            if not isinstance(files, list):
+                raise tornado.web.HTTPError(400, reason="files field is not a list")
+            # write the new manifest beside the old one; the Bundle switches over below
+            req["file_count"] = len(files)
+            req["files_version"] = unique_id()
+            await insert_files(self.db, manifest_chunks(bundle_id, req["files_version"], files))
+        try:
+            ret, before = await self.patch_bundle(bundle_id, req)
+        except tornado.web.HTTPError:
+            if files is not None:
+                # nothing switched over to the new manifest, so take it back out
+                query = {"bundle": bundle_id, "version": req["files_version"]}
+                with mongo_op("BundleFiles", "delete_many", lambda: f"filter={query}"):
+                    await self.db.BundleFiles.delete_many(filter=query)
+            raise
+        if files is not None:
+            await remove_files(self.db, bundle_id, keep=req["files_version"])
+        logging.info("patched Bundle %s with %s", bundle_id, req)
+        self.work_notifier.notify("Bundles", work_statuses(req))
         self.write(ret)
 
+    async def patch_bundle(self, bundle_id: str, req: Dict[str, Any]) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+        """Apply a PATCH to a Bundle; return the response and the Bundle as it was, if read."""
+        query = {"uuid": bundle_id}
+        update_doc: Dict[str, Any] = {"$set": req}
+        if "files_version" in req:
+            update_doc["$unset"] = {"files": True}
+        before: Optional[Dict[str, Any]] = None
+        if BUNDLE_COUNT_FIELDS & set(req):
+            # keep the bundle_counts of the TransferRequest in step with the Bundle
+            with mongo_op("Bundles", "find_one_and_update", lambda: f"filter={query}, update={update_doc}, projection={BUNDLE_COUNT_PROJECTION}, return_document={BEFORE}"):
+                before = await self.db.Bundles.find_one_and_update(filter=query,
+                                                                   update=update_doc,
+                                                                   projection=BUNDLE_COUNT_PROJECTION,
+                                                                   return_document=BEFORE)
+            if not before:
+                raise tornado.web.HTTPError(404, reason="not found")
+            after = {**before, **{key: req[key] for key in BUNDLE_COUNT_FIELDS if key in req}}
+            await update_bundle_counts(self.db, [before], [after])
+            ret: Dict[str, Any] = {}
+            if not self.minimal_return():
+                with mongo_op("Bundles", "find_one", lambda: f"filter={query}, projection={REMOVE_ID}"):
+                    ret = await self.db.Bundles.find_one(filter=query, projection=REMOVE_ID) or {}
+        elif self.minimal_return():
+            # read back the status, so that we know which pops might want the Bundle now
+            projection = {"_id": False, "status": True}
+            with mongo_op("Bundles", "find_one_and_update", lambda: f"filter={query}, update={update_doc}, projection={projection}"):
+                before = await self.db.Bundles.find_one_and_update(filter=query,
+                                                                   update=update_doc,
+                                                                   projection=projection)
+            if not before:
+                raise tornado.web.HTTPError(404, reason="not found")
+            ret = {}
+        else:
+            with mongo_op("Bundles", "find_one_and_update", lambda: f"filter={query}, update={update_doc}, projection={REMOVE_ID}, return_document={AFTER}"):
+                ret = await self.db.Bundles.find_one_and_update(filter=query,
+                                                                update=update_doc,
+                                                                projection=REMOVE_ID,
+                                                                return_document=AFTER)
+            if not ret:
+                raise tornado.web.HTTPError(404, reason="not found")
+        return (ret, before)
+
     @lta_auth(roles=['admin', 'system', 'user'])
     async def delete(self, bundle_id: str) -> None:
         """Handle DELETE /Bundles/{uuid}."""
         query = {"uuid": bundle_id}
-        logging.debug(f"MONGO-START: db.Bundles.delete_one(filter={query})")
-        await self.db.Bundles.delete_one(filter=query)
-        logging.debug("MONGO-END:   db.Bundles.delete_one(filter)")
+        with mongo_op("Bundles", "find_one_and_delete", lambda: f"filter={query}, projection={BUNDLE_COUNT_PROJECTION}"):
+            before = await self.db.Bundles.find_one_and_delete(filter=query, projection=BUNDLE_COUNT_PROJECTION)
+        with mongo_op("BundlesArchive", "find_one_and_delete", lambda: f"filter={query}, projection={BUNDLE_COUNT_PROJECTION}"):
+            archived = await self.db.BundlesArchive.find_one_and_delete(filter=query, projection=BUNDLE_COUNT_PROJECTION)
+        # archived Bundles count towards their TransferRequest too
+        if before or archived:
+            await update_bundle_counts(self.db, [before or archived], [])
+        await remove_files(self.db, bundle_id)
+        query = {"bundle": bundle_id}
+        with mongo_op("BundleFilesArchive", "delete_many", lambda: f"filter={query}"):
+            await self.db.BundleFilesArchive.delete_many(filter=query)
         logging.info(f"deleted Bundle {bundle_id}")
         self.set_status(204)
 
+class BundlesFilesHandler(BaseLTAHandler):
+    """BundlesFilesHandler handles the file manifest routes for Bundles."""
+
+    @lta_auth(roles=['admin', 'system', 'user'])
+    async def get(self, bundle_id: str) -> None:
+        """Handle GET /Bundles/{uuid}/files."""
+        try:
+            start = int(self.get_query_argument("start", default="0"))
+        except ValueError:
+            raise tornado.web.HTTPError(400, reason="start field is not an integer")
+        if start < 0:
+            raise tornado.web.HTTPError(400, reason="start field must not be negative")
+        limit = parse_limit(self.get_query_argument("limit", default=None))
+        if not limit:
+            limit = MANIFEST_CHUNK_SIZE
+        # find the Bundle, in case its manifest was never moved out
+        query = {"uuid": bundle_id}
+        projection = {"_id": False, "uuid": True, "file_count": True, "files": True, "files_version": True}
+        bundle = await find_one_archived(self.db, "Bundles", query, projection)
+        if not bundle:
+            raise tornado.web.HTTPError(404, reason="not found")
+        if "files" in bundle:
+            files = bundle["files"][start:start+limit]
+        else:
+            # read only the chunks that overlap the requested page
+            first = start // MANIFEST_CHUNK_SIZE
+            last = (start + limit - 1) // MANIFEST_CHUNK_SIZE
+            query2 = {
+                "bundle": bundle_id,
+                "version": bundle.get("files_version"),  # None matches the unversioned chunks
+                "index": {"$gte": first, "$lte": last},
+            }
+            files = []
+            # the manifests of archived Bundles were archived along with them
+            for collection_name in ["BundleFiles", "BundleFilesArchive"]:
+                with mongo_op(collection_name, "find", lambda: f"filter={query2}, projection={REMOVE_ID}, sort={MANIFEST_ORDER}"):
+                    async for row in self.db[collection_name].find(filter=query2, projection=REMOVE_ID, sort=MANIFEST_ORDER):
+                        files.extend(row["files"])
+                if files:
+                    break
+            offset = start - (first * MANIFEST_CHUNK_SIZE)
+            files = files[offset:offset+limit]
+        next_start = None
+        if len(files) == limit:
+            next_start = start + limit
+        self.write({
+            'files': files,
+            'start': start,
+            'next': next_start,
+        })
+
+class BundlesActionsTransitionHandler(BaseLTAHandler):
+    """BundlesActionsTransitionHandler handles /Bundles/{uuid}/actions/transition."""
+
+    @lta_auth(roles=['admin', 'system', 'user'])
+    async def post(self, bundle_id: str) -> None:
+        """Handle POST /Bundles/{uuid}/actions/transition."""
+        req = json_decode(self.request.body)
+        for field in ["from_status", "to_status"]:
+            if field not in req:
+                raise tornado.web.HTTPError(400, reason=f"missing {field} field")
+            if not isinstance(req[field], str):
+                raise tornado.web.HTTPError(400, reason=f"{field} field is not a string")
+            if not req[field]:
+                raise tornado.web.HTTPError(400, reason=f"{field} field is empty")
+        if 'claimant' in req and not isinstance(req['claimant'], str):
+            raise tornado.web.HTTPError(400, reason="claimant field is not a string")
+        update = req.get("update", {})
+        if not isinstance(update, dict):
+            raise tornado.web.HTTPError(400, reason="update field is not an object")
+        for field in ["files", "files_version", "status", "uuid"]:
+            if field in update:
+                raise tornado.web.HTTPError(400, reason=f"cannot transition {field} field")
+        # only move the Bundle if it is still in the state the caller expects
+        query = {
+            "uuid": bundle_id,
+            "status": req["from_status"],
+        }
+        if 'claimant' in req:
+            query["claimant"] = req["claimant"]
+        update_doc = {
+            "$set": {
+                "update_timestamp": now(),
+                **update,
+                "status": req["to_status"],
+            }
+        }
+        with mongo_op("Bundles", "find_one_and_update", lambda: f"filter={query}, update={update_doc}, projection={BUNDLE_COUNT_PROJECTION}, return_document={BEFORE}"):
+            before = await self.db.Bundles.find_one_and_update(filter=query,
+                                                               update=update_doc,
+                                                               projection=BUNDLE_COUNT_PROJECTION,
+                                                               return_document=BEFORE)
+        if before is None:
+            # tell the caller why we didn't move it
+            projection = {"_id": False, "claimant": True, "status": True}
+            with mongo_op("Bundles", "find_one", lambda: f"filter={{'uuid': {bundle_id}}}, projection={projection}"):
+                current = await self.db.Bundles.find_one(filter={"uuid": bundle_id}, projection=projection)
+            if not current:
+                raise tornado.web.HTTPError(404, reason="not found")
+            raise tornado.web.HTTPError(409, reason=f"conflict: Bundle has status {current.get('status')} and claimant {current.get('claimant')}")
+        after = {**before, **{key: update_doc["$set"][key] for key in BUNDLE_COUNT_FIELDS if key in update_doc["$set"]}}
+        await update_bundle_counts(self.db, [before], [after])
+        ret: Dict[str, Any] = {}
+        if not self.minimal_return():
+            query = {"uuid": bundle_id}
+            with mongo_op("Bundles", "find_one", lambda: f"filter={query}, projection={REMOVE_ID}"):
+                ret = await self.db.Bundles.find_one(filter=query, projection=REMOVE_ID) or {}
+        logging.info(f"transitioned Bundle {bundle_id} from {req['from_status']} to {req['to_status']}")
+        self.work_notifier.notify("Bundles", [req["to_status"]])
+        self.write(ret)
+
 # -----------------------------------------------------------------------------
 
 class MainHandler(BaseLTAHandler):
@@ -368,6 +1701,23 @@ class MainHandler(BaseLTAHandler):
         """Handle GET /."""
         self.write({})
 
+class MetricsHandler(BaseLTAHandler):
+    """MetricsHandler exposes the REST server metrics to Prometheus."""
+
+    def initialize(self, metrics_registry: Any, *args: Any, **kwargs: Any) -> None:  # type: ignore[override]
+        """Initialize a MetricsHandler object."""
+        super(MetricsHandler, self).initialize(*args, **kwargs)
+        self.metrics_registry = metrics_registry
+
+    def get(self) -> None:
+        """Handle GET /metrics."""
+        if not METRICS:
+            raise tornado.web.HTTPError(404, reason="prometheus_client is not installed")
+        if self.metrics_registry is None:
+            raise tornado.web.HTTPError(404, reason="LTA_REST_WORKERS > 1 requires PROMETHEUS_MULTIPROC_DIR for metrics")
+        self.set_header("Content-Type", CONTENT_TYPE_LATEST)
+        self.write(generate_latest(self.metrics_registry))
+
 # -----------------------------------------------------------------------------
 
 class TransferRequestsHandler(BaseLTAHandler):
@@ -376,13 +1726,37 @@ class TransferRequestsHandler(BaseLTAHandler):
     @lta_auth(roles=['admin', 'system', 'user'])
     async def get(self) -> None:
         """Handle GET /TransferRequests."""
-        ret = []
-        logging.debug(f"MONGO-START: db.TransferRequests.find(filter={ALL_DOCUMENTS}, projection={REMOVE_ID})")
-        async for row in self.db.TransferRequests.find(filter=ALL_DOCUMENTS,
-                                                       projection=REMOVE_ID):
-            ret.append(row)
-        logging.debug("MONGO-END*:  db.TransferRequests.find(filter, projection)")
-        self.write({'results': ret})
+        dest = self.get_query_argument("dest", default=None)
+        source = self.get_query_argument("source", default=None)
+        status = self.get_query_argument("status", default=None)
+        fields = parse_fields(self.get_query_argument("fields", default=None))
+        limit = parse_limit(self.get_query_argument("limit", default=None))
+        cursor = self.get_query_argument("cursor", default=None)
+
+        query: Dict[str, Any] = {}
+        if dest:
+            query["dest"] = dest
+        if source:
+            query["source"] = source
+        if status:
+            query["status"] = status
+
+        projection = fields if fields else REMOVE_ID
+
+        # if the caller wants a stream, send the results as we read them
+        if self.accepts_ndjson():
+            stream = find_stream(self.db.TransferRequests, query, projection, limit, cursor)
+            await self.write_ndjson("TransferRequests", stream, lambda row: row)
+            return
+
+        ret, next_cursor = await find_page(self.db.TransferRequests, query, projection, limit, cursor)
+
+        response: Dict[str, Any] = {
+            'results': ret,
+        }
+        if limit or cursor:
+            response['cursor'] = next_cursor
+        self.write(response)
 
     @lta_auth(roles=['admin', 'system', 'user'])
     async def post(self) -> None:
@@ -416,10 +1790,11 @@ class TransferRequestsHandler(BaseLTAHandler):
         req['update_timestamp'] = right_now
         req['work_priority_timestamp'] = right_now
         req['claimed'] = False
-        logging.debug(f"MONGO-START: db.TransferRequests.insert_one(document={req}")
-        await self.db.TransferRequests.insert_one(document=req)
-        logging.debug("MONGO-END:   db.TransferRequests.insert_one(document)")
+        req['bundle_counts'] = {}
+        with mongo_op("TransferRequests", "insert_one", lambda: f"document={req}"):
+            await self.db.TransferRequests.insert_one(document=req)
         logging.info(f"created TransferRequest {req['uuid']}")
+        self.work_notifier.notify("TransferRequests", ["unclaimed"])
         self.set_status(201)
         self.write({'TransferRequest': req['uuid']})
 
@@ -430,9 +1805,7 @@ class TransferRequestSingleHandler(BaseLTAHandler):
     async def get(self, request_id: str) -> None:
         """Handle GET /TransferRequests/{uuid}."""
         query = {'uuid': request_id}
-        logging.debug(f"MONGO-START: db.TransferRequests.find_one(filter={query}, projection={REMOVE_ID}")
-        ret = await self.db.TransferRequests.find_one(filter=query, projection=REMOVE_ID)
-        logging.debug("MONGO-END:   db.TransferRequests.find_one(filter, projection)")
+        ret = await find_one_archived(self.db, "TransferRequests", query, REMOVE_ID)
         if not ret:
             raise tornado.web.HTTPError(404, reason="not found")
         self.write(ret)
@@ -443,31 +1816,37 @@ class TransferRequestSingleHandler(BaseLTAHandler):
         req = json_decode(self.request.body)
         if 'uuid' in req and req['uuid'] != request_id:
             raise tornado.web.HTTPError(400, reason="bad request")
+        if 'bundle_counts' in req:
+            raise tornado.web.HTTPError(400, reason="cannot patch bundle_counts field")
         sbtr = self.db.TransferRequests
         query = {"uuid": request_id}
         update = {"$set": req}
-        logging.debug(f"MONGO-START: db.TransferRequests.find_one_and_update(filter={query}, update={update}, projection={REMOVE_ID}, return_document={AFTER}")
-        ret = await sbtr.find_one_and_update(filter=query,
-                                             update=update,
-                                             projection=REMOVE_ID,
-                                             return_document=AFTER)
-        logging.debug("MONGO-END:   db.TransferRequests.find_one_and_update(filter, update, projection, return_document")
-        if not ret:
+        # the response never carried the document, so don't ask for it back
+        with mongo_op("TransferRequests", "update_one", lambda: f"filter={query}, update={update}"):
+            ret = await sbtr.update_one(filter=query, update=update)
+        if not ret.matched_count:
             raise tornado.web.HTTPError(404, reason="not found")
-        logging.info(f"patched TransferRequest {request_id} with {req}")
+        logging.info("patched TransferRequest %s with %s", request_id, req)
+        self.work_notifier.notify("TransferRequests", work_statuses(req))
         self.write({})
 
     @lta_auth(roles=['admin', 'system', 'user'])
     async def delete(self, request_id: str) -> None:
         """Handle DELETE /TransferRequests/{uuid}."""
         query = {"uuid": request_id}
-        logging.debug(f"MONGO-START: db.TransferRequests.delete_one(filter={query})")
-        await self.db.TransferRequests.delete_one(filter=query)
-        logging.debug("MONGO-END:   db.TransferRequests.delete_one(filter)")
+        with mongo_op("TransferRequests", "delete_one", lambda: f"filter={query}"):
+            await self.db.TransferRequests.delete_one(filter=query)
+        with mongo_op("TransferRequestsArchive", "delete_one", lambda: f"filter={query}"):
+            await self.db.TransferRequestsArchive.delete_one(filter=query)
         logging.info(f"deleted TransferRequest {request_id}")
         self.set_status(204)
 
 
+class TransferRequestActionsArchiveHandler(ArchiveActionsHandler):
+    """Handler for /TransferRequests/actions/archive."""
+
+    collection = "TransferRequests"
+
 class TransferRequestActionsPopHandler(BaseLTAHandler):
     """TransferRequestActionsPopHandler handles /TransferRequests/actions/pop."""
 
@@ -475,34 +1854,49 @@ class TransferRequestActionsPopHandler(BaseLTAHandler):
     async def post(self) -> None:
         """Handle POST /TransferRequests/actions/pop."""
         source = self.get_argument('source')
+        limit = parse_limit(self.get_argument('limit', default=None))
         pop_body = json_decode(self.request.body)
         if 'claimant' not in pop_body:
             raise tornado.web.HTTPError(400, reason="missing claimant field")
         claimant = pop_body["claimant"]
+        wait = parse_wait(self.get_argument('wait', default=None))
         # find and claim a transfer request for the specified source
         sdtr = self.db.TransferRequests
         find_query = {
             "source": source,
             "status": "unclaimed",
         }
-        right_now = now()  # https://www.youtube.com/watch?v=nRGCZh5A8T4
-        update_doc = {
-            "$set": {
-                "status": "processing",
-                "update_timestamp": right_now,
-                "claimed": True,
-                "claimant": claimant,
-                "claim_timestamp": right_now,
+
+        async def claim() -> Any:
+            right_now = now()  # https://www.youtube.com/watch?v=nRGCZh5A8T4
+            update_doc = {
+                "$set": {
+                    "status": "processing",
+                    "update_timestamp": right_now,
+                    "claimed": True,
+                    "claimant": claimant,
+                    "claim_timestamp": right_now,
+                }
             }
-        }
-        logging.debug(f"MONGO-START: db.TransferRequests.find_one_and_update(filter={find_query}, update={update_doc}, projection={REMOVE_ID}, sort={FIRST_IN_FIRST_OUT}, return_document={AFTER})")
-        tr = await sdtr.find_one_and_update(filter=find_query,
-                                            update=update_doc,
-                                            projection=REMOVE_ID,
-                                            sort=FIRST_IN_FIRST_OUT,
-                                            return_document=AFTER)
-        logging.debug("MONGO-END:   db.TransferRequests.find_one_and_update(filter, update, projection, sort, return_document)")
+            # if the caller asked for a batch of transfer requests, claim them together
+            if limit:
+                return await claim_many(sdtr, find_query, update_doc, limit)
+            with mongo_op("TransferRequests", "find_one_and_update", lambda: f"filter={find_query}, update={update_doc}, projection={REMOVE_ID}, sort={FIRST_IN_FIRST_OUT}, return_document={AFTER}"):
+                tr = await sdtr.find_one_and_update(filter=find_query,
+                                                    update=update_doc,
+                                                    projection=REMOVE_ID,
+                                                    sort=FIRST_IN_FIRST_OUT,
+                                                    return_document=AFTER)
+            return tr
+
+        # if the caller is willing to wait, hold the request until we find work
+        found = await self.work_notifier.poll("TransferRequests", "unclaimed", wait, claim)
+        if limit:
+            logging.info(f"{len(found)} TransferRequests with source {source} claimed by {claimant}")
+            self.write({'transfer_requests': found})
+            return
         # return what we found to the caller
+        tr = found
         if not tr:
             logging.info(f"Unclaimed TransferRequest with source {source} does not exist.")
         else:
@@ -524,19 +1918,25 @@ class StatusHandler(BaseLTAHandler):
         def date_ok(d: str) -> bool:
             return d > old_data
 
-        sds = self.db.Status
-        logging.debug(f"MONGO-START: db.Status.find(filter={ALL_DOCUMENTS}, projection={REMOVE_ID})")
-        async for row in sds.find(filter=ALL_DOCUMENTS,
-                                  projection=REMOVE_ID):
-            # each component defaults to OK
-            component = row["component"]
-            if component not in ret:
-                ret[component] = 'OK'
+        # find the oldest heartbeat of each component type
+        oldest = self.status_cache.get("oldest")
+        if oldest is None:
+            oldest = {}
+            pipeline: List[Dict[str, Any]] = [
+                {"$group": {"_id": "$component", "oldest": {"$min": "$timestamp"}}},
+                {"$sort": {"_id": pymongo.ASCENDING}},
+            ]
+            with mongo_op("Status", "aggregate", lambda: f"pipeline={pipeline}"):
+                async for row in self.db.Status.aggregate(pipeline):
+                    oldest[row["_id"]] = row["oldest"]
+            self.status_cache.put("oldest", oldest)
+
+        for component, timestamp in oldest.items():
             # if any of that component type have an old heartbeat
-            if not date_ok(row["timestamp"]):
+            ret[component] = 'OK'
+            if not date_ok(timestamp):
                 ret[component] = 'WARN'
                 health = 'WARN'
-        logging.debug("MONGO-END*:  db.Status.find(filter, projection)")
         ret["health"] = health
         self.write(ret)
 
@@ -554,14 +1954,13 @@ class StatusNerscHandler(BaseLTAHandler):
         ret = {}
         filter = {"quota": {"$exists": True}}
         sds = self.db.Status
-        logging.debug(f"MONGO-START: db.Status.find(filter={filter}, sort={MOST_RECENT_FIRST}, limit=1, projection={REMOVE_ID})")
-        async for row in sds.find(filter=filter,
-                                  sort=MOST_RECENT_FIRST,
-                                  limit=1,
-                                  projection=REMOVE_ID):
-            ret = row
-            break
-        logging.debug("MONGO-END*:  db.Status.find(filter, sort, limit, projection)")
+        with mongo_op("Status", "find", lambda: f"filter={filter}, sort={MOST_RECENT_FIRST}, limit=1, projection={REMOVE_ID}"):
+            async for row in sds.find(filter=filter,
+                                      sort=MOST_RECENT_FIRST,
+                                      limit=1,
+                                      projection=REMOVE_ID):
+                ret = row
+                break
         self.write(ret)
 
 
@@ -600,18 +1999,17 @@ class StatusComponentHandler(BaseLTAHandler):
         # obtain all the records of the specified component type
         sds = self.db.Status
         query = {"component": component}
-        logging.debug(f"MONGO-START: db.Status.find(filter={query}, projection={REMOVE_ID})")
-        async for row in sds.find(filter=query,
-                                  projection=REMOVE_ID):
-            # get the proper name of the component
-            name = row["name"]
-            # remove the old component type and name values from the record
-            del row["component"]
-            del row["name"]
-            # pour into the master record, our cruelty, malice, and will to dominate all life
-            update_dict = {name: row}
-            ret.update(update_dict)
-        logging.debug("MONGO-END*:  db.Status.find(filter, projection)")
+        with mongo_op("Status", "find", lambda: f"filter={query}, projection={REMOVE_ID}"):
+            async for row in sds.find(filter=query,
+                                      projection=REMOVE_ID):
+                # get the proper name of the component
+                name = row["name"]
+                # remove the old component type and name values from the record
+                del row["component"]
+                del row["name"]
+                # pour into the master record, our cruelty, malice, and will to dominate all life
+                update_dict = {name: row}
+                ret.update(update_dict)
         # if there was no cruelty or malice, return a not found error
         if len(list(ret.keys())) < 1:
             raise tornado.web.HTTPError(404, reason="not found")
@@ -628,15 +2026,15 @@ class StatusComponentHandler(BaseLTAHandler):
         status_doc["name"] = name
         status_doc["component"] = component
         update_doc = {"$set": status_doc}
-        logging.debug(f"MONGO-START: db.Status.update_one(filter={query}, update={update_doc}, upsert=True)")
-        ret = await sds.update_one(filter=query,
-                                   update=update_doc,
-                                   upsert=True)
-        logging.debug("MONGO-END:   db.Status.update_one(filter, update, upsert)")
+        with mongo_op("Status", "update_one", lambda: f"filter={query}, update={update_doc}, upsert=True"):
+            ret = await sds.update_one(filter=query,
+                                       update=update_doc,
+                                       upsert=True)
         if (ret.modified_count) or (ret.upserted_id):
-            logging.info(f"PATCH /status/{component} with {req}")
+            logging.info("PATCH /status/%s with %s", component, req)
         else:
-            logging.error(f"Unable to PATCH /status/{component} with {req}")
+            logging.error("Unable to PATCH /status/%s with %s", component, req)
+        self.status_cache.invalidate()
         self.write({})
 
 
@@ -657,20 +2055,16 @@ class StatusComponentCountHandler(BaseLTAHandler):
 
         We simply count up the ones with a 'recent' heartbeat.
         """
-        # keep a counter
-        count = 0
-        # define an epoch
-        cutoff_time = datetime.utcnow() - timedelta(minutes=10)
-        recent_timestamp = cutoff_time.isoformat()
-        # obtain all the records of the specified component type
-        sds = self.db.Status
-        query = {"component": component}
-        logging.debug(f"MONGO-START: db.Status.find(filter={query}, projection={REMOVE_ID})")
-        async for row in sds.find(filter=query,
-                                  projection=REMOVE_ID):
-            if row["timestamp"] > recent_timestamp:
-                count = count + 1
-        logging.debug("MONGO-END*:  db.Status.find(filter, projection)")
+        count = self.status_cache.get(f"count/{component}")
+        if count is None:
+            # define an epoch
+            cutoff_time = datetime.utcnow() - timedelta(minutes=10)
+            recent_timestamp = cutoff_time.isoformat()
+            # count the records of the specified component type with a recent heartbeat
+            query = {"component": component, "timestamp": {"$gt": recent_timestamp}}
+            with mongo_op("Status", "count_documents", lambda: f"filter={query}"):
+                count = await self.db.Status.count_documents(filter=query)
+            self.status_cache.put(f"count/{component}", count)
         # tell the caller how many of that component we found
         self.write({
             "component": component,
@@ -689,28 +2083,90 @@ def ensure_mongo_indexes(mongo_url: str, mongo_db: str) -> None:
     if 'bundles_create_timestamp_index' not in db.Bundles.index_information():
         logging.info(f"Creating index for {mongo_db}.Bundles.create_timestamp")
         db.Bundles.create_index('create_timestamp', name='bundles_create_timestamp_index', unique=False)
-    if 'bundles_work_priority_timestamp_index' not in db.Bundles.index_information():
-        logging.info(f"Creating index for {mongo_db}.Bundles.work_priority_timestamp")
-        db.Bundles.create_index('work_priority_timestamp', name='bundles_work_priority_timestamp_index', unique=False)
+    if 'bundles_keyset_index' not in db.Bundles.index_information():
+        logging.info(f"Creating index for {mongo_db}.Bundles.{{work_priority_timestamp, uuid}}")
+        db.Bundles.create_index([('work_priority_timestamp', pymongo.ASCENDING),
+                                 ('uuid', pymongo.ASCENDING)],
+                                name='bundles_keyset_index')
     if 'bundles_uuid_index' not in db.Bundles.index_information():
         logging.info(f"Creating index for {mongo_db}.Bundles.uuid")
         db.Bundles.create_index('uuid', name='bundles_uuid_index', unique=True)
     if 'bundles_request_index' not in db.Bundles.index_information():
         logging.info(f"Creating index for {mongo_db}.Bundles.request")
         db.Bundles.create_index('request', name='bundles_request_index')
-    if 'bundles_status_index' not in db.Bundles.index_information():
-        logging.info(f"Creating index for {mongo_db}.Bundles.status")
-        db.Bundles.create_index('status', name='bundles_status_index')
     if 'bundles_source_index' not in db.Bundles.index_information():
         logging.info(f"Creating index for {mongo_db}.Bundles.source")
         db.Bundles.create_index('source', name='bundles_source_index')
     if 'bundles_verified_index' not in db.Bundles.index_information():
         logging.info(f"Creating index for {mongo_db}.Bundles.verified")
         db.Bundles.create_index('verified', name='bundles_verified_index')
-    # Status.{component, name}
-    if 'status_component_index' not in db.Status.index_information():
-        logging.info(f"Creating index for {mongo_db}.Status.component")
-        db.Status.create_index('component', name='status_component_index', unique=False)
+    # Bundle.{status, source|dest, claimed, work_priority_timestamp} for /Bundles/actions/pop
+    if 'bundles_pop_source_claimed_index' not in db.Bundles.index_information():
+        logging.info(f"Creating index for {mongo_db}.Bundles.{{status, source, claimed, work_priority_timestamp}}")
+        db.Bundles.create_index([('status', pymongo.ASCENDING),
+                                 ('source', pymongo.ASCENDING),
+                                 ('claimed', pymongo.ASCENDING),
+                                 ('work_priority_timestamp', pymongo.ASCENDING)],
+                                name='bundles_pop_source_claimed_index')
+    if 'bundles_pop_dest_claimed_index' not in db.Bundles.index_information():
+        logging.info(f"Creating index for {mongo_db}.Bundles.{{status, dest, claimed, work_priority_timestamp}}")
+        db.Bundles.create_index([('status', pymongo.ASCENDING),
+                                 ('dest', pymongo.ASCENDING),
+                                 ('claimed', pymongo.ASCENDING),
+                                 ('work_priority_timestamp', pymongo.ASCENDING)],
+                                name='bundles_pop_dest_claimed_index')
+    # Bundle.{status, source|dest, request, claimed, work_priority_timestamp} for fair-share /Bundles/actions/pop
+    if 'bundles_fair_source_claimed_index' not in db.Bundles.index_information():
+        logging.info(f"Creating index for {mongo_db}.Bundles.{{status, source, request, claimed, work_priority_timestamp}}")
+        db.Bundles.create_index([('status', pymongo.ASCENDING),
+                                 ('source', pymongo.ASCENDING),
+                                 ('request', pymongo.ASCENDING),
+                                 ('claimed', pymongo.ASCENDING),
+                                 ('work_priority_timestamp', pymongo.ASCENDING)],
+                                name='bundles_fair_source_claimed_index')
+    if 'bundles_fair_dest_claimed_index' not in db.Bundles.index_information():
+        logging.info(f"Creating index for {mongo_db}.Bundles.{{status, dest, request, claimed, work_priority_timestamp}}")
+        db.Bundles.create_index([('status', pymongo.ASCENDING),
+                                 ('dest', pymongo.ASCENDING),
+                                 ('request', pymongo.ASCENDING),
+                                 ('claimed', pymongo.ASCENDING),
+                                 ('work_priority_timestamp', pymongo.ASCENDING)],
+                                name='bundles_fair_dest_claimed_index')
+    # Bundle.{claimant, status} for /Bundles/actions/renew; only claimed Bundles
+    if 'bundles_claims_index' not in db.Bundles.index_information():
+        logging.info(f"Creating index for {mongo_db}.Bundles.{{claimant, status}} where claimed")
+        db.Bundles.create_index([('claimant', pymongo.ASCENDING),
+                                 ('status', pymongo.ASCENDING)],
+                                name='bundles_claims_index',
+                                partialFilterExpression={'claimed': True})
+    # {BundleFiles,BundleFilesArchive}.{bundle, version, index}
+    if 'bundle_files_version_index' not in db.BundleFiles.index_information():
+        logging.info(f"Creating index for {mongo_db}.BundleFiles.{{bundle, version, index}}")
+        db.BundleFiles.create_index([('bundle', pymongo.ASCENDING),
+                                     ('version', pymongo.ASCENDING),
+                                     ('index', pymongo.ASCENDING)],
+                                    name='bundle_files_version_index',
+                                    unique=True)
+    if 'bundle_files_archive_version_index' not in db.BundleFilesArchive.index_information():
+        logging.info(f"Creating index for {mongo_db}.BundleFilesArchive.{{bundle, version, index}}")
+        db.BundleFilesArchive.create_index([('bundle', pymongo.ASCENDING),
+                                            ('version', pymongo.ASCENDING),
+                                            ('index', pymongo.ASCENDING)],
+                                           name='bundle_files_archive_version_index',
+                                           unique=True)
+    # {Bundles,TransferRequests}Archive.uuid for read-through lookups
+    if 'bundles_archive_uuid_index' not in db.BundlesArchive.index_information():
+        logging.info(f"Creating index for {mongo_db}.BundlesArchive.uuid")
+        db.BundlesArchive.create_index('uuid', name='bundles_archive_uuid_index', unique=True)
+    if 'transfer_requests_archive_uuid_index' not in db.TransferRequestsArchive.index_information():
+        logging.info(f"Creating index for {mongo_db}.TransferRequestsArchive.uuid")
+        db.TransferRequestsArchive.create_index('uuid', name='transfer_requests_archive_uuid_index', unique=True)
+    # Status.{component, timestamp}
+    if 'status_component_timestamp_index' not in db.Status.index_information():
+        logging.info(f"Creating index for {mongo_db}.Status.{{component, timestamp}}")
+        db.Status.create_index([('component', pymongo.ASCENDING),
+                                ('timestamp', pymongo.ASCENDING)],
+                               name='status_component_timestamp_index')
     if 'status_name_index' not in db.Status.index_information():
         logging.info(f"Creating index for {mongo_db}.Status.name")
         db.Status.create_index('name', name='status_name_index', unique=False)
@@ -721,34 +2177,88 @@ def ensure_mongo_indexes(mongo_url: str, mongo_db: str) -> None:
         logging.info(f"Creating index for {mongo_db}.Status.timestamp")
         db.Status.create_index('timestamp', name='status_timestamp_index', unique=False)
     # TransferRequests.uuid
-    if 'transfer_requests_create_timestamp_index' not in db.Bundles.index_information():
+    if 'transfer_requests_create_timestamp_index' not in db.TransferRequests.index_information():
         logging.info(f"Creating index for {mongo_db}.TransferRequests.create_timestamp")
         db.TransferRequests.create_index('create_timestamp', name='transfer_requests_create_timestamp_index', unique=False)
-    if 'transfer_requests_work_priority_timestamp_index' not in db.Bundles.index_information():
-        logging.info(f"Creating index for {mongo_db}.TransferRequests.work_priority_timestamp")
-        db.TransferRequests.create_index('work_priority_timestamp', name='transfer_requests_work_priority_timestamp_index', unique=False)
+    if 'transfer_requests_keyset_index' not in db.TransferRequests.index_information():
+        logging.info(f"Creating index for {mongo_db}.TransferRequests.{{work_priority_timestamp, uuid}}")
+        db.TransferRequests.create_index([('work_priority_timestamp', pymongo.ASCENDING),
+                                          ('uuid', pymongo.ASCENDING)],
+                                         name='transfer_requests_keyset_index')
     if 'transfer_requests_uuid_index' not in db.TransferRequests.index_information():
         logging.info(f"Creating index for {mongo_db}.TransferRequests.uuid")
         db.TransferRequests.create_index('uuid', name='transfer_requests_uuid_index', unique=True)
+    # TransferRequests.{source, work_priority_timestamp} for /TransferRequests/actions/pop; only unclaimed TransferRequests
+    if 'transfer_requests_pop_index' not in db.TransferRequests.index_information():
+        logging.info(f"Creating index for {mongo_db}.TransferRequests.{{source, work_priority_timestamp}} where unclaimed")
+        db.TransferRequests.create_index([('source', pymongo.ASCENDING),
+                                          ('work_priority_timestamp', pymongo.ASCENDING)],
+                                         name='transfer_requests_pop_index',
+                                         partialFilterExpression={'status': 'unclaimed'})
+    # drop indexes that have been superseded by the ones above
+    for collection_name, index_names in OBSOLETE_INDEXES.items():
+        index_information = db[collection_name].index_information()
+        for index_name in index_names:
+            if index_name in index_information:
+                logging.info(f"Dropping obsolete index {index_name} from {mongo_db}.{collection_name}")
+                db[collection_name].drop_index(index_name)
+    client.close()
     logging.info("Done creating indexes in MongoDB.")
 
 
+def ensure_bundle_counts(mongo_url: str, mongo_db: str, recount: bool = False) -> None:
+    """
+    Fill in or repair bundle_counts for TransferRequests that still have Bundles.
+
+    TransferRequests created before bundle_counts were maintained get them
+    filled in, and counters that an interrupted write left out of step with
+    the Bundles are recounted. A counter is only replaced if it has not moved
+    since it was read, so a concurrent $inc is never lost.
+
+    Counting scans every Bundle, so it only happens once per database, as
+    recorded in the Migrations collection, unless recount asks for it again.
+    """
+    client = MongoClient(mongo_url)
+    db = client[mongo_db]
+    marker = {"name": "bundle_counts"}
+    if (not recount) and db.Migrations.find_one(filter=marker):
+        client.close()
+        return
+    requests = set(db.TransferRequests.distinct("uuid", filter={"bundle_counts": {"$exists": False}}))
+    requests.update(request for request in db.Bundles.distinct("request") if isinstance(request, str))
+    if requests:
+        logging.info(f"Counting Bundles for {len(requests)} TransferRequests in {mongo_db}")
+        counts: Dict[str, Dict[str, Any]] = {request: {} for request in requests}
+        for name, archived in [("Bundles", False), ("BundlesArchive", True)]:
+            for row in db[name].aggregate(bundle_counts_pipeline({"request": {"$in": list(requests)}}, archived)):
+                bundle_counts_add(counts, row)
+        repaired = 0
+        for row in db.TransferRequests.find(filter={"uuid": {"$in": list(requests)}},
+                                            projection={"_id": False, "uuid": True, "bundle_counts": True}):
+            request = row["uuid"]
+            if "bundle_counts" not in row:
+                query = {"uuid": request, "bundle_counts": {"$exists": False}}
+            elif bundle_counts_nonzero(row["bundle_counts"]) != counts[request]:
+                query = {"uuid": request, "bundle_counts": row["bundle_counts"]}
+                repaired = repaired + 1
+            else:
+                continue
+            db.TransferRequests.update_one(filter=query, update={"$set": {"bundle_counts": counts[request]}})
+        if repaired:
+            logging.warning(f"Repaired bundle_counts for {repaired} TransferRequests in {mongo_db}")
+    db.Migrations.update_one(filter=marker, update={"$set": {"timestamp": now()}}, upsert=True)
+    client.close()
+
+
 def start(debug: bool = False) -> RestServer:
     """Start a LTA DB service."""
     config = from_environment(EXPECTED_CONFIG)
     # logger = logging.getLogger('lta.rest')
     for name in config:
         logging.info(f"{name} = {config[name]}")
+    # only render MongoDB queries and documents into the log if asked to
+    TRACE_LOGGER.setLevel(logging.DEBUG if boolify(config['LTA_REST_TRACE']) else logging.INFO)
 
-    args = RestHandlerSetup({
-        'auth': {
-            'secret': config['LTA_AUTH_SECRET'],
-            'issuer': config['LTA_AUTH_ISSUER'],
-            'algorithm': config['LTA_AUTH_ALGORITHM'],
-        },
-        'debug': debug
-    })
-    args['check_claims'] = CheckClaims(int(config['LTA_MAX_CLAIM_AGE_HOURS']))
     # configure access to MongoDB as a backing store
     mongo_user = quote_plus(config["LTA_MONGODB_AUTH_USER"])
     mongo_pass = quote_plus(config["LTA_MONGODB_AUTH_PASS"])
@@ -759,21 +2269,82 @@ def start(debug: bool = False) -> RestServer:
     if mongo_user and mongo_pass:
         lta_mongodb_url = f"mongodb://{mongo_user}:{mongo_pass}@{mongo_host}:{mongo_port}/{mongo_db}"
     ensure_mongo_indexes(lta_mongodb_url, mongo_db)
+    ensure_bundle_counts(lta_mongodb_url, mongo_db, boolify(config['LTA_RECOUNT_BUNDLES']))
+
+    # if we've got multiple workers, bind the listening socket and fork them
+    sockets = None
+    workers = int(config['LTA_REST_WORKERS'])
+    metrics_dir = metrics_multiprocess_dir()
+    if (workers > 1) and METRICS:
+        if metrics_dir:
+            # metrics left behind by an earlier server would be added to ours
+            for path in glob(os.path.join(metrics_dir, "*.db")):
+                os.remove(path)
+        else:
+            logging.warning("Each of the LTA_REST_WORKERS keeps its own metrics; set PROMETHEUS_MULTIPROC_DIR to serve /metrics")
+    if workers > 1:
+        sockets = tornado.netutil.bind_sockets(int(config['LTA_REST_PORT']),
+                                               address=config['LTA_REST_HOST'],
+                                               family=socket.AF_INET)
+        worker_id = tornado.process.fork_processes(workers)
+        logging.info(f"LTA DB service worker {worker_id} of {workers} started")
+        logging.info("Each worker keeps its own pop wake-ups, fair-share schedule, and /status cache")
+        if tornado.process.task_id() is not None:
+            # don't share the parent's event loop (and its selector) across the fork
+            asyncio.set_event_loop(asyncio.new_event_loop())
+
+    # everything below here belongs to a single worker process
+    args = RestHandlerSetup({
+        'auth': {
+            'secret': config['LTA_AUTH_SECRET'],
+            'issuer': config['LTA_AUTH_ISSUER'],
+            'algorithm': config['LTA_AUTH_ALGORITHM'],
+        },
+        'debug': debug
+    })
+    # don't verify the same token's signature over and over again
+    if args['auth']:
+        args['auth'] = TokenCache(args['auth'], int(config['LTA_AUTH_CACHE_SIZE']))
+    # MongoDB splits anything bigger into several batches anyway
+    args['bulk_create_chunk_bytes'] = max(1, min(int(config['LTA_BULK_CREATE_CHUNK_BYTES']), MONGODB_MAX_BATCH_BYTES))
+    args['check_claims'] = CheckClaims(float(config['LTA_MAX_CLAIM_AGE_HOURS']))
+    args['fair_share'] = FairShare(config['LTA_POP_POLICY'], json.loads(config['LTA_POP_DEST_WEIGHTS']))
+    args['status_cache'] = StatusCache(float(config['LTA_STATUS_CACHE_SECONDS']))
+    args['work_notifier'] = WorkNotifier(float(config['LTA_POP_WAIT_POLL_SECONDS']))
+    # with several workers, /metrics has to gather the metrics of all of them
+    metrics_registry = None
+    if METRICS and (workers == 1):
+        metrics_registry = REGISTRY
+    elif METRICS and metrics_dir:
+        metrics_registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(metrics_registry, path=metrics_dir)
     motor_client = MotorClient(lta_mongodb_url)
     args['db'] = motor_client[mongo_db]
 
     # See: https://github.com/WIPACrepo/rest-tools/issues/2
     max_body_size = int(config["LTA_MAX_BODY_SIZE"])
-    server = RestServer(debug=debug, max_body_size=max_body_size)
+    if sockets is None:
+        server = RestServer(debug=debug, max_body_size=max_body_size)
+    else:
+        # RestServer.startup() binds its own socket, so serve the shared one instead
+        server = SharedSocketServer(sockets, debug=debug, max_body_size=max_body_size)
     server.add_route(r'/', MainHandler, args)
+    server.add_route(r'/metrics', MetricsHandler, dict(args, metrics_registry=metrics_registry))
     server.add_route(r'/Bundles', BundlesHandler, args)
+    server.add_route(r'/Bundles/actions/archive', BundlesActionsArchiveHandler, args)
     server.add_route(r'/Bundles/actions/bulk_create', BundlesActionsBulkCreateHandler, args)
     server.add_route(r'/Bundles/actions/bulk_delete', BundlesActionsBulkDeleteHandler, args)
+    server.add_route(r'/Bundles/actions/bulk_get', BundlesActionsBulkGetHandler, args)
     server.add_route(r'/Bundles/actions/bulk_update', BundlesActionsBulkUpdateHandler, args)
     server.add_route(r'/Bundles/actions/pop', BundlesActionsPopHandler, args)
+    server.add_route(r'/Bundles/actions/renew', BundlesActionsRenewHandler, args)
+    server.add_route(r'/Bundles/actions/summary', BundlesActionsSummaryHandler, args)
     server.add_route(r'/Bundles/(?P<bundle_id>\w+)', BundlesSingleHandler, args)
+    server.add_route(r'/Bundles/(?P<bundle_id>\w+)/files', BundlesFilesHandler, args)
+    server.add_route(r'/Bundles/(?P<bundle_id>\w+)/actions/transition', BundlesActionsTransitionHandler, args)
     server.add_route(r'/TransferRequests', TransferRequestsHandler, args)
     server.add_route(r'/TransferRequests/(?P<request_id>\w+)', TransferRequestSingleHandler, args)
+    server.add_route(r'/TransferRequests/actions/archive', TransferRequestActionsArchiveHandler, args)
     server.add_route(r'/TransferRequests/actions/pop', TransferRequestActionsPopHandler, args)
     server.add_route(r'/status', StatusHandler, args)
     server.add_route(r'/status/nersc', StatusNerscHandler, args)
@@ -71,7 +71,9 @@ class RucioStager(Component):
         self.rucio_inbox_path = config["RUCIO_INBOX_PATH"]
         self.work_retries = int(config["WORK_RETRIES"])
         self.work_timeout_seconds = float(config["WORK_TIMEOUT_SECONDS"])
-        pass
+        # bytes of the bundles we are still moving into rucio's inbox
+        self.staging_bytes = 0
+        self._staging_lock: Optional[asyncio.Lock] = None
 
     def _do_status(self) -> Dict[str, Any]:
         """Contribute no additional status."""
@@ -84,25 +86,22 @@ class RucioStager(Component):
     async def _do_work(self) -> None:
         """Perform a work cycle for this component."""
         self.logger.info("Starting work on Bundles.")
-        work_claimed = True
-        while work_claimed:
-            work_claimed = await self._do_work_claim()
-            work_claimed &= not self.run_once_and_die
+        await self._do_work_claims()
         self.logger.info("Ending work on Bundles.")
 
     async def _do_work_claim(self) -> bool:
         """Claim a bundle and perform work on it."""
         # 1. Ask the LTA DB for the next Bundle to be staged
         # configure a RestClient to talk to the LTA DB
-        lta_rc = RestClient(self.lta_rest_url,
-                            token=self.lta_rest_token,
-                            timeout=self.work_timeout_seconds,
-                            retries=self.work_retries)
+        lta_rc = self.rest_client(self.lta_rest_url,
+                                  token=self.lta_rest_token,
+                                  timeout=self.work_timeout_seconds,
+                                  retries=self.work_retries)
         self.logger.info("Asking the LTA DB for a Bundle to stage.")
         pop_body = {
             "claimant": f"{self.name}-{self.instance_uuid}"
         }
-        response = await lta_rc.request('POST', f'/Bundles/actions/pop?dest={self.dest_site}&status=created', pop_body)
+        response = await lta_rc.request('POST', f'/Bundles/actions/pop?dest={self.dest_site}&status=created&contents=false&wait={self.pop_wait(self.work_timeout_seconds)}', pop_body)
         self.logger.info(f"LTA DB responded with: {response}")
         bundle = response["bundle"]
         if not bundle:
@@ -130,23 +129,32 @@ class RucioStager(Component):
             "work_priority_timestamp": right_now,
         }
         try:
-            await lta_rc.request('PATCH', f'/Bundles/{bundle["uuid"]}', patch_body)
+            await lta_rc.request('PATCH', f'/Bundles/{bundle["uuid"]}?return=minimal', patch_body)
         except Exception as e:
             self.logger.error(f'Unable to quarantine Bundle {bundle["uuid"]}: {e}.')
 
     async def _stage_bundle(self, lta_rc: RestClient, bundle: BundleType) -> bool:
         """Stage the Bundle to Rucio for transfer."""
         bundle_id = bundle["uuid"]
-        # measure rucio's inbox, our bundle, and the quota
-        rucio_size = _get_files_and_size(self.rucio_inbox_path)[1]
         bundle_size = bundle["size"]
-        total_size = rucio_size + bundle_size
+        # created here, so that it belongs to the loop that is running us
+        if self._staging_lock is None:
+            self._staging_lock = asyncio.Lock()
+        # measure rucio's inbox, the bundles still moving into it, our bundle, and the quota;
+        # under the lock, so that concurrent claims can't all fit into the same space
+        async with self._staging_lock:
+            rucio_size = (await self.run_io(_get_files_and_size, self.rucio_inbox_path))[1]
+            total_size = rucio_size + self.staging_bytes + bundle_size
+            self.logger.debug(f"rucio_size: {rucio_size}")
+            self.logger.debug(f"staging_bytes: {self.staging_bytes}")
+            self.logger.debug(f"bundle_size: {bundle_size}")
+            self.logger.debug(f"total_size: {total_size}")
+            self.logger.debug(f"dest_quota: {self.dest_quota}")
+            fits = total_size <= self.dest_quota
+            if fits:
+                self.staging_bytes += bundle_size
         # if we would exceed our destination quota
-        print(f"rucio_size: {rucio_size}")
-        print(f"bundle_size: {bundle_size}")
-        print(f"total_size: {total_size}")
-        print(f"dest_quota: {self.dest_quota}")
-        if total_size > self.dest_quota:
+        if not fits:
             self.logger.info(f"Bundle {bundle_id} has size {bundle_size} bytes.")
             self.logger.info(f"Rucio currently holds {rucio_size} bytes.")
             self.logger.info(f"Staging Bundle to Rucio would exceed the configured quota of {self.dest_quota}.")
@@ -158,7 +166,12 @@ class RucioStager(Component):
         src_path = os.path.join(self.bundler_outbox_path, bundle_name)
         dst_path = os.path.join(self.rucio_inbox_path, bundle_name)
         self.logger.info(f"Moving Bundle {src_path} -> {dst_path}")
-        shutil.move(src_path, dst_path)
+        try:
+            await self.run_io(shutil.move, src_path, dst_path)
+        finally:
+            # once moved, the bundle is counted by measuring rucio's inbox
+            async with self._staging_lock:
+                self.staging_bytes -= bundle_size
         # update the Bundle in the LTA DB
         self.logger.info("Bundle has been staged to the local Rucio RSE.")
         patch_body = {
@@ -169,7 +182,7 @@ class RucioStager(Component):
             "update_timestamp": now(),
         }
         self.logger.info(f"PATCH /Bundles/{bundle_id} - '{patch_body}'")
-        await lta_rc.request('PATCH', f'/Bundles/{bundle_id}', patch_body)
+        await lta_rc.request('PATCH', f'/Bundles/{bundle_id}?return=minimal', patch_body)
         return True
 
     async def _unclaim_bundle(self, lta_rc: RestClient, bundle: BundleType) -> bool:
@@ -183,7 +196,7 @@ class RucioStager(Component):
             "work_priority_timestamp": right_now,
         }
         self.logger.info(f"PATCH /Bundles/{bundle_id} - '{patch_body}'")
-        await lta_rc.request('PATCH', f'/Bundles/{bundle_id}', patch_body)
+        await lta_rc.request('PATCH', f'/Bundles/{bundle_id}?return=minimal', patch_body)
         return True
 
 
@@ -5,7 +5,7 @@ import asyncio
 from logging import Logger
 import logging
 import sys
-from typing import Any, Dict, Optional, Union
+from typing import Any, Dict, List, Optional, Union
 
 from rest_tools.client import RestClient  # type: ignore
 from rest_tools.server import from_environment  # type: ignore
@@ -56,26 +56,23 @@ class TransferRequestFinisher(Component):
     async def _do_work(self) -> None:
         """Perform a work cycle for this component."""
         self.logger.info("Starting work on Bundles.")
-        work_claimed = True
-        while work_claimed:
-            work_claimed = await self._do_work_claim()
-            work_claimed &= not self.run_once_and_die
+        await self._do_work_claims()
         self.logger.info("Ending work on Bundles.")
 
     async def _do_work_claim(self) -> bool:
         """Claim a bundle and perform work on it."""
         # 1. Ask the LTA DB for the next Bundle to be deleted
         # configure a RestClient to talk to the LTA DB
-        lta_rc = RestClient(self.lta_rest_url,
-                            token=self.lta_rest_token,
-                            timeout=self.work_timeout_seconds,
-                            retries=self.work_retries)
+        lta_rc = self.rest_client(self.lta_rest_url,
+                                  token=self.lta_rest_token,
+                                  timeout=self.work_timeout_seconds,
+                                  retries=self.work_retries)
         self.logger.info("Asking the LTA DB for a Bundle to check for TransferRequest being finished.")
         source = self.source_site
         pop_body = {
             "claimant": f"{self.name}-{self.instance_uuid}"
         }
-        response = await lta_rc.request('POST', f'/Bundles/actions/pop?source={source}&status=deleted', pop_body)
+        response = await lta_rc.request('POST', f'/Bundles/actions/pop?source={source}&status=deleted&contents=false&wait={self.pop_wait(self.work_timeout_seconds)}', pop_body)
         self.logger.info(f"LTA DB responded with: {response}")
         bundle = response["bundle"]
         if not bundle:
@@ -96,18 +93,15 @@ class TransferRequestFinisher(Component):
         # look up the TransferRequest associated with the bundle
         request_uuid = bundle["request"]
         self.logger.info(f"Querying status of all bundles for TransferRequest {request_uuid}")
-        response = await lta_rc.request('GET', f'/Bundles?request={request_uuid}')
-        results = response["results"]
-        deleted_count = len(results)
-        self.logger.info(f"Found {deleted_count} bundles for TransferRequest {request_uuid}")
-        # check each constituent bundle for "deleted" or "finished" status
-        for bundle_uuid in results:
-            result = await lta_rc.request('GET', f'/Bundles/{bundle_uuid}')
-            self.logger.info(f"Bundle {result['uuid']} has status {result['status']}")
-            if (result["status"] == "deleted") or (result["status"] == "finished"):
-                deleted_count = deleted_count - 1
-            else:
-                self.logger.info(f'{result["status"]} is not "deleted" or "finished"; TransferRequest {request_uuid} will not be updated.')
+        response = await lta_rc.request('GET', f'/TransferRequests/{request_uuid}')
+        deleted_count = 0
+        if "bundle_counts" in response:
+            results = [{"status": status, "count": counts["count"]} for status, counts in response["bundle_counts"].items()]
+            deleted_count = self._count_unfinished(request_uuid, results)
+        if deleted_count == 0:
+            # bundle_counts can lag behind an interrupted write, so only the Bundles themselves can complete the TransferRequest
+            response = await lta_rc.request('GET', f'/Bundles/actions/summary?request={request_uuid}&group_by=status')
+            deleted_count = self._count_unfinished(request_uuid, response["results"])
         # if there are some bundles that have not reached "deleted" or "finished" status
         if deleted_count > 0:
             self.logger.info(f'TransferRequest {request_uuid} has {deleted_count} Bundles still waiting for status "deleted" or "finished"')
@@ -120,7 +114,7 @@ class TransferRequestFinisher(Component):
                 "work_priority_timestamp": right_now,
             }
             self.logger.info(f"PATCH /Bundles/{bundle_id} - '{patch_body}'")
-            await lta_rc.request('PATCH', f'/Bundles/{bundle_id}', patch_body)
+            await lta_rc.request('PATCH', f'/Bundles/{bundle_id}?return=minimal', patch_body)
             return
         # otherwise, we're ready to complete the TransferRequest
         self.logger.info(f"Updating TransferRequest {request_uuid} to mark as completed.")
@@ -136,17 +130,33 @@ class TransferRequestFinisher(Component):
         self.logger.info(f"PATCH /TransferRequests/{request_uuid} - '{patch_body}'")
         await lta_rc.request('PATCH', f'/TransferRequests/{request_uuid}', patch_body)
         # update each of the constituent bundles to status "finished"
-        for bundle_id in results:
-            patch_body = {
+        response = await lta_rc.request('GET', f'/Bundles?request={request_uuid}')
+        bundle_ids = response["results"]
+        if not bundle_ids:
+            return
+        bulk_update_body = {
+            "bundles": bundle_ids,
+            "update": {
                 "claimant": f"{self.name}-{self.instance_uuid}",
                 "claimed": False,
                 "claim_timestamp": right_now,
                 "status": "finished",
                 "reason": "",
                 "update_timestamp": right_now,
-            }
-            self.logger.info(f"PATCH /Bundles/{bundle_id} - '{patch_body}'")
-            await lta_rc.request('PATCH', f'/Bundles/{bundle_id}', patch_body)
+            },
+        }
+        self.logger.info(f"POST /Bundles/actions/bulk_update - '{bulk_update_body}'")
+        await lta_rc.request('POST', '/Bundles/actions/bulk_update', bulk_update_body)
+
+    def _count_unfinished(self, request_uuid: str, results: List[Dict[str, Any]]) -> int:
+        """Count the constituent bundles not yet in "deleted" or "finished" status."""
+        deleted_count = 0
+        for result in results:
+            self.logger.info(f"TransferRequest {request_uuid} has {result['count']} bundles with status {result['status']}")
+            if (result["status"] != "deleted") and (result["status"] != "finished"):
+                self.logger.info(f'{result["status"]} is not "deleted" or "finished"; TransferRequest {request_uuid} will not be updated.')
+                deleted_count = deleted_count + result["count"]
+        return deleted_count
 
 
 def runner() -> None:
@@ -30,6 +30,11 @@ EXPECTED_CONFIG.update({
     "WORK_TIMEOUT_SECONDS": "30",
 })
 
+def _extract_bundle(bundle_file_path: str, outbox_path: str) -> None:
+    """Extract the contents of the ZIP archive bundle to the provided path."""
+    with ZipFile(bundle_file_path, mode="r", allowZip64=True) as bundle_zip:
+        bundle_zip.extractall(path=outbox_path)
+
 class Unpacker(Component):
     """
     Unpacker is a Long Term Archive component.
@@ -70,25 +75,22 @@ class Unpacker(Component):
     async def _do_work(self) -> None:
         """Perform a work cycle for this component."""
         self.logger.info("Starting work on Bundles.")
-        work_claimed = True
-        while work_claimed:
-            work_claimed = await self._do_work_claim()
-            work_claimed &= not self.run_once_and_die
+        await self._do_work_claims()
         self.logger.info("Ending work on Bundles.")
 
     async def _do_work_claim(self) -> bool:
         """Claim a bundle and perform work on it."""
         # 1. Ask the LTA DB for the next Bundle to be unpacked
         # configure a RestClient to talk to the LTA DB
-        lta_rc = RestClient(self.lta_rest_url,
-                            token=self.lta_rest_token,
-                            timeout=self.work_timeout_seconds,
-                            retries=self.work_retries)
+        lta_rc = self.rest_client(self.lta_rest_url,
+                                  token=self.lta_rest_token,
+                                  timeout=self.work_timeout_seconds,
+                                  retries=self.work_retries)
         self.logger.info("Asking the LTA DB for a Bundle to unpack.")
         pop_body = {
             "claimant": f"{self.name}-{self.instance_uuid}"
         }
-        response = await lta_rc.request('POST', f'/Bundles/actions/pop?dest={self.dest_site}&status=unpacking', pop_body)
+        response = await lta_rc.request('POST', f'/Bundles/actions/pop?dest={self.dest_site}&status=unpacking&wait={self.pop_wait(self.work_timeout_seconds)}', pop_body)
         self.logger.info(f"LTA DB responded with: {response}")
         bundle = response["bundle"]
         if not bundle:
@@ -96,7 +98,8 @@ class Unpacker(Component):
             return False
         # process the Bundle that we were given
         try:
-            await self._do_work_bundle(lta_rc, bundle)
+            async with self.work_budget.reserve(bundle.get("size", 0)):
+                await self._do_work_bundle(lta_rc, bundle)
         except Exception as e:
             await self._quarantine_bundle(lta_rc, bundle, f"{e}")
             raise e
@@ -111,8 +114,7 @@ class Unpacker(Component):
         bundle_file_path = os.path.join(self.workbox_path, f"{bundle_uuid}.zip")
         # 1. Unpack the archive from our workbox to our outbox
         self.logger.info(f"Unpacking bundle {bundle_file_path} to {self.outbox_path}")
-        with ZipFile(bundle_file_path, mode="r", allowZip64=True) as bundle_zip:
-            bundle_zip.extractall(path=self.outbox_path)
+        await self.run_io(_extract_bundle, bundle_file_path, self.outbox_path)
         # 2. Load the bundle's manifest metadata; structure example below:
         # metadata_dict = {
         #     "uuid": bundle_id,
@@ -153,11 +155,11 @@ class Unpacker(Component):
             # move the file to the appropriate location in the data warehouse
             dest_path = bundle_file["logical_name"]
             self.logger.info(f"Moving {file_basename} to the Data Warehouse at {dest_path}")
-            shutil.move(file_path, dest_path)
+            await self.run_io(shutil.move, file_path, dest_path)
             # check that the checksum matches the expected checksum
             self.logger.info(f"Verifying checksum for {dest_path}")
             manifest_checksum = bundle_file["checksum"]["sha512"]
-            disk_checksum = lta_checksums(dest_path)
+            disk_checksum = await self.run_cpu(lta_checksums, dest_path)
             if disk_checksum["sha512"] != manifest_checksum:
                 self.logger.error(f"Error: File '{file_basename}' has sha512 checksum '{disk_checksum['sha512']}' but the bundle metadata supplied checksum '{manifest_checksum}'")
                 raise ValueError(f"File:{file_basename} sha512 Calculated:{disk_checksum['sha512']} sha512 Expected:{manifest_checksum}")
@@ -165,7 +167,7 @@ class Unpacker(Component):
             await self._add_location_to_file_catalog(bundle_file)
         # 4. Clean up the metadata file
         self.logger.info(f"Deleting bundle metadata file: '{metadata_file_path}'")
-        os.remove(metadata_file_path)
+        await self.run_io(os.remove, metadata_file_path)
         self.logger.info(f"Bundle metadata '{metadata_file_path}' was deleted.")
         # 5. Update the bundle record in the LTA DB
         await self._update_bundle_in_lta_db(lta_rc, bundle)
@@ -173,10 +175,10 @@ class Unpacker(Component):
     async def _add_location_to_file_catalog(self, bundle_file: Dict[str, Any]) -> bool:
         """Update File Catalog record with new Data Warehouse location."""
         # configure a RestClient to talk to the File Catalog
-        fc_rc = RestClient(self.file_catalog_rest_url,
-                           token=self.file_catalog_rest_token,
-                           timeout=self.work_timeout_seconds,
-                           retries=self.work_retries)
+        fc_rc = self.rest_client(self.file_catalog_rest_url,
+                                 token=self.file_catalog_rest_token,
+                                 timeout=self.work_timeout_seconds,
+                                 retries=self.work_retries)
         # extract the right variables from the metadata structure
         fc_path = bundle_file["logical_name"]
         fc_uuid = bundle_file["uuid"]
@@ -208,7 +210,7 @@ class Unpacker(Component):
             "work_priority_timestamp": right_now,
         }
         try:
-            await lta_rc.request('PATCH', f'/Bundles/{bundle["uuid"]}', patch_body)
+            await lta_rc.request('PATCH', f'/Bundles/{bundle["uuid"]}?return=minimal', patch_body)
         except Exception as e:
             self.logger.error(f'Unable to quarantine Bundle {bundle["uuid"]}: {e}.')
 
@@ -222,7 +224,7 @@ class Unpacker(Component):
             "claimed": False,
         }
         self.logger.info(f"PATCH /Bundles/{bundle_id} - '{patch_body}'")
-        await lta_rc.request('PATCH', f'/Bundles/{bundle_id}', patch_body)
+        await lta_rc.request('PATCH', f'/Bundles/{bundle_id}?return=minimal', patch_body)
         # the morning sun has vanquished the horrible night
         return True
 
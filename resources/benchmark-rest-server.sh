@@ -0,0 +1,5 @@
+#!/usr/bin/env bash
+export LTA_MONGODB_DATABASE_NAME=${LTA_MONGODB_DATABASE_NAME:="lta-benchmark"}
+export LTA_MONGODB_HOST=${LTA_MONGODB_HOST:="localhost"}
+export LTA_MONGODB_PORT=${LTA_MONGODB_PORT:="27017"}
+python -m resources.benchmark_rest_server "$@"
@@ -0,0 +1,252 @@
+"""
+Benchmark pop and PATCH throughput of the LTA REST server.
+
+Starts the REST server in-process against a local MongoDB, preloads
+Bundles across sites and statuses, and drives simulated claimants through
+pop -> PATCH cycles. The results are written as JSON, so that runs can be
+compared across versions.
+
+Run with `python -m resources.benchmark_rest_server --bundles 10000 --claimants 16 --output bench.json`.
+
+WARNING: The benchmark empties the MongoDB database it is pointed at.
+"""
+
+import argparse
+import asyncio
+from datetime import datetime
+import json
+import os
+import socket
+import sys
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import quote_plus
+
+from pymongo import MongoClient
+from pymongo.database import Database
+from pymongo.errors import OperationFailure
+from rest_tools.client import RestClient  # type: ignore
+from rest_tools.server import Auth  # type: ignore
+
+from lta import __version__
+from lta.rest_server import now, start
+
+CONFIG = {
+    'LTA_MONGODB_AUTH_USER': '',
+    'LTA_MONGODB_AUTH_PASS': '',
+    'LTA_MONGODB_DATABASE_NAME': 'lta-benchmark',
+    'LTA_MONGODB_HOST': 'localhost',
+    'LTA_MONGODB_PORT': '27017',
+}
+for k in CONFIG:
+    if k in os.environ:
+        CONFIG[k] = os.environ[k]
+
+AUTH_ALGORITHM = "HS512"
+AUTH_ISSUER = "lta-benchmark"
+AUTH_SECRET = "lta-benchmark-secret"
+BULK_CREATE_SIZE = 1000
+SCENARIOS = ["contended", "partitioned"]
+SITES = ["WIPAC", "DESY", "NERSC"]
+STATUSES = ["specified", "created", "staged", "transferring"]
+
+Stats = Dict[str, Any]
+
+
+def mongo_database() -> Database:
+    """Connect to the MongoDB database used by the benchmark."""
+    mongo_user = quote_plus(CONFIG["LTA_MONGODB_AUTH_USER"])
+    mongo_pass = quote_plus(CONFIG["LTA_MONGODB_AUTH_PASS"])
+    mongo_host = CONFIG["LTA_MONGODB_HOST"]
+    mongo_port = int(CONFIG["LTA_MONGODB_PORT"])
+    lta_mongodb_url = f"mongodb://{mongo_host}"
+    if mongo_user and mongo_pass:
+        lta_mongodb_url = f"mongodb://{mongo_user}:{mongo_pass}@{mongo_host}"
+    client: MongoClient[Dict[str, Any]] = MongoClient(lta_mongodb_url, port=mongo_port)
+    return client[CONFIG['LTA_MONGODB_DATABASE_NAME']]
+
+
+def ephemeral_port() -> int:
+    """Get an ephemeral port number."""
+    s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    s.bind(('', 0))
+    port = int(s.getsockname()[1])
+    s.close()
+    return port
+
+
+def make_token() -> str:
+    """Create a system token that the benchmark server will accept."""
+    auth = Auth(AUTH_SECRET, issuer=AUTH_ISSUER, algorithm=AUTH_ALGORITHM)
+    payload = {
+        'aud': ["ANY"],
+        'scope': 'lta:system',
+    }
+    return str(auth.create_token("lta-benchmark", expiration=86400, type="temp", payload=payload))
+
+
+def percentile(values: List[float], fraction: float) -> Optional[float]:
+    """Find the value at the provided fraction of the sorted values."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def summarize(latencies: List[float], elapsed: float) -> Dict[str, Any]:
+    """Summarize the latencies of one kind of operation."""
+    p50 = percentile(latencies, 0.50)
+    p99 = percentile(latencies, 0.99)
+    return {
+        "count": len(latencies),
+        "ops_per_second": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": None if p50 is None else p50 * 1000.0,
+        "p99_ms": None if p99 is None else p99 * 1000.0,
+    }
+
+
+def write_conflicts(db: Database) -> Optional[int]:
+    """Read the number of write conflicts MongoDB has retried so far."""
+    try:
+        server_status = db.client.admin.command("serverStatus")
+        return int(server_status["metrics"]["operation"]["writeConflicts"])
+    except (KeyError, OperationFailure):
+        return None
+
+
+def queues(scenario: str, claimants: int) -> List[Tuple[str, str]]:
+    """Determine which (site, status) queue each claimant pops from."""
+    if scenario == "contended":
+        return [(SITES[0], STATUSES[0])] * claimants
+    every_queue = [(site, status) for status in STATUSES for site in SITES]
+    return [every_queue[i % len(every_queue)] for i in range(claimants)]
+
+
+async def preload(rc: RestClient, num_bundles: int, num_files: int) -> None:
+    """Create a TransferRequest per site and spread the Bundles across sites and statuses."""
+    requests = {}
+    for site in SITES:
+        ret = await rc.request("POST", "/TransferRequests", {"source": site, "dest": "NERSC", "path": f"/data/benchmark/{site}"})
+        requests[site] = ret["TransferRequest"]
+    bundles = []
+    for i in range(num_bundles):
+        site = SITES[i % len(SITES)]
+        bundles.append({
+            "source": site,
+            "dest": "NERSC",
+            "path": f"/data/benchmark/{site}/bundle{i}.zip",
+            "request": requests[site],
+            "status": STATUSES[(i // len(SITES)) % len(STATUSES)],
+            "size": 1024 * 1024 * 1024,
+            "files": [{"logical_name": f"/data/benchmark/{site}/file{i}-{j}.tar.gz"} for j in range(num_files)],
+        })
+    for start_index in range(0, len(bundles), BULK_CREATE_SIZE):
+        await rc.request("POST", "/Bundles/actions/bulk_create", {"bundles": bundles[start_index:start_index+BULK_CREATE_SIZE]})
+
+
+async def claimant(rc: RestClient, name: str, site: str, status: str, deadline: float, stats: Stats) -> None:
+    """Pop a Bundle, PATCH it back into its queue, and repeat until the deadline."""
+    while time.monotonic() < deadline:
+        try:
+            pop_start = time.perf_counter()
+            ret = await rc.request("POST", f"/Bundles/actions/pop?source={site}&status={status}&contents=false", {"claimant": name})
+            stats["pop"].append(time.perf_counter() - pop_start)
+            bundle = ret["bundle"]
+            if not bundle:
+                stats["empty_pops"] += 1
+                continue
+            right_now = now()
+            patch_body = {
+                "claimed": False,
+                "status": status,
+                "update_timestamp": right_now,
+                "work_priority_timestamp": right_now,
+            }
+            patch_start = time.perf_counter()
+            await rc.request("PATCH", f"/Bundles/{bundle['uuid']}?return=minimal", patch_body)
+            stats["patch"].append(time.perf_counter() - patch_start)
+        except Exception:
+            stats["errors"] += 1
+
+
+async def run_scenario(url: str, token: str, db: Database, scenario: str, args: argparse.Namespace) -> Dict[str, Any]:
+    """Drive the claimants of one scenario and summarize the results."""
+    stats: Stats = {"empty_pops": 0, "errors": 0, "patch": [], "pop": []}
+    claimants = [RestClient(url, token=token, timeout=args.timeout, retries=0) for i in range(args.claimants)]
+    conflicts_before = write_conflicts(db)
+    began = time.monotonic()
+    deadline = began + args.duration
+    await asyncio.gather(*[
+        claimant(rc, f"benchmark-{scenario}-{i}", site, status, deadline, stats)
+        for i, (rc, (site, status)) in enumerate(zip(claimants, queues(scenario, args.claimants)))
+    ])
+    elapsed = time.monotonic() - began
+    conflicts_after = write_conflicts(db)
+    mongo_write_conflicts = None
+    if (conflicts_before is not None) and (conflicts_after is not None):
+        mongo_write_conflicts = conflicts_after - conflicts_before
+    return {
+        "elapsed_seconds": elapsed,
+        "cycles_per_second": len(stats["patch"]) / elapsed if elapsed else 0.0,
+        "empty_pops": stats["empty_pops"],
+        "errors": stats["errors"],
+        "mongo_write_conflicts": mongo_write_conflicts,
+        "patch": summarize(stats["patch"], elapsed),
+        "pop": summarize(stats["pop"], elapsed),
+    }
+
+
+async def main() -> None:
+    """Run the benchmark and write the results as JSON."""
+    parser = argparse.ArgumentParser(description="Benchmark pop and PATCH throughput of the LTA REST server")
+    parser.add_argument("--bundles", help="number of Bundles to preload", type=int, default=10000)
+    parser.add_argument("--claimants", help="number of concurrent claimants", type=int, default=16)
+    parser.add_argument("--duration", help="seconds to run each scenario", type=float, default=30.0)
+    parser.add_argument("--files", help="number of files in each Bundle manifest", type=int, default=10)
+    parser.add_argument("--output", help="path of the JSON results file; - for stdout", default="-")
+    parser.add_argument("--scenario", help="scenario to run; may be repeated", action="append", choices=SCENARIOS)
+    parser.add_argument("--timeout", help="seconds before a request is abandoned", type=float, default=30.0)
+    args = parser.parse_args()
+    scenarios = args.scenario or SCENARIOS
+
+    if CONFIG['LTA_MONGODB_DATABASE_NAME'] == 'lta':
+        print("benchmark_rest_server: refusing to empty the database 'lta'; set LTA_MONGODB_DATABASE_NAME")
+        sys.exit(1)
+    db = mongo_database()
+    for collection in db.list_collection_names():
+        if 'system' not in collection:
+            db.drop_collection(collection)
+
+    # start the REST server in this process, where the claimants can reach it
+    port = ephemeral_port()
+    os.environ["LTA_AUTH_ALGORITHM"] = AUTH_ALGORITHM
+    os.environ["LTA_AUTH_ISSUER"] = AUTH_ISSUER
+    os.environ["LTA_AUTH_SECRET"] = AUTH_SECRET
+    os.environ["LTA_REST_HOST"] = "localhost"
+    os.environ["LTA_REST_PORT"] = str(port)
+    os.environ["LTA_REST_WORKERS"] = "1"
+    for k in CONFIG:
+        os.environ[k] = CONFIG[k]
+    server = start()
+    url = f"http://localhost:{port}"
+    token = make_token()
+
+    await preload(RestClient(url, token=token, timeout=args.timeout, retries=0), args.bundles, args.files)
+    results = {
+        "version": __version__,
+        "timestamp": datetime.utcnow().isoformat(),
+        "config": vars(args),
+        "scenarios": {scenario: await run_scenario(url, token, db, scenario, args) for scenario in scenarios},
+    }
+    await server.stop()
+
+    text = json.dumps(results, indent=4, sort_keys=True)
+    if args.output == "-":
+        print(text)
+    else:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
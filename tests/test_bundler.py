@@ -1,6 +1,7 @@
 # test_bundler.py
 """Unit tests for lta/bundler.py."""
 
+from concurrent.futures import ThreadPoolExecutor
 from unittest.mock import call, mock_open, patch
 
 import pytest  # type: ignore
@@ -20,6 +21,7 @@ def config():
         "HEARTBEAT_PATCH_RETRIES": "3",
         "HEARTBEAT_PATCH_TIMEOUT_SECONDS": "30",
         "HEARTBEAT_SLEEP_DURATION_SECONDS": "60",
+        "LOOP_STALL_LOG_SECONDS": "0",
         "LTA_REST_TOKEN": "fake-lta-rest-token",
         "LTA_REST_URL": "http://RmMNHdPhHpH2ZxfaFAC9d2jiIbf5pZiHDqy43rFLQiM.com/",
         "MYSQL_DB": "testing-db",
@@ -29,8 +31,11 @@ def config():
         "MYSQL_USER": "jade-user",
         "RUN_ONCE_AND_DIE": "False",
         "SOURCE_SITE": "WIPAC",
+        "WORK_BYTES_IN_FLIGHT": "0",
+        "WORK_CONCURRENCY": "1",
         "WORK_RETRIES": "3",
         "WORK_SLEEP_DURATION_SECONDS": "60",
+        "WORK_SLEEP_MIN_DURATION_SECONDS": "5",
         "WORK_TIMEOUT_SECONDS": "30",
     }
 
@@ -137,6 +142,7 @@ async def test_bundler_logs_configuration(mocker):
         "HEARTBEAT_PATCH_RETRIES": "1",
         "HEARTBEAT_PATCH_TIMEOUT_SECONDS": "20",
         "HEARTBEAT_SLEEP_DURATION_SECONDS": "30",
+        "LOOP_STALL_LOG_SECONDS": "0",
         "LTA_REST_TOKEN": "logme-fake-lta-rest-token",
         "LTA_REST_URL": "logme-http://RmMNHdPhHpH2ZxfaFAC9d2jiIbf5pZiHDqy43rFLQiM.com/",
         "MYSQL_DB": "logme-testing-db",
@@ -146,8 +152,11 @@ async def test_bundler_logs_configuration(mocker):
         "MYSQL_USER": "logme-jade-user",
         "RUN_ONCE_AND_DIE": "False",
         "SOURCE_SITE": "WIPAC",
+        "WORK_BYTES_IN_FLIGHT": "0",
+        "WORK_CONCURRENCY": "1",
         "WORK_RETRIES": "5",
         "WORK_SLEEP_DURATION_SECONDS": "70",
+        "WORK_SLEEP_MIN_DURATION_SECONDS": "5",
         "WORK_TIMEOUT_SECONDS": "90",
     }
     Bundler(bundler_config, logger_mock)
@@ -159,6 +168,7 @@ async def test_bundler_logs_configuration(mocker):
         call('HEARTBEAT_PATCH_RETRIES = 1'),
         call('HEARTBEAT_PATCH_TIMEOUT_SECONDS = 20'),
         call('HEARTBEAT_SLEEP_DURATION_SECONDS = 30'),
+        call('LOOP_STALL_LOG_SECONDS = 0'),
         call('LTA_REST_TOKEN = logme-fake-lta-rest-token'),
         call('LTA_REST_URL = logme-http://RmMNHdPhHpH2ZxfaFAC9d2jiIbf5pZiHDqy43rFLQiM.com/'),
         call('MYSQL_DB = logme-testing-db'),
@@ -168,8 +178,11 @@ async def test_bundler_logs_configuration(mocker):
         call('MYSQL_USER = logme-jade-user'),
         call('RUN_ONCE_AND_DIE = False'),
         call('SOURCE_SITE = WIPAC'),
+        call('WORK_BYTES_IN_FLIGHT = 0'),
+        call('WORK_CONCURRENCY = 1'),
         call('WORK_RETRIES = 5'),
         call('WORK_SLEEP_DURATION_SECONDS = 70'),
+        call('WORK_SLEEP_MIN_DURATION_SECONDS = 5'),
         call('WORK_TIMEOUT_SECONDS = 90'),
     ]
     logger_mock.info.assert_has_calls(EXPECTED_LOGGER_CALLS)
@@ -207,7 +220,7 @@ async def test_bundler_do_work_pop_exception(config, mocker):
     p = Bundler(config, logger_mock)
     with pytest.raises(HTTPError):
         await p._do_work()
-    lta_rc_mock.assert_called_with("POST", '/Bundles/actions/pop?source=WIPAC&status=specified', mocker.ANY)
+    lta_rc_mock.assert_called_with("POST", '/Bundles/actions/pop?source=WIPAC&status=specified&wait=15', mocker.ANY)
 
 
 @pytest.mark.asyncio
@@ -230,7 +243,7 @@ async def test_bundler_do_work_claim_no_results(config, mocker):
     }
     p = Bundler(config, logger_mock)
     assert not await p._do_work_claim()
-    lta_rc_mock.assert_called_with("POST", '/Bundles/actions/pop?source=WIPAC&status=specified', mocker.ANY)
+    lta_rc_mock.assert_called_with("POST", '/Bundles/actions/pop?source=WIPAC&status=specified&wait=15', mocker.ANY)
 
 
 @pytest.mark.asyncio
@@ -247,10 +260,29 @@ async def test_bundler_do_work_yes_results(config, mocker):
     dwb_mock = mocker.patch("lta.bundler.Bundler._do_work_bundle", new_callable=AsyncMock)
     p = Bundler(config, logger_mock)
     assert await p._do_work_claim()
-    lta_rc_mock.assert_called_with("POST", '/Bundles/actions/pop?source=WIPAC&status=specified', mocker.ANY)
+    lta_rc_mock.assert_called_with("POST", '/Bundles/actions/pop?source=WIPAC&status=specified&wait=15', mocker.ANY)
     dwb_mock.assert_called_with(lta_rc_mock, BUNDLE_OBJ)
 
 
+@pytest.mark.asyncio
+async def test_bundler_do_work_claim_work_budget(config, mocker):
+    """Test that _do_work_claim reserves the size of the files in the Bundle from the work budget."""
+    BUNDLE_OBJ = {
+        "uuid": "f74db80e-9661-40cc-9f01-8d087af23f56",
+        "files": [{"file_size": 100}, {"file_size": 23}],
+    }
+    logger_mock = mocker.MagicMock()
+    lta_rc_mock = mocker.patch("rest_tools.client.RestClient.request", new_callable=AsyncMock)
+    lta_rc_mock.return_value = {
+        "bundle": BUNDLE_OBJ,
+    }
+    mocker.patch("lta.bundler.Bundler._do_work_bundle", new_callable=AsyncMock)
+    p = Bundler(config, logger_mock)
+    reserve_spy = mocker.spy(p.work_budget, "reserve")
+    assert await p._do_work_claim()
+    reserve_spy.assert_called_with(123)
+
+
 @pytest.mark.asyncio
 async def test_bundler_do_work_dest_results(config, mocker):
     """Test that _do_work_bundle does the work of preparing an archive."""
@@ -263,6 +295,7 @@ async def test_bundler_do_work_dest_results(config, mocker):
     mock_shutil_move = mocker.patch("shutil.move")
     mock_shutil_move.return_value = None
     mock_lta_checksums = mocker.patch("lta.bundler.lta_checksums")
+    mocker.patch("lta.component.ProcessPoolExecutor", ThreadPoolExecutor)  # mocks can't be sent to another process
     mock_lta_checksums.return_value = {
         "adler32": "89d5efeb",
         "sha512": "c919210281b72327c179e26be799b06cdaf48bf6efce56fb9d53f758c1b997099831ad05453fdb1ba65be7b35d0b4c5cebfc439efbdf83317ba0e38bf6f42570",
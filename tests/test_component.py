@@ -1,7 +1,12 @@
 # test_component.py
 """Unit tests for lta/picker.py."""
 
+import asyncio
 from asyncio import Future
+import sys
+from subprocess import TimeoutExpired
+import threading
+import time
 from unittest.mock import call, MagicMock
 from uuid import uuid1
 
@@ -9,7 +14,8 @@ import pytest  # type: ignore
 import requests
 from tornado.web import HTTPError  # type: ignore
 
-from lta.component import patch_status_heartbeat, status_loop, work_loop
+from lta.component import ByteBudget, COMMON_CONFIG, Component, LoopMonitor, patch_status_heartbeat, percentile, run_command, status_loop, work_loop
+from lta.crypto import sha512sum
 from lta.picker import main, Picker
 from .test_util import AsyncMock, ObjectLiteral
 
@@ -23,19 +29,272 @@ def config():
         "HEARTBEAT_PATCH_RETRIES": "3",
         "HEARTBEAT_PATCH_TIMEOUT_SECONDS": "30",
         "HEARTBEAT_SLEEP_DURATION_SECONDS": "60",
+        "LOOP_STALL_LOG_SECONDS": "0",
         "LTA_REST_TOKEN": "fake-lta-rest-token",
         "LTA_REST_URL": "http://RmMNHdPhHpH2ZxfaFAC9d2jiIbf5pZiHDqy43rFLQiM.com/",
+        "WORK_BYTES_IN_FLIGHT": "0",
+        "WORK_CONCURRENCY": "1",
         "WORK_RETRIES": "3",
         "WORK_SLEEP_DURATION_SECONDS": "60",
+        "WORK_SLEEP_MIN_DURATION_SECONDS": "5",
         "WORK_TIMEOUT_SECONDS": "30"
     }
 
 
+class ClaimComponent(Component):
+    """A minimal Component that performs its work one claim at a time."""
+
+    def __init__(self, config, logger):
+        """Create a ClaimComponent."""
+        super().__init__("claim", config, logger)
+
+    def _do_status(self):
+        return {}
+
+    def _expected_config(self):
+        return COMMON_CONFIG
+
+    async def _do_work(self):
+        await self._do_work_claims()
+
+    async def _do_work_claim(self):
+        return False
+
+
+@pytest.fixture
+def claim_config():
+    """Supply a stock ClaimComponent configuration."""
+    return {
+        "COMPONENT_NAME": "testing-claim",
+        "HEARTBEAT_PATCH_RETRIES": "3",
+        "HEARTBEAT_PATCH_TIMEOUT_SECONDS": "30",
+        "HEARTBEAT_SLEEP_DURATION_SECONDS": "60",
+        "LOOP_STALL_LOG_SECONDS": "0",
+        "LTA_REST_TOKEN": "fake-lta-rest-token",
+        "LTA_REST_URL": "http://RmMNHdPhHpH2ZxfaFAC9d2jiIbf5pZiHDqy43rFLQiM.com/",
+        "RUN_ONCE_AND_DIE": "False",
+        "SOURCE_SITE": "WIPAC",
+        "WORK_BYTES_IN_FLIGHT": "0",
+        "WORK_CONCURRENCY": "1",
+        "WORK_SLEEP_DURATION_SECONDS": "60",
+        "WORK_SLEEP_MIN_DURATION_SECONDS": "5",
+    }
+
+
 def test_always_succeed():
     """Succeed with flying colors."""
     assert True
 
 
+@pytest.mark.asyncio
+async def test_byte_budget_no_limit():
+    """Ensure a ByteBudget of 0 never makes anybody wait."""
+    budget = ByteBudget(0)
+    async with budget.reserve(1000):
+        async with budget.reserve(1000):
+            assert budget.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_byte_budget_limit():
+    """Ensure a ByteBudget holds work back until the bytes in flight fit."""
+    budget = ByteBudget(100)
+    high_water = []
+
+    async def work(size):
+        async with budget.reserve(size):
+            high_water.append(budget.in_flight)
+            await asyncio.sleep(0.01)
+
+    await asyncio.gather(work(60), work(60), work(30), work(250))
+    assert budget.in_flight == 0
+    assert len(high_water) == 4
+    # the oversized unit of work is allowed to run, but only by itself
+    assert 250 in high_water
+    assert max(x for x in high_water if x != 250) <= 100
+
+
+def test_percentile():
+    """Ensure percentile finds values in a sorted list."""
+    assert percentile([], 0.5) == 0.0
+    assert percentile([1.0], 0.99) == 1.0
+    assert percentile([float(x) for x in range(101)], 0.50) == 50.0
+    assert percentile([float(x) for x in range(101)], 0.99) == 99.0
+
+
+@pytest.mark.asyncio
+async def test_loop_monitor(mocker):
+    """Ensure LoopMonitor measures a blocked event loop and logs where it was blocked."""
+    mocker.patch("lta.component.LOOP_LAG_SAMPLE_SECONDS", 0.01)
+    logger_mock = MagicMock()
+    monitor = LoopMonitor(logger_mock, 0.1)
+    assert monitor.status() == {
+        "loop_lag_p50_seconds": 0.0,
+        "loop_lag_p99_seconds": 0.0,
+        "loop_lag_max_seconds": 0.0,
+    }
+    monitor.start()
+    try:
+        await asyncio.sleep(0.1)
+        time.sleep(0.3)  # block the event loop
+        await asyncio.sleep(0.1)
+    finally:
+        monitor.stop()
+    # stop() waits for the stall watchdog thread
+    assert not any(thread.name == "loop-stall-watchdog" for thread in threading.enumerate())
+    status = monitor.status()
+    assert status["loop_lag_max_seconds"] >= 0.2
+    assert status["loop_lag_p50_seconds"] < 0.2
+    # status() doesn't change anything; the maximum covers only the time since the last reset
+    assert monitor.status() == status
+    assert monitor.snapshot_and_reset() == status
+    assert monitor.status()["loop_lag_max_seconds"] == 0.0
+    logger_mock.warning.assert_called()
+    assert "test_loop_monitor" in logger_mock.warning.call_args[0][0]
+
+
+@pytest.mark.asyncio
+async def test_run_command():
+    """Ensure run_command runs a command and collects its output."""
+    completed_process = await run_command([sys.executable, "-c", "print('hello'); raise SystemExit(3)"])
+    assert completed_process.args == [sys.executable, "-c", "print('hello'); raise SystemExit(3)"]
+    assert completed_process.returncode == 3
+    assert completed_process.stdout.strip() == b"hello"
+    assert completed_process.stderr == b""
+
+
+@pytest.mark.asyncio
+async def test_run_command_timeout():
+    """Ensure run_command kills a command that runs longer than its timeout."""
+    start = time.monotonic()
+    with pytest.raises(TimeoutExpired):
+        await run_command([sys.executable, "-c", "import time; time.sleep(30)"], timeout=0.5)
+    assert time.monotonic() - start < 10
+
+
+@pytest.mark.asyncio
+async def test_run_command_cancel(mocker):
+    """Ensure run_command kills and reaps its command when it is cancelled."""
+    processes = []
+    create_subprocess_exec = asyncio.create_subprocess_exec
+
+    async def exec_and_keep(*args, **kwargs):
+        process = await create_subprocess_exec(*args, **kwargs)
+        processes.append(process)
+        return process
+
+    mocker.patch("asyncio.create_subprocess_exec", side_effect=exec_and_keep)
+    task = asyncio.ensure_future(run_command([sys.executable, "-c", "import time; time.sleep(30)"]))
+    await asyncio.sleep(0.5)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert processes[0].returncode is not None
+
+
+def test_rest_client_shared(claim_config, mocker):
+    """Test that rest_client hands out one long-lived RestClient per service."""
+    logger_mock = mocker.MagicMock()
+    claim_config["HEARTBEAT_PATCH_TIMEOUT_SECONDS"] = "10"
+    p = ClaimComponent(claim_config, logger_mock)
+    rc = p.rest_client(p.lta_rest_url, token=p.lta_rest_token, timeout=30, retries=3)
+    assert p.rest_client(p.lta_rest_url, token=p.lta_rest_token, timeout=30, retries=3) is rc
+    hb_rc = p.rest_client(p.lta_rest_url, token=p.lta_rest_token, timeout=p.heartbeat_patch_timeout_seconds, retries=p.heartbeat_patch_retries)
+    assert hb_rc is not rc
+    assert rc.address == p.lta_rest_url
+
+
+@pytest.mark.asyncio
+async def test_run_io_run_cpu(claim_config, mocker, tmp_path):
+    """Test that run_io and run_cpu return the result of the call they run."""
+    logger_mock = mocker.MagicMock()
+    p = ClaimComponent(claim_config, logger_mock)
+    assert p.cpu_executor is None
+    bundle_path = tmp_path / "bundle.zip"
+    assert await p.run_io(bundle_path.write_bytes, b"bundle") == 6
+    assert await p.run_cpu(sha512sum, str(bundle_path)) == sha512sum(str(bundle_path))
+    assert p.cpu_executor is not None
+
+
+@pytest.mark.asyncio
+async def test_do_work_claims_concurrency(claim_config, mocker):
+    """Test that _do_work_claims runs WORK_CONCURRENCY claims until each runs out of work."""
+    logger_mock = mocker.MagicMock()
+    dwc_mock = mocker.patch.object(ClaimComponent, "_do_work_claim", new_callable=AsyncMock)
+    dwc_mock.side_effect = [True, True, True, True, False, False, False]
+    claim_config["WORK_CONCURRENCY"] = "3"
+    p = ClaimComponent(claim_config, logger_mock)
+    await p._do_work()
+    assert dwc_mock.call_count == 7
+
+
+@pytest.mark.asyncio
+async def test_do_work_claims_concurrency_exception(claim_config, mocker):
+    """Test that _do_work_claims lets the other claims finish before raising an error."""
+    logger_mock = mocker.MagicMock()
+    dwc_mock = mocker.patch.object(ClaimComponent, "_do_work_claim", new_callable=AsyncMock)
+    dwc_mock.side_effect = [Exception("bad thing happen!"), True, False]
+    claim_config["WORK_CONCURRENCY"] = "2"
+    p = ClaimComponent(claim_config, logger_mock)
+    with pytest.raises(Exception):
+        await p._do_work()
+    assert dwc_mock.call_count == 3
+
+
+def test_next_sleep_duration(claim_config, mocker):
+    """Test that the sleep between work cycles backs off when idle and resets when working."""
+    logger_mock = mocker.MagicMock()
+    p = ClaimComponent(claim_config, logger_mock)
+    p.last_work_claimed = True
+    assert p.next_sleep_duration() == 5
+    p.last_work_claimed = False
+    for ceiling in [10, 20, 40, 60, 60, 60]:
+        assert 5 <= p.next_sleep_duration() <= ceiling
+        assert p.work_backoff_seconds == ceiling
+    p.last_work_claimed = True
+    assert p.next_sleep_duration() == 5
+    assert p.work_backoff_seconds == 5
+
+
+def test_next_sleep_duration_after_pop_wait(claim_config, mocker):
+    """Test that an idle cycle doesn't sleep after its pops waited on the LTA DB, unless they returned early."""
+    logger_mock = mocker.MagicMock()
+    p = ClaimComponent(claim_config, logger_mock)
+    p.work_backoff_seconds = 40
+    assert p.pop_wait(30) == 15
+    p.last_work_seconds = 15.2
+    assert p.next_sleep_duration() == 0
+    assert p.work_backoff_seconds == 5
+    # a pop that failed fast didn't wait, so we back off as usual
+    p.last_work_seconds = 0.1
+    assert 5 <= p.next_sleep_duration() <= 10
+    assert p.work_backoff_seconds == 10
+
+
+def test_pop_wait(claim_config, mocker):
+    """Test that pops wait no longer than the work sleep or half the RestClient timeout."""
+    logger_mock = mocker.MagicMock()
+    p = ClaimComponent(claim_config, logger_mock)
+    assert p.pop_wait(30) == 15
+    assert p.pop_wait(300) == 60
+    claim_config["RUN_ONCE_AND_DIE"] = "True"
+    p = ClaimComponent(claim_config, logger_mock)
+    assert p.pop_wait(30) == 0
+
+
+@pytest.mark.asyncio
+async def test_sleep_until_woken(claim_config, mocker):
+    """Test that wake() cuts the sleep between work cycles short."""
+    logger_mock = mocker.MagicMock()
+    p = ClaimComponent(claim_config, logger_mock)
+    await p.sleep_until_woken(0.01)
+    assert not p.last_work_claimed
+    asyncio.get_event_loop().call_later(0.01, p.wake)
+    await asyncio.wait_for(p.sleep_until_woken(60), timeout=5)
+    assert p.last_work_claimed
+    assert p.next_sleep_duration() == 5
+
+
 def xtest_constructor_missing_config():
     """Fail with a TypeError if a configuration object isn't provided."""
     with pytest.raises(TypeError):
@@ -277,11 +536,15 @@ async def xtest_picker_logs_configuration(mocker):
         "HEARTBEAT_PATCH_RETRIES": "1",
         "HEARTBEAT_PATCH_TIMEOUT_SECONDS": "20",
         "HEARTBEAT_SLEEP_DURATION_SECONDS": "30",
+        "LOOP_STALL_LOG_SECONDS": "0",
         "LTA_REST_TOKEN": "logme-fake-lta-rest-token",
         "LTA_REST_URL": "logme-http://RmMNHdPhHpH2ZxfaFAC9d2jiIbf5pZiHDqy43rFLQiM.com/",
         "PICKER_NAME": "logme-testing-picker",
+        "WORK_BYTES_IN_FLIGHT": "0",
+        "WORK_CONCURRENCY": "1",
         "WORK_RETRIES": "5",
         "WORK_SLEEP_DURATION_SECONDS": "70",
+        "WORK_SLEEP_MIN_DURATION_SECONDS": "5",
         "WORK_TIMEOUT_SECONDS": "90"
     }
     Picker(picker_config, logger_mock)
@@ -292,11 +555,15 @@ async def xtest_picker_logs_configuration(mocker):
         call('HEARTBEAT_PATCH_RETRIES = 1'),
         call('HEARTBEAT_PATCH_TIMEOUT_SECONDS = 20'),
         call('HEARTBEAT_SLEEP_DURATION_SECONDS = 30'),
+        call('LOOP_STALL_LOG_SECONDS = 0'),
         call('LTA_REST_TOKEN = logme-fake-lta-rest-token'),
         call('LTA_REST_URL = logme-http://RmMNHdPhHpH2ZxfaFAC9d2jiIbf5pZiHDqy43rFLQiM.com/'),
         call('PICKER_NAME = logme-testing-picker'),
+        call('WORK_BYTES_IN_FLIGHT = 0'),
+        call('WORK_CONCURRENCY = 1'),
         call('WORK_RETRIES = 5'),
         call('WORK_SLEEP_DURATION_SECONDS = 70'),
+        call('WORK_SLEEP_MIN_DURATION_SECONDS = 5'),
         call('WORK_TIMEOUT_SECONDS = 90')
     ]
     logger_mock.info.assert_has_calls(EXPECTED_LOGGER_CALLS)
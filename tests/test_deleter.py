@@ -20,13 +20,17 @@ def config():
         "HEARTBEAT_PATCH_TIMEOUT_SECONDS": "30",
         "HEARTBEAT_SLEEP_DURATION_SECONDS": "60",
         "INPUT_STATUS": "detached",
+        "LOOP_STALL_LOG_SECONDS": "0",
         "LTA_REST_TOKEN": "fake-lta-rest-token",
         "LTA_REST_URL": "http://RmMNHdPhHpH2ZxfaFAC9d2jiIbf5pZiHDqy43rFLQiM.com/",
         "OUTPUT_STATUS": "source-deleted",
         "RUN_ONCE_AND_DIE": "False",
         "SOURCE_SITE": "WIPAC",
+        "WORK_BYTES_IN_FLIGHT": "0",
+        "WORK_CONCURRENCY": "1",
         "WORK_RETRIES": "3",
         "WORK_SLEEP_DURATION_SECONDS": "60",
+        "WORK_SLEEP_MIN_DURATION_SECONDS": "5",
         "WORK_TIMEOUT_SECONDS": "30",
     }
 
@@ -69,13 +73,17 @@ async def test_deleter_logs_configuration(mocker):
         "HEARTBEAT_PATCH_TIMEOUT_SECONDS": "20",
         "HEARTBEAT_SLEEP_DURATION_SECONDS": "30",
         "INPUT_STATUS": "detached",
+        "LOOP_STALL_LOG_SECONDS": "0",
         "LTA_REST_TOKEN": "logme-fake-lta-rest-token",
         "LTA_REST_URL": "logme-http://zjwdm5ggeEgS1tZDZy9l1DOZU53uiSO4Urmyb8xL0.com/",
         "OUTPUT_STATUS": "source-deleted",
         "RUN_ONCE_AND_DIE": "False",
         "SOURCE_SITE": "WIPAC",
+        "WORK_BYTES_IN_FLIGHT": "0",
+        "WORK_CONCURRENCY": "1",
         "WORK_RETRIES": "5",
         "WORK_SLEEP_DURATION_SECONDS": "70",
+        "WORK_SLEEP_MIN_DURATION_SECONDS": "5",
         "WORK_TIMEOUT_SECONDS": "90",
     }
     Deleter(deleter_config, logger_mock)
@@ -88,13 +96,17 @@ async def test_deleter_logs_configuration(mocker):
         call('HEARTBEAT_PATCH_TIMEOUT_SECONDS = 20'),
         call('HEARTBEAT_SLEEP_DURATION_SECONDS = 30'),
         call('INPUT_STATUS = detached'),
+        call('LOOP_STALL_LOG_SECONDS = 0'),
         call('LTA_REST_TOKEN = logme-fake-lta-rest-token'),
         call('LTA_REST_URL = logme-http://zjwdm5ggeEgS1tZDZy9l1DOZU53uiSO4Urmyb8xL0.com/'),
         call('OUTPUT_STATUS = source-deleted'),
         call('RUN_ONCE_AND_DIE = False'),
         call('SOURCE_SITE = WIPAC'),
+        call('WORK_BYTES_IN_FLIGHT = 0'),
+        call('WORK_CONCURRENCY = 1'),
         call('WORK_RETRIES = 5'),
         call('WORK_SLEEP_DURATION_SECONDS = 70'),
+        call('WORK_SLEEP_MIN_DURATION_SECONDS = 5'),
         call('WORK_TIMEOUT_SECONDS = 90')
     ]
     logger_mock.info.assert_has_calls(EXPECTED_LOGGER_CALLS)
@@ -149,7 +161,7 @@ async def test_deleter_do_work_pop_exception(config, mocker):
     p = Deleter(config, logger_mock)
     with pytest.raises(HTTPError):
         await p._do_work()
-    lta_rc_mock.assert_called_with("POST", '/Bundles/actions/pop?dest=NERSC&status=detached', {'claimant': f'{p.name}-{p.instance_uuid}'})
+    lta_rc_mock.assert_called_with("POST", '/Bundles/actions/pop?dest=NERSC&status=detached&contents=false&wait=15', {'claimant': f'{p.name}-{p.instance_uuid}'})
 
 @pytest.mark.asyncio
 async def test_deleter_do_work_no_results(config, mocker):
@@ -182,7 +194,7 @@ async def test_deleter_do_work_claim_no_result(config, mocker):
     db_mock = mocker.patch("lta.deleter.Deleter._delete_bundle", new_callable=AsyncMock)
     p = Deleter(config, logger_mock)
     await p._do_work_claim()
-    lta_rc_mock.assert_called_with("POST", '/Bundles/actions/pop?dest=NERSC&status=detached', {'claimant': f'{p.name}-{p.instance_uuid}'})
+    lta_rc_mock.assert_called_with("POST", '/Bundles/actions/pop?dest=NERSC&status=detached&contents=false&wait=15', {'claimant': f'{p.name}-{p.instance_uuid}'})
     db_mock.assert_not_called()
 
 @pytest.mark.asyncio
@@ -198,7 +210,7 @@ async def test_deleter_do_work_claim_yes_result(config, mocker):
     db_mock = mocker.patch("lta.deleter.Deleter._delete_bundle", new_callable=AsyncMock)
     p = Deleter(config, logger_mock)
     assert await p._do_work_claim()
-    lta_rc_mock.assert_called_with("POST", '/Bundles/actions/pop?dest=NERSC&status=detached', {'claimant': f'{p.name}-{p.instance_uuid}'})
+    lta_rc_mock.assert_called_with("POST", '/Bundles/actions/pop?dest=NERSC&status=detached&contents=false&wait=15', {'claimant': f'{p.name}-{p.instance_uuid}'})
     db_mock.assert_called_with(mocker.ANY, {"one": 1})
 
 @pytest.mark.asyncio
@@ -217,7 +229,7 @@ async def test_deleter_delete_bundle_raises(config, mocker):
     p = Deleter(config, logger_mock)
     with pytest.raises(Exception):
         await p._do_work_claim()
-    lta_rc_mock.assert_called_with("POST", '/Bundles/actions/pop?dest=NERSC&status=detached', {'claimant': f'{p.name}-{p.instance_uuid}'})
+    lta_rc_mock.assert_called_with("POST", '/Bundles/actions/pop?dest=NERSC&status=detached&contents=false&wait=15', {'claimant': f'{p.name}-{p.instance_uuid}'})
     db_mock.assert_called_with(mocker.ANY, {"one": 1})
     qb_mock.assert_called_with(mocker.ANY, {"one": 1}, "LTA DB unavailable; currently safer at home")
 
@@ -233,7 +245,7 @@ async def test_deleter_delete_bundle(config, mocker):
         "bundle_path": "/icecube/datawarehouse/path/to/c4b345e4-2395-4f9e-b0eb-9cc1c9cdf003.zip",
     })
     remove_mock.assert_called()
-    lta_rc_mock.request.assert_called_with("PATCH", "/Bundles/c4b345e4-2395-4f9e-b0eb-9cc1c9cdf003", mocker.ANY)
+    lta_rc_mock.request.assert_called_with("PATCH", "/Bundles/c4b345e4-2395-4f9e-b0eb-9cc1c9cdf003?return=minimal", mocker.ANY)
 
 @pytest.mark.asyncio
 async def test_deleter_quarantine_bundle_with_reason(config, mocker):
@@ -242,4 +254,4 @@ async def test_deleter_quarantine_bundle_with_reason(config, mocker):
     lta_rc_mock = mocker.patch("rest_tools.client.RestClient", new_callable=AsyncMock)
     p = Deleter(config, logger_mock)
     await p._quarantine_bundle(lta_rc_mock, {"uuid": "c4b345e4-2395-4f9e-b0eb-9cc1c9cdf003"}, "Rucio caught fire, then we roasted marshmellows.")
-    lta_rc_mock.request.assert_called_with("PATCH", "/Bundles/c4b345e4-2395-4f9e-b0eb-9cc1c9cdf003", mocker.ANY)
+    lta_rc_mock.request.assert_called_with("PATCH", "/Bundles/c4b345e4-2395-4f9e-b0eb-9cc1c9cdf003?return=minimal", mocker.ANY)
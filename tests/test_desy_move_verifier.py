@@ -18,14 +18,18 @@ def config():
         "HEARTBEAT_PATCH_RETRIES": "3",
         "HEARTBEAT_PATCH_TIMEOUT_SECONDS": "30",
         "HEARTBEAT_SLEEP_DURATION_SECONDS": "60",
+        "LOOP_STALL_LOG_SECONDS": "0",
         "LTA_REST_TOKEN": "fake-lta-rest-token",
         "LTA_REST_URL": "http://RmMNHdPhHpH2ZxfaFAC9d2jiIbf5pZiHDqy43rFLQiM.com/",
         "NEXT_STATUS": "taping",
         "RUN_ONCE_AND_DIE": "False",
         "SOURCE_SITE": "WIPAC",
         "TRANSFER_CONFIG_PATH": "examples/rucio.json",
+        "WORK_BYTES_IN_FLIGHT": "0",
+        "WORK_CONCURRENCY": "1",
         "WORK_RETRIES": "3",
         "WORK_SLEEP_DURATION_SECONDS": "60",
+        "WORK_SLEEP_MIN_DURATION_SECONDS": "5",
         "WORK_TIMEOUT_SECONDS": "30",
     }
 
@@ -64,14 +68,18 @@ async def test_desy_move_verifier_logs_configuration(mocker):
         "HEARTBEAT_PATCH_RETRIES": "1",
         "HEARTBEAT_PATCH_TIMEOUT_SECONDS": "20",
         "HEARTBEAT_SLEEP_DURATION_SECONDS": "30",
+        "LOOP_STALL_LOG_SECONDS": "0",
         "LTA_REST_TOKEN": "logme-fake-lta-rest-token",
         "LTA_REST_URL": "logme-http://zjwdm5ggeEgS1tZDZy9l1DOZU53uiSO4Urmyb8xL0.com/",
         "NEXT_STATUS": "prognosticating",
         "RUN_ONCE_AND_DIE": "False",
         "SOURCE_SITE": "WIPAC",
         "TRANSFER_CONFIG_PATH": "examples/rucio.json",
+        "WORK_BYTES_IN_FLIGHT": "0",
+        "WORK_CONCURRENCY": "1",
         "WORK_RETRIES": "5",
         "WORK_SLEEP_DURATION_SECONDS": "70",
+        "WORK_SLEEP_MIN_DURATION_SECONDS": "5",
         "WORK_TIMEOUT_SECONDS": "90",
     }
     DesyMoveVerifier(desy_move_verifier_config, logger_mock)
@@ -82,14 +90,18 @@ async def test_desy_move_verifier_logs_configuration(mocker):
         call('HEARTBEAT_PATCH_RETRIES = 1'),
         call('HEARTBEAT_PATCH_TIMEOUT_SECONDS = 20'),
         call('HEARTBEAT_SLEEP_DURATION_SECONDS = 30'),
+        call('LOOP_STALL_LOG_SECONDS = 0'),
         call('LTA_REST_TOKEN = logme-fake-lta-rest-token'),
         call('LTA_REST_URL = logme-http://zjwdm5ggeEgS1tZDZy9l1DOZU53uiSO4Urmyb8xL0.com/'),
         call('NEXT_STATUS = prognosticating'),
         call('RUN_ONCE_AND_DIE = False'),
         call('SOURCE_SITE = WIPAC'),
         call('TRANSFER_CONFIG_PATH = examples/rucio.json'),
+        call('WORK_BYTES_IN_FLIGHT = 0'),
+        call('WORK_CONCURRENCY = 1'),
         call('WORK_RETRIES = 5'),
         call('WORK_SLEEP_DURATION_SECONDS = 70'),
+        call('WORK_SLEEP_MIN_DURATION_SECONDS = 5'),
         call('WORK_TIMEOUT_SECONDS = 90')
     ]
     logger_mock.info.assert_has_calls(EXPECTED_LOGGER_CALLS)
@@ -144,7 +156,7 @@ async def test_desy_move_verifier_do_work_pop_exception(config, mocker):
     p = DesyMoveVerifier(config, logger_mock)
     with pytest.raises(HTTPError):
         await p._do_work()
-    lta_rc_mock.assert_called_with("POST", '/Bundles/actions/pop?dest=DESY&status=transferring', {'claimant': f'{p.name}-{p.instance_uuid}'})
+    lta_rc_mock.assert_called_with("POST", '/Bundles/actions/pop?dest=DESY&status=transferring&contents=false&wait=15', {'claimant': f'{p.name}-{p.instance_uuid}'})
 
 @pytest.mark.asyncio
 async def test_desy_move_verifier_do_work_no_results(config, mocker):
@@ -177,7 +189,7 @@ async def test_desy_move_verifier_do_work_claim_no_result(config, mocker):
     vb_mock = mocker.patch("lta.desy_move_verifier.DesyMoveVerifier._verify_bundle", new_callable=AsyncMock)
     p = DesyMoveVerifier(config, logger_mock)
     await p._do_work_claim()
-    lta_rc_mock.assert_called_with("POST", '/Bundles/actions/pop?dest=DESY&status=transferring', {'claimant': f'{p.name}-{p.instance_uuid}'})
+    lta_rc_mock.assert_called_with("POST", '/Bundles/actions/pop?dest=DESY&status=transferring&contents=false&wait=15', {'claimant': f'{p.name}-{p.instance_uuid}'})
     vb_mock.assert_not_called()
 
 @pytest.mark.asyncio
@@ -193,7 +205,7 @@ async def test_desy_move_verifier_do_work_claim_yes_result(config, mocker):
     vb_mock = mocker.patch("lta.desy_move_verifier.DesyMoveVerifier._verify_bundle", new_callable=AsyncMock)
     p = DesyMoveVerifier(config, logger_mock)
     assert await p._do_work_claim()
-    lta_rc_mock.assert_called_with("POST", '/Bundles/actions/pop?dest=DESY&status=transferring', {'claimant': f'{p.name}-{p.instance_uuid}'})
+    lta_rc_mock.assert_called_with("POST", '/Bundles/actions/pop?dest=DESY&status=transferring&contents=false&wait=15', {'claimant': f'{p.name}-{p.instance_uuid}'})
     vb_mock.assert_called_with(mocker.ANY, {"one": 1})
 
 @pytest.mark.asyncio
@@ -223,7 +235,7 @@ async def test_desy_move_verifier_verify_bundle_not_finished(config, mocker):
     await p._verify_bundle(lta_rc_mock, bundle_obj)
     inst_mock.assert_called_with(p.transfer_config)
     xfer_service_mock.status.assert_called_with("dataset-nersc|8286d3ba-fb1b-4923-876d-935bdf7fc99e.zip")
-    lta_rc_mock.request.assert_called_with("PATCH", '/Bundles/8286d3ba-fb1b-4923-876d-935bdf7fc99e', mocker.ANY)
+    lta_rc_mock.request.assert_called_with("PATCH", '/Bundles/8286d3ba-fb1b-4923-876d-935bdf7fc99e?return=minimal', mocker.ANY)
 
 @pytest.mark.asyncio
 async def test_desy_move_verifier_verify_bundle_finished(config, mocker):
@@ -252,7 +264,7 @@ async def test_desy_move_verifier_verify_bundle_finished(config, mocker):
     await p._verify_bundle(lta_rc_mock, bundle_obj)
     inst_mock.assert_called_with(p.transfer_config)
     xfer_service_mock.status.assert_called_with("dataset-nersc|8286d3ba-fb1b-4923-876d-935bdf7fc99e.zip")
-    lta_rc_mock.request.assert_called_with("PATCH", '/Bundles/8286d3ba-fb1b-4923-876d-935bdf7fc99e', {
+    lta_rc_mock.request.assert_called_with("PATCH", '/Bundles/8286d3ba-fb1b-4923-876d-935bdf7fc99e?return=minimal', {
         "status": "taping",
         "reason": "",
         "update_timestamp": mocker.ANY,
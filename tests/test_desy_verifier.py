@@ -1,6 +1,7 @@
 # test_desy_verifier.py
 """Unit tests for lta/desy_verifier.py."""
 
+from concurrent.futures import ThreadPoolExecutor
 from unittest.mock import call, MagicMock
 
 import pytest  # type: ignore
@@ -21,13 +22,17 @@ def config():
         "HEARTBEAT_PATCH_RETRIES": "3",
         "HEARTBEAT_PATCH_TIMEOUT_SECONDS": "30",
         "HEARTBEAT_SLEEP_DURATION_SECONDS": "60",
+        "LOOP_STALL_LOG_SECONDS": "0",
         "LTA_REST_TOKEN": "fake-lta-rest-token",
         "LTA_REST_URL": "http://RmMNHdPhHpH2ZxfaFAC9d2jiIbf5pZiHDqy43rFLQiM.com/",
         "TAPE_BASE_PATH": "/path/to/hpss",
         "RUN_ONCE_AND_DIE": "False",
         "SOURCE_SITE": "WIPAC",
+        "WORK_BYTES_IN_FLIGHT": "0",
+        "WORK_CONCURRENCY": "1",
         "WORK_RETRIES": "3",
         "WORK_SLEEP_DURATION_SECONDS": "60",
+        "WORK_SLEEP_MIN_DURATION_SECONDS": "5",
         "WORK_TIMEOUT_SECONDS": "30",
         "WORKBOX_PATH": "/path/to/wipac/workbox/directory",
     }
@@ -181,13 +186,17 @@ async def test_desy_verifier_logs_configuration(mocker):
         "HEARTBEAT_PATCH_RETRIES": "1",
         "HEARTBEAT_PATCH_TIMEOUT_SECONDS": "20",
         "HEARTBEAT_SLEEP_DURATION_SECONDS": "30",
+        "LOOP_STALL_LOG_SECONDS": "0",
         "LTA_REST_TOKEN": "logme-fake-lta-rest-token",
         "LTA_REST_URL": "logme-http://RmMNHdPhHpH2ZxfaFAC9d2jiIbf5pZiHDqy43rFLQiM.com/",
         "RUN_ONCE_AND_DIE": "False",
         "SOURCE_SITE": "WIPAC",
         "TAPE_BASE_PATH": "/logme/path/to/hpss",
+        "WORK_BYTES_IN_FLIGHT": "0",
+        "WORK_CONCURRENCY": "1",
         "WORK_RETRIES": "5",
         "WORK_SLEEP_DURATION_SECONDS": "70",
+        "WORK_SLEEP_MIN_DURATION_SECONDS": "5",
         "WORK_TIMEOUT_SECONDS": "90",
         "WORKBOX_PATH": "/path/to/wipac/workbox/directory",
     }
@@ -202,13 +211,17 @@ async def test_desy_verifier_logs_configuration(mocker):
         call('HEARTBEAT_PATCH_RETRIES = 1'),
         call('HEARTBEAT_PATCH_TIMEOUT_SECONDS = 20'),
         call('HEARTBEAT_SLEEP_DURATION_SECONDS = 30'),
+        call('LOOP_STALL_LOG_SECONDS = 0'),
         call('LTA_REST_TOKEN = logme-fake-lta-rest-token'),
         call('LTA_REST_URL = logme-http://RmMNHdPhHpH2ZxfaFAC9d2jiIbf5pZiHDqy43rFLQiM.com/'),
         call('RUN_ONCE_AND_DIE = False'),
         call('SOURCE_SITE = WIPAC'),
         call('TAPE_BASE_PATH = /logme/path/to/hpss'),
+        call('WORK_BYTES_IN_FLIGHT = 0'),
+        call('WORK_CONCURRENCY = 1'),
         call('WORK_RETRIES = 5'),
         call('WORK_SLEEP_DURATION_SECONDS = 70'),
+        call('WORK_SLEEP_MIN_DURATION_SECONDS = 5'),
         call('WORK_TIMEOUT_SECONDS = 90'),
         call('WORKBOX_PATH = /path/to/wipac/workbox/directory'),
     ]
@@ -264,7 +277,7 @@ async def test_desy_verifier_do_work_pop_exception(config, mocker):
     p = DesyVerifier(config, logger_mock)
     with pytest.raises(HTTPError):
         await p._do_work()
-    lta_rc_mock.assert_called_with("POST", '/Bundles/actions/pop?dest=DESY&status=verifying', {'claimant': f'{p.name}-{p.instance_uuid}'})
+    lta_rc_mock.assert_called_with("POST", '/Bundles/actions/pop?dest=DESY&status=verifying&wait=15', {'claimant': f'{p.name}-{p.instance_uuid}'})
 
 @pytest.mark.asyncio
 async def test_desy_verifier_do_work_no_results(config, mocker):
@@ -297,7 +310,7 @@ async def test_desy_verifier_do_work_claim_no_result(config, mocker):
     vbih_mock = mocker.patch("lta.desy_verifier.DesyVerifier._verify_bundle_at_desy", new_callable=AsyncMock)
     p = DesyVerifier(config, logger_mock)
     await p._do_work_claim()
-    lta_rc_mock.assert_called_with("POST", '/Bundles/actions/pop?dest=DESY&status=verifying', {'claimant': f'{p.name}-{p.instance_uuid}'})
+    lta_rc_mock.assert_called_with("POST", '/Bundles/actions/pop?dest=DESY&status=verifying&wait=15', {'claimant': f'{p.name}-{p.instance_uuid}'})
     vbih_mock.assert_not_called()
 
 @pytest.mark.asyncio
@@ -314,7 +327,7 @@ async def test_desy_verifier_do_work_claim_yes_result(config, mocker):
     vbih_mock.return_value = False
     p = DesyVerifier(config, logger_mock)
     assert await p._do_work_claim()
-    lta_rc_mock.assert_called_with("POST", '/Bundles/actions/pop?dest=DESY&status=verifying', {'claimant': f'{p.name}-{p.instance_uuid}'})
+    lta_rc_mock.assert_called_with("POST", '/Bundles/actions/pop?dest=DESY&status=verifying&wait=15', {'claimant': f'{p.name}-{p.instance_uuid}'})
     vbih_mock.assert_called_with(mocker.ANY, {"one": 1})
 
 @pytest.mark.asyncio
@@ -333,7 +346,7 @@ async def test_desy_verifier_do_work_claim_yes_result_update_fc_and_lta(config,
     ubild_mock = mocker.patch("lta.desy_verifier.DesyVerifier._update_bundle_in_lta_db", new_callable=AsyncMock)
     p = DesyVerifier(config, logger_mock)
     assert await p._do_work_claim()
-    lta_rc_mock.assert_called_with("POST", '/Bundles/actions/pop?dest=DESY&status=verifying', {'claimant': f'{p.name}-{p.instance_uuid}'})
+    lta_rc_mock.assert_called_with("POST", '/Bundles/actions/pop?dest=DESY&status=verifying&wait=15', {'claimant': f'{p.name}-{p.instance_uuid}'})
     vbih_mock.assert_called_with(mocker.ANY, {"one": 1})
     abtfc_mock.assert_called_with({"one": 1})
     ubild_mock.assert_called_with(mocker.ANY, {"one": 1})
@@ -356,7 +369,7 @@ async def test_desy_verifier_do_work_claim_exception_caught(config, mocker):
     vbih_mock.side_effect = Exception("Database totally on fire, guys")
     p = DesyVerifier(config, logger_mock)
     assert not await p._do_work_claim()
-    lta_rc_mock.assert_called_with("PATCH", '/Bundles/45ae2ad39c664fda86e5981be0976d9c', mocker.ANY)
+    lta_rc_mock.assert_called_with("PATCH", '/Bundles/45ae2ad39c664fda86e5981be0976d9c?return=minimal', mocker.ANY)
     vbih_mock.assert_called_with(mocker.ANY, {"uuid": "45ae2ad39c664fda86e5981be0976d9c", "one": 1})
 
 @pytest.mark.asyncio
@@ -455,7 +468,7 @@ async def test_desy_verifier_update_bundle_in_lta_db(config, mocker):
     lta_mock.request = lta_rc_mock
     p = DesyVerifier(config, logger_mock)
     assert await p._update_bundle_in_lta_db(lta_mock, bundle)
-    lta_rc_mock.assert_called_with("PATCH", '/Bundles/7ec8a8f9-fae3-4f25-ae54-c1f66014f5ef', mocker.ANY)
+    lta_rc_mock.assert_called_with("PATCH", '/Bundles/7ec8a8f9-fae3-4f25-ae54-c1f66014f5ef?return=minimal', mocker.ANY)
 
 @pytest.mark.asyncio
 async def test_desy_verifier_verify_bundle_at_desy_success_no_quarantine(config, mocker):
@@ -469,7 +482,7 @@ async def test_desy_verifier_verify_bundle_at_desy_success_no_quarantine(config,
             "sha512": "97de2a6ad728f50a381eb1be6ecf015019887fac27e8bf608334fb72caf8d3f654fdcce68c33b0f0f27de499b84e67b8357cd81ef7bba3cdaa9e23a648f43ad2",
         },
     }
-    run_mock = mocker.patch("lta.desy_verifier.run", new_callable=MagicMock)
+    run_mock = mocker.patch("lta.desy_verifier.run_command", new_callable=AsyncMock)
     run_mock.side_effect = [
         ObjectLiteral(
             returncode=0,
@@ -481,6 +494,7 @@ async def test_desy_verifier_verify_bundle_at_desy_success_no_quarantine(config,
     opi_mock = mocker.patch("os.path.isfile", new_callable=MagicMock)
     opi_mock.return_value = True
     hash_mock = mocker.patch("lta.desy_verifier.sha512sum")
+    mocker.patch("lta.component.ProcessPoolExecutor", ThreadPoolExecutor)  # mocks can't be sent to another process
     hash_mock.return_value = "97de2a6ad728f50a381eb1be6ecf015019887fac27e8bf608334fb72caf8d3f654fdcce68c33b0f0f27de499b84e67b8357cd81ef7bba3cdaa9e23a648f43ad2"
     remove_mock = mocker.patch("os.remove", new_callable=MagicMock)
     lta_mock = mocker.MagicMock()
@@ -504,7 +518,7 @@ async def test_desy_verifier_verify_bundle_at_desy_fail_globus_url_copy(config,
             "sha512": "97de2a6ad728f50a381eb1be6ecf015019887fac27e8bf608334fb72caf8d3f654fdcce68c33b0f0f27de499b84e67b8357cd81ef7bba3cdaa9e23a648f43ad2",
         },
     }
-    run_mock = mocker.patch("lta.desy_verifier.run", new_callable=MagicMock)
+    run_mock = mocker.patch("lta.desy_verifier.run_command", new_callable=AsyncMock)
     run_mock.side_effect = [
         ObjectLiteral(
             returncode=1,
@@ -536,7 +550,7 @@ async def test_desy_verifier_verify_bundle_at_desy_fail_no_file(config, mocker):
             "sha512": "97de2a6ad728f50a381eb1be6ecf015019887fac27e8bf608334fb72caf8d3f654fdcce68c33b0f0f27de499b84e67b8357cd81ef7bba3cdaa9e23a648f43ad2",
         },
     }
-    run_mock = mocker.patch("lta.desy_verifier.run", new_callable=MagicMock)
+    run_mock = mocker.patch("lta.desy_verifier.run_command", new_callable=AsyncMock)
     run_mock.side_effect = [
         ObjectLiteral(
             returncode=0,
@@ -570,7 +584,7 @@ async def test_desy_verifier_verify_bundle_at_desy_fail_checksum_mismatch(config
             "sha512": "97de2a6ad728f50a381eb1be6ecf015019887fac27e8bf608334fb72caf8d3f654fdcce68c33b0f0f27de499b84e67b8357cd81ef7bba3cdaa9e23a648f43ad2",
         },
     }
-    run_mock = mocker.patch("lta.desy_verifier.run", new_callable=MagicMock)
+    run_mock = mocker.patch("lta.desy_verifier.run_command", new_callable=AsyncMock)
     run_mock.side_effect = [
         ObjectLiteral(
             returncode=0,
@@ -582,6 +596,7 @@ async def test_desy_verifier_verify_bundle_at_desy_fail_checksum_mismatch(config
     opi_mock = mocker.patch("os.path.isfile", new_callable=MagicMock)
     opi_mock.return_value = True
     hash_mock = mocker.patch("lta.desy_verifier.sha512sum")
+    mocker.patch("lta.component.ProcessPoolExecutor", ThreadPoolExecutor)  # mocks can't be sent to another process
     hash_mock.return_value = "bf608334fb72caf8d3f654fdcce68c33b0f0f27de499b84e67b8357cd81ef7bba3cdaa9e23a648f43ad297de2a6ad728f50a381eb1be6ecf015019887fac27e8"
     remove_mock = mocker.patch("os.remove", new_callable=MagicMock)
     lta_mock = mocker.MagicMock()
@@ -606,7 +621,7 @@ async def test_desy_verifier_verify_bundle_at_desy_fail_checksum_mismatch(config
 #             "sha512": "97de2a6ad728f50a381eb1be6ecf015019887fac27e8bf608334fb72caf8d3f654fdcce68c33b0f0f27de499b84e67b8357cd81ef7bba3cdaa9e23a648f43ad2",
 #         },
 #     }
-#     run_mock = mocker.patch("lta.desy_verifier.run", new_callable=MagicMock)
+#     run_mock = mocker.patch("lta.desy_verifier.run_command", new_callable=AsyncMock)
 #     run_mock.side_effect = [
 #         ObjectLiteral(
 #             returncode=1,
@@ -621,7 +636,7 @@ async def test_desy_verifier_verify_bundle_at_desy_fail_checksum_mismatch(config
 #     p = DesyVerifier(config, logger_mock)
 #     assert not await p._verify_bundle_in_hpss(lta_mock, bundle)
 #     assert run_mock.call_count == 1
-#     lta_rc_mock.assert_called_with('PATCH', '/Bundles/7ec8a8f9-fae3-4f25-ae54-c1f66014f5ef', mocker.ANY)
+#     lta_rc_mock.assert_called_with('PATCH', '/Bundles/7ec8a8f9-fae3-4f25-ae54-c1f66014f5ef?return=minimal', mocker.ANY)
 #
 # @pytest.mark.asyncio
 # async def test_desy_verifier_verify_bundle_in_hpss_mismatch_checksum_quarantine(config, mocker):
@@ -635,7 +650,7 @@ async def test_desy_verifier_verify_bundle_at_desy_fail_checksum_mismatch(config
 #             "sha512": "97de2a6ad728f50a381eb1be6ecf015019887fac27e8bf608334fb72caf8d3f654fdcce68c33b0f0f27de499b84e67b8357cd81ef7bba3cdaa9e23a648f43ad2",
 #         },
 #     }
-#     run_mock = mocker.patch("lta.desy_verifier.run", new_callable=MagicMock)
+#     run_mock = mocker.patch("lta.desy_verifier.run_command", new_callable=AsyncMock)
 #     run_mock.side_effect = [
 #         ObjectLiteral(
 #             returncode=0,
@@ -650,7 +665,7 @@ async def test_desy_verifier_verify_bundle_at_desy_fail_checksum_mismatch(config
 #     p = DesyVerifier(config, logger_mock)
 #     assert not await p._verify_bundle_in_hpss(lta_mock, bundle)
 #     assert run_mock.call_count == 1
-#     lta_rc_mock.assert_called_with('PATCH', '/Bundles/7ec8a8f9-fae3-4f25-ae54-c1f66014f5ef', mocker.ANY)
+#     lta_rc_mock.assert_called_with('PATCH', '/Bundles/7ec8a8f9-fae3-4f25-ae54-c1f66014f5ef?return=minimal', mocker.ANY)
 #
 # @pytest.mark.asyncio
 # async def test_desy_verifier_verify_bundle_in_hpss_failure_hashverify_quarantine(config, mocker):
@@ -664,7 +679,7 @@ async def test_desy_verifier_verify_bundle_at_desy_fail_checksum_mismatch(config
 #             "sha512": "97de2a6ad728f50a381eb1be6ecf015019887fac27e8bf608334fb72caf8d3f654fdcce68c33b0f0f27de499b84e67b8357cd81ef7bba3cdaa9e23a648f43ad2",
 #         },
 #     }
-#     run_mock = mocker.patch("lta.desy_verifier.run", new_callable=MagicMock)
+#     run_mock = mocker.patch("lta.desy_verifier.run_command", new_callable=AsyncMock)
 #     run_mock.side_effect = [
 #         ObjectLiteral(
 #             returncode=0,
@@ -685,7 +700,7 @@ async def test_desy_verifier_verify_bundle_at_desy_fail_checksum_mismatch(config
 #     p = DesyVerifier(config, logger_mock)
 #     assert not await p._verify_bundle_in_hpss(lta_mock, bundle)
 #     assert run_mock.call_count == 2
-#     lta_rc_mock.assert_called_with('PATCH', '/Bundles/7ec8a8f9-fae3-4f25-ae54-c1f66014f5ef', mocker.ANY)
+#     lta_rc_mock.assert_called_with('PATCH', '/Bundles/7ec8a8f9-fae3-4f25-ae54-c1f66014f5ef?return=minimal', mocker.ANY)
 #
 # @pytest.mark.asyncio
 # async def test_desy_verifier_verify_bundle_in_hpss_hashverify_bad_type_quarantine(config, mocker):
@@ -699,7 +714,7 @@ async def test_desy_verifier_verify_bundle_at_desy_fail_checksum_mismatch(config
 #             "sha512": "97de2a6ad728f50a381eb1be6ecf015019887fac27e8bf608334fb72caf8d3f654fdcce68c33b0f0f27de499b84e67b8357cd81ef7bba3cdaa9e23a648f43ad2",
 #         },
 #     }
-#     run_mock = mocker.patch("lta.desy_verifier.run", new_callable=MagicMock)
+#     run_mock = mocker.patch("lta.desy_verifier.run_command", new_callable=AsyncMock)
 #     run_mock.side_effect = [
 #         ObjectLiteral(
 #             returncode=0,
@@ -720,7 +735,7 @@ async def test_desy_verifier_verify_bundle_at_desy_fail_checksum_mismatch(config
 #     p = DesyVerifier(config, logger_mock)
 #     assert not await p._verify_bundle_in_hpss(lta_mock, bundle)
 #     assert run_mock.call_count == 2
-#     lta_rc_mock.assert_called_with('PATCH', '/Bundles/7ec8a8f9-fae3-4f25-ae54-c1f66014f5ef', mocker.ANY)
+#     lta_rc_mock.assert_called_with('PATCH', '/Bundles/7ec8a8f9-fae3-4f25-ae54-c1f66014f5ef?return=minimal', mocker.ANY)
 #
 # @pytest.mark.asyncio
 # async def test_desy_verifier_verify_bundle_in_hpss_hashverify_bad_result_quarantine(config, mocker):
@@ -734,7 +749,7 @@ async def test_desy_verifier_verify_bundle_at_desy_fail_checksum_mismatch(config
 #             "sha512": "97de2a6ad728f50a381eb1be6ecf015019887fac27e8bf608334fb72caf8d3f654fdcce68c33b0f0f27de499b84e67b8357cd81ef7bba3cdaa9e23a648f43ad2",
 #         },
 #     }
-#     run_mock = mocker.patch("lta.desy_verifier.run", new_callable=MagicMock)
+#     run_mock = mocker.patch("lta.desy_verifier.run_command", new_callable=AsyncMock)
 #     run_mock.side_effect = [
 #         ObjectLiteral(
 #             returncode=0,
@@ -755,4 +770,4 @@ async def test_desy_verifier_verify_bundle_at_desy_fail_checksum_mismatch(config
 #     p = DesyVerifier(config, logger_mock)
 #     assert not await p._verify_bundle_in_hpss(lta_mock, bundle)
 #     assert run_mock.call_count == 2
-#     lta_rc_mock.assert_called_with('PATCH', '/Bundles/7ec8a8f9-fae3-4f25-ae54-c1f66014f5ef', mocker.ANY)
+#     lta_rc_mock.assert_called_with('PATCH', '/Bundles/7ec8a8f9-fae3-4f25-ae54-c1f66014f5ef?return=minimal', mocker.ANY)
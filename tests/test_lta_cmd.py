@@ -1,9 +1,14 @@
 # test_lta_cmd.py
 """Unit tests for lta/lta_cmd.py."""
 
+from argparse import Namespace
+import json
+from unittest.mock import call
+
 import pytest  # type: ignore
 
-from lta.lta_cmd import normalize_path
+from lta.lta_cmd import bundle_archive, bundle_ls, bundle_update_status, EXIT_OK, normalize_path, request_archive, request_status
+from .test_util import AsyncMock
 
 
 def test_normalize_path() -> None:
@@ -17,3 +22,209 @@ def test_PATH_PREFIX_WHITELIST() -> None:
     """Test that normalize_path will enforce PATH_PREFIX_WHITELIST."""
     with pytest.raises(ValueError):
         normalize_path("/mnt/lfs7/exp/IceCube/2018/unbiased/PFRaw/1109")
+
+
+@pytest.mark.asyncio
+async def test_request_status_summary(capsys, mocker) -> None:
+    """Test that request status counts the bundles of a TransferRequest with the summary route."""
+    lta_rc_mock = mocker.MagicMock()
+    lta_rc_mock.request = AsyncMock()
+    lta_rc_mock.request.side_effect = [
+        {
+            "uuid": "c9a23a20-92d6-49eb-a63e-0f73ac632146",
+            "work_priority_timestamp": "2021-01-01T00:00:00",
+            "status": "processing",
+            "update_timestamp": "2021-01-02T00:00:00",
+            "claimed": False,
+            "source": "WIPAC",
+            "dest": "NERSC",
+            "path": "/data/exp/IceCube/2013/filtered/PFFilt/1109",
+        },
+        {
+            "results": [
+                {"status": "created", "count": 2, "size": 2048, "oldest_update_timestamp": "2021-01-03T00:00:00"},
+                {"status": "finished", "count": 1, "size": 1024, "oldest_update_timestamp": "2021-01-04T00:00:00"},
+            ]
+        },
+    ]
+    args = Namespace(di={"lta_rc": lta_rc_mock},
+                     uuid="c9a23a20-92d6-49eb-a63e-0f73ac632146",
+                     contents=False,
+                     json=False)
+    assert await request_status(args) == EXIT_OK
+    lta_rc_mock.request.assert_has_calls([
+        call("GET", "/TransferRequests/c9a23a20-92d6-49eb-a63e-0f73ac632146"),
+        call("GET", "/Bundles/actions/summary?request=c9a23a20-92d6-49eb-a63e-0f73ac632146&group_by=status"),
+    ])
+    out = capsys.readouterr().out
+    assert "    Bundles: 3" in out
+    assert "        created: 2 (2K) since 2021-01-03 00:00:00" in out
+    assert "        finished: 1 (1K) since 2021-01-04 00:00:00" in out
+
+
+@pytest.mark.asyncio
+async def test_bundle_update_status_old_status(mocker) -> None:
+    """Test that bundle update-status --old-status moves the bundle with the transition route."""
+    mocker.patch("lta.lta_cmd.now", return_value="2021-01-05T00:00:00")
+    lta_rc_mock = mocker.MagicMock()
+    lta_rc_mock.request = AsyncMock()
+    args = Namespace(di={"lta_rc": lta_rc_mock},
+                     uuid="4e7cae5c-8d6f-4bb9-bb3b-1f6a3c2a4a5e",
+                     new_status="specified",
+                     old_status="quarantined",
+                     keep_claim=False,
+                     keep_priority=True)
+    assert await bundle_update_status(args) == EXIT_OK
+    lta_rc_mock.request.assert_called_with("POST", "/Bundles/4e7cae5c-8d6f-4bb9-bb3b-1f6a3c2a4a5e/actions/transition", {
+        "from_status": "quarantined",
+        "to_status": "specified",
+        "update": {
+            "reason": "",
+            "update_timestamp": "2021-01-05T00:00:00",
+            "claimed": False,
+        },
+    })
+
+
+@pytest.mark.asyncio
+async def test_bundle_update_status_without_old_status(mocker) -> None:
+    """Test that bundle update-status without --old-status still PATCHes the bundle."""
+    mocker.patch("lta.lta_cmd.now", return_value="2021-01-05T00:00:00")
+    lta_rc_mock = mocker.MagicMock()
+    lta_rc_mock.request = AsyncMock()
+    args = Namespace(di={"lta_rc": lta_rc_mock},
+                     uuid="4e7cae5c-8d6f-4bb9-bb3b-1f6a3c2a4a5e",
+                     new_status="specified",
+                     old_status=None,
+                     keep_claim=True,
+                     keep_priority=False)
+    assert await bundle_update_status(args) == EXIT_OK
+    lta_rc_mock.request.assert_called_with("PATCH", "/Bundles/4e7cae5c-8d6f-4bb9-bb3b-1f6a3c2a4a5e", {
+        "status": "specified",
+        "reason": "",
+        "update_timestamp": "2021-01-05T00:00:00",
+        "work_priority_timestamp": "2021-01-05T00:00:00",
+    })
+
+
+@pytest.mark.asyncio
+async def test_bundle_ls(capsys, mocker) -> None:
+    """Test that bundle ls lists the uuids of the bundles."""
+    lta_rc_mock = mocker.MagicMock()
+    lta_rc_mock.request = AsyncMock()
+    lta_rc_mock.request.return_value = {
+        "results": ["8f03a920-49d6-446b-811e-830e3f7942f5", "90a664cc-e3f9-4421-973f-7bc4a0c2c5b0"],
+    }
+    args = Namespace(di={"lta_rc": lta_rc_mock}, json=False, show_status=False)
+    assert await bundle_ls(args) == EXIT_OK
+    lta_rc_mock.request.assert_called_with("GET", "/Bundles")
+    out = capsys.readouterr().out
+    assert out == "total 2\nBundle 8f03a920-49d6-446b-811e-830e3f7942f5\nBundle 90a664cc-e3f9-4421-973f-7bc4a0c2c5b0\n"
+
+
+@pytest.mark.asyncio
+async def test_bundle_ls_status_json(capsys, mocker) -> None:
+    """Test that bundle ls --status --json still prints the uuid list, and --status lists statuses from one query."""
+    uuids = ["8f03a920-49d6-446b-811e-830e3f7942f5", "90a664cc-e3f9-4421-973f-7bc4a0c2c5b0"]
+    results = [
+        {"uuid": "8f03a920-49d6-446b-811e-830e3f7942f5", "status": "created"},
+        {"uuid": "90a664cc-e3f9-4421-973f-7bc4a0c2c5b0", "status": "finished"},
+    ]
+    lta_rc_mock = mocker.MagicMock()
+    lta_rc_mock.request = AsyncMock()
+    lta_rc_mock.request.return_value = {"results": uuids}
+    args = Namespace(di={"lta_rc": lta_rc_mock}, json=True, show_status=True)
+    assert await bundle_ls(args) == EXIT_OK
+    lta_rc_mock.request.assert_called_once_with("GET", "/Bundles")
+    assert json.loads(capsys.readouterr().out) == {"results": uuids}
+
+    # without --json, each bundle is listed with its status
+    lta_rc_mock.request.reset_mock()
+    lta_rc_mock.request.return_value = {"results": results}
+    args = Namespace(di={"lta_rc": lta_rc_mock}, json=False, show_status=True)
+    assert await bundle_ls(args) == EXIT_OK
+    lta_rc_mock.request.assert_called_once_with("GET", "/Bundles?fields=status")
+    out = capsys.readouterr().out
+    assert out == "total 2\nBundle 8f03a920-49d6-446b-811e-830e3f7942f5 created\nBundle 90a664cc-e3f9-4421-973f-7bc4a0c2c5b0 finished\n"
+
+
+@pytest.mark.asyncio
+async def test_request_status_contents_bulk_get(capsys, mocker) -> None:
+    """Test that request status --contents reads the bundles of a TransferRequest with one bulk_get."""
+    lta_rc_mock = mocker.MagicMock()
+    lta_rc_mock.request = AsyncMock()
+    lta_rc_mock.request.side_effect = [
+        {
+            "uuid": "c9a23a20-92d6-49eb-a63e-0f73ac632146",
+            "work_priority_timestamp": "2021-01-01T00:00:00",
+            "status": "processing",
+            "update_timestamp": "2021-01-02T00:00:00",
+            "claimed": False,
+            "source": "WIPAC",
+            "dest": "NERSC",
+            "path": "/data/exp/IceCube/2013/filtered/PFFilt/1109",
+        },
+        {
+            "results": ["8f03a920-49d6-446b-811e-830e3f7942f5"],
+        },
+        {
+            "bundles": [
+                {
+                    "uuid": "8f03a920-49d6-446b-811e-830e3f7942f5",
+                    "status": "created",
+                    "update_timestamp": "2021-01-03T00:00:00",
+                    "claimed": False,
+                    "file_count": 42,
+                },
+            ],
+            "count": 1,
+        },
+    ]
+    args = Namespace(di={"lta_rc": lta_rc_mock},
+                     uuid="c9a23a20-92d6-49eb-a63e-0f73ac632146",
+                     contents=True,
+                     json=False)
+    assert await request_status(args) == EXIT_OK
+    assert lta_rc_mock.request.call_count == 3
+    assert lta_rc_mock.request.call_args_list[1] == call("GET", "/Bundles?request=c9a23a20-92d6-49eb-a63e-0f73ac632146")
+    method, route, body = lta_rc_mock.request.call_args_list[2][0]
+    assert (method, route) == ("POST", "/Bundles/actions/bulk_get")
+    assert body["bundles"] == ["8f03a920-49d6-446b-811e-830e3f7942f5"]
+    assert "file_count" in body["fields"]
+    out = capsys.readouterr().out
+    assert "        Bundle 8f03a920-49d6-446b-811e-830e3f7942f5" in out
+    assert "            Files: 42" in out
+
+
+@pytest.mark.asyncio
+async def test_bundle_archive(capsys, mocker) -> None:
+    """Test that bundle archive asks for batches until there is nothing left to archive."""
+    lta_rc_mock = mocker.MagicMock()
+    lta_rc_mock.request = AsyncMock()
+    lta_rc_mock.request.side_effect = [
+        {"uuids": ["8f03a920-49d6-446b-811e-830e3f7942f5", "90a664cc-e3f9-4421-973f-7bc4a0c2c5b0"], "count": 2},
+        {"uuids": ["a1b6e6c8-6c7a-4a43-9d6e-1c9c0f1f8d3b"], "count": 1},
+        {"uuids": [], "count": 0},
+    ]
+    args = Namespace(di={"lta_rc": lta_rc_mock}, days=45, verbose=True)
+    assert await bundle_archive(args) == EXIT_OK
+    assert lta_rc_mock.request.call_args_list == [call("POST", "/Bundles/actions/archive", {"days": 45})] * 3
+    out = capsys.readouterr().out
+    assert "archived Bundles 8f03a920-49d6-446b-811e-830e3f7942f5\n" in out
+    assert "archived Bundles a1b6e6c8-6c7a-4a43-9d6e-1c9c0f1f8d3b\n" in out
+    assert out.endswith("archived 3 Bundles\n")
+
+
+@pytest.mark.asyncio
+async def test_request_archive(capsys, mocker) -> None:
+    """Test that request archive archives TransferRequests and only reports the total without --verbose."""
+    lta_rc_mock = mocker.MagicMock()
+    lta_rc_mock.request = AsyncMock()
+    lta_rc_mock.request.side_effect = [
+        {"uuids": ["c9a23a20-92d6-49eb-a63e-0f73ac632146"], "count": 1},
+        {"uuids": [], "count": 0},
+    ]
+    args = Namespace(di={"lta_rc": lta_rc_mock}, days=30, verbose=False)
+    assert await request_archive(args) == EXIT_OK
+    assert lta_rc_mock.request.call_args_list == [call("POST", "/TransferRequests/actions/archive", {"days": 30})] * 2
+    assert capsys.readouterr().out == "archived 1 TransferRequests\n"
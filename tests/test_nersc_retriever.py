@@ -1,7 +1,7 @@
 # test_nersc_retriever.py
 """Unit tests for lta/nersc_retriever.py."""
 
-from unittest.mock import call, MagicMock
+from unittest.mock import call
 
 import pytest  # type: ignore
 from tornado.web import HTTPError  # type: ignore
@@ -17,6 +17,7 @@ def config():
         "HEARTBEAT_PATCH_RETRIES": "3",
         "HEARTBEAT_PATCH_TIMEOUT_SECONDS": "30",
         "HEARTBEAT_SLEEP_DURATION_SECONDS": "60",
+        "LOOP_STALL_LOG_SECONDS": "0",
         "LTA_REST_TOKEN": "fake-lta-rest-token",
         "LTA_REST_URL": "http://RmMNHdPhHpH2ZxfaFAC9d2jiIbf5pZiHDqy43rFLQiM.com/",
         "MAX_COUNT": "5",
@@ -24,8 +25,11 @@ def config():
         "RUN_ONCE_AND_DIE": "False",
         "SOURCE_SITE": "WIPAC",
         "TAPE_BASE_PATH": "/path/to/hpss",
+        "WORK_BYTES_IN_FLIGHT": "0",
+        "WORK_CONCURRENCY": "1",
         "WORK_RETRIES": "3",
         "WORK_SLEEP_DURATION_SECONDS": "60",
+        "WORK_SLEEP_MIN_DURATION_SECONDS": "5",
         "WORK_TIMEOUT_SECONDS": "30",
     }
 
@@ -129,6 +133,7 @@ async def test_nersc_retriever_logs_configuration(mocker):
         "HEARTBEAT_PATCH_RETRIES": "1",
         "HEARTBEAT_PATCH_TIMEOUT_SECONDS": "20",
         "HEARTBEAT_SLEEP_DURATION_SECONDS": "30",
+        "LOOP_STALL_LOG_SECONDS": "0",
         "LTA_REST_TOKEN": "logme-fake-lta-rest-token",
         "LTA_REST_URL": "logme-http://RmMNHdPhHpH2ZxfaFAC9d2jiIbf5pZiHDqy43rFLQiM.com/",
         "MAX_COUNT": "9001",
@@ -136,8 +141,11 @@ async def test_nersc_retriever_logs_configuration(mocker):
         "RUN_ONCE_AND_DIE": "False",
         "SOURCE_SITE": "NERSC",
         "TAPE_BASE_PATH": "/log/me/path/to/hpss",
+        "WORK_BYTES_IN_FLIGHT": "0",
+        "WORK_CONCURRENCY": "1",
         "WORK_RETRIES": "5",
         "WORK_SLEEP_DURATION_SECONDS": "70",
+        "WORK_SLEEP_MIN_DURATION_SECONDS": "5",
         "WORK_TIMEOUT_SECONDS": "90",
     }
     NerscRetriever(nersc_retriever_config, logger_mock)
@@ -147,6 +155,7 @@ async def test_nersc_retriever_logs_configuration(mocker):
         call('HEARTBEAT_PATCH_RETRIES = 1'),
         call('HEARTBEAT_PATCH_TIMEOUT_SECONDS = 20'),
         call('HEARTBEAT_SLEEP_DURATION_SECONDS = 30'),
+        call('LOOP_STALL_LOG_SECONDS = 0'),
         call('LTA_REST_TOKEN = logme-fake-lta-rest-token'),
         call('LTA_REST_URL = logme-http://RmMNHdPhHpH2ZxfaFAC9d2jiIbf5pZiHDqy43rFLQiM.com/'),
         call('MAX_COUNT = 9001'),
@@ -154,8 +163,11 @@ async def test_nersc_retriever_logs_configuration(mocker):
         call('RUN_ONCE_AND_DIE = False'),
         call('SOURCE_SITE = NERSC'),
         call('TAPE_BASE_PATH = /log/me/path/to/hpss'),
+        call('WORK_BYTES_IN_FLIGHT = 0'),
+        call('WORK_CONCURRENCY = 1'),
         call('WORK_RETRIES = 5'),
         call('WORK_SLEEP_DURATION_SECONDS = 70'),
+        call('WORK_SLEEP_MIN_DURATION_SECONDS = 5'),
         call('WORK_TIMEOUT_SECONDS = 90')
     ]
     logger_mock.info.assert_has_calls(EXPECTED_LOGGER_CALLS)
@@ -210,7 +222,7 @@ async def test_nersc_retriever_do_work_yes_results(config, mocker):
 async def test_nersc_retriever_hpss_not_available(config, mocker):
     """Test that a bad returncode on hpss_avail will prevent work."""
     logger_mock = mocker.MagicMock()
-    run_mock = mocker.patch("lta.nersc_retriever.run", new_callable=MagicMock)
+    run_mock = mocker.patch("lta.nersc_retriever.run_command", new_callable=AsyncMock)
     run_mock.return_value = ObjectLiteral(
         returncode=1,
         args=["/usr/common/mss/bin/hpss_avail", "archive"],
@@ -225,7 +237,7 @@ async def test_nersc_retriever_hpss_not_available(config, mocker):
 async def test_nersc_retriever_do_work_pop_exception(config, mocker):
     """Test that _do_work raises when the RestClient can't pop."""
     logger_mock = mocker.MagicMock()
-    run_mock = mocker.patch("lta.nersc_retriever.run", new_callable=MagicMock)
+    run_mock = mocker.patch("lta.nersc_retriever.run_command", new_callable=AsyncMock)
     run_mock.return_value = ObjectLiteral(
         returncode=0,
         args=["/usr/common/mss/bin/hpss_avail", "archive"],
@@ -239,14 +251,14 @@ async def test_nersc_retriever_do_work_pop_exception(config, mocker):
     p = NerscRetriever(config, logger_mock)
     with pytest.raises(HTTPError):
         await p._do_work()
-    lta_rc_mock.assert_called_with("POST", '/Bundles/actions/pop?dest=WIPAC&status=located', {'claimant': f'{p.name}-{p.instance_uuid}'})
+    lta_rc_mock.assert_called_with("POST", '/Bundles/actions/pop?dest=WIPAC&status=located&contents=false&wait=15', {'claimant': f'{p.name}-{p.instance_uuid}'})
 
 
 @pytest.mark.asyncio
 async def test_nersc_retriever_do_work_claim_no_result(config, mocker):
     """Test that _do_work_claim does not work when the LTA DB has no work."""
     logger_mock = mocker.MagicMock()
-    run_mock = mocker.patch("lta.nersc_retriever.run", new_callable=MagicMock)
+    run_mock = mocker.patch("lta.nersc_retriever.run_command", new_callable=AsyncMock)
     run_mock.return_value = ObjectLiteral(
         returncode=0,
         args=["/usr/common/mss/bin/hpss_avail", "archive"],
@@ -262,7 +274,7 @@ async def test_nersc_retriever_do_work_claim_no_result(config, mocker):
     wbth_mock = mocker.patch("lta.nersc_retriever.NerscRetriever._read_bundle_from_hpss", new_callable=AsyncMock)
     p = NerscRetriever(config, logger_mock)
     await p._do_work_claim()
-    lta_rc_mock.assert_called_with("POST", '/Bundles/actions/pop?dest=WIPAC&status=located', {'claimant': f'{p.name}-{p.instance_uuid}'})
+    lta_rc_mock.assert_called_with("POST", '/Bundles/actions/pop?dest=WIPAC&status=located&contents=false&wait=15', {'claimant': f'{p.name}-{p.instance_uuid}'})
     wbth_mock.assert_not_called()
 
 
@@ -270,7 +282,7 @@ async def test_nersc_retriever_do_work_claim_no_result(config, mocker):
 async def test_nersc_retriever_do_work_claim_yes_result(config, mocker):
     """Test that _do_work_claim processes the Bundle it gets from the LTA DB."""
     logger_mock = mocker.MagicMock()
-    run_mock = mocker.patch("lta.nersc_retriever.run", new_callable=MagicMock)
+    run_mock = mocker.patch("lta.nersc_retriever.run_command", new_callable=AsyncMock)
     run_mock.return_value = ObjectLiteral(
         returncode=0,
         args=["/usr/common/mss/bin/hpss_avail", "archive"],
@@ -288,7 +300,7 @@ async def test_nersc_retriever_do_work_claim_yes_result(config, mocker):
     wbth_mock = mocker.patch("lta.nersc_retriever.NerscRetriever._read_bundle_from_hpss", new_callable=AsyncMock)
     p = NerscRetriever(config, logger_mock)
     await p._do_work_claim()
-    lta_rc_mock.assert_called_with("POST", '/Bundles/actions/pop?dest=WIPAC&status=located', {'claimant': f'{p.name}-{p.instance_uuid}'})
+    lta_rc_mock.assert_called_with("POST", '/Bundles/actions/pop?dest=WIPAC&status=located&contents=false&wait=15', {'claimant': f'{p.name}-{p.instance_uuid}'})
     wbth_mock.assert_called_with(mocker.ANY, {"one": 1})
 
 
@@ -296,7 +308,7 @@ async def test_nersc_retriever_do_work_claim_yes_result(config, mocker):
 async def test_nersc_retriever_do_work_claim_write_bundle_raise_exception(config, mocker):
     """Test that _do_work_claim will quarantine a bundle if an exception occurs."""
     logger_mock = mocker.MagicMock()
-    run_mock = mocker.patch("lta.nersc_retriever.run", new_callable=MagicMock)
+    run_mock = mocker.patch("lta.nersc_retriever.run_command", new_callable=AsyncMock)
     run_mock.return_value = ObjectLiteral(
         returncode=0,
         args=["/usr/common/mss/bin/hpss_avail", "archive"],
@@ -316,7 +328,7 @@ async def test_nersc_retriever_do_work_claim_write_bundle_raise_exception(config
     wbth_mock.side_effect = Exception("BAD THING HAPPEN!")
     p = NerscRetriever(config, logger_mock)
     assert not await p._do_work_claim()
-    lta_rc_mock.assert_called_with("PATCH", '/Bundles/8f03a920-49d6-446b-811e-830e3f7942f5', mocker.ANY)
+    lta_rc_mock.assert_called_with("PATCH", '/Bundles/8f03a920-49d6-446b-811e-830e3f7942f5?return=minimal', mocker.ANY)
     wbth_mock.assert_called_with(mocker.ANY, {"uuid": "8f03a920-49d6-446b-811e-830e3f7942f5"})
 
 
@@ -324,7 +336,7 @@ async def test_nersc_retriever_do_work_claim_write_bundle_raise_exception(config
 async def test_nersc_retriever_read_bundle_from_hpss_hsi_get(config, mocker):
     """Test that _read_bundle_from_hpss executes an HSI command to read the file from tape."""
     logger_mock = mocker.MagicMock()
-    run_mock = mocker.patch("lta.nersc_retriever.run", new_callable=MagicMock)
+    run_mock = mocker.patch("lta.nersc_retriever.run_command", new_callable=AsyncMock)
     run_mock.return_value = ObjectLiteral(
         returncode=0,
         args=["/usr/common/mss/bin/hpss_avail", "archive"],
@@ -349,14 +361,14 @@ async def test_nersc_retriever_read_bundle_from_hpss_hsi_get(config, mocker):
     p = NerscRetriever(config, logger_mock)
     await p._do_work_claim()
     ehc_mock.assert_called_with(lta_rc_mock, mocker.ANY, ['/usr/common/mss/bin/hsi', 'get', '-c', 'on', '/path/to/rse/398ca1ed-0178-4333-a323-8b9158c3dd88.zip', ':', '/path/to/hpss/data/exp/IceCube/2019/filtered/PFFilt/1109/398ca1ed-0178-4333-a323-8b9158c3dd88.zip'])
-    lta_rc_mock.assert_called_with("PATCH", '/Bundles/398ca1ed-0178-4333-a323-8b9158c3dd88', mocker.ANY)
+    lta_rc_mock.assert_called_with("PATCH", '/Bundles/398ca1ed-0178-4333-a323-8b9158c3dd88?return=minimal', mocker.ANY)
 
 
 @pytest.mark.asyncio
 async def test_nersc_retriever_read_bundle_from_hpss(config, mocker):
     """Test that _read_bundle_from_hpss updates the LTA DB after success."""
     logger_mock = mocker.MagicMock()
-    run_mock = mocker.patch("lta.nersc_retriever.run", new_callable=MagicMock)
+    run_mock = mocker.patch("lta.nersc_retriever.run_command", new_callable=AsyncMock)
     run_mock.return_value = ObjectLiteral(
         returncode=0,
         args=["/usr/common/mss/bin/hpss_avail", "archive"],
@@ -381,14 +393,14 @@ async def test_nersc_retriever_read_bundle_from_hpss(config, mocker):
     p = NerscRetriever(config, logger_mock)
     await p._do_work_claim()
     ehc_mock.assert_called_with(lta_rc_mock, mocker.ANY, ['/usr/common/mss/bin/hsi', 'get', '-c', 'on', '/path/to/rse/398ca1ed-0178-4333-a323-8b9158c3dd88.zip', ':', '/path/to/hpss/data/exp/IceCube/2019/filtered/PFFilt/1109/398ca1ed-0178-4333-a323-8b9158c3dd88.zip'])
-    lta_rc_mock.assert_called_with("PATCH", '/Bundles/398ca1ed-0178-4333-a323-8b9158c3dd88', mocker.ANY)
+    lta_rc_mock.assert_called_with("PATCH", '/Bundles/398ca1ed-0178-4333-a323-8b9158c3dd88?return=minimal', mocker.ANY)
 
 
 @pytest.mark.asyncio
 async def test_nersc_retriever_execute_hsi_command_failed(config, mocker):
     """Test that _execute_hsi_command will PATCH a bundle to quarantine on failure."""
     logger_mock = mocker.MagicMock()
-    run_mock = mocker.patch("lta.nersc_retriever.run", new_callable=MagicMock)
+    run_mock = mocker.patch("lta.nersc_retriever.run_command", new_callable=AsyncMock)
     run_mock.side_effect = [
         ObjectLiteral(
             returncode=0,
@@ -418,14 +430,14 @@ async def test_nersc_retriever_execute_hsi_command_failed(config, mocker):
     ]
     p = NerscRetriever(config, logger_mock)
     await p._do_work_claim()
-    lta_rc_mock.assert_called_with("PATCH", '/Bundles/398ca1ed-0178-4333-a323-8b9158c3dd88', mocker.ANY)
+    lta_rc_mock.assert_called_with("PATCH", '/Bundles/398ca1ed-0178-4333-a323-8b9158c3dd88?return=minimal', mocker.ANY)
 
 
 @pytest.mark.asyncio
 async def test_nersc_retriever_execute_hsi_command_success(config, mocker):
     """Test that _execute_hsi_command will PATCH a bundle to quarantine on failure."""
     logger_mock = mocker.MagicMock()
-    run_mock = mocker.patch("lta.nersc_retriever.run", new_callable=MagicMock)
+    run_mock = mocker.patch("lta.nersc_retriever.run_command", new_callable=AsyncMock)
     run_mock.side_effect = [
         ObjectLiteral(
             returncode=0,
@@ -452,4 +464,4 @@ async def test_nersc_retriever_execute_hsi_command_success(config, mocker):
     ]
     p = NerscRetriever(config, logger_mock)
     await p._do_work_claim()
-    lta_rc_mock.assert_called_with("PATCH", '/Bundles/398ca1ed-0178-4333-a323-8b9158c3dd88', mocker.ANY)
+    lta_rc_mock.assert_called_with("PATCH", '/Bundles/398ca1ed-0178-4333-a323-8b9158c3dd88?return=minimal', mocker.ANY)
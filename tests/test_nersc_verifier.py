@@ -1,7 +1,7 @@
 # test_nersc_verifier.py
 """Unit tests for lta/nersc_verifier.py."""
 
-from unittest.mock import call, MagicMock
+from unittest.mock import call
 
 import pytest  # type: ignore
 from tornado.web import HTTPError  # type: ignore
@@ -19,13 +19,17 @@ def config():
         "HEARTBEAT_PATCH_RETRIES": "3",
         "HEARTBEAT_PATCH_TIMEOUT_SECONDS": "30",
         "HEARTBEAT_SLEEP_DURATION_SECONDS": "60",
+        "LOOP_STALL_LOG_SECONDS": "0",
         "LTA_REST_TOKEN": "fake-lta-rest-token",
         "LTA_REST_URL": "http://RmMNHdPhHpH2ZxfaFAC9d2jiIbf5pZiHDqy43rFLQiM.com/",
         "TAPE_BASE_PATH": "/path/to/hpss",
         "RUN_ONCE_AND_DIE": "False",
         "SOURCE_SITE": "WIPAC",
+        "WORK_BYTES_IN_FLIGHT": "0",
+        "WORK_CONCURRENCY": "1",
         "WORK_RETRIES": "3",
         "WORK_SLEEP_DURATION_SECONDS": "60",
+        "WORK_SLEEP_MIN_DURATION_SECONDS": "5",
         "WORK_TIMEOUT_SECONDS": "30",
     }
 
@@ -176,13 +180,17 @@ async def test_nersc_verifier_logs_configuration(mocker):
         "HEARTBEAT_PATCH_RETRIES": "1",
         "HEARTBEAT_PATCH_TIMEOUT_SECONDS": "20",
         "HEARTBEAT_SLEEP_DURATION_SECONDS": "30",
+        "LOOP_STALL_LOG_SECONDS": "0",
         "LTA_REST_TOKEN": "logme-fake-lta-rest-token",
         "LTA_REST_URL": "logme-http://RmMNHdPhHpH2ZxfaFAC9d2jiIbf5pZiHDqy43rFLQiM.com/",
         "RUN_ONCE_AND_DIE": "False",
         "SOURCE_SITE": "WIPAC",
         "TAPE_BASE_PATH": "/logme/path/to/hpss",
+        "WORK_BYTES_IN_FLIGHT": "0",
+        "WORK_CONCURRENCY": "1",
         "WORK_RETRIES": "5",
         "WORK_SLEEP_DURATION_SECONDS": "70",
+        "WORK_SLEEP_MIN_DURATION_SECONDS": "5",
         "WORK_TIMEOUT_SECONDS": "90",
     }
     NerscVerifier(nersc_verifier_config, logger_mock)
@@ -194,13 +202,17 @@ async def test_nersc_verifier_logs_configuration(mocker):
         call('HEARTBEAT_PATCH_RETRIES = 1'),
         call('HEARTBEAT_PATCH_TIMEOUT_SECONDS = 20'),
         call('HEARTBEAT_SLEEP_DURATION_SECONDS = 30'),
+        call('LOOP_STALL_LOG_SECONDS = 0'),
         call('LTA_REST_TOKEN = logme-fake-lta-rest-token'),
         call('LTA_REST_URL = logme-http://RmMNHdPhHpH2ZxfaFAC9d2jiIbf5pZiHDqy43rFLQiM.com/'),
         call('RUN_ONCE_AND_DIE = False'),
         call('SOURCE_SITE = WIPAC'),
         call('TAPE_BASE_PATH = /logme/path/to/hpss'),
+        call('WORK_BYTES_IN_FLIGHT = 0'),
+        call('WORK_CONCURRENCY = 1'),
         call('WORK_RETRIES = 5'),
         call('WORK_SLEEP_DURATION_SECONDS = 70'),
+        call('WORK_SLEEP_MIN_DURATION_SECONDS = 5'),
         call('WORK_TIMEOUT_SECONDS = 90')
     ]
     logger_mock.info.assert_has_calls(EXPECTED_LOGGER_CALLS)
@@ -250,7 +262,7 @@ async def test_nersc_verifier_run_exception(config, mocker):
 async def test_nersc_verifier_hpss_not_available(config, mocker):
     """Test that a bad returncode on hpss_avail will prevent work."""
     logger_mock = mocker.MagicMock()
-    run_mock = mocker.patch("lta.nersc_verifier.run", new_callable=MagicMock)
+    run_mock = mocker.patch("lta.nersc_verifier.run_command", new_callable=AsyncMock)
     run_mock.return_value = ObjectLiteral(
         returncode=1,
         args=["/usr/common/mss/bin/hpss_avail", "archive"],
@@ -264,7 +276,7 @@ async def test_nersc_verifier_hpss_not_available(config, mocker):
 async def test_nersc_verifier_do_work_pop_exception(config, mocker):
     """Test that _do_work raises when the RestClient can't pop."""
     logger_mock = mocker.MagicMock()
-    run_mock = mocker.patch("lta.nersc_verifier.run", new_callable=MagicMock)
+    run_mock = mocker.patch("lta.nersc_verifier.run_command", new_callable=AsyncMock)
     run_mock.side_effect = [
         ObjectLiteral(
             returncode=0,
@@ -284,7 +296,7 @@ async def test_nersc_verifier_do_work_pop_exception(config, mocker):
     p = NerscVerifier(config, logger_mock)
     with pytest.raises(HTTPError):
         await p._do_work()
-    lta_rc_mock.assert_called_with("POST", '/Bundles/actions/pop?dest=NERSC&status=verifying', {'claimant': f'{p.name}-{p.instance_uuid}'})
+    lta_rc_mock.assert_called_with("POST", '/Bundles/actions/pop?dest=NERSC&status=verifying&wait=15', {'claimant': f'{p.name}-{p.instance_uuid}'})
 
 @pytest.mark.asyncio
 async def test_nersc_verifier_do_work_no_results(config, mocker):
@@ -310,7 +322,7 @@ async def test_nersc_verifier_do_work_yes_results(config, mocker):
 async def test_nersc_verifier_do_work_claim_no_result(config, mocker):
     """Test that _do_work_claim does not work when the LTA DB has no work."""
     logger_mock = mocker.MagicMock()
-    run_mock = mocker.patch("lta.nersc_verifier.run", new_callable=MagicMock)
+    run_mock = mocker.patch("lta.nersc_verifier.run_command", new_callable=AsyncMock)
     run_mock.side_effect = [
         ObjectLiteral(
             returncode=0,
@@ -332,14 +344,14 @@ async def test_nersc_verifier_do_work_claim_no_result(config, mocker):
     vbih_mock = mocker.patch("lta.nersc_verifier.NerscVerifier._verify_bundle_in_hpss", new_callable=AsyncMock)
     p = NerscVerifier(config, logger_mock)
     await p._do_work_claim()
-    lta_rc_mock.assert_called_with("POST", '/Bundles/actions/pop?dest=NERSC&status=verifying', {'claimant': f'{p.name}-{p.instance_uuid}'})
+    lta_rc_mock.assert_called_with("POST", '/Bundles/actions/pop?dest=NERSC&status=verifying&wait=15', {'claimant': f'{p.name}-{p.instance_uuid}'})
     vbih_mock.assert_not_called()
 
 @pytest.mark.asyncio
 async def test_nersc_verifier_do_work_claim_yes_result(config, mocker):
     """Test that _do_work_claim processes the Bundle that it gets from the LTA DB."""
     logger_mock = mocker.MagicMock()
-    run_mock = mocker.patch("lta.nersc_verifier.run", new_callable=MagicMock)
+    run_mock = mocker.patch("lta.nersc_verifier.run_command", new_callable=AsyncMock)
     run_mock.side_effect = [
         ObjectLiteral(
             returncode=0,
@@ -364,14 +376,14 @@ async def test_nersc_verifier_do_work_claim_yes_result(config, mocker):
     vbih_mock.return_value = False
     p = NerscVerifier(config, logger_mock)
     assert await p._do_work_claim()
-    lta_rc_mock.assert_called_with("POST", '/Bundles/actions/pop?dest=NERSC&status=verifying', {'claimant': f'{p.name}-{p.instance_uuid}'})
+    lta_rc_mock.assert_called_with("POST", '/Bundles/actions/pop?dest=NERSC&status=verifying&wait=15', {'claimant': f'{p.name}-{p.instance_uuid}'})
     vbih_mock.assert_called_with(mocker.ANY, {"one": 1})
 
 @pytest.mark.asyncio
 async def test_nersc_verifier_do_work_claim_yes_result_update_fc_and_lta(config, mocker):
     """Test that _do_work_claim processes the Bundle that it gets from the LTA DB."""
     logger_mock = mocker.MagicMock()
-    run_mock = mocker.patch("lta.nersc_verifier.run", new_callable=MagicMock)
+    run_mock = mocker.patch("lta.nersc_verifier.run_command", new_callable=AsyncMock)
     run_mock.side_effect = [
         ObjectLiteral(
             returncode=0,
@@ -398,7 +410,7 @@ async def test_nersc_verifier_do_work_claim_yes_result_update_fc_and_lta(config,
     ubild_mock = mocker.patch("lta.nersc_verifier.NerscVerifier._update_bundle_in_lta_db", new_callable=AsyncMock)
     p = NerscVerifier(config, logger_mock)
     assert await p._do_work_claim()
-    lta_rc_mock.assert_called_with("POST", '/Bundles/actions/pop?dest=NERSC&status=verifying', {'claimant': f'{p.name}-{p.instance_uuid}'})
+    lta_rc_mock.assert_called_with("POST", '/Bundles/actions/pop?dest=NERSC&status=verifying&wait=15', {'claimant': f'{p.name}-{p.instance_uuid}'})
     vbih_mock.assert_called_with(mocker.ANY, {"one": 1})
     abtfc_mock.assert_called_with({"one": 1})
     ubild_mock.assert_called_with(mocker.ANY, {"one": 1})
@@ -407,7 +419,7 @@ async def test_nersc_verifier_do_work_claim_yes_result_update_fc_and_lta(config,
 async def test_nersc_verifier_do_work_claim_exception_caught(config, mocker):
     """Test that _do_work_claim quarantines a Bundle if it catches an Exception."""
     logger_mock = mocker.MagicMock()
-    run_mock = mocker.patch("lta.nersc_verifier.run", new_callable=MagicMock)
+    run_mock = mocker.patch("lta.nersc_verifier.run_command", new_callable=AsyncMock)
     run_mock.side_effect = [
         ObjectLiteral(
             returncode=0,
@@ -436,7 +448,7 @@ async def test_nersc_verifier_do_work_claim_exception_caught(config, mocker):
     vbih_mock.side_effect = Exception("Database totally on fire, guys")
     p = NerscVerifier(config, logger_mock)
     assert not await p._do_work_claim()
-    lta_rc_mock.assert_called_with("PATCH", '/Bundles/45ae2ad39c664fda86e5981be0976d9c', mocker.ANY)
+    lta_rc_mock.assert_called_with("PATCH", '/Bundles/45ae2ad39c664fda86e5981be0976d9c?return=minimal', mocker.ANY)
     vbih_mock.assert_called_with(mocker.ANY, {"uuid": "45ae2ad39c664fda86e5981be0976d9c", "one": 1})
 
 @pytest.mark.asyncio
@@ -535,7 +547,7 @@ async def test_nersc_verifier_update_bundle_in_lta_db(config, mocker):
     lta_mock.request = lta_rc_mock
     p = NerscVerifier(config, logger_mock)
     assert await p._update_bundle_in_lta_db(lta_mock, bundle)
-    lta_rc_mock.assert_called_with("PATCH", '/Bundles/7ec8a8f9-fae3-4f25-ae54-c1f66014f5ef', mocker.ANY)
+    lta_rc_mock.assert_called_with("PATCH", '/Bundles/7ec8a8f9-fae3-4f25-ae54-c1f66014f5ef?return=minimal', mocker.ANY)
 
 @pytest.mark.asyncio
 async def test_nersc_verifier_verify_bundle_in_hpss_success_no_quarantine(config, mocker):
@@ -549,7 +561,7 @@ async def test_nersc_verifier_verify_bundle_in_hpss_success_no_quarantine(config
             "sha512": "97de2a6ad728f50a381eb1be6ecf015019887fac27e8bf608334fb72caf8d3f654fdcce68c33b0f0f27de499b84e67b8357cd81ef7bba3cdaa9e23a648f43ad2",
         },
     }
-    run_mock = mocker.patch("lta.nersc_verifier.run", new_callable=MagicMock)
+    run_mock = mocker.patch("lta.nersc_verifier.run_command", new_callable=AsyncMock)
     run_mock.side_effect = [
         ObjectLiteral(
             returncode=0,
@@ -584,7 +596,7 @@ async def test_nersc_verifier_verify_bundle_in_hpss_hsi_failure_quarantine(confi
             "sha512": "97de2a6ad728f50a381eb1be6ecf015019887fac27e8bf608334fb72caf8d3f654fdcce68c33b0f0f27de499b84e67b8357cd81ef7bba3cdaa9e23a648f43ad2",
         },
     }
-    run_mock = mocker.patch("lta.nersc_verifier.run", new_callable=MagicMock)
+    run_mock = mocker.patch("lta.nersc_verifier.run_command", new_callable=AsyncMock)
     run_mock.side_effect = [
         ObjectLiteral(
             returncode=1,
@@ -599,7 +611,7 @@ async def test_nersc_verifier_verify_bundle_in_hpss_hsi_failure_quarantine(confi
     p = NerscVerifier(config, logger_mock)
     assert not await p._verify_bundle_in_hpss(lta_mock, bundle)
     assert run_mock.call_count == 1
-    lta_rc_mock.assert_called_with('PATCH', '/Bundles/7ec8a8f9-fae3-4f25-ae54-c1f66014f5ef', mocker.ANY)
+    lta_rc_mock.assert_called_with('PATCH', '/Bundles/7ec8a8f9-fae3-4f25-ae54-c1f66014f5ef?return=minimal', mocker.ANY)
 
 @pytest.mark.asyncio
 async def test_nersc_verifier_verify_bundle_in_hpss_mismatch_checksum_quarantine(config, mocker):
@@ -613,7 +625,7 @@ async def test_nersc_verifier_verify_bundle_in_hpss_mismatch_checksum_quarantine
             "sha512": "97de2a6ad728f50a381eb1be6ecf015019887fac27e8bf608334fb72caf8d3f654fdcce68c33b0f0f27de499b84e67b8357cd81ef7bba3cdaa9e23a648f43ad2",
         },
     }
-    run_mock = mocker.patch("lta.nersc_verifier.run", new_callable=MagicMock)
+    run_mock = mocker.patch("lta.nersc_verifier.run_command", new_callable=AsyncMock)
     run_mock.side_effect = [
         ObjectLiteral(
             returncode=0,
@@ -628,7 +640,7 @@ async def test_nersc_verifier_verify_bundle_in_hpss_mismatch_checksum_quarantine
     p = NerscVerifier(config, logger_mock)
     assert not await p._verify_bundle_in_hpss(lta_mock, bundle)
     assert run_mock.call_count == 1
-    lta_rc_mock.assert_called_with('PATCH', '/Bundles/7ec8a8f9-fae3-4f25-ae54-c1f66014f5ef', mocker.ANY)
+    lta_rc_mock.assert_called_with('PATCH', '/Bundles/7ec8a8f9-fae3-4f25-ae54-c1f66014f5ef?return=minimal', mocker.ANY)
 
 @pytest.mark.asyncio
 async def test_nersc_verifier_verify_bundle_in_hpss_failure_hashverify_quarantine(config, mocker):
@@ -642,7 +654,7 @@ async def test_nersc_verifier_verify_bundle_in_hpss_failure_hashverify_quarantin
             "sha512": "97de2a6ad728f50a381eb1be6ecf015019887fac27e8bf608334fb72caf8d3f654fdcce68c33b0f0f27de499b84e67b8357cd81ef7bba3cdaa9e23a648f43ad2",
         },
     }
-    run_mock = mocker.patch("lta.nersc_verifier.run", new_callable=MagicMock)
+    run_mock = mocker.patch("lta.nersc_verifier.run_command", new_callable=AsyncMock)
     run_mock.side_effect = [
         ObjectLiteral(
             returncode=0,
@@ -663,7 +675,7 @@ async def test_nersc_verifier_verify_bundle_in_hpss_failure_hashverify_quarantin
     p = NerscVerifier(config, logger_mock)
     assert not await p._verify_bundle_in_hpss(lta_mock, bundle)
     assert run_mock.call_count == 2
-    lta_rc_mock.assert_called_with('PATCH', '/Bundles/7ec8a8f9-fae3-4f25-ae54-c1f66014f5ef', mocker.ANY)
+    lta_rc_mock.assert_called_with('PATCH', '/Bundles/7ec8a8f9-fae3-4f25-ae54-c1f66014f5ef?return=minimal', mocker.ANY)
 
 @pytest.mark.asyncio
 async def test_nersc_verifier_verify_bundle_in_hpss_hashverify_bad_type_quarantine(config, mocker):
@@ -677,7 +689,7 @@ async def test_nersc_verifier_verify_bundle_in_hpss_hashverify_bad_type_quaranti
             "sha512": "97de2a6ad728f50a381eb1be6ecf015019887fac27e8bf608334fb72caf8d3f654fdcce68c33b0f0f27de499b84e67b8357cd81ef7bba3cdaa9e23a648f43ad2",
         },
     }
-    run_mock = mocker.patch("lta.nersc_verifier.run", new_callable=MagicMock)
+    run_mock = mocker.patch("lta.nersc_verifier.run_command", new_callable=AsyncMock)
     run_mock.side_effect = [
         ObjectLiteral(
             returncode=0,
@@ -698,7 +710,7 @@ async def test_nersc_verifier_verify_bundle_in_hpss_hashverify_bad_type_quaranti
     p = NerscVerifier(config, logger_mock)
     assert not await p._verify_bundle_in_hpss(lta_mock, bundle)
     assert run_mock.call_count == 2
-    lta_rc_mock.assert_called_with('PATCH', '/Bundles/7ec8a8f9-fae3-4f25-ae54-c1f66014f5ef', mocker.ANY)
+    lta_rc_mock.assert_called_with('PATCH', '/Bundles/7ec8a8f9-fae3-4f25-ae54-c1f66014f5ef?return=minimal', mocker.ANY)
 
 @pytest.mark.asyncio
 async def test_nersc_verifier_verify_bundle_in_hpss_hashverify_bad_result_quarantine(config, mocker):
@@ -712,7 +724,7 @@ async def test_nersc_verifier_verify_bundle_in_hpss_hashverify_bad_result_quaran
             "sha512": "97de2a6ad728f50a381eb1be6ecf015019887fac27e8bf608334fb72caf8d3f654fdcce68c33b0f0f27de499b84e67b8357cd81ef7bba3cdaa9e23a648f43ad2",
         },
     }
-    run_mock = mocker.patch("lta.nersc_verifier.run", new_callable=MagicMock)
+    run_mock = mocker.patch("lta.nersc_verifier.run_command", new_callable=AsyncMock)
     run_mock.side_effect = [
         ObjectLiteral(
             returncode=0,
@@ -733,4 +745,4 @@ async def test_nersc_verifier_verify_bundle_in_hpss_hashverify_bad_result_quaran
     p = NerscVerifier(config, logger_mock)
     assert not await p._verify_bundle_in_hpss(lta_mock, bundle)
     assert run_mock.call_count == 2
-    lta_rc_mock.assert_called_with('PATCH', '/Bundles/7ec8a8f9-fae3-4f25-ae54-c1f66014f5ef', mocker.ANY)
+    lta_rc_mock.assert_called_with('PATCH', '/Bundles/7ec8a8f9-fae3-4f25-ae54-c1f66014f5ef?return=minimal', mocker.ANY)
@@ -17,14 +17,18 @@ def config():
         "HEARTBEAT_PATCH_RETRIES": "3",
         "HEARTBEAT_PATCH_TIMEOUT_SECONDS": "30",
         "HEARTBEAT_SLEEP_DURATION_SECONDS": "60",
+        "LOOP_STALL_LOG_SECONDS": "0",
         "LTA_REST_TOKEN": "fake-lta-rest-token",
         "LTA_REST_URL": "http://RmMNHdPhHpH2ZxfaFAC9d2jiIbf5pZiHDqy43rFLQiM.com/",
         "RUCIO_PASSWORD": "hunter2",
         "RUN_ONCE_AND_DIE": "False",
         "SOURCE_SITE": "WIPAC",
         "TRANSFER_CONFIG_PATH": "examples/rucio.json",
+        "WORK_BYTES_IN_FLIGHT": "0",
+        "WORK_CONCURRENCY": "1",
         "WORK_RETRIES": "3",
         "WORK_SLEEP_DURATION_SECONDS": "60",
+        "WORK_SLEEP_MIN_DURATION_SECONDS": "5",
         "WORK_TIMEOUT_SECONDS": "30",
     }
 
@@ -60,14 +64,18 @@ async def test_replicator_logs_configuration(mocker):
         "HEARTBEAT_PATCH_RETRIES": "1",
         "HEARTBEAT_PATCH_TIMEOUT_SECONDS": "20",
         "HEARTBEAT_SLEEP_DURATION_SECONDS": "30",
+        "LOOP_STALL_LOG_SECONDS": "0",
         "LTA_REST_TOKEN": "logme-fake-lta-rest-token",
         "LTA_REST_URL": "logme-http://zjwdm5ggeEgS1tZDZy9l1DOZU53uiSO4Urmyb8xL0.com/",
         "RUCIO_PASSWORD": "hunter3",  # electric boogaloo
         "RUN_ONCE_AND_DIE": "False",
         "SOURCE_SITE": "WIPAC",
         "TRANSFER_CONFIG_PATH": "examples/rucio.json",
+        "WORK_BYTES_IN_FLIGHT": "0",
+        "WORK_CONCURRENCY": "1",
         "WORK_RETRIES": "5",
         "WORK_SLEEP_DURATION_SECONDS": "70",
+        "WORK_SLEEP_MIN_DURATION_SECONDS": "5",
         "WORK_TIMEOUT_SECONDS": "90",
     }
     Replicator(replicator_config, logger_mock)
@@ -77,14 +85,18 @@ async def test_replicator_logs_configuration(mocker):
         call('HEARTBEAT_PATCH_RETRIES = 1'),
         call('HEARTBEAT_PATCH_TIMEOUT_SECONDS = 20'),
         call('HEARTBEAT_SLEEP_DURATION_SECONDS = 30'),
+        call('LOOP_STALL_LOG_SECONDS = 0'),
         call('LTA_REST_TOKEN = logme-fake-lta-rest-token'),
         call('LTA_REST_URL = logme-http://zjwdm5ggeEgS1tZDZy9l1DOZU53uiSO4Urmyb8xL0.com/'),
         call('RUCIO_PASSWORD = hunter3'),
         call('RUN_ONCE_AND_DIE = False'),
         call('SOURCE_SITE = WIPAC'),
         call('TRANSFER_CONFIG_PATH = examples/rucio.json'),
+        call('WORK_BYTES_IN_FLIGHT = 0'),
+        call('WORK_CONCURRENCY = 1'),
         call('WORK_RETRIES = 5'),
         call('WORK_SLEEP_DURATION_SECONDS = 70'),
+        call('WORK_SLEEP_MIN_DURATION_SECONDS = 5'),
         call('WORK_TIMEOUT_SECONDS = 90')
     ]
     logger_mock.info.assert_has_calls(EXPECTED_LOGGER_CALLS)
@@ -139,7 +151,7 @@ async def test_replicator_do_work_pop_exception(config, mocker):
     p = Replicator(config, logger_mock)
     with pytest.raises(HTTPError):
         await p._do_work()
-    lta_rc_mock.assert_called_with("POST", '/Bundles/actions/pop?source=WIPAC&status=staged', {'claimant': f'{p.name}-{p.instance_uuid}'})
+    lta_rc_mock.assert_called_with("POST", '/Bundles/actions/pop?source=WIPAC&status=staged&contents=false&wait=15', {'claimant': f'{p.name}-{p.instance_uuid}'})
 
 @pytest.mark.asyncio
 async def test_replicator_do_work_no_results(config, mocker):
@@ -172,7 +184,7 @@ async def test_replicator_do_work_claim_no_result(config, mocker):
     rbtds_mock = mocker.patch("lta.replicator.Replicator._replicate_bundle_to_destination_site", new_callable=AsyncMock)
     p = Replicator(config, logger_mock)
     await p._do_work_claim()
-    lta_rc_mock.assert_called_with("POST", '/Bundles/actions/pop?source=WIPAC&status=staged', {'claimant': f'{p.name}-{p.instance_uuid}'})
+    lta_rc_mock.assert_called_with("POST", '/Bundles/actions/pop?source=WIPAC&status=staged&contents=false&wait=15', {'claimant': f'{p.name}-{p.instance_uuid}'})
     rbtds_mock.assert_not_called()
 
 @pytest.mark.asyncio
@@ -188,7 +200,7 @@ async def test_replicator_do_work_claim_yes_result(config, mocker):
     rbtds_mock = mocker.patch("lta.replicator.Replicator._replicate_bundle_to_destination_site", new_callable=AsyncMock)
     p = Replicator(config, logger_mock)
     await p._do_work_claim()
-    lta_rc_mock.assert_called_with("POST", '/Bundles/actions/pop?source=WIPAC&status=staged', {'claimant': f'{p.name}-{p.instance_uuid}'})
+    lta_rc_mock.assert_called_with("POST", '/Bundles/actions/pop?source=WIPAC&status=staged&contents=false&wait=15', {'claimant': f'{p.name}-{p.instance_uuid}'})
     rbtds_mock.assert_called_with(mocker.ANY, {"one": 1})
 
 @pytest.mark.asyncio
@@ -206,7 +218,7 @@ async def test_replicator_replicate_bundle_to_destination_site(config, mocker):
     await p._replicate_bundle_to_destination_site(lta_rc_mock, bundle_obj)
     inst_mock.assert_called_with(p.transfer_config, logger_mock)
     xfer_service_mock.start.assert_called_with(bundle_obj)
-    lta_rc_mock.request.assert_called_with("PATCH", '/Bundles/8286d3ba-fb1b-4923-876d-935bdf7fc99e', mocker.ANY)
+    lta_rc_mock.request.assert_called_with("PATCH", '/Bundles/8286d3ba-fb1b-4923-876d-935bdf7fc99e?return=minimal', mocker.ANY)
 
 @pytest.mark.asyncio
 async def test_replicator_quarantine_on_replicate_exception(config, mocker):
@@ -223,7 +235,7 @@ async def test_replicator_quarantine_on_replicate_exception(config, mocker):
     qb_mock = mocker.patch("lta.replicator.Replicator._quarantine_bundle", new_callable=AsyncMock)
     p = Replicator(config, logger_mock)
     await p._do_work_claim()
-    lta_rc_mock.assert_called_with("POST", '/Bundles/actions/pop?source=WIPAC&status=staged', {'claimant': f'{p.name}-{p.instance_uuid}'})
+    lta_rc_mock.assert_called_with("POST", '/Bundles/actions/pop?source=WIPAC&status=staged&contents=false&wait=15', {'claimant': f'{p.name}-{p.instance_uuid}'})
     qb_mock.assert_called_with(mocker.ANY, {"one": 1}, "Rucio caught fire, then we roasted marshmellows.")
 
 @pytest.mark.asyncio
@@ -233,4 +245,4 @@ async def test_replicator_quarantine_bundle_with_reason(config, mocker):
     lta_rc_mock = mocker.patch("rest_tools.client.RestClient", new_callable=AsyncMock)
     p = Replicator(config, logger_mock)
     await p._quarantine_bundle(lta_rc_mock, {"uuid": "c4b345e4-2395-4f9e-b0eb-9cc1c9cdf003"}, "Rucio caught fire, then we roasted marshmellows.")
-    lta_rc_mock.request.assert_called_with("PATCH", "/Bundles/c4b345e4-2395-4f9e-b0eb-9cc1c9cdf003", mocker.ANY)
+    lta_rc_mock.request.assert_called_with("PATCH", "/Bundles/c4b345e4-2395-4f9e-b0eb-9cc1c9cdf003?return=minimal", mocker.ANY)
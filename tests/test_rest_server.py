@@ -3,8 +3,10 @@
 
 import asyncio
 from datetime import datetime, timedelta
+import json
 import os
 import socket
+import time
 from typing import Dict
 from urllib.parse import quote_plus
 
@@ -13,8 +15,9 @@ from pymongo.database import Database  # type: ignore
 import pytest  # type: ignore
 import requests  # type: ignore
 from rest_tools.client import RestClient  # type: ignore
+from tornado.httpclient import AsyncHTTPClient
 
-from lta.rest_server import boolify, CheckClaims, main, start, unique_id
+from lta.rest_server import boolify, CheckClaims, ensure_bundle_counts, ensure_mongo_indexes, FairShare, main, metrics_multiprocess_dir, SharedSocketServer, start, TokenCache, unique_id, work_statuses, WorkNotifier
 
 ALL_DOCUMENTS: Dict[str, str] = {}
 REMOVE_ID = {"_id": False}
@@ -124,6 +127,179 @@ def test_check_claims_old_age():
     cutoff = cc.old_age()
     assert isinstance(cutoff, str)
 
+def test_check_claims_claimable():
+    """Verify that CheckClaims treats expired claims as claimable."""
+    cc = CheckClaims(0.5)
+    claimable = cc.claimable()
+    assert {"claimed": False} in claimable["$or"]
+    assert claimable["$or"][1]["claimed"] is True
+    assert claimable["$or"][1]["claim_timestamp"]["$lt"] < datetime.utcnow().isoformat()
+
+def test_work_statuses():
+    """Verify that only status changes wake up waiting pops."""
+    assert work_statuses({"status": "specified"}) == {"specified"}
+    assert work_statuses({"status": "specified", "claimed": False}) == {"specified"}
+    # an unclaim that leaves the status alone puts the document back for later
+    assert work_statuses({"claimed": False, "work_priority_timestamp": "2019-02-11T18:00:00"}) == set()
+    assert work_statuses({"claimed": True, "claimant": "bundler"}) == set()
+    assert work_statuses({"update_timestamp": "2019-02-11T18:00:00"}) == set()
+    assert work_statuses({}) == set()
+
+@pytest.mark.asyncio
+async def test_work_notifier():
+    """Verify that WorkNotifier wakes up only the pops waiting on the notified status."""
+    notifier = WorkNotifier(poll_seconds=30)
+    attempts = {"created": 0, "staged": 0}
+
+    def attempt(status):
+        async def claim():
+            attempts[status] += 1
+            return attempts[status] > 1
+        return claim
+
+    created = asyncio.ensure_future(notifier.poll("Bundles", "created", 10, attempt("created")))
+    staged = asyncio.ensure_future(notifier.poll("Bundles", "staged", 0.5, attempt("staged")))
+    await asyncio.sleep(0.1)
+    notifier.notify("Bundles", ["created"])
+    assert await asyncio.wait_for(created, timeout=5)
+    assert attempts["created"] == 2
+    # nobody notified staged, so it looked once and gave up when the wait ran out
+    assert not await staged
+    assert attempts["staged"] == 1
+
+def test_token_cache(mocker):
+    """Verify that TokenCache reuses validations until the token expires."""
+    auth = mocker.MagicMock()
+    auth.validate.side_effect = lambda token: {"sub": token, "exp": time.time() + (-1 if token == "old" else 3600)}
+    tc = TokenCache(auth, size=2)
+    assert tc.validate("a")["sub"] == "a"
+    assert tc.validate("a")["sub"] == "a"
+    assert auth.validate.call_count == 1
+    # expired tokens are handed back to the Auth object every time
+    tc.validate("old")
+    tc.validate("old")
+    assert auth.validate.call_count == 3
+    # the least recently used token is forgotten first
+    tc.validate("b")
+    tc.validate("c")
+    tc.validate("b")
+    assert auth.validate.call_count == 5
+    tc.validate("a")
+    assert auth.validate.call_count == 6
+    # failures are not cached
+    auth.validate.side_effect = Exception("bad token")
+    with pytest.raises(Exception):
+        tc.validate("d")
+    with pytest.raises(Exception):
+        tc.validate("d")
+    # everything else is passed through
+    assert tc.token_url == auth.token_url
+
+def test_token_cache_max_age(mocker):
+    """Verify that TokenCache revalidates tokens without exp, and long-lived tokens after max_age."""
+    auth = mocker.MagicMock()
+    auth.validate.side_effect = lambda token: {"sub": token} if token == "forever" else {"sub": token, "exp": time.time() + 3600}
+    tc = TokenCache(auth, size=2, max_age=60)
+    tc.validate("forever")
+    tc.validate("forever")
+    assert auth.validate.call_count == 2
+    tc.validate("a")
+    tc.validate("a")
+    assert auth.validate.call_count == 3
+    # an hour-long token is only trusted for max_age
+    mocker.patch("time.time", return_value=time.time() + 61)
+    tc.validate("a")
+    assert auth.validate.call_count == 4
+
+def test_fair_share():
+    """Verify that FairShare serves TransferRequests in proportion to their weights."""
+    with pytest.raises(ValueError):
+        FairShare("lifo")
+    fs = FairShare("fair", {"NERSC": 2})
+    assert fs.weight({"dest": "DESY"}) == 1.0
+    assert fs.weight({"dest": "NERSC"}) == 2.0
+    assert fs.weight({"dest": "NERSC", "weight": 3}) == 6.0
+    assert fs.weight({"dest": "DESY", "weight": -1}) == 1.0
+    assert fs.expired("q")
+    assert fs.pick("q") == (False, None)
+    fs.refresh("q", {"big": 1.0, "small": 1.0, "urgent": 2.0})
+    assert not fs.expired("q")
+    assert fs.allocate("q", 8) == {"big": 2, "small": 2, "urgent": 4}
+    # a single pop serves the TransferRequest furthest behind
+    assert fs.pick("q") == (True, "big")
+    fs.charge("q", "big")
+    assert fs.pick("q") == (True, "small")
+    fs.drop("q", "small")
+    assert fs.pick("q") == (True, "urgent")
+    # newcomers start level with the TransferRequest furthest behind
+    fs.refresh("q", {"big": 1.0, "urgent": 2.0, "new": 1.0})
+    assert fs.passes["q"] == {"big": 1.0, "urgent": 0.0, "new": 0.0}
+
+def test_ensure_mongo_indexes(mongo):
+    """Verify that ensure_mongo_indexes creates claim queue indexes and drops obsolete ones."""
+    mongo.Bundles.create_index('status', name='bundles_status_index')
+    mongo.Bundles.create_index([('status', 1), ('source', 1), ('work_priority_timestamp', 1)], name='bundles_pop_source_index')
+    mongo.BundleFiles.create_index([('bundle', 1), ('index', 1)], name='bundle_files_bundle_index', unique=True)
+    mongo_url = f"mongodb://{CONFIG['LTA_MONGODB_HOST']}:{CONFIG['LTA_MONGODB_PORT']}"
+    ensure_mongo_indexes(mongo_url, CONFIG['LTA_MONGODB_DATABASE_NAME'])
+    bundles_indexes = mongo.Bundles.index_information()
+    assert 'bundles_pop_source_claimed_index' in bundles_indexes
+    assert 'bundles_pop_dest_claimed_index' in bundles_indexes
+    assert 'bundles_fair_source_claimed_index' in bundles_indexes
+    assert 'bundles_fair_dest_claimed_index' in bundles_indexes
+    assert 'bundles_pop_source_index' not in bundles_indexes
+    assert 'bundles_claims_index' in bundles_indexes
+    assert 'bundles_status_index' not in bundles_indexes
+    assert 'bundle_files_version_index' in mongo.BundleFiles.index_information()
+    assert 'bundle_files_bundle_index' not in mongo.BundleFiles.index_information()
+    assert 'bundle_files_archive_version_index' in mongo.BundleFilesArchive.index_information()
+    assert 'status_component_timestamp_index' in mongo.Status.index_information()
+    assert 'bundles_archive_uuid_index' in mongo.BundlesArchive.index_information()
+    assert 'transfer_requests_archive_uuid_index' in mongo.TransferRequestsArchive.index_information()
+    transfer_requests_indexes = mongo.TransferRequests.index_information()
+    assert 'transfer_requests_create_timestamp_index' in transfer_requests_indexes
+    assert 'transfer_requests_keyset_index' in transfer_requests_indexes
+    assert 'transfer_requests_pop_index' in transfer_requests_indexes
+    # running it again is harmless
+    ensure_mongo_indexes(mongo_url, CONFIG['LTA_MONGODB_DATABASE_NAME'])
+
+def test_ensure_bundle_counts(mongo):
+    """Verify that ensure_bundle_counts fills in missing bundle_counts and repairs stale ones."""
+    mongo.TransferRequests.insert_many([
+        {"uuid": "old"},
+        {"uuid": "stale", "bundle_counts": {}},
+        {"uuid": "good", "bundle_counts": {"created": {"count": 1, "size": 5}, "deleted": {"count": 0, "size": 0}}},
+    ])
+    mongo.Bundles.insert_many([
+        {"uuid": "a", "request": "old", "status": "created", "size": 100},
+        {"uuid": "b", "request": "old", "status": "created", "size": 20},
+        {"uuid": "c", "request": "old", "status": "deleted", "size": 3},
+        {"uuid": "d", "request": "stale", "status": "created", "size": 4},
+        {"uuid": "e", "request": "good", "status": "created", "size": 5},
+    ])
+    mongo_url = f"mongodb://{CONFIG['LTA_MONGODB_HOST']}:{CONFIG['LTA_MONGODB_PORT']}"
+    ensure_bundle_counts(mongo_url, CONFIG['LTA_MONGODB_DATABASE_NAME'])
+    assert mongo.TransferRequests.find_one({"uuid": "old"})["bundle_counts"] == {
+        "created": {"count": 2, "size": 120},
+        "deleted": {"count": 1, "size": 3},
+    }
+    assert mongo.TransferRequests.find_one({"uuid": "stale"})["bundle_counts"] == {
+        "created": {"count": 1, "size": 4},
+    }
+    # emptied statuses are left alone when the counters are right
+    assert mongo.TransferRequests.find_one({"uuid": "good"})["bundle_counts"] == {
+        "created": {"count": 1, "size": 5},
+        "deleted": {"count": 0, "size": 0},
+    }
+    # counting only happens once, unless a recount is asked for
+    mongo.TransferRequests.update_one({"uuid": "stale"}, {"$set": {"bundle_counts": {}}})
+    ensure_bundle_counts(mongo_url, CONFIG['LTA_MONGODB_DATABASE_NAME'])
+    assert mongo.TransferRequests.find_one({"uuid": "stale"})["bundle_counts"] == {}
+    ensure_bundle_counts(mongo_url, CONFIG['LTA_MONGODB_DATABASE_NAME'], recount=True)
+    assert mongo.TransferRequests.find_one({"uuid": "stale"})["bundle_counts"] == {
+        "created": {"count": 1, "size": 4},
+    }
+
 # -----------------------------------------------------------------------------
 
 @pytest.mark.asyncio
@@ -219,6 +395,35 @@ async def test_transfer_request_crud(mongo, rest):
     ret = await r.request('GET', '/TransferRequests')
     assert len(ret['results']) == 0
 
+@pytest.mark.asyncio
+async def test_transfer_request_get_filters_and_pages(mongo, rest):
+    """Check that GET /TransferRequests can filter, project fields, and read pages."""
+    r = rest(role="system")
+    for source, dest in [("WIPAC", "NERSC"), ("WIPAC", "DESY"), ("NERSC", "WIPAC")]:
+        request = {'source': source, 'dest': dest, 'path': '/data/exp/foo/bar'}
+        await r.request('POST', '/TransferRequests', request)
+
+    ret = await r.request('GET', '/TransferRequests?source=WIPAC')
+    assert len(ret['results']) == 2
+    ret = await r.request('GET', '/TransferRequests?dest=WIPAC')
+    assert len(ret['results']) == 1
+    ret = await r.request('GET', '/TransferRequests?status=unclaimed&source=WIPAC&dest=DESY')
+    assert len(ret['results']) == 1
+    ret = await r.request('GET', '/TransferRequests?status=completed')
+    assert len(ret['results']) == 0
+
+    ret = await r.request('GET', '/TransferRequests?fields=status')
+    assert len(ret['results']) == 3
+    for result in ret['results']:
+        assert set(result.keys()) == {"uuid", "status"}
+
+    ret = await r.request('GET', '/TransferRequests?limit=2')
+    assert len(ret['results']) == 2
+    assert ret['results'][0]['path'] == '/data/exp/foo/bar'
+    ret = await r.request('GET', f'/TransferRequests?limit=2&cursor={ret["cursor"]}')
+    assert len(ret['results']) == 1
+    assert ret['cursor'] is None
+
 @pytest.mark.asyncio
 async def test_transfer_request_pop(rest):
     """Check pop action for transfer requests."""
@@ -256,6 +461,46 @@ async def test_transfer_request_pop(rest):
     ret = await r.request('POST', '/TransferRequests/actions/pop?source=WIPAC', wipac_pop_claimant)
     assert not ret['transfer_request']
 
+@pytest.mark.asyncio
+async def test_transfer_request_pop_limit(mongo, rest):
+    """Check batch pop action for transfer requests."""
+    r = rest('system')
+    for i in range(3):
+        request = {
+            'source': 'WIPAC',
+            'dest': 'NERSC',
+            'path': f'/data/exp/foo/bar{i}',
+        }
+        await r.request('POST', '/TransferRequests', request)
+
+    claimant = {
+        'claimant': 'testing-picker-3e4da7c3-bb73-4ab3-b6a6-02ceff6501fc',
+    }
+
+    # a limit must be a positive integer
+    with pytest.raises(Exception):
+        await r.request('POST', '/TransferRequests/actions/pop?source=WIPAC&limit=0', claimant)
+    with pytest.raises(Exception):
+        await r.request('POST', '/TransferRequests/actions/pop?source=WIPAC&limit=lots', claimant)
+
+    # we claim two of the three in first-in-first-out order
+    ret = await r.request('POST', '/TransferRequests/actions/pop?source=WIPAC&limit=2', claimant)
+    assert len(ret['transfer_requests']) == 2
+    assert ret['transfer_requests'][0]['path'] == '/data/exp/foo/bar0'
+    assert ret['transfer_requests'][1]['path'] == '/data/exp/foo/bar1'
+    for tr in ret['transfer_requests']:
+        assert tr['status'] == 'processing'
+        assert tr['claimant'] == claimant['claimant']
+
+    # we claim what is left, even if we asked for more
+    ret = await r.request('POST', '/TransferRequests/actions/pop?source=WIPAC&limit=10', claimant)
+    assert len(ret['transfer_requests']) == 1
+    assert ret['transfer_requests'][0]['path'] == '/data/exp/foo/bar2'
+
+    # repeating gets no work
+    ret = await r.request('POST', '/TransferRequests/actions/pop?source=WIPAC&limit=10', claimant)
+    assert ret['transfer_requests'] == []
+
 @pytest.mark.asyncio
 async def test_status(mongo, rest):
     """Check for status handling."""
@@ -290,6 +535,106 @@ async def test_status(mongo, rest):
     assert ret['1'] == 'OK'
     assert ret['2'] == 'WARN'
 
+@pytest.mark.asyncio
+async def test_status_cache(mongo, rest):
+    """Check that status rollups are cached until the next status PATCH."""
+    r = rest('system')
+
+    request = {'picker1': {'timestamp': datetime.utcnow().isoformat()}}
+    await r.request('PATCH', '/status/picker', request)
+    ret = await r.request('GET', '/status')
+    assert ret == {'picker': 'OK', 'health': 'OK'}
+    ret = await r.request('GET', '/status/picker/count')
+    assert ret['count'] == 1
+
+    # a write that bypasses the PATCH route is not seen until the cache expires
+    old_timestamp = (datetime.utcnow() - timedelta(hours=1)).isoformat()
+    mongo.Status.insert_one({'component': 'picker', 'name': 'picker2', 'timestamp': old_timestamp})
+    mongo.Status.insert_one({'component': 'picker', 'name': 'picker3', 'timestamp': datetime.utcnow().isoformat()})
+    ret = await r.request('GET', '/status')
+    assert ret == {'picker': 'OK', 'health': 'OK'}
+    ret = await r.request('GET', '/status/picker/count')
+    assert ret['count'] == 1
+
+    # but a PATCH invalidates the cache
+    request = {'bundler1': {'timestamp': datetime.utcnow().isoformat()}}
+    await r.request('PATCH', '/status/bundler', request)
+    ret = await r.request('GET', '/status')
+    assert ret == {'bundler': 'OK', 'picker': 'WARN', 'health': 'WARN'}
+    ret = await r.request('GET', '/status/picker/count')
+    assert ret['count'] == 2
+
+@pytest.mark.asyncio
+async def test_start_workers(mongo, monkeypatch, mocker, port):
+    """Check that start binds a shared socket before forking workers."""
+    monkeypatch.setenv("LTA_AUTH_ALGORITHM", "HS512")
+    monkeypatch.setenv("LTA_AUTH_ISSUER", CONFIG['TOKEN_SERVICE'])
+    monkeypatch.setenv("LTA_AUTH_SECRET", CONFIG['AUTH_SECRET'])
+    monkeypatch.setenv("LTA_MONGODB_DATABASE_NAME", CONFIG['LTA_MONGODB_DATABASE_NAME'])
+    monkeypatch.setenv("LTA_REST_PORT", str(port))
+    monkeypatch.setenv("LTA_REST_WORKERS", "4")
+    ensure_mock = mocker.patch("lta.rest_server.ensure_mongo_indexes")
+    fork_mock = mocker.patch("tornado.process.fork_processes", return_value=0)
+    s = start(debug=True)
+    ensure_mock.assert_called_once()
+    fork_mock.assert_called_with(4)
+
+    http_client = AsyncHTTPClient()
+    response = await http_client.fetch(f'http://localhost:{port}/')
+    assert json.loads(response.body) == {}
+    assert isinstance(s, SharedSocketServer)
+    await s.stop()
+
+def test_metrics_multiprocess_dir(monkeypatch):
+    """Check that metrics_multiprocess_dir finds the prometheus_client multiprocess directory."""
+    monkeypatch.delenv("PROMETHEUS_MULTIPROC_DIR", raising=False)
+    monkeypatch.delenv("prometheus_multiproc_dir", raising=False)
+    assert metrics_multiprocess_dir() is None
+    monkeypatch.setenv("prometheus_multiproc_dir", "/tmp/old-style")
+    assert metrics_multiprocess_dir() == "/tmp/old-style"
+    monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", "/tmp/lta-metrics")
+    assert metrics_multiprocess_dir() == "/tmp/lta-metrics"
+
+@pytest.mark.asyncio
+async def test_metrics(mongo, rest, port):
+    """Check that GET /metrics reports request and MongoDB latencies."""
+    r = rest('system')
+    await r.request('GET', '/Bundles')
+    await r.request('GET', '/TransferRequests')
+
+    http_client = AsyncHTTPClient()
+    response = await http_client.fetch(f'http://localhost:{port}/metrics')
+    lines = response.body.decode("utf-8").splitlines()
+
+    def has_metric(name, *labels):
+        return any(line.startswith(name + "{") and all(label in line for label in labels) for line in lines)
+
+    assert has_metric('lta_rest_request_seconds_count', 'route="BundlesHandler"', 'method="GET"', 'status="200"')
+    assert has_metric('lta_rest_response_bytes_count', 'route="TransferRequestsHandler"')
+    assert has_metric('lta_rest_mongo_seconds_count', 'collection="Bundles"', 'operation="find"')
+    assert not has_metric('lta_rest_mongo_seconds_count', 'operation="stream"')
+
+@pytest.mark.asyncio
+async def test_metrics_ndjson(mongo, rest, port):
+    """Check that GET /metrics reports NDJSON streams apart from MongoDB operations."""
+    r = rest('system')
+    await r.request('POST', '/Bundles/actions/bulk_create', {'bundles': [{"request": "a", "status": "taping"} for i in range(3)]})
+
+    t = requests.get(CONFIG['TOKEN_SERVICE']+'/token', params={'scope': 'lta:system'}).json()['access']
+    headers = {
+        'Accept': 'application/x-ndjson',
+        'Authorization': f'Bearer {t}',
+    }
+    http_client = AsyncHTTPClient()
+    await http_client.fetch(f'http://localhost:{port}/Bundles', headers=headers)
+
+    response = await http_client.fetch(f'http://localhost:{port}/metrics')
+    lines = response.body.decode("utf-8").splitlines()
+    assert 'lta_rest_stream_rows_sum{collection="Bundles"} 3.0' in lines
+    assert any(line.startswith('lta_rest_stream_seconds_count{collection="Bundles"}') for line in lines)
+    assert any(line.startswith('lta_rest_mongo_seconds_count{collection="Bundles",operation="find"}') for line in lines)
+    assert not any(line.startswith('lta_rest_mongo_seconds') and 'operation="stream"' in line for line in lines)
+
 @pytest.mark.asyncio
 async def test_script_main(mocker):
     """Ensure that main sets up logging, starts a server, and runs the event loop."""
@@ -356,6 +701,43 @@ async def test_bundles_bulk_crud(mongo, rest):
     results = ret["results"]
     assert len(results) == 0
 
+@pytest.mark.asyncio
+async def test_bundles_bulk_results(mongo, rest):
+    """Check that bulk_update and bulk_delete report each affected bundle once."""
+    r = rest('system')
+
+    request = {'bundles': [{"name": "one"}, {"name": "two"}, {"name": "three", "key": "value"}]}
+    ret = await r.request('POST', '/Bundles/actions/bulk_create', request)
+    one, two, three = ret["bundles"]
+
+    # bundles that already have the value are not reported as updated
+    request2 = {'bundles': [two, one, three, two, unique_id()], 'update': {'key': 'value'}}
+    ret = await r.request('POST', '/Bundles/actions/bulk_update', request2)
+    assert ret["count"] == 2
+    assert ret["bundles"] == [two, one]
+
+    # repeating the update modifies nothing
+    ret = await r.request('POST', '/Bundles/actions/bulk_update', request2)
+    assert ret["count"] == 0
+    assert ret["bundles"] == []
+
+    # setting None still creates the field on bundles that lack it
+    request2 = {'bundles': [one, two, three], 'update': {'reason': None}}
+    ret = await r.request('POST', '/Bundles/actions/bulk_update', request2)
+    assert ret["count"] == 3
+    assert mongo.Bundles.count_documents({"reason": {"$exists": True}}) == 3
+    ret = await r.request('POST', '/Bundles/actions/bulk_update', request2)
+    assert ret["count"] == 0
+
+    # bundles are reported in request order, once each
+    request3 = {'bundles': [three, unique_id(), one, three]}
+    ret = await r.request('POST', '/Bundles/actions/bulk_delete', request3)
+    assert ret["count"] == 2
+    assert ret["bundles"] == [three, one]
+
+    ret = await r.request('GET', '/Bundles')
+    assert ret["results"] == [two]
+
 @pytest.mark.asyncio
 async def test_bundles_actions_bulk_create_errors(rest):
     """Check error conditions for bulk_create."""
@@ -390,6 +772,51 @@ async def test_bundles_actions_bulk_delete_errors(rest):
     with pytest.raises(Exception):
         await r.request('POST', '/Bundles/actions/bulk_delete', request)
 
+@pytest.mark.asyncio
+async def test_bundles_actions_bulk_get(mongo, rest):
+    """Check that bulk_get returns the requested Bundles and fields in one call."""
+    r = rest('system')
+
+    for request in [{}, {'bundles': ''}, {'bundles': []}, {'bundles': ['a'], 'fields': 'status'}, {'bundles': ['a'], 'fields': ['']}]:
+        with pytest.raises(Exception):
+            await r.request('POST', '/Bundles/actions/bulk_get', request)
+
+    test_data = {
+        'bundles': [
+            {
+                "source": "WIPAC",
+                "dest": "NERSC",
+                "path": f"/data/exp/IceCube/2014/bundle{i}.zip",
+                "status": "specified",
+                "files": [{"logical_name": f"/data/exp/IceCube/2014/file{i}-{j}.tar.gz"} for j in range(i)],
+            } for i in range(3)
+        ]
+    }
+    ret = await r.request('POST', '/Bundles/actions/bulk_create', test_data)
+    uuids = ret["bundles"]
+    # a Bundle written before manifests were stored in BundleFiles
+    mongo.Bundles.insert_one({"uuid": "legacy", "status": "specified", "files": [{"logical_name": "/a"}, {"logical_name": "/b"}]})
+
+    # results come back in request order, without unknown Bundles
+    request = {'bundles': [uuids[2], "missing", uuids[0], "legacy"]}
+    ret = await r.request('POST', '/Bundles/actions/bulk_get', request)
+    assert ret["count"] == 3
+    assert [bundle["uuid"] for bundle in ret["bundles"]] == [uuids[2], uuids[0], "legacy"]
+    assert ret["bundles"][0]["path"] == "/data/exp/IceCube/2014/bundle2.zip"
+    assert all("files" not in bundle for bundle in ret["bundles"])
+
+    request = {'bundles': [uuids[2], "legacy"], 'fields': ['status', 'file_count']}
+    ret = await r.request('POST', '/Bundles/actions/bulk_get', request)
+    assert ret["bundles"] == [
+        {"uuid": uuids[2], "status": "specified", "file_count": 2},
+        {"uuid": "legacy", "status": "specified", "file_count": 2},
+    ]
+
+    request = {'bundles': uuids + ["legacy"], 'fields': ['files']}
+    ret = await r.request('POST', '/Bundles/actions/bulk_get', request)
+    assert [len(bundle["files"]) for bundle in ret["bundles"]] == [0, 1, 2, 2]
+    assert all(set(bundle.keys()) == {"uuid", "files"} for bundle in ret["bundles"])
+
 @pytest.mark.asyncio
 async def test_bundles_actions_bulk_update_errors(rest):
     """Check error conditions for bulk_update."""
@@ -594,6 +1021,153 @@ async def test_get_bundles_request_filter(mongo, rest):
     results = ret["results"]
     assert len(results) == 2
 
+@pytest.mark.asyncio
+async def test_bundles_actions_summary(mongo, rest):
+    """Check that GET /Bundles/actions/summary counts bundles by group."""
+    r = rest('user')
+
+    test_data = {
+        'bundles': [
+            {"request": "a", "status": "deleted", "size": 100},
+            {"request": "a", "status": "deleted", "size": 200},
+            {"request": "a", "status": "taping", "size": 400},
+            {"request": "b", "status": "taping", "size": 800},
+        ]
+    }
+    ret = await rest('system').request('POST', '/Bundles/actions/bulk_create', test_data)
+    assert ret["count"] == 4
+
+    with pytest.raises(Exception):
+        await r.request('GET', '/Bundles/actions/summary?group_by=files')
+
+    ret = await r.request('GET', '/Bundles/actions/summary')
+    assert [(x["status"], x["count"], x["size"]) for x in ret["results"]] == [("deleted", 2, 300), ("taping", 2, 1200)]
+    for result in ret["results"]:
+        assert result["oldest_update_timestamp"] <= datetime.utcnow().isoformat()
+
+    ret = await r.request('GET', '/Bundles/actions/summary?request=a&group_by=status')
+    assert [(x["status"], x["count"], x["size"]) for x in ret["results"]] == [("deleted", 2, 300), ("taping", 1, 400)]
+
+    ret = await r.request('GET', '/Bundles/actions/summary?group_by=request,status')
+    assert [(x["request"], x["status"], x["count"]) for x in ret["results"]] == [("a", "deleted", 2), ("a", "taping", 1), ("b", "taping", 1)]
+
+    ret = await r.request('GET', '/Bundles/actions/summary?request=c')
+    assert ret["results"] == []
+
+@pytest.mark.asyncio
+async def test_get_bundles_fields_and_pages(mongo, rest):
+    """Check that GET /Bundles can project fields and read pages."""
+    r = rest('system')
+
+    test_data = {
+        'bundles': [
+            {"request": "a", "status": "taping", "files": [{"uuid": f"{i}"}]} for i in range(5)
+        ]
+    }
+    ret = await r.request('POST', '/Bundles/actions/bulk_create', test_data)
+    uuids = ret["bundles"]
+
+    # fields gives us documents instead of uuids
+    ret = await r.request('GET', '/Bundles?fields=status,request')
+    assert len(ret["results"]) == 5
+    for result in ret["results"]:
+        assert set(result.keys()) == {"uuid", "status", "request"}
+    assert "cursor" not in ret
+
+    # manifests are only available one Bundle at a time
+    with pytest.raises(Exception):
+        await r.request('GET', '/Bundles?fields=status,files')
+    ret = await r.request('GET', f'/Bundles/{uuids[0]}/files')
+    assert ret["files"] == [{"uuid": "0"}]
+
+    # a bad limit or cursor is an error
+    with pytest.raises(Exception):
+        await r.request('GET', '/Bundles?limit=0')
+    with pytest.raises(Exception):
+        await r.request('GET', '/Bundles?cursor=garbage')
+
+    # we can read the bundles two at a time
+    pages = []
+    ret = await r.request('GET', '/Bundles?limit=2')
+    pages.append(ret["results"])
+    while ret["cursor"]:
+        ret = await r.request('GET', f'/Bundles?limit=2&cursor={ret["cursor"]}')
+        pages.append(ret["results"])
+    assert [len(page) for page in pages] == [2, 2, 1]
+    assert sorted(sum(pages, [])) == sorted(uuids)
+
+    # pages can also project fields
+    ret = await r.request('GET', '/Bundles?limit=3&fields=status')
+    assert len(ret["results"]) == 3
+    for result in ret["results"]:
+        assert set(result.keys()) == {"uuid", "status"}
+    ret = await r.request('GET', f'/Bundles?limit=3&fields=status&cursor={ret["cursor"]}')
+    assert len(ret["results"]) == 2
+    assert ret["cursor"] is None
+
+@pytest.mark.asyncio
+async def test_get_bundles_pages_null_timestamp(mongo, rest):
+    """Check that GET /Bundles pages through Bundles with a missing or null work_priority_timestamp."""
+    r = rest('system')
+
+    test_data = {
+        'bundles': [
+            {"request": "a", "status": "taping"} for i in range(5)
+        ]
+    }
+    ret = await r.request('POST', '/Bundles/actions/bulk_create', test_data)
+    uuids = ret["bundles"]
+    # older Bundles may have no timestamp at all, or a null one
+    mongo.Bundles.update_one({"uuid": uuids[0]}, {"$unset": {"work_priority_timestamp": True}})
+    mongo.Bundles.update_one({"uuid": uuids[1]}, {"$set": {"work_priority_timestamp": None}})
+
+    for limit in [1, 2]:
+        pages = []
+        ret = await r.request('GET', f'/Bundles?limit={limit}')
+        pages.append(ret["results"])
+        while ret["cursor"]:
+            ret = await r.request('GET', f'/Bundles?limit={limit}&cursor={ret["cursor"]}')
+            pages.append(ret["results"])
+        assert sorted(sum(pages, [])) == sorted(uuids)
+        # the Bundles without a timestamp come first
+        assert set(sum(pages, [])[:2]) == set(uuids[:2])
+
+@pytest.mark.asyncio
+async def test_get_bundles_ndjson(mongo, rest, port):
+    """Check that GET /Bundles and GET /TransferRequests can stream NDJSON."""
+    r = rest('system')
+
+    test_data = {
+        'bundles': [
+            {"request": "a", "status": "taping"} for i in range(3)
+        ]
+    }
+    ret = await r.request('POST', '/Bundles/actions/bulk_create', test_data)
+    uuids = ret["bundles"]
+    request = {'source': 'WIPAC', 'dest': 'NERSC', 'path': '/data/exp/foo/bar'}
+    await r.request('POST', '/TransferRequests', request)
+
+    t = requests.get(CONFIG['TOKEN_SERVICE']+'/token', params={'scope': 'lta:system'}).json()['access']
+    headers = {
+        'Accept': 'application/x-ndjson',
+        'Authorization': f'Bearer {t}',
+    }
+    http_client = AsyncHTTPClient()
+
+    response = await http_client.fetch(f'http://localhost:{port}/Bundles', headers=headers)
+    assert response.headers['Content-Type'] == 'application/x-ndjson'
+    lines = response.body.decode().splitlines()
+    assert sorted([json.loads(line) for line in lines]) == sorted(uuids)
+
+    response = await http_client.fetch(f'http://localhost:{port}/Bundles?fields=status', headers=headers)
+    lines = response.body.decode().splitlines()
+    assert [json.loads(line)["status"] for line in lines] == ["taping", "taping", "taping"]
+
+    response = await http_client.fetch(f'http://localhost:{port}/TransferRequests?source=WIPAC', headers=headers)
+    lines = response.body.decode().splitlines()
+    assert len(lines) == 1
+    assert json.loads(lines[0])["path"] == '/data/exp/foo/bar'
+
 @pytest.mark.asyncio
 async def test_get_bundles_uuid_error(rest):
     """Check that GET /Bundles/UUID returns 404 on not found."""
@@ -831,6 +1405,620 @@ async def test_bundles_actions_pop_at_destination(mongo, rest):
     assert ret['bundle']
     assert ret['bundle']["path"] == "/data/exp/IceCube/2014/15f7a399-fe40-4337-bb7e-d68d2d28ec8e.zip"
 
+@pytest.mark.asyncio
+async def test_bundles_actions_pop_limit(mongo, rest):
+    """Check batch pop action for bundles."""
+    r = rest('system')
+
+    test_data = {
+        'bundles': [
+            {
+                "source": "WIPAC",
+                "dest": "NERSC",
+                "path": f"/data/exp/IceCube/2014/bundle{i}.zip",
+                "status": "deletable",
+                "verified": True,
+            } for i in range(5)
+        ]
+    }
+    ret = await r.request('POST', '/Bundles/actions/bulk_create', test_data)
+    assert ret["count"] == 5
+
+    claimant_body = {
+        'claimant': 'testing-deleter-aaaed864-0112-4bcf-a069-bb55c12e291d',
+    }
+
+    # a limit must be a positive integer
+    with pytest.raises(Exception):
+        await r.request('POST', '/Bundles/actions/pop?dest=NERSC&status=deletable&limit=-1', claimant_body)
+
+    # there is nothing to claim at the wrong site
+    ret = await r.request('POST', '/Bundles/actions/pop?dest=DESY&status=deletable&limit=3', claimant_body)
+    assert ret['bundles'] == []
+
+    # we claim three of the five
+    ret = await r.request('POST', '/Bundles/actions/pop?dest=NERSC&status=deletable&limit=3', claimant_body)
+    assert len(ret['bundles']) == 3
+    for bundle in ret['bundles']:
+        assert bundle['claimed']
+        assert bundle['claimant'] == claimant_body['claimant']
+        assert 'claim_token' not in bundle
+    claimed = {bundle['uuid'] for bundle in ret['bundles']}
+    # the token that found our batch doesn't stay behind in the database
+    assert mongo.Bundles.count_documents({"claim_token": {"$exists": True}}) == 0
+
+    # we claim the other two, even if we asked for more
+    ret = await r.request('POST', '/Bundles/actions/pop?dest=NERSC&status=deletable&limit=3', claimant_body)
+    assert len(ret['bundles']) == 2
+    assert not claimed.intersection({bundle['uuid'] for bundle in ret['bundles']})
+
+    # repeating gets no work
+    ret = await r.request('POST', '/Bundles/actions/pop?dest=NERSC&status=deletable', claimant_body)
+    assert not ret['bundle']
+
+@pytest.mark.asyncio
+async def test_bundles_actions_pop_limit_concurrent(mongo, rest):
+    """Check that concurrent batch pops by the same claimant never claim the same bundle."""
+    r = rest('system', timeout=5)
+
+    test_data = {
+        'bundles': [
+            {
+                "source": "WIPAC",
+                "dest": "NERSC",
+                "path": f"/data/exp/IceCube/2014/bundle{i}.zip",
+                "status": "deletable",
+                "verified": True,
+            } for i in range(20)
+        ]
+    }
+    ret = await r.request('POST', '/Bundles/actions/bulk_create', test_data)
+    assert ret["count"] == 20
+
+    claimant_body = {
+        'claimant': 'testing-deleter-aaaed864-0112-4bcf-a069-bb55c12e291d',
+    }
+    pops = await asyncio.gather(*[
+        r.request('POST', '/Bundles/actions/pop?dest=NERSC&status=deletable&limit=3', claimant_body)
+        for i in range(8)
+    ])
+    claimed = [bundle['uuid'] for ret in pops for bundle in ret['bundles']]
+    # every claimed bundle was returned to exactly one pop
+    assert len(claimed) == len(set(claimed))
+    assert len(claimed) == mongo.Bundles.count_documents({"claimed": True})
+    # pops that lost a race look again, so no claimable bundle is left behind
+    assert len(claimed) == 20
+
+@pytest.mark.asyncio
+async def test_bundles_actions_pop_expired_claim(mongo, rest):
+    """Check that pop reclaims bundles whose claim lease has expired."""
+    r = rest('system')
+
+    test_data = {
+        'bundles': [
+            {
+                "source": "WIPAC",
+                "dest": "NERSC",
+                "path": "/data/exp/IceCube/2014/15f7a399-fe40-4337-bb7e-d68d2d28ec8e.zip",
+                "status": "specified",
+            },
+            {
+                "source": "WIPAC",
+                "dest": "NERSC",
+                "path": "/tmp/path1/sub1/48091a00-0c97-482f-a716-2e721b8e9662.zip",
+                "status": "specified",
+            },
+        ]
+    }
+    ret = await r.request('POST', '/Bundles/actions/bulk_create', test_data)
+    stale_uuid, live_uuid = ret["bundles"]
+
+    # a crashed bundler claimed one long ago, a live bundler claimed the other just now
+    long_ago = (datetime.utcnow() - timedelta(days=2)).isoformat(timespec='seconds')
+    mongo.Bundles.update_one({"uuid": stale_uuid}, {"$set": {"claimed": True, "claimant": "dead-bundler", "claim_timestamp": long_ago}})
+    mongo.Bundles.update_one({"uuid": live_uuid}, {"$set": {"claimed": True, "claimant": "live-bundler", "claim_timestamp": datetime.utcnow().isoformat(timespec='seconds')}})
+
+    claimant_body = {
+        'claimant': 'testing-bundler-aaaed864-0112-4bcf-a069-bb55c12e291d',
+    }
+    ret = await r.request('POST', '/Bundles/actions/pop?source=WIPAC&status=specified', claimant_body)
+    assert ret['bundle']
+    assert ret['bundle']['uuid'] == stale_uuid
+    assert ret['bundle']['claimant'] == claimant_body['claimant']
+
+    # the live claim is not taken away
+    ret = await r.request('POST', '/Bundles/actions/pop?source=WIPAC&status=specified', claimant_body)
+    assert not ret['bundle']
+
+@pytest.mark.asyncio
+async def test_bundles_actions_renew(mongo, rest):
+    """Check that renew extends the leases held by a claimant."""
+    r = rest('system')
+
+    test_data = {
+        'bundles': [
+            {
+                "source": "WIPAC",
+                "dest": "NERSC",
+                "path": f"/data/exp/IceCube/2014/bundle{i}.zip",
+                "status": "specified",
+            } for i in range(3)
+        ]
+    }
+    ret = await r.request('POST', '/Bundles/actions/bulk_create', test_data)
+    uuids = ret["bundles"]
+
+    # the renew route requires a claimant
+    with pytest.raises(Exception):
+        await r.request('POST', '/Bundles/actions/renew', {})
+    with pytest.raises(Exception):
+        await r.request('POST', '/Bundles/actions/renew', {'claimant': ''})
+    with pytest.raises(Exception):
+        await r.request('POST', '/Bundles/actions/renew', {'claimant': 'bundler', 'bundles': 'abc'})
+
+    # our bundler claims two bundles, but has not renewed them in a while
+    long_ago = (datetime.utcnow() - timedelta(days=2)).isoformat(timespec='seconds')
+    mongo.Bundles.update_many({"uuid": {"$in": uuids[0:2]}}, {"$set": {"claimed": True, "claimant": "bundler", "claim_timestamp": long_ago}})
+
+    ret = await r.request('POST', '/Bundles/actions/renew', {'claimant': 'other-bundler'})
+    assert ret['count'] == 0
+
+    ret = await r.request('POST', '/Bundles/actions/renew', {'claimant': 'bundler', 'bundles': [uuids[0]]})
+    assert ret['count'] == 1
+
+    ret = await r.request('POST', '/Bundles/actions/renew', {'claimant': 'bundler'})
+    assert ret['count'] == 2
+
+    # now that the leases are fresh, nobody else can pop them
+    claimant_body = {
+        'claimant': 'testing-bundler-aaaed864-0112-4bcf-a069-bb55c12e291d',
+    }
+    ret = await r.request('POST', '/Bundles/actions/pop?source=WIPAC&status=specified&limit=3', claimant_body)
+    assert [bundle['uuid'] for bundle in ret['bundles']] == [uuids[2]]
+
+@pytest.mark.asyncio
+async def test_bundles_files_manifest(mongo, rest, monkeypatch):
+    """Check that Bundle file manifests are stored and paged from BundleFiles."""
+    monkeypatch.setattr("lta.rest_server.MANIFEST_CHUNK_SIZE", 3)
+    r = rest('system')
+
+    files = [{"logical_name": f"/data/exp/IceCube/2014/file{i}.tar.gz", "file_size": i} for i in range(7)]
+    test_data = {
+        'bundles': [
+            {
+                "source": "WIPAC",
+                "dest": "NERSC",
+                "path": "/data/exp/IceCube/2014",
+                "status": "specified",
+                "files": files,
+            },
+        ]
+    }
+    ret = await r.request('POST', '/Bundles/actions/bulk_create', test_data)
+    uuid = ret["bundles"][0]
+
+    # the manifest is stored in chunks outside of the Bundle
+    doc = mongo.Bundles.find_one({"uuid": uuid})
+    assert "files" not in doc
+    assert doc["file_count"] == 7
+    assert mongo.BundleFiles.count_documents({"bundle": uuid}) == 3
+
+    # the Bundle is reassembled when requested with contents
+    ret = await r.request('GET', f'/Bundles/{uuid}')
+    assert ret["files"] == files
+    ret = await r.request('GET', f'/Bundles/{uuid}?contents=False')
+    assert "files" not in ret
+    ret = await r.request('POST', '/Bundles/actions/pop?source=WIPAC&status=specified', {'claimant': 'bundler'})
+    assert ret["bundle"]["files"] == files
+
+    # the manifest can be read in pages
+    ret = await r.request('GET', f'/Bundles/{uuid}/files?start=2&limit=4')
+    assert ret == {'files': files[2:6], 'start': 2, 'next': 6}
+    ret = await r.request('GET', f'/Bundles/{uuid}/files?start=6&limit=4')
+    assert ret == {'files': files[6:], 'start': 6, 'next': None}
+    with pytest.raises(Exception):
+        await r.request('GET', f'/Bundles/{uuid}/files?start=-1')
+    with pytest.raises(Exception):
+        await r.request('GET', '/Bundles/0123456789abcdef/files')
+
+    # the manifest can be replaced, but not with a bulk update
+    with pytest.raises(Exception):
+        await r.request('PATCH', f'/Bundles/{uuid}', {"files": "abc"})
+    with pytest.raises(Exception):
+        await r.request('POST', '/Bundles/actions/bulk_update', {'bundles': [uuid], 'update': {"files": []}})
+    with pytest.raises(Exception):
+        await r.request('PATCH', f'/Bundles/{uuid}', {"files_version": "abc"})
+    ret = await r.request('PATCH', f'/Bundles/{uuid}', {"files": files[0:2]})
+    assert ret["file_count"] == 2
+    ret = await r.request('GET', f'/Bundles/{uuid}')
+    assert ret["files"] == files[0:2]
+    assert mongo.BundleFiles.count_documents({"bundle": uuid}) == 1
+
+    # the chunks of a replaced manifest that were left behind are never read
+    mongo.BundleFiles.insert_one({"bundle": uuid, "version": "stale", "index": 0, "files": files[6:]})
+    ret = await r.request('GET', f'/Bundles/{uuid}')
+    assert ret["files"] == files[0:2]
+    ret = await r.request('GET', f'/Bundles/{uuid}/files')
+    assert ret["files"] == files[0:2]
+    mongo.BundleFiles.delete_one({"bundle": uuid, "version": "stale"})
+
+    # a manifest for a Bundle that doesn't exist doesn't stay behind
+    with pytest.raises(Exception):
+        await r.request('PATCH', '/Bundles/0123456789abcdef', {"files": files})
+    assert mongo.BundleFiles.count_documents({"bundle": "0123456789abcdef"}) == 0
+
+    # deleting the Bundle deletes the manifest
+    await r.request('DELETE', f'/Bundles/{uuid}')
+    assert mongo.BundleFiles.count_documents({}) == 0
+
+@pytest.mark.asyncio
+async def test_bundles_pop_contents_and_minimal_patch(mongo, rest):
+    """Check that pop can leave out the manifest and PATCH can return nothing."""
+    r = rest('system')
+
+    test_data = {
+        'bundles': [
+            {
+                "source": "WIPAC",
+                "dest": "NERSC",
+                "path": f"/data/exp/IceCube/2014/bundle{i}.zip",
+                "status": "specified",
+                "files": [{"logical_name": f"/data/exp/IceCube/2014/file{i}.tar.gz"}],
+            } for i in range(3)
+        ]
+    }
+    ret = await r.request('POST', '/Bundles/actions/bulk_create', test_data)
+    uuids = ret["bundles"]
+
+    claimant_body = {'claimant': 'bundler'}
+    ret = await r.request('POST', '/Bundles/actions/pop?source=WIPAC&status=specified&contents=false', claimant_body)
+    assert ret["bundle"]["uuid"] == uuids[0]
+    assert "files" not in ret["bundle"]
+    ret = await r.request('POST', '/Bundles/actions/pop?source=WIPAC&status=specified&contents=false&limit=2', claimant_body)
+    assert [bundle["uuid"] for bundle in ret["bundles"]] == uuids[1:]
+    assert all("files" not in bundle for bundle in ret["bundles"])
+
+    ret = await r.request('PATCH', f'/Bundles/{uuids[0]}?return=minimal', {"status": "created"})
+    assert ret == {}
+    assert mongo.Bundles.find_one({"uuid": uuids[0]})["status"] == "created"
+    with pytest.raises(Exception):
+        await r.request('PATCH', '/Bundles/0123456789abcdef?return=minimal', {"status": "created"})
+
+@pytest.mark.asyncio
+async def test_bundles_actions_transition(mongo, rest):
+    """Check that transition only moves a Bundle out of the expected state."""
+    r = rest('system')
+
+    test_data = {
+        'bundles': [
+            {
+                "source": "WIPAC",
+                "dest": "NERSC",
+                "path": "/data/exp/IceCube/2014/bundle.zip",
+                "status": "specified",
+            },
+        ]
+    }
+    ret = await r.request('POST', '/Bundles/actions/bulk_create', test_data)
+    uuid = ret["bundles"][0]
+    ret = await r.request('POST', '/Bundles/actions/pop?source=WIPAC&status=specified', {'claimant': 'bundler'})
+    assert ret["bundle"]["uuid"] == uuid
+
+    for body in [{},
+                 {"from_status": "specified"},
+                 {"from_status": 1, "to_status": "created"},
+                 {"from_status": "", "to_status": "created"},
+                 {"from_status": "specified", "to_status": "created", "claimant": 1},
+                 {"from_status": "specified", "to_status": "created", "update": []},
+                 {"from_status": "specified", "to_status": "created", "update": {"status": "quarantined"}}]:
+        with pytest.raises(Exception) as e:
+            await r.request('POST', f'/Bundles/{uuid}/actions/transition', body)
+        assert e.value.response.status_code == 400
+
+    # somebody else's claim or an unexpected state is a conflict
+    with pytest.raises(Exception) as e:
+        await r.request('POST', f'/Bundles/{uuid}/actions/transition', {"from_status": "specified", "to_status": "created", "claimant": "replicator"})
+    assert e.value.response.status_code == 409
+    with pytest.raises(Exception) as e:
+        await r.request('POST', f'/Bundles/{uuid}/actions/transition', {"from_status": "created", "to_status": "staged"})
+    assert e.value.response.status_code == 409
+    with pytest.raises(Exception) as e:
+        await r.request('POST', '/Bundles/0123456789abcdef/actions/transition', {"from_status": "specified", "to_status": "created"})
+    assert e.value.response.status_code == 404
+
+    body = {"from_status": "specified", "to_status": "created", "claimant": "bundler", "update": {"claimed": False, "size": 1234}}
+    ret = await r.request('POST', f'/Bundles/{uuid}/actions/transition', body)
+    assert ret["status"] == "created"
+    assert ret["claimed"] is False
+    assert ret["size"] == 1234
+
+    # the second caller loses the race
+    with pytest.raises(Exception) as e:
+        await r.request('POST', f'/Bundles/{uuid}/actions/transition', body)
+    assert e.value.response.status_code == 409
+
+    ret = await r.request('POST', f'/Bundles/{uuid}/actions/transition?return=minimal', {"from_status": "created", "to_status": "staged"})
+    assert ret == {}
+    assert mongo.Bundles.find_one({"uuid": uuid})["status"] == "staged"
+
+@pytest.mark.asyncio
+async def test_transfer_request_bundle_counts(mongo, rest):
+    """Check that TransferRequests keep count of their Bundles by status."""
+    r = rest('system')
+
+    ret = await r.request('POST', '/TransferRequests', {'source': 'WIPAC', 'dest': 'NERSC', 'path': '/data/exp/IceCube/2014'})
+    request_uuid = ret['TransferRequest']
+    with pytest.raises(Exception):
+        await r.request('PATCH', f'/TransferRequests/{request_uuid}', {'bundle_counts': {}})
+
+    async def bundle_counts():
+        ret = await r.request('GET', f'/TransferRequests/{request_uuid}')
+        return {status: counts for status, counts in ret["bundle_counts"].items() if counts["count"]}
+
+    assert await bundle_counts() == {}
+    test_data = {
+        'bundles': [
+            {
+                "source": "WIPAC",
+                "dest": "NERSC",
+                "path": f"/data/exp/IceCube/2014/bundle{i}.zip",
+                "request": request_uuid,
+                "status": "specified",
+            } for i in range(4)
+        ]
+    }
+    ret = await r.request('POST', '/Bundles/actions/bulk_create', test_data)
+    uuids = ret["bundles"]
+    assert await bundle_counts() == {"specified": {"count": 4, "size": 0}}
+
+    # PATCH, transition, bulk_update and delete all move the counters
+    await r.request('PATCH', f'/Bundles/{uuids[0]}?return=minimal', {"status": "created", "size": 100})
+    await r.request('PATCH', f'/Bundles/{uuids[1]}', {"status": "created", "size": 20})
+    await r.request('PATCH', f'/Bundles/{uuids[2]}', {"claimed": True})
+    assert await bundle_counts() == {"specified": {"count": 2, "size": 0}, "created": {"count": 2, "size": 120}}
+    await r.request('POST', f'/Bundles/{uuids[0]}/actions/transition', {"from_status": "created", "to_status": "deleted"})
+    assert await bundle_counts() == {"specified": {"count": 2, "size": 0}, "created": {"count": 1, "size": 20}, "deleted": {"count": 1, "size": 100}}
+    await r.request('POST', '/Bundles/actions/bulk_update', {"bundles": uuids[1:3], "update": {"status": "deleted"}})
+    assert await bundle_counts() == {"specified": {"count": 1, "size": 0}, "deleted": {"count": 3, "size": 120}}
+    await r.request('DELETE', f'/Bundles/{uuids[1]}')
+    assert await bundle_counts() == {"specified": {"count": 1, "size": 0}, "deleted": {"count": 2, "size": 100}}
+    await r.request('POST', '/Bundles/actions/bulk_delete', {"bundles": uuids})
+    assert await bundle_counts() == {}
+
+@pytest.mark.asyncio
+async def test_transfer_request_bundle_counts_concurrent(mongo, rest):
+    """Check that bulk routes racing with PATCH keep bundle_counts in step with the Bundles."""
+    r = rest('system', timeout=10.0)
+
+    ret = await r.request('POST', '/TransferRequests', {'source': 'WIPAC', 'dest': 'NERSC', 'path': '/data/exp/IceCube/2014'})
+    request_uuid = ret['TransferRequest']
+
+    async def check_bundle_counts():
+        expected: Dict[str, Dict[str, int]] = {}
+        for bundle in mongo.Bundles.find({"request": request_uuid}):
+            total = expected.setdefault(bundle["status"], {"count": 0, "size": 0})
+            total["count"] += 1
+            total["size"] += bundle["size"]
+        ret = await r.request('GET', f'/TransferRequests/{request_uuid}')
+        assert {status: counts for status, counts in ret["bundle_counts"].items() if counts["count"]} == expected
+        assert mongo.Bundles.count_documents({"bulk_token": {"$exists": True}}) == 0
+
+    test_data = {
+        'bundles': [
+            {
+                "source": "WIPAC",
+                "dest": "NERSC",
+                "path": f"/data/exp/IceCube/2014/bundle{i}.zip",
+                "request": request_uuid,
+                "size": i + 1,
+                "status": "specified",
+            } for i in range(40)
+        ]
+    }
+    ret = await r.request('POST', '/Bundles/actions/bulk_create', test_data)
+    uuids = ret["bundles"]
+
+    # PATCH every other Bundle while bulk_update moves all of them
+    for status in ["deleted", "finished", "detached"]:
+        patches = [r.request('PATCH', f'/Bundles/{uuid}?return=minimal', {"status": "created", "size": 1000}) for uuid in uuids[::2]]
+        await asyncio.gather(r.request('POST', '/Bundles/actions/bulk_update', {"bundles": uuids, "update": {"status": status}}), *patches)
+        await check_bundle_counts()
+
+    # PATCH every other Bundle while bulk_delete removes half of them
+    patches = [r.request('PATCH', f'/Bundles/{uuid}?return=minimal', {"status": "deleted", "size": 10}) for uuid in uuids[::2]]
+    # a PATCH that loses the race to bulk_delete finds nothing to patch
+    rets = await asyncio.gather(r.request('POST', '/Bundles/actions/bulk_delete', {"bundles": uuids[:20]}), *patches, return_exceptions=True)
+    assert rets[0]["count"] == 20
+    await check_bundle_counts()
+
+@pytest.mark.asyncio
+async def test_transfer_request_bundle_counts_archived(mongo, rest):
+    """Check that archived Bundles still count towards their TransferRequest."""
+    r = rest('system')
+
+    ret = await r.request('POST', '/TransferRequests', {'source': 'WIPAC', 'dest': 'NERSC', 'path': '/data/exp/IceCube/2014'})
+    request_uuid = ret['TransferRequest']
+
+    async def bundle_counts():
+        ret = await r.request('GET', f'/TransferRequests/{request_uuid}')
+        return {status: counts for status, counts in ret["bundle_counts"].items() if counts["count"]}
+
+    test_data = {
+        'bundles': [
+            {
+                "source": "WIPAC",
+                "dest": "NERSC",
+                "path": f"/data/exp/IceCube/2014/bundle{i}.zip",
+                "request": request_uuid,
+                "size": 10,
+                "status": "finished",
+            } for i in range(3)
+        ]
+    }
+    ret = await r.request('POST', '/Bundles/actions/bulk_create', test_data)
+    uuids = ret["bundles"]
+    mongo.Bundles.update_many({"uuid": {"$in": uuids[:2]}}, {"$set": {"update_timestamp": "2020-01-01T00:00:00"}})
+    ret = await r.request('POST', '/Bundles/actions/archive', {})
+    assert ret['count'] == 2
+    assert await bundle_counts() == {"finished": {"count": 3, "size": 30}}
+
+    # archived Bundles stay in the counters
+    await r.request('POST', '/Bundles/actions/bulk_update', {"bundles": uuids[2:], "update": {"status": "deleted"}})
+    assert await bundle_counts() == {"finished": {"count": 2, "size": 20}, "deleted": {"count": 1, "size": 10}}
+    await r.request('DELETE', f'/Bundles/{uuids[0]}')
+    assert await bundle_counts() == {"finished": {"count": 1, "size": 10}, "deleted": {"count": 1, "size": 10}}
+    await r.request('POST', '/Bundles/actions/bulk_delete', {"bundles": uuids})
+    assert await bundle_counts() == {"finished": {"count": 1, "size": 10}}
+
+@pytest.mark.asyncio
+async def test_archive(mongo, rest):
+    """Check that old finished documents move to the archive and can still be read."""
+    r = rest('system')
+
+    for request in [{'days': 'abc'}, {'days': -1}, {'limit': 'abc'}, {'limit': 0}]:
+        with pytest.raises(Exception):
+            await r.request('POST', '/Bundles/actions/archive', request)
+
+    old = "2020-01-01T00:00:00"
+    mongo.Bundles.insert_many([
+        {"uuid": "old_finished", "status": "finished", "update_timestamp": old, "file_count": 1},
+        {"uuid": "old_detached", "status": "detached", "update_timestamp": old},
+        {"uuid": "old_created", "status": "created", "update_timestamp": old},
+        {"uuid": "new_finished", "status": "finished", "update_timestamp": "2999-01-01T00:00:00"},
+    ])
+    mongo.BundleFiles.insert_one({"bundle": "old_finished", "index": 0, "files": [{"logical_name": "/a"}]})
+    mongo.TransferRequests.insert_many([
+        {"uuid": "old_completed", "status": "completed", "update_timestamp": old},
+        {"uuid": "old_unclaimed", "status": "unclaimed", "update_timestamp": old},
+    ])
+
+    ret = await r.request('POST', '/Bundles/actions/archive', {'limit': 1})
+    assert ret['count'] == 1
+    ret = await r.request('POST', '/Bundles/actions/archive', {})
+    assert ret['count'] == 0
+    # detached Bundles are still waiting for the deleter
+    assert sorted(doc["uuid"] for doc in mongo.Bundles.find()) == ["new_finished", "old_created", "old_detached"]
+    assert sorted(doc["uuid"] for doc in mongo.BundlesArchive.find()) == ["old_finished"]
+    # the manifest of an archived Bundle is archived with it
+    assert mongo.BundleFiles.count_documents({"bundle": "old_finished"}) == 0
+    assert mongo.BundleFilesArchive.count_documents({"bundle": "old_finished"}) == 1
+    ret = await r.request('POST', '/TransferRequests/actions/archive', {'days': 1})
+    assert ret == {'uuids': ['old_completed'], 'count': 1}
+
+    # archived documents are still there when asked for by uuid
+    ret = await r.request('GET', '/Bundles/old_finished')
+    assert ret["files"] == [{"logical_name": "/a"}]
+    ret = await r.request('GET', '/Bundles/old_finished/files')
+    assert ret["files"] == [{"logical_name": "/a"}]
+    ret = await r.request('POST', '/Bundles/actions/bulk_get', {'bundles': ['old_created', 'old_finished'], 'fields': ['status']})
+    assert ret['bundles'] == [{"uuid": "old_created", "status": "created"}, {"uuid": "old_finished", "status": "finished"}]
+    ret = await r.request('GET', '/TransferRequests/old_completed')
+    assert ret["status"] == "completed"
+    ret = await r.request('GET', '/TransferRequests')
+    assert [request["uuid"] for request in ret["results"]] == ["old_unclaimed"]
+
+    await r.request('DELETE', '/Bundles/old_finished')
+    with pytest.raises(Exception):
+        await r.request('GET', '/Bundles/old_finished')
+    assert mongo.BundleFilesArchive.count_documents({}) == 0
+
+@pytest.mark.asyncio
+async def test_bundles_actions_pop_fair(mongo, rest):
+    """Check that fair-share pop takes turns between TransferRequests."""
+    r = rest('system')
+
+    claimant_body = {'claimant': 'replicator'}
+    with pytest.raises(Exception):
+        await r.request('POST', '/Bundles/actions/pop?source=WIPAC&status=created&policy=lifo', claimant_body)
+    ret = await r.request('POST', '/Bundles/actions/pop?source=WIPAC&status=created&policy=fair', claimant_body)
+    assert ret["bundle"] is None
+
+    ret = await r.request('POST', '/TransferRequests', {'source': 'WIPAC', 'dest': 'NERSC', 'path': '/data/exp/IceCube/2013'})
+    big = ret['TransferRequest']
+    ret = await r.request('POST', '/TransferRequests', {'source': 'WIPAC', 'dest': 'NERSC', 'path': '/data/exp/IceCube/2014'})
+    small = ret['TransferRequest']
+    for request, count in [(big, 6), (small, 2)]:
+        test_data = {
+            'bundles': [
+                {
+                    "source": "WIPAC",
+                    "dest": "NERSC",
+                    "path": f"/data/exp/IceCube/bundle{i}.zip",
+                    "request": request,
+                    "status": "created",
+                } for i in range(count)
+            ]
+        }
+        await r.request('POST', '/Bundles/actions/bulk_create', test_data)
+
+    # first in, first out would hand out every big Bundle before the small ones
+    ret = await r.request('POST', '/Bundles/actions/pop?source=WIPAC&status=created&limit=2', claimant_body)
+    assert [bundle["request"] for bundle in ret["bundles"]] == [big, big]
+    ret = await r.request('POST', '/Bundles/actions/pop?source=WIPAC&status=created&policy=fair&limit=2', claimant_body)
+    assert sorted(bundle["request"] for bundle in ret["bundles"]) == sorted([big, small])
+    ret = await r.request('POST', '/Bundles/actions/pop?source=WIPAC&status=created&policy=fair', claimant_body)
+    first = ret["bundle"]["request"]
+    ret = await r.request('POST', '/Bundles/actions/pop?source=WIPAC&status=created&policy=fair', claimant_body)
+    assert {first, ret["bundle"]["request"]} == {big, small}
+    # once the small TransferRequest is done, the big one gets everything
+    ret = await r.request('POST', '/Bundles/actions/pop?source=WIPAC&status=created&policy=fair&limit=5', claimant_body)
+    assert [bundle["request"] for bundle in ret["bundles"]] == [big, big]
+    ret = await r.request('POST', '/Bundles/actions/pop?source=WIPAC&status=created&policy=fair', claimant_body)
+    assert ret["bundle"] is None
+
+@pytest.mark.asyncio
+async def test_bundles_actions_pop_wait(mongo, rest):
+    """Check that pop with wait holds the request until work arrives."""
+    r = rest('system', timeout=10.0)
+
+    claimant_body = {'claimant': 'bundler'}
+    with pytest.raises(Exception):
+        await r.request('POST', '/Bundles/actions/pop?source=WIPAC&status=specified&wait=abc', claimant_body)
+    with pytest.raises(Exception):
+        await r.request('POST', '/Bundles/actions/pop?source=WIPAC&status=specified&wait=-1', claimant_body)
+
+    # nothing shows up, so we give up after waiting
+    ret = await r.request('POST', '/Bundles/actions/pop?source=WIPAC&status=specified&wait=0.1', claimant_body)
+    assert ret['bundle'] is None
+
+    test_data = {
+        'bundles': [
+            {
+                "source": "WIPAC",
+                "dest": "NERSC",
+                "path": "/data/exp/IceCube/2014/bundle.zip",
+                "status": "created",
+            },
+        ]
+    }
+    ret = await r.request('POST', '/Bundles/actions/bulk_create', test_data)
+    uuid = ret["bundles"][0]
+
+    # the waiting pop is woken up by the PATCH that makes the bundle claimable
+    pop = asyncio.ensure_future(r.request('POST', '/Bundles/actions/pop?source=WIPAC&status=specified&wait=8', claimant_body))
+    await asyncio.sleep(0.25)
+    assert not pop.done()
+    start = datetime.utcnow()
+    await r.request('PATCH', f'/Bundles/{uuid}', {"status": "specified"})
+    ret = await pop
+    assert ret['bundle']['uuid'] == uuid
+    assert (datetime.utcnow() - start) < timedelta(seconds=4)
+
+@pytest.mark.asyncio
+async def test_transfer_request_pop_wait(mongo, rest):
+    """Check that pop with wait is woken up by a new TransferRequest."""
+    r = rest('system', timeout=10.0)
+
+    claimant_body = {'claimant': 'picker'}
+    pop = asyncio.ensure_future(r.request('POST', '/TransferRequests/actions/pop?source=WIPAC&wait=8', claimant_body))
+    await asyncio.sleep(0.25)
+    assert not pop.done()
+    request = {'source': 'WIPAC', 'dest': 'NERSC', 'path': '/data/exp/foo/bar'}
+    ret = await r.request('POST', '/TransferRequests', request)
+    uuid = ret['TransferRequest']
+    ret = await pop
+    assert ret['transfer_request']['uuid'] == uuid
+
 @pytest.mark.asyncio
 async def test_bundles_actions_bulk_create_huge(mongo, rest):
     """Check pop action for bundles at destination."""
@@ -886,6 +2074,16 @@ async def test_bundles_actions_bulk_create_huge(mongo, rest):
     assert len(ret["bundles"]) == 1
     assert ret["count"] == 1
 
+    #
+    # Create - POST /Bundles/actions/bulk_create; large enough to be chunked
+    #
+    files = test_data["bundles"][0]["files"]
+    test_data["bundles"] = [dict(test_data["bundles"][0], files=files[i::4]) for i in range(4)]
+    ret = await r.request('POST', '/Bundles/actions/bulk_create', test_data)
+    assert len(ret["bundles"]) == 4
+    assert ret["count"] == 4
+    assert mongo.Bundles.count_documents({}) == 5
+
 @pytest.mark.asyncio
 async def test_status_component_count(mongo, rest):
     """Verify that GET /status/{component}/count works."""
@@ -1,6 +1,8 @@
 # test_rucio_stager.py
 """Unit tests for lta/rucio_stager.py."""
 
+import asyncio
+import time
 from unittest.mock import call, MagicMock
 
 import pytest  # type: ignore
@@ -20,13 +22,17 @@ def config():
         "HEARTBEAT_PATCH_RETRIES": "3",
         "HEARTBEAT_PATCH_TIMEOUT_SECONDS": "30",
         "HEARTBEAT_SLEEP_DURATION_SECONDS": "60",
+        "LOOP_STALL_LOG_SECONDS": "0",
         "LTA_REST_TOKEN": "fake-lta-rest-token",
         "LTA_REST_URL": "http://RmMNHdPhHpH2ZxfaFAC9d2jiIbf5pZiHDqy43rFLQiM.com/",
         "RUCIO_INBOX_PATH": "/path/to/icecube/rucio/inbox",
         "RUN_ONCE_AND_DIE": "False",
         "SOURCE_SITE": "WIPAC",
+        "WORK_BYTES_IN_FLIGHT": "0",
+        "WORK_CONCURRENCY": "1",
         "WORK_RETRIES": "3",
         "WORK_SLEEP_DURATION_SECONDS": "60",
+        "WORK_SLEEP_MIN_DURATION_SECONDS": "5",
         "WORK_TIMEOUT_SECONDS": "30",
     }
 
@@ -70,13 +76,17 @@ async def test_rucio_stager_logs_configuration(mocker):
         "HEARTBEAT_PATCH_RETRIES": "1",
         "HEARTBEAT_PATCH_TIMEOUT_SECONDS": "20",
         "HEARTBEAT_SLEEP_DURATION_SECONDS": "30",
+        "LOOP_STALL_LOG_SECONDS": "0",
         "LTA_REST_TOKEN": "logme-fake-lta-rest-token",
         "LTA_REST_URL": "logme-http://zjwdm5ggeEgS1tZDZy9l1DOZU53uiSO4Urmyb8xL0.com/",
         "RUCIO_INBOX_PATH": "/path/to/icecube/rucio/inbox",
         "RUN_ONCE_AND_DIE": "False",
         "SOURCE_SITE": "WIPAC",
+        "WORK_BYTES_IN_FLIGHT": "0",
+        "WORK_CONCURRENCY": "1",
         "WORK_RETRIES": "5",
         "WORK_SLEEP_DURATION_SECONDS": "70",
+        "WORK_SLEEP_MIN_DURATION_SECONDS": "5",
         "WORK_TIMEOUT_SECONDS": "90",
     }
     RucioStager(rucio_stager_config, logger_mock)
@@ -89,13 +99,17 @@ async def test_rucio_stager_logs_configuration(mocker):
         call('HEARTBEAT_PATCH_RETRIES = 1'),
         call('HEARTBEAT_PATCH_TIMEOUT_SECONDS = 20'),
         call('HEARTBEAT_SLEEP_DURATION_SECONDS = 30'),
+        call('LOOP_STALL_LOG_SECONDS = 0'),
         call('LTA_REST_TOKEN = logme-fake-lta-rest-token'),
         call('LTA_REST_URL = logme-http://zjwdm5ggeEgS1tZDZy9l1DOZU53uiSO4Urmyb8xL0.com/'),
         call('RUCIO_INBOX_PATH = /path/to/icecube/rucio/inbox'),
         call('RUN_ONCE_AND_DIE = False'),
         call('SOURCE_SITE = WIPAC'),
+        call('WORK_BYTES_IN_FLIGHT = 0'),
+        call('WORK_CONCURRENCY = 1'),
         call('WORK_RETRIES = 5'),
         call('WORK_SLEEP_DURATION_SECONDS = 70'),
+        call('WORK_SLEEP_MIN_DURATION_SECONDS = 5'),
         call('WORK_TIMEOUT_SECONDS = 90')
     ]
     logger_mock.info.assert_has_calls(EXPECTED_LOGGER_CALLS)
@@ -150,7 +164,7 @@ async def test_rucio_stager_do_work_pop_exception(config, mocker):
     p = RucioStager(config, logger_mock)
     with pytest.raises(HTTPError):
         await p._do_work()
-    lta_rc_mock.assert_called_with("POST", '/Bundles/actions/pop?dest=NERSC&status=created', {'claimant': f'{p.name}-{p.instance_uuid}'})
+    lta_rc_mock.assert_called_with("POST", '/Bundles/actions/pop?dest=NERSC&status=created&contents=false&wait=15', {'claimant': f'{p.name}-{p.instance_uuid}'})
 
 @pytest.mark.asyncio
 async def test_rucio_stager_do_work_no_results(config, mocker):
@@ -183,7 +197,7 @@ async def test_rucio_stager_do_work_claim_no_result(config, mocker):
     sb_mock = mocker.patch("lta.rucio_stager.RucioStager._stage_bundle", new_callable=AsyncMock)
     p = RucioStager(config, logger_mock)
     await p._do_work_claim()
-    lta_rc_mock.assert_called_with("POST", '/Bundles/actions/pop?dest=NERSC&status=created', {'claimant': f'{p.name}-{p.instance_uuid}'})
+    lta_rc_mock.assert_called_with("POST", '/Bundles/actions/pop?dest=NERSC&status=created&contents=false&wait=15', {'claimant': f'{p.name}-{p.instance_uuid}'})
     sb_mock.assert_not_called()
 
 @pytest.mark.asyncio
@@ -199,7 +213,7 @@ async def test_rucio_stager_do_work_claim_yes_result(config, mocker):
     sb_mock = mocker.patch("lta.rucio_stager.RucioStager._stage_bundle", new_callable=AsyncMock)
     p = RucioStager(config, logger_mock)
     assert not await p._do_work_claim()
-    lta_rc_mock.assert_called_with("POST", '/Bundles/actions/pop?dest=NERSC&status=created', {'claimant': f'{p.name}-{p.instance_uuid}'})
+    lta_rc_mock.assert_called_with("POST", '/Bundles/actions/pop?dest=NERSC&status=created&contents=false&wait=15', {'claimant': f'{p.name}-{p.instance_uuid}'})
     sb_mock.assert_called_with(mocker.ANY, {"one": 1})
 
 @pytest.mark.asyncio
@@ -218,7 +232,7 @@ async def test_rucio_stager_stage_bundle_raises(config, mocker):
     p = RucioStager(config, logger_mock)
     with pytest.raises(Exception):
         await p._do_work_claim()
-    lta_rc_mock.assert_called_with("POST", '/Bundles/actions/pop?dest=NERSC&status=created', {'claimant': f'{p.name}-{p.instance_uuid}'})
+    lta_rc_mock.assert_called_with("POST", '/Bundles/actions/pop?dest=NERSC&status=created&contents=false&wait=15', {'claimant': f'{p.name}-{p.instance_uuid}'})
     sb_mock.assert_called_with(mocker.ANY, {"one": 1})
     qb_mock.assert_called_with(mocker.ANY, {"one": 1}, "LTA DB unavailable; currently safer at home")
 
@@ -237,7 +251,33 @@ async def test_rucio_stager_stage_bundle(config, mocker):
         "size": 536870912000,
     })
     move_mock.assert_called()
-    lta_rc_mock.request.assert_called_with("PATCH", "/Bundles/c4b345e4-2395-4f9e-b0eb-9cc1c9cdf003", mocker.ANY)
+    lta_rc_mock.request.assert_called_with("PATCH", "/Bundles/c4b345e4-2395-4f9e-b0eb-9cc1c9cdf003?return=minimal", mocker.ANY)
+
+@pytest.mark.asyncio
+async def test_rucio_stager_stage_bundle_concurrent_quota(config, mocker):
+    """Test that _stage_bundle counts Bundles still being moved against the quota."""
+    logger_mock = mocker.MagicMock()
+    lta_rc_mock = mocker.patch("rest_tools.client.RestClient", new_callable=AsyncMock)
+    move_mock = mocker.patch("shutil.move", new_callable=MagicMock)
+    move_mock.side_effect = lambda src, dst: time.sleep(0.1)
+    gfas_mock = mocker.patch("lta.rucio_stager._get_files_and_size", new_callable=MagicMock)
+    gfas_mock.return_value = ([], 0)
+    ub_mock = mocker.patch("lta.rucio_stager.RucioStager._unclaim_bundle", new_callable=AsyncMock)
+    config["WORK_CONCURRENCY"] = "2"
+    p = RucioStager(config, logger_mock)
+    # each Bundle fits within the quota, but both of them don't
+    bundles = [
+        {
+            "uuid": uuid,
+            "bundle_path": f"/icecube/datawarehouse/path/to/{uuid}.zip",
+            "size": 7 * 1024**4,
+        } for uuid in ["c4b345e4-2395-4f9e-b0eb-9cc1c9cdf003", "7b1c2a8e-0c4f-4d4b-9a34-2f4a1fdc9c71"]
+    ]
+    staged = await asyncio.gather(*[p._stage_bundle(lta_rc_mock, bundle) for bundle in bundles])
+    assert sorted(staged) == [False, True]
+    assert move_mock.call_count == 1
+    assert ub_mock.call_count == 1
+    assert p.staging_bytes == 0
 
 @pytest.mark.asyncio
 async def test_rucio_stager_stage_bundle_over_quota(config, mocker):
@@ -269,7 +309,7 @@ async def test_rucio_stager_quarantine_bundle_with_reason(config, mocker):
     lta_rc_mock = mocker.patch("rest_tools.client.RestClient", new_callable=AsyncMock)
     p = RucioStager(config, logger_mock)
     await p._quarantine_bundle(lta_rc_mock, {"uuid": "c4b345e4-2395-4f9e-b0eb-9cc1c9cdf003"}, "Rucio caught fire, then we roasted marshmellows.")
-    lta_rc_mock.request.assert_called_with("PATCH", "/Bundles/c4b345e4-2395-4f9e-b0eb-9cc1c9cdf003", mocker.ANY)
+    lta_rc_mock.request.assert_called_with("PATCH", "/Bundles/c4b345e4-2395-4f9e-b0eb-9cc1c9cdf003?return=minimal", mocker.ANY)
 
 @pytest.mark.asyncio
 async def test_rucio_stager_unclaim_bundle(config, mocker):
@@ -278,4 +318,4 @@ async def test_rucio_stager_unclaim_bundle(config, mocker):
     lta_rc_mock = mocker.patch("rest_tools.client.RestClient", new_callable=AsyncMock)
     p = RucioStager(config, logger_mock)
     await p._unclaim_bundle(lta_rc_mock, {"uuid": "c4b345e4-2395-4f9e-b0eb-9cc1c9cdf003"})
-    lta_rc_mock.request.assert_called_with("PATCH", "/Bundles/c4b345e4-2395-4f9e-b0eb-9cc1c9cdf003", mocker.ANY)
+    lta_rc_mock.request.assert_called_with("PATCH", "/Bundles/c4b345e4-2395-4f9e-b0eb-9cc1c9cdf003?return=minimal", mocker.ANY)
@@ -1,6 +1,7 @@
 # test_site_move_verifier.py
 """Unit tests for lta/site_move_verifier.py."""
 
+from concurrent.futures import ThreadPoolExecutor
 from unittest.mock import call, MagicMock
 
 import pytest  # type: ignore
@@ -20,14 +21,18 @@ def config():
         "HEARTBEAT_PATCH_RETRIES": "3",
         "HEARTBEAT_PATCH_TIMEOUT_SECONDS": "30",
         "HEARTBEAT_SLEEP_DURATION_SECONDS": "60",
+        "LOOP_STALL_LOG_SECONDS": "0",
         "LTA_REST_TOKEN": "fake-lta-rest-token",
         "LTA_REST_URL": "http://RmMNHdPhHpH2ZxfaFAC9d2jiIbf5pZiHDqy43rFLQiM.com/",
         "NEXT_STATUS": "taping",
         "RUN_ONCE_AND_DIE": "False",
         "SOURCE_SITE": "WIPAC",
         "USE_FULL_BUNDLE_PATH": "FALSE",
+        "WORK_BYTES_IN_FLIGHT": "0",
+        "WORK_CONCURRENCY": "1",
         "WORK_RETRIES": "3",
         "WORK_SLEEP_DURATION_SECONDS": "60",
+        "WORK_SLEEP_MIN_DURATION_SECONDS": "5",
         "WORK_TIMEOUT_SECONDS": "30",
     }
 
@@ -146,14 +151,18 @@ async def test_site_move_verifier_logs_configuration(mocker):
         "HEARTBEAT_PATCH_RETRIES": "1",
         "HEARTBEAT_PATCH_TIMEOUT_SECONDS": "20",
         "HEARTBEAT_SLEEP_DURATION_SECONDS": "30",
+        "LOOP_STALL_LOG_SECONDS": "0",
         "LTA_REST_TOKEN": "logme-fake-lta-rest-token",
         "LTA_REST_URL": "logme-http://zjwdm5ggeEgS1tZDZy9l1DOZU53uiSO4Urmyb8xL0.com/",
         "NEXT_STATUS": "prognosticating",
         "RUN_ONCE_AND_DIE": "False",
         "SOURCE_SITE": "WIPAC",
         "USE_FULL_BUNDLE_PATH": "FALSE",
+        "WORK_BYTES_IN_FLIGHT": "0",
+        "WORK_CONCURRENCY": "1",
         "WORK_RETRIES": "5",
         "WORK_SLEEP_DURATION_SECONDS": "70",
+        "WORK_SLEEP_MIN_DURATION_SECONDS": "5",
         "WORK_TIMEOUT_SECONDS": "90",
     }
     SiteMoveVerifier(site_move_verifier_config, logger_mock)
@@ -165,14 +174,18 @@ async def test_site_move_verifier_logs_configuration(mocker):
         call('HEARTBEAT_PATCH_RETRIES = 1'),
         call('HEARTBEAT_PATCH_TIMEOUT_SECONDS = 20'),
         call('HEARTBEAT_SLEEP_DURATION_SECONDS = 30'),
+        call('LOOP_STALL_LOG_SECONDS = 0'),
         call('LTA_REST_TOKEN = logme-fake-lta-rest-token'),
         call('LTA_REST_URL = logme-http://zjwdm5ggeEgS1tZDZy9l1DOZU53uiSO4Urmyb8xL0.com/'),
         call('NEXT_STATUS = prognosticating'),
         call('RUN_ONCE_AND_DIE = False'),
         call('SOURCE_SITE = WIPAC'),
         call('USE_FULL_BUNDLE_PATH = FALSE'),
+        call('WORK_BYTES_IN_FLIGHT = 0'),
+        call('WORK_CONCURRENCY = 1'),
         call('WORK_RETRIES = 5'),
         call('WORK_SLEEP_DURATION_SECONDS = 70'),
+        call('WORK_SLEEP_MIN_DURATION_SECONDS = 5'),
         call('WORK_TIMEOUT_SECONDS = 90')
     ]
     logger_mock.info.assert_has_calls(EXPECTED_LOGGER_CALLS)
@@ -227,7 +240,7 @@ async def test_site_move_verifier_do_work_pop_exception(config, mocker):
     p = SiteMoveVerifier(config, logger_mock)
     with pytest.raises(HTTPError):
         await p._do_work()
-    lta_rc_mock.assert_called_with("POST", '/Bundles/actions/pop?dest=NERSC&status=transferring', {'claimant': f'{p.name}-{p.instance_uuid}'})
+    lta_rc_mock.assert_called_with("POST", '/Bundles/actions/pop?dest=NERSC&status=transferring&contents=false&wait=15', {'claimant': f'{p.name}-{p.instance_uuid}'})
 
 @pytest.mark.asyncio
 async def test_site_move_verifier_do_work_no_results(config, mocker):
@@ -260,7 +273,7 @@ async def test_site_move_verifier_do_work_claim_no_result(config, mocker):
     vb_mock = mocker.patch("lta.site_move_verifier.SiteMoveVerifier._verify_bundle", new_callable=AsyncMock)
     p = SiteMoveVerifier(config, logger_mock)
     await p._do_work_claim()
-    lta_rc_mock.assert_called_with("POST", '/Bundles/actions/pop?dest=NERSC&status=transferring', {'claimant': f'{p.name}-{p.instance_uuid}'})
+    lta_rc_mock.assert_called_with("POST", '/Bundles/actions/pop?dest=NERSC&status=transferring&contents=false&wait=15', {'claimant': f'{p.name}-{p.instance_uuid}'})
     vb_mock.assert_not_called()
 
 @pytest.mark.asyncio
@@ -276,7 +289,7 @@ async def test_site_move_verifier_do_work_claim_yes_result(config, mocker):
     vb_mock = mocker.patch("lta.site_move_verifier.SiteMoveVerifier._verify_bundle", new_callable=AsyncMock)
     p = SiteMoveVerifier(config, logger_mock)
     assert await p._do_work_claim()
-    lta_rc_mock.assert_called_with("POST", '/Bundles/actions/pop?dest=NERSC&status=transferring', {'claimant': f'{p.name}-{p.instance_uuid}'})
+    lta_rc_mock.assert_called_with("POST", '/Bundles/actions/pop?dest=NERSC&status=transferring&contents=false&wait=15', {'claimant': f'{p.name}-{p.instance_uuid}'})
     vb_mock.assert_called_with(mocker.ANY, {"one": 1})
 
 @pytest.mark.asyncio
@@ -291,6 +304,7 @@ async def test_site_move_verifier_verify_bundle_bad_checksum(config, mocker):
     getmtime_mock = mocker.patch("os.path.getmtime")
     getmtime_mock.return_value = 1588042614 - 120
     hash_mock = mocker.patch("lta.site_move_verifier.sha512sum")
+    mocker.patch("lta.component.ProcessPoolExecutor", ThreadPoolExecutor)  # mocks can't be sent to another process
     hash_mock.return_value = "54321"
     bundle_obj = {
         "uuid": "8286d3ba-fb1b-4923-876d-935bdf7fc99e",
@@ -305,7 +319,7 @@ async def test_site_move_verifier_verify_bundle_bad_checksum(config, mocker):
     p = SiteMoveVerifier(config, logger_mock)
     await p._verify_bundle(lta_rc_mock, bundle_obj)
     hash_mock.assert_called_with("/path/to/rse/8286d3ba-fb1b-4923-876d-935bdf7fc99e.zip")
-    lta_rc_mock.request.assert_called_with("PATCH", '/Bundles/8286d3ba-fb1b-4923-876d-935bdf7fc99e', {
+    lta_rc_mock.request.assert_called_with("PATCH", '/Bundles/8286d3ba-fb1b-4923-876d-935bdf7fc99e?return=minimal', {
         "status": "quarantined",
         "reason": mocker.ANY,
         "work_priority_timestamp": mocker.ANY,
@@ -323,6 +337,7 @@ async def test_site_move_verifier_verify_bundle_good_checksum(config, mocker):
     getmtime_mock = mocker.patch("os.path.getmtime")
     getmtime_mock.return_value = 1588042614 - 120
     hash_mock = mocker.patch("lta.site_move_verifier.sha512sum")
+    mocker.patch("lta.component.ProcessPoolExecutor", ThreadPoolExecutor)  # mocks can't be sent to another process
     hash_mock.return_value = "12345"
     bundle_obj = {
         "uuid": "8286d3ba-fb1b-4923-876d-935bdf7fc99e",
@@ -337,7 +352,7 @@ async def test_site_move_verifier_verify_bundle_good_checksum(config, mocker):
     p = SiteMoveVerifier(config, logger_mock)
     await p._verify_bundle(lta_rc_mock, bundle_obj)
     hash_mock.assert_called_with("/path/to/rse/8286d3ba-fb1b-4923-876d-935bdf7fc99e.zip")
-    lta_rc_mock.request.assert_called_with("PATCH", '/Bundles/8286d3ba-fb1b-4923-876d-935bdf7fc99e', {
+    lta_rc_mock.request.assert_called_with("PATCH", '/Bundles/8286d3ba-fb1b-4923-876d-935bdf7fc99e?return=minimal', {
         "status": "taping",
         "reason": "",
         "update_timestamp": mocker.ANY,
@@ -17,14 +17,18 @@ def config():
         "HEARTBEAT_PATCH_RETRIES": "3",
         "HEARTBEAT_PATCH_TIMEOUT_SECONDS": "30",
         "HEARTBEAT_SLEEP_DURATION_SECONDS": "60",
+        "LOOP_STALL_LOG_SECONDS": "0",
         "LTA_REST_TOKEN": "fake-lta-rest-token",
         "LTA_REST_URL": "http://RmMNHdPhHpH2ZxfaFAC9d2jiIbf5pZiHDqy43rFLQiM.com/",
         "RUCIO_PASSWORD": "hunter2",
         "RUN_ONCE_AND_DIE": "False",
         "SOURCE_SITE": "WIPAC",
         "TRANSFER_CONFIG_PATH": "examples/rucio.json",
+        "WORK_BYTES_IN_FLIGHT": "0",
+        "WORK_CONCURRENCY": "1",
         "WORK_RETRIES": "3",
         "WORK_SLEEP_DURATION_SECONDS": "60",
+        "WORK_SLEEP_MIN_DURATION_SECONDS": "5",
         "WORK_TIMEOUT_SECONDS": "30",
     }
 
@@ -59,14 +63,18 @@ async def test_transfer_request_finisher_logs_configuration(mocker):
         "HEARTBEAT_PATCH_RETRIES": "1",
         "HEARTBEAT_PATCH_TIMEOUT_SECONDS": "20",
         "HEARTBEAT_SLEEP_DURATION_SECONDS": "30",
+        "LOOP_STALL_LOG_SECONDS": "0",
         "LTA_REST_TOKEN": "logme-fake-lta-rest-token",
         "LTA_REST_URL": "logme-http://zjwdm5ggeEgS1tZDZy9l1DOZU53uiSO4Urmyb8xL0.com/",
         "RUCIO_PASSWORD": "hunter3-electric-boogaloo",
         "RUN_ONCE_AND_DIE": "False",
         "SOURCE_SITE": "WIPAC",
         "TRANSFER_CONFIG_PATH": "examples/rucio.json",
+        "WORK_BYTES_IN_FLIGHT": "0",
+        "WORK_CONCURRENCY": "1",
         "WORK_RETRIES": "5",
         "WORK_SLEEP_DURATION_SECONDS": "70",
+        "WORK_SLEEP_MIN_DURATION_SECONDS": "5",
         "WORK_TIMEOUT_SECONDS": "90",
     }
     TransferRequestFinisher(transfer_request_finisher_config, logger_mock)
@@ -76,14 +84,18 @@ async def test_transfer_request_finisher_logs_configuration(mocker):
         call('HEARTBEAT_PATCH_RETRIES = 1'),
         call('HEARTBEAT_PATCH_TIMEOUT_SECONDS = 20'),
         call('HEARTBEAT_SLEEP_DURATION_SECONDS = 30'),
+        call('LOOP_STALL_LOG_SECONDS = 0'),
         call('LTA_REST_TOKEN = logme-fake-lta-rest-token'),
         call('LTA_REST_URL = logme-http://zjwdm5ggeEgS1tZDZy9l1DOZU53uiSO4Urmyb8xL0.com/'),
         call('RUCIO_PASSWORD = hunter3-electric-boogaloo'),
         call('RUN_ONCE_AND_DIE = False'),
         call('SOURCE_SITE = WIPAC'),
         call('TRANSFER_CONFIG_PATH = examples/rucio.json'),
+        call('WORK_BYTES_IN_FLIGHT = 0'),
+        call('WORK_CONCURRENCY = 1'),
         call('WORK_RETRIES = 5'),
         call('WORK_SLEEP_DURATION_SECONDS = 70'),
+        call('WORK_SLEEP_MIN_DURATION_SECONDS = 5'),
         call('WORK_TIMEOUT_SECONDS = 90')
     ]
     logger_mock.info.assert_has_calls(EXPECTED_LOGGER_CALLS)
@@ -138,7 +150,7 @@ async def test_transfer_request_finisher_do_work_pop_exception(config, mocker):
     p = TransferRequestFinisher(config, logger_mock)
     with pytest.raises(HTTPError):
         await p._do_work()
-    lta_rc_mock.assert_called_with("POST", '/Bundles/actions/pop?source=WIPAC&status=deleted', {'claimant': f'{p.name}-{p.instance_uuid}'})
+    lta_rc_mock.assert_called_with("POST", '/Bundles/actions/pop?source=WIPAC&status=deleted&contents=false&wait=15', {'claimant': f'{p.name}-{p.instance_uuid}'})
 
 @pytest.mark.asyncio
 async def test_transfer_request_finisher_do_work_no_results(config, mocker):
@@ -171,7 +183,7 @@ async def test_transfer_request_finisher_do_work_claim_no_result(config, mocker)
     utr_mock = mocker.patch("lta.transfer_request_finisher.TransferRequestFinisher._update_transfer_request", new_callable=AsyncMock)
     p = TransferRequestFinisher(config, logger_mock)
     await p._do_work_claim()
-    lta_rc_mock.assert_called_with("POST", '/Bundles/actions/pop?source=WIPAC&status=deleted', {'claimant': f'{p.name}-{p.instance_uuid}'})
+    lta_rc_mock.assert_called_with("POST", '/Bundles/actions/pop?source=WIPAC&status=deleted&contents=false&wait=15', {'claimant': f'{p.name}-{p.instance_uuid}'})
     utr_mock.assert_not_called()
 
 @pytest.mark.asyncio
@@ -187,7 +199,7 @@ async def test_transfer_request_finisher_do_work_claim_yes_result(config, mocker
     utr_mock = mocker.patch("lta.transfer_request_finisher.TransferRequestFinisher._update_transfer_request", new_callable=AsyncMock)
     p = TransferRequestFinisher(config, logger_mock)
     assert not await p._do_work_claim()
-    lta_rc_mock.assert_called_with("POST", '/Bundles/actions/pop?source=WIPAC&status=deleted', {'claimant': f'{p.name}-{p.instance_uuid}'})
+    lta_rc_mock.assert_called_with("POST", '/Bundles/actions/pop?source=WIPAC&status=deleted&contents=false&wait=15', {'claimant': f'{p.name}-{p.instance_uuid}'})
     utr_mock.assert_called_with(mocker.ANY, {"one": 1})
 
 @pytest.mark.asyncio
@@ -198,27 +210,23 @@ async def test_transfer_request_finisher_update_transfer_request_no(config, mock
         "request": "a8758a77-2a66-46e6-b43d-b4c74d3078a6",
         "status": "deleted",
     }
-    transferring_bundle = {
-        "uuid": "90a664cc-e3f9-4421-973f-7bc2bc7407d0",
-        "request": "a8758a77-2a66-46e6-b43d-b4c74d3078a6",
-        "status": "transferring",
-    }
     logger_mock = mocker.MagicMock()
     lta_rc_mock = mocker.patch("rest_tools.client.RestClient", new_callable=AsyncMock)
     lta_rc_mock.request.side_effect = [
+        {
+            "uuid": "a8758a77-2a66-46e6-b43d-b4c74d3078a6",
+        },
         {
             "results": [
-                "8286d3ba-fb1b-4923-876d-935bdf7fc99e",
-                "90a664cc-e3f9-4421-973f-7bc2bc7407d0",
+                {"status": "deleted", "count": 1, "size": 0, "oldest_update_timestamp": "2021-02-01T00:00:00"},
+                {"status": "transferring", "count": 1, "size": 0, "oldest_update_timestamp": "2021-02-01T00:00:00"},
             ],
         },
         deleted_bundle,
-        transferring_bundle,
-        deleted_bundle,
     ]
     p = TransferRequestFinisher(config, logger_mock)
     await p._update_transfer_request(lta_rc_mock, deleted_bundle)
-    lta_rc_mock.request.assert_called_with("PATCH", '/Bundles/8286d3ba-fb1b-4923-876d-935bdf7fc99e', {
+    lta_rc_mock.request.assert_called_with("PATCH", '/Bundles/8286d3ba-fb1b-4923-876d-935bdf7fc99e?return=minimal', {
         'claimed': False,
         'update_timestamp': mocker.ANY,
         'work_priority_timestamp': mocker.ANY,
@@ -243,25 +251,104 @@ async def test_transfer_request_finisher_update_transfer_request_yes(config, moc
     logger_mock = mocker.MagicMock()
     lta_rc_mock = mocker.patch("rest_tools.client.RestClient", new_callable=AsyncMock)
     lta_rc_mock.request.side_effect = [
+        transfer_request,
+        {
+            "results": [
+                {"status": "deleted", "count": 1, "size": 0, "oldest_update_timestamp": "2021-02-01T00:00:00"},
+                {"status": "finished", "count": 1, "size": 0, "oldest_update_timestamp": "2021-02-01T00:00:00"},
+            ],
+        },
+        transfer_request,
         {
             "results": [
                 "8286d3ba-fb1b-4923-876d-935bdf7fc99e",
                 "90a664cc-e3f9-4421-973f-7bc2bc7407d0",
             ],
         },
-        deleted_bundle,
-        finished_bundle,
+        {
+            "bundles": [deleted_bundle["uuid"], finished_bundle["uuid"]],
+            "count": 2,
+        },
+    ]
+    p = TransferRequestFinisher(config, logger_mock)
+    await p._update_transfer_request(lta_rc_mock, deleted_bundle)
+    lta_rc_mock.request.assert_called_with("POST", '/Bundles/actions/bulk_update', {
+        "bundles": [
+            "8286d3ba-fb1b-4923-876d-935bdf7fc99e",
+            "90a664cc-e3f9-4421-973f-7bc2bc7407d0",
+        ],
+        "update": {
+            "claimant": mocker.ANY,
+            "claimed": False,
+            "claim_timestamp": mocker.ANY,
+            "status": "finished",
+            "reason": "",
+            "update_timestamp": mocker.ANY,
+        },
+    })
+
+@pytest.mark.asyncio
+async def test_transfer_request_finisher_update_transfer_request_bundle_counts(config, mocker):
+    """Test that _update_transfer_request uses the bundle_counts of the TransferRequest."""
+    deleted_bundle = {
+        "uuid": "8286d3ba-fb1b-4923-876d-935bdf7fc99e",
+        "request": "a8758a77-2a66-46e6-b43d-b4c74d3078a6",
+        "status": "deleted",
+    }
+    transfer_request = {
+        "uuid": "a8758a77-2a66-46e6-b43d-b4c74d3078a6",
+        "bundle_counts": {
+            "deleted": {"count": 1, "size": 0},
+            "transferring": {"count": 1, "size": 0},
+        },
+    }
+    logger_mock = mocker.MagicMock()
+    lta_rc_mock = mocker.patch("rest_tools.client.RestClient", new_callable=AsyncMock)
+    lta_rc_mock.request.side_effect = [
         transfer_request,
-        deleted_bundle,
-        finished_bundle,
+        {},
     ]
     p = TransferRequestFinisher(config, logger_mock)
     await p._update_transfer_request(lta_rc_mock, deleted_bundle)
-    lta_rc_mock.request.assert_called_with("PATCH", '/Bundles/90a664cc-e3f9-4421-973f-7bc2bc7407d0', {
-        "claimant": mocker.ANY,
-        "claimed": False,
-        "claim_timestamp": mocker.ANY,
-        "status": "finished",
-        "reason": "",
-        "update_timestamp": mocker.ANY,
+    assert lta_rc_mock.request.call_count == 2
+    lta_rc_mock.request.assert_called_with("PATCH", '/Bundles/8286d3ba-fb1b-4923-876d-935bdf7fc99e?return=minimal', {
+        'claimed': False,
+        'update_timestamp': mocker.ANY,
+        'work_priority_timestamp': mocker.ANY,
+    })
+
+@pytest.mark.asyncio
+async def test_transfer_request_finisher_update_transfer_request_bundle_counts_stale(config, mocker):
+    """Test that _update_transfer_request checks a summary before bundle_counts complete a TransferRequest."""
+    deleted_bundle = {
+        "uuid": "8286d3ba-fb1b-4923-876d-935bdf7fc99e",
+        "request": "a8758a77-2a66-46e6-b43d-b4c74d3078a6",
+        "status": "deleted",
+    }
+    transfer_request = {
+        "uuid": "a8758a77-2a66-46e6-b43d-b4c74d3078a6",
+        "bundle_counts": {
+            "deleted": {"count": 2, "size": 0},
+        },
+    }
+    logger_mock = mocker.MagicMock()
+    lta_rc_mock = mocker.patch("rest_tools.client.RestClient", new_callable=AsyncMock)
+    lta_rc_mock.request.side_effect = [
+        transfer_request,
+        {
+            "results": [
+                {"status": "deleted", "count": 1, "size": 0, "oldest_update_timestamp": "2021-02-01T00:00:00"},
+                {"status": "transferring", "count": 1, "size": 0, "oldest_update_timestamp": "2021-02-01T00:00:00"},
+            ],
+        },
+        {},
+    ]
+    p = TransferRequestFinisher(config, logger_mock)
+    await p._update_transfer_request(lta_rc_mock, deleted_bundle)
+    assert lta_rc_mock.request.call_count == 3
+    lta_rc_mock.request.assert_any_call("GET", '/Bundles/actions/summary?request=a8758a77-2a66-46e6-b43d-b4c74d3078a6&group_by=status')
+    lta_rc_mock.request.assert_called_with("PATCH", '/Bundles/8286d3ba-fb1b-4923-876d-935bdf7fc99e?return=minimal', {
+        'claimed': False,
+        'update_timestamp': mocker.ANY,
+        'work_priority_timestamp': mocker.ANY,
     })
@@ -1,6 +1,7 @@
 # test_unpacker.py
 """Unit tests for lta/unpacker.py."""
 
+from concurrent.futures import ThreadPoolExecutor
 from unittest.mock import call, mock_open, patch
 
 import pytest  # type: ignore
@@ -21,14 +22,18 @@ def config():
         "HEARTBEAT_PATCH_RETRIES": "3",
         "HEARTBEAT_PATCH_TIMEOUT_SECONDS": "30",
         "HEARTBEAT_SLEEP_DURATION_SECONDS": "60",
+        "LOOP_STALL_LOG_SECONDS": "0",
         "LTA_REST_TOKEN": "fake-lta-rest-token",
         "LTA_REST_URL": "http://RmMNHdPhHpH2ZxfaFAC9d2jiIbf5pZiHDqy43rFLQiM.com/",
         "RUN_ONCE_AND_DIE": "False",
         "SOURCE_SITE": "NERSC",
         "UNPACKER_OUTBOX_PATH": "/tmp/lta/testing/unpacker/outbox",
         "UNPACKER_WORKBOX_PATH": "/tmp/lta/testing/unpacker/workbox",
+        "WORK_BYTES_IN_FLIGHT": "0",
+        "WORK_CONCURRENCY": "1",
         "WORK_RETRIES": "3",
         "WORK_SLEEP_DURATION_SECONDS": "60",
+        "WORK_SLEEP_MIN_DURATION_SECONDS": "5",
         "WORK_TIMEOUT_SECONDS": "30",
     }
 
@@ -136,14 +141,18 @@ async def test_unpacker_logs_configuration(mocker):
         "HEARTBEAT_PATCH_RETRIES": "1",
         "HEARTBEAT_PATCH_TIMEOUT_SECONDS": "20",
         "HEARTBEAT_SLEEP_DURATION_SECONDS": "30",
+        "LOOP_STALL_LOG_SECONDS": "0",
         "LTA_REST_TOKEN": "logme-fake-lta-rest-token",
         "LTA_REST_URL": "logme-http://RmMNHdPhHpH2ZxfaFAC9d2jiIbf5pZiHDqy43rFLQiM.com/",
         "RUN_ONCE_AND_DIE": "False",
         "SOURCE_SITE": "NERSC",
         "UNPACKER_OUTBOX_PATH": "logme/tmp/lta/testing/unpacker/outbox",
         "UNPACKER_WORKBOX_PATH": "logme/tmp/lta/testing/unpacker/workbox",
+        "WORK_BYTES_IN_FLIGHT": "0",
+        "WORK_CONCURRENCY": "1",
         "WORK_RETRIES": "5",
         "WORK_SLEEP_DURATION_SECONDS": "70",
+        "WORK_SLEEP_MIN_DURATION_SECONDS": "5",
         "WORK_TIMEOUT_SECONDS": "90",
     }
     Unpacker(unpacker_config, logger_mock)
@@ -156,14 +165,18 @@ async def test_unpacker_logs_configuration(mocker):
         call('HEARTBEAT_PATCH_RETRIES = 1'),
         call('HEARTBEAT_PATCH_TIMEOUT_SECONDS = 20'),
         call('HEARTBEAT_SLEEP_DURATION_SECONDS = 30'),
+        call('LOOP_STALL_LOG_SECONDS = 0'),
         call('LTA_REST_TOKEN = logme-fake-lta-rest-token'),
         call('LTA_REST_URL = logme-http://RmMNHdPhHpH2ZxfaFAC9d2jiIbf5pZiHDqy43rFLQiM.com/'),
         call('RUN_ONCE_AND_DIE = False'),
         call('SOURCE_SITE = NERSC'),
         call('UNPACKER_OUTBOX_PATH = logme/tmp/lta/testing/unpacker/outbox'),
         call('UNPACKER_WORKBOX_PATH = logme/tmp/lta/testing/unpacker/workbox'),
+        call('WORK_BYTES_IN_FLIGHT = 0'),
+        call('WORK_CONCURRENCY = 1'),
         call('WORK_RETRIES = 5'),
         call('WORK_SLEEP_DURATION_SECONDS = 70'),
+        call('WORK_SLEEP_MIN_DURATION_SECONDS = 5'),
         call('WORK_TIMEOUT_SECONDS = 90'),
     ]
     logger_mock.info.assert_has_calls(EXPECTED_LOGGER_CALLS)
@@ -201,7 +214,7 @@ async def test_unpacker_do_work_pop_exception(config, mocker):
     p = Unpacker(config, logger_mock)
     with pytest.raises(HTTPError):
         await p._do_work()
-    lta_rc_mock.assert_called_with("POST", '/Bundles/actions/pop?dest=WIPAC&status=unpacking', mocker.ANY)
+    lta_rc_mock.assert_called_with("POST", '/Bundles/actions/pop?dest=WIPAC&status=unpacking&wait=15', mocker.ANY)
 
 
 @pytest.mark.asyncio
@@ -224,7 +237,7 @@ async def test_unpacker_do_work_claim_no_results(config, mocker):
     }
     p = Unpacker(config, logger_mock)
     assert not await p._do_work_claim()
-    lta_rc_mock.assert_called_with("POST", '/Bundles/actions/pop?dest=WIPAC&status=unpacking', mocker.ANY)
+    lta_rc_mock.assert_called_with("POST", '/Bundles/actions/pop?dest=WIPAC&status=unpacking&wait=15', mocker.ANY)
 
 
 @pytest.mark.asyncio
@@ -241,7 +254,7 @@ async def test_unpacker_do_work_yes_results(config, mocker):
     dwb_mock = mocker.patch("lta.unpacker.Unpacker._do_work_bundle", new_callable=AsyncMock)
     p = Unpacker(config, logger_mock)
     assert await p._do_work_claim()
-    lta_rc_mock.assert_called_with("POST", '/Bundles/actions/pop?dest=WIPAC&status=unpacking', mocker.ANY)
+    lta_rc_mock.assert_called_with("POST", '/Bundles/actions/pop?dest=WIPAC&status=unpacking&wait=15', mocker.ANY)
     dwb_mock.assert_called_with(lta_rc_mock, BUNDLE_OBJ)
 
 
@@ -262,7 +275,7 @@ async def test_unpacker_do_work_raise_exception(config, mocker):
     p = Unpacker(config, logger_mock)
     with pytest.raises(Exception):
         await p._do_work_claim()
-    lta_rc_mock.assert_called_with("POST", '/Bundles/actions/pop?dest=WIPAC&status=unpacking', mocker.ANY)
+    lta_rc_mock.assert_called_with("POST", '/Bundles/actions/pop?dest=WIPAC&status=unpacking&wait=15', mocker.ANY)
     dwb_mock.assert_called_with(lta_rc_mock, BUNDLE_OBJ)
     qb_mock.assert_called_with(lta_rc_mock, BUNDLE_OBJ, "LTA DB started on fire again")
 
@@ -288,7 +301,7 @@ async def test_unpacker_quarantine_bundle_with_reason(config, mocker):
     lta_rc_mock = mocker.patch("rest_tools.client.RestClient", new_callable=AsyncMock)
     p = Unpacker(config, logger_mock)
     await p._quarantine_bundle(lta_rc_mock, {"uuid": "c4b345e4-2395-4f9e-b0eb-9cc1c9cdf003"}, "Rucio caught fire, then we roasted marshmellows.")
-    lta_rc_mock.request.assert_called_with("PATCH", "/Bundles/c4b345e4-2395-4f9e-b0eb-9cc1c9cdf003", mocker.ANY)
+    lta_rc_mock.request.assert_called_with("PATCH", "/Bundles/c4b345e4-2395-4f9e-b0eb-9cc1c9cdf003?return=minimal", mocker.ANY)
 
 
 @pytest.mark.asyncio
@@ -299,7 +312,7 @@ async def test_unpacker_quarantine_bundle_with_reason_raises(config, mocker):
     lta_rc_mock.request.side_effect = Exception("Marshmellows were poisoned")
     p = Unpacker(config, logger_mock)
     await p._quarantine_bundle(lta_rc_mock, {"uuid": "c4b345e4-2395-4f9e-b0eb-9cc1c9cdf003"}, "Rucio caught fire, then we roasted marshmellows.")
-    lta_rc_mock.request.assert_called_with("PATCH", "/Bundles/c4b345e4-2395-4f9e-b0eb-9cc1c9cdf003", mocker.ANY)
+    lta_rc_mock.request.assert_called_with("PATCH", "/Bundles/c4b345e4-2395-4f9e-b0eb-9cc1c9cdf003?return=minimal", mocker.ANY)
 
 
 @pytest.mark.asyncio
@@ -309,7 +322,7 @@ async def test_unpacker_update_bundle_in_lta_db(config, mocker):
     lta_rc_mock = mocker.patch("rest_tools.client.RestClient", new_callable=AsyncMock)
     p = Unpacker(config, logger_mock)
     assert await p._update_bundle_in_lta_db(lta_rc_mock, {"uuid": "c4b345e4-2395-4f9e-b0eb-9cc1c9cdf003"})
-    lta_rc_mock.request.assert_called_with("PATCH", "/Bundles/c4b345e4-2395-4f9e-b0eb-9cc1c9cdf003", mocker.ANY)
+    lta_rc_mock.request.assert_called_with("PATCH", "/Bundles/c4b345e4-2395-4f9e-b0eb-9cc1c9cdf003?return=minimal", mocker.ANY)
 
 
 @pytest.mark.asyncio
@@ -362,6 +375,7 @@ async def test_unpacker_do_work_bundle(config, mocker):
     mock_shutil_move = mocker.patch("shutil.move")
     mock_shutil_move.return_value = None
     mock_lta_checksums = mocker.patch("lta.unpacker.lta_checksums")
+    mocker.patch("lta.component.ProcessPoolExecutor", ThreadPoolExecutor)  # mocks can't be sent to another process
     mock_lta_checksums.return_value = {
         "adler32": "89d5efeb",
         "sha512": "c919210281b72327c179e26be799b06cdaf48bf6efce56fb9d53f758c1b997099831ad05453fdb1ba65be7b35d0b4c5cebfc439efbdf83317ba0e38bf6f42570",
@@ -410,6 +424,7 @@ async def test_unpacker_do_work_bundle_mismatch_size(config, mocker):
     mock_shutil_move = mocker.patch("shutil.move")
     mock_shutil_move.return_value = None
     mock_lta_checksums = mocker.patch("lta.unpacker.lta_checksums")
+    mocker.patch("lta.component.ProcessPoolExecutor", ThreadPoolExecutor)  # mocks can't be sent to another process
     mock_lta_checksums.return_value = {
         "adler32": "89d5efeb",
         "sha512": "c919210281b72327c179e26be799b06cdaf48bf6efce56fb9d53f758c1b997099831ad05453fdb1ba65be7b35d0b4c5cebfc439efbdf83317ba0e38bf6f42570",
@@ -459,6 +474,7 @@ async def test_unpacker_do_work_bundle_mismatch_checksum(config, mocker):
     mock_shutil_move = mocker.patch("shutil.move")
     mock_shutil_move.return_value = None
     mock_lta_checksums = mocker.patch("lta.unpacker.lta_checksums")
+    mocker.patch("lta.component.ProcessPoolExecutor", ThreadPoolExecutor)  # mocks can't be sent to another process
     mock_lta_checksums.return_value = {
         "adler32": "89d5efeb",
         "sha512": "919210281b72327c179e26be799b06cdaf48bf6efce56fb9d53f758c1b997099831ad05453fdb1ba65be7b35d0b4c5cebfc439efbdf83317ba0e38bf6f42570c",